@@ -1,5 +1,14 @@
+import uuid
+
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters, ShowFacets
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils.html import format_html
+from rest_framework.exceptions import NotFound
+
+from api.pagination import AuditLogPagination, estimated_count, keyset_filter
+from .audit import AUDITED_TABLES
 from .models import User, LoginLogs, AuditLog
 
 
@@ -71,17 +80,97 @@ class LoginLogsAdmin(admin.ModelAdmin):
         return request.user.is_superuser or request.user.is_super_admin()
 
 
+class AuditTableFilter(admin.SimpleListFilter):
+    """Fixed table choices: the default filter would run SELECT DISTINCT over the whole audit_log"""
+    title = 'الجدول'
+    parameter_name = 'table_name'
+
+    def lookups(self, request, model_admin):
+        return [(table, table) for table in AUDITED_TABLES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(table_name=self.value())
+        return queryset
+
+
+class AuditLogChangeList(ChangeList):
+    """
+    Keyset pages (``?cursor=``, as in ``/api/audit/``) instead of numbered
+    ones, and the planner's estimate instead of ``COUNT(*)``, so a page costs
+    the same at any depth and any table size.
+    """
+    cursor_var = AuditLogPagination.cursor_query_param
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(self.cursor_var, None)
+        return lookup_params
+
+    def get_results(self, request):
+        pagination = AuditLogPagination()
+        try:
+            cursor = pagination.parse_cursor(request.GET.get(self.cursor_var))
+        except NotFound:
+            raise IncorrectLookupParameters
+        # Filter and first-page links start over from the newest rows
+        self.filter_params.pop(self.cursor_var, None)
+
+        queryset = self.queryset
+        if cursor is not None:
+            queryset = keyset_filter(queryset, pagination.ordering_field, *cursor)
+        rows = list(queryset[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        self.result_list = rows[:self.list_per_page]
+        self.next_url = (
+            self.get_query_string({self.cursor_var: pagination.encode_cursor(self.result_list[-1])})
+            if has_next else None
+        )
+        self.first_url = self.get_query_string() if cursor is not None else None
+
+        self.result_count = estimated_count(self.queryset)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
-    list_display = ('action', 'table_name', 'changed_by', 'changed_at')
-    list_filter = ('action', 'table_name', 'changed_at')
+    list_display = ('action', 'table_name', 'record_history', 'changed_by', 'changed_at')
+    list_filter = ('action', AuditTableFilter, 'changed_at')
     search_fields = ('table_name', 'changed_by__username', 'changed_by__full_name')
-    ordering = ('-changed_at',)
+    search_help_text = 'معرف السجل (UUID)، أو اسم الجدول أو اسم المستخدم أو جزء منه'
+    ordering = ('-changed_at', '-id')
+    # The keyset pages only follow (changed_at, id)
+    sortable_by = ()
+    show_facets = ShowFacets.NEVER
+    show_full_result_count = False
+    list_per_page = 50
     readonly_fields = ('changed_at',)
     
+    def get_changelist(self, request, **kwargs):
+        return AuditLogChangeList
+    
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('changed_by')
     
+    def get_search_results(self, request, queryset, search_term):
+        """A UUID is a record's history (on the record index), anything else the usual ``search_fields`` match"""
+        try:
+            record_id = uuid.UUID(search_term.strip())
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(table_name__in=AUDITED_TABLES, record_id=record_id), False
+    
+    @admin.display(description='السجل')
+    def record_history(self, obj):
+        if obj.record_id is None:
+            return '-'
+        return format_html('<a href="?table_name={}&record_id={}">{}</a>', obj.table_name, obj.record_id, obj.record_id)
+    
     def has_add_permission(self, request):
         return False  # Audit logs should not be manually created
     
@@ -92,4 +181,4 @@ class AuditLogAdmin(admin.ModelAdmin):
         return request.user.is_superuser or request.user.is_super_admin()
     
     def has_view_permission(self, request, obj=None):
-        return request.user.is_superuser or request.user.is_super_admin()
\ No newline at end of file
+        return request.user.is_superuser or request.user.is_super_admin()
@@ -0,0 +1,90 @@
+"""
+Monthly partitions of ``audit_log`` (migration ``accounts.0006``).
+
+``audit_log`` is range-partitioned on ``changed_at`` by UTC month, one
+``audit_log_YYYY_MM`` table per month. Rows for a month without its
+partition land in ``audit_log_default`` and are moved out when the partition
+is created (``audit_log_create_partition`` in SQL).
+
+The rows come from statement-level triggers installed per table by the SQL
+function ``audit_install(table, skipped)``. INSERT and DELETE store the whole
+row; UPDATE stores only the changed columns, in ``old_data`` and
+``new_data``. The comparison is generated column by column, so run
+``SELECT audit_install('<table>')`` again in any migration that adds a
+column to an audited table. Generated columns are never stored, and neither
+is ``users.password_hash``.
+
+Retention works on whole partitions: a month past the retention window is
+detached, which is a catalog change and not a row-by-row DELETE. It is then
+kept as ``audit_archive_YYYY_MM`` for export or dropped.
+"""
+import datetime
+import re
+
+from django.db import connection
+
+# The tables migration 0006 installs audit triggers on
+AUDITED_TABLES = ('users', 'delegation', 'member', 'check_out')
+
+PARTITION_NAME = re.compile(r'^audit_log_(\d{4})_(\d{2})$')
+ARCHIVE_PREFIX = 'audit_archive_'
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition(month):
+    """Create the partition of ``month`` (if missing) and return its name"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT audit_log_create_partition(%s)', [month_start(month)])
+        return cursor.fetchone()[0]
+
+
+def partitions():
+    """``[(name, first day of the month)]`` of the monthly partitions, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'audit_log'::regclass")
+        names = [name for (name,) in cursor.fetchall()]
+    months = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append((name, datetime.date(int(match[1]), int(match[2]), 1)))
+    return sorted(months, key=lambda item: item[1])
+
+
+def empty_default_partition():
+    """Give every month still held by ``audit_log_default`` its own partition; returns their names"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT date_trunc('month', changed_at AT TIME ZONE 'UTC')::date FROM audit_log_default"
+        )
+        months = [month for (month,) in cursor.fetchall()]
+    return [create_partition(month) for month in months]
+
+
+def retire_partitions(before, drop=False):
+    """
+    Detach every monthly partition older than the month of ``before``.
+
+    Detached partitions are renamed ``audit_archive_YYYY_MM``, or dropped
+    with ``drop=True``. Returns the names of the retired partitions.
+    """
+    retired = []
+    with connection.cursor() as cursor:
+        for name, month in partitions():
+            if month >= month_start(before):
+                break
+            cursor.execute(f'ALTER TABLE audit_log DETACH PARTITION "{name}"')
+            if drop:
+                cursor.execute(f'DROP TABLE "{name}"')
+            else:
+                cursor.execute(f'ALTER TABLE "{name}" RENAME TO "{ARCHIVE_PREFIX}{month:%Y_%m}"')
+            retired.append(name)
+    return retired
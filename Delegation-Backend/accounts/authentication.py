@@ -0,0 +1,113 @@
+"""
+Token authentication with a cached token -> user lookup.
+
+DRF's ``TokenAuthentication`` reads ``authtoken_token`` joined to ``users``
+on every request. ``CachedTokenAuthentication`` keeps the few user fields
+that permission checks need (id, role, is_active, ...) in the default cache
+for ``AUTH_TOKEN_CACHE_TTL`` seconds, keyed by a hash of the token. A cached
+request therefore authenticates without touching the database. The cached
+user is a model instance with the other fields deferred; reading one of them
+costs a query.
+
+The cache must be shared by every worker, so the settings set
+``AUTH_TOKEN_CACHE_TTL`` to 0 unless the default cache is Redis: each request
+then reads the token from the database.
+
+Entries are dropped as soon as they could be wrong (``accounts.signals``):
+when a token is deleted (logout, rotation, expiry) and whenever a user is
+saved (deactivation, role change). ``QuerySet.update()`` on users bypasses
+signals; call ``forget_user`` after one.
+
+With ``AUTH_TOKEN_TTL`` set, a token older than that many seconds is
+rejected and deleted; ``issue_token`` hands out a fresh one at the next
+login, and ``rotate_token`` replaces a token on demand.
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+CACHE_KEY = 'auth:token:{digest}'
+# The user fields kept in the cache; everything else is deferred
+CACHED_FIELDS = ('id', 'username', 'full_name', 'is_active', 'is_staff', 'is_superuser', 'role')
+
+
+def cache_key(key):
+    return CACHE_KEY.format(digest=hashlib.sha256(key.encode()).hexdigest())
+
+
+def token_expired(created):
+    ttl = settings.AUTH_TOKEN_TTL
+    return bool(ttl) and created + datetime.timedelta(seconds=ttl) <= timezone.now()
+
+
+def forget_token(key):
+    cache.delete(cache_key(key))
+
+
+def forget_user(user_id):
+    """Drop the cached entry of the user's token (its role or status changed)"""
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        forget_token(key)
+
+
+def issue_token(user):
+    """The user's token, replaced by a new one if it has expired"""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token.created):
+        return rotate_token(user)
+    return token
+
+
+def rotate_token(user):
+    """Replace the user's token; the old key stops working immediately"""
+    Token.objects.filter(user=user).delete()
+    return Token.objects.create(user=user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``Authorization: Token <key>``, served from the cache after the first request"""
+
+    def authenticate_credentials(self, key):
+        entry = cache.get(cache_key(key)) if settings.AUTH_TOKEN_CACHE_TTL else None
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            entry = {
+                'created': token.created,
+                'user': {field: getattr(token.user, field) for field in CACHED_FIELDS},
+            }
+            if settings.AUTH_TOKEN_CACHE_TTL and not token_expired(token.created):
+                cache.set(cache_key(key), entry, self.cache_timeout(token.created))
+
+        if token_expired(entry['created']):
+            Token.objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        user = self.cached_user(entry['user'])
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, Token(key=key, user=user, created=entry['created']))
+
+    @staticmethod
+    def cache_timeout(created):
+        timeout = settings.AUTH_TOKEN_CACHE_TTL
+        if settings.AUTH_TOKEN_TTL:
+            remaining = created + datetime.timedelta(seconds=settings.AUTH_TOKEN_TTL) - timezone.now()
+            timeout = min(timeout, max(int(remaining.total_seconds()), 1))
+        return timeout
+
+    @staticmethod
+    def cached_user(fields):
+        User = get_user_model()
+        names = [f.attname for f in User._meta.concrete_fields if f.attname in fields]
+        return User.from_db('default', names, [fields[name] for name in names])
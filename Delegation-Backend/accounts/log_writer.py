@@ -0,0 +1,175 @@
+"""
+Batched log writes off the request path.
+
+``writer.put(record)`` appends an unsaved model instance (``LoginLogs``,
+``AuditLog``, ...) to an in-process queue and returns at once. A background
+thread writes the queue with one ``bulk_create`` per model when
+``LOG_BATCH_SIZE`` records are waiting or every ``LOG_FLUSH_MS``
+milliseconds. Whatever is still queued is written at interpreter exit
+(``close``). With ``LOG_FLUSH_MS = 0`` every record is written in the calling
+thread, as before.
+
+The queue holds at most ``LOG_QUEUE_MAX`` records. Records beyond that, and
+records of a batch the database refused, are dropped and counted in
+``stats()['dropped']`` (``/api/dashboard/log-writer/``). They are logs, so
+losing some is better than slowing down or failing a login.
+"""
+import atexit
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+
+DEFAULT_FLUSH_MS = 1000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_QUEUE_MAX = 10000
+
+
+class LogWriter:
+    """Queues unsaved log records and writes them in batches from a worker thread"""
+
+    def __init__(self, flush_ms=None, batch_size=None, max_pending=None):
+        self._flush_ms = flush_ms
+        self._batch_size = batch_size
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        # Held for a whole write, so batches reach the database in order
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = []
+        self._worker = None
+        self._closed = False
+        self.records_in = 0
+        self.records_written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_error = None
+
+    @property
+    def flush_ms(self):
+        if self._flush_ms is not None:
+            return self._flush_ms
+        return getattr(settings, 'LOG_FLUSH_MS', DEFAULT_FLUSH_MS)
+
+    @property
+    def batch_size(self):
+        return self._batch_size or getattr(settings, 'LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    @property
+    def max_pending(self):
+        return self._max_pending or getattr(settings, 'LOG_QUEUE_MAX', DEFAULT_QUEUE_MAX)
+
+    def put(self, record, username=None):
+        """
+        Queue ``record``; returns ``False`` if it was dropped because the queue is full.
+
+        With ``username`` the record's ``user`` is filled in when the batch is
+        written (one query for the whole batch), and the record is skipped if
+        no such user exists. Failed logins use it, so they no longer look the
+        user up during the request.
+        """
+        synchronous = self.flush_ms <= 0 or self._closed
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.records_in += 1
+            self._pending.append((record, username))
+            full = len(self._pending) >= self.batch_size
+            worker = None
+            if not synchronous and self._worker is None:
+                worker = self._worker = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        if synchronous:
+            self.flush()
+        elif worker is not None:
+            worker.start()
+        if full:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """Write everything queued; returns the number of records written"""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            try:
+                written = self._write(pending)
+            except Exception as exc:
+                with self._lock:
+                    self.dropped += len(pending)
+                    self.last_error = repr(exc)
+                return 0
+            with self._lock:
+                self.records_written += written
+                self.flushes += 1
+            return written
+
+    def _write(self, pending):
+        usernames = {username for _, username in pending if username}
+        user_ids = {}
+        if usernames:
+            User = get_user_model()
+            user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        batches = {}
+        for record, username in pending:
+            if username:
+                if username not in user_ids:
+                    continue
+                record.user_id = user_ids[username]
+            batches.setdefault(type(record), []).append(record)
+        written = 0
+        with transaction.atomic():
+            for model, records in batches.items():
+                model.objects.bulk_create(records, batch_size=self.batch_size)
+                written += len(records)
+        return written
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_ms / 1000.0)
+            self._wake.clear()
+            if self._closed:
+                # close() writes the rest in its own thread
+                return
+            try:
+                self.flush()
+            finally:
+                # The worker thread has its own database connections
+                connections.close_all()
+
+    def close(self):
+        """Stop the worker and write what is left (registered with ``atexit``)"""
+        self._closed = True
+        self._wake.set()
+        worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'flush_ms': self.flush_ms,
+                'batch_size': self.batch_size,
+                'records_in': self.records_in,
+                'records_written': self.records_written,
+                'pending': len(self._pending),
+                'dropped': self.dropped,
+                'flushes': self.flushes,
+                'last_error': self.last_error,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.records_in = 0
+            self.records_written = 0
+            self.dropped = 0
+            self.flushes = 0
+            self.last_error = None
+
+
+writer = LogWriter()
+atexit.register(writer.close)
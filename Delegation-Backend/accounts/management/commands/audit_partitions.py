@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import audit
+
+
+class Command(BaseCommand):
+    help = ('Maintain the monthly audit_log partitions: create the coming months, move rows out of the '
+            'default partition, and detach (or drop) months older than the retention window. '
+            'Run it daily or monthly from cron.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=2, help='Months to create after the current one (default: 2)')
+        parser.add_argument('--keep-months', type=int, default=12,
+                            help='Months kept attached, the current one included (default: 12)')
+        parser.add_argument('--drop', action='store_true',
+                            help='Drop retired partitions instead of keeping them as audit_archive_YYYY_MM')
+
+    def handle(self, *args, **options):
+        if options['keep_months'] < 1:
+            raise CommandError('--keep-months must be at least 1')
+        this_month = audit.month_start(timezone.now().date())
+        with transaction.atomic():
+            moved = audit.empty_default_partition()
+            for count in range(options['ahead'] + 1):
+                audit.create_partition(audit.add_months(this_month, count))
+            retired = audit.retire_partitions(
+                audit.add_months(this_month, 1 - options['keep_months']), drop=options['drop'],
+            )
+        if moved:
+            self.stdout.write(f'moved out of audit_log_default: {", ".join(moved)}')
+        action = 'dropped' if options['drop'] else 'detached'
+        self.stdout.write(f'{action}: {", ".join(retired) or "-"}')
+        self.stdout.write(f'attached: {", ".join(name for name, _ in audit.partitions())}')
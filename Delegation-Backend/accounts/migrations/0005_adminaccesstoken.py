@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_auditlog_changed_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminAccessToken',
+            fields=[
+                ('token_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='admin_access_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'رمز دخول لوحة الإدارة',
+                'verbose_name_plural': 'رموز دخول لوحة الإدارة',
+                'db_table': 'admin_access_token',
+            },
+        ),
+    ]
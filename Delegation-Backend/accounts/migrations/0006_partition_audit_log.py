@@ -0,0 +1,210 @@
+from django.db import migrations
+
+
+PARTITION_SQL = """
+ALTER TABLE audit_log RENAME TO audit_log_unpartitioned;
+ALTER TABLE audit_log_unpartitioned RENAME CONSTRAINT audit_log_pkey TO audit_log_unpartitioned_pkey;
+
+-- سجل التدقيق مقسم حسب شهر changed_at (التوقيت العالمي)
+-- المفتاح الأساسي يجب أن يتضمن عمود التقسيم
+CREATE TABLE audit_log (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    table_name VARCHAR(100) NOT NULL,
+    record_id UUID NULL,
+    action VARCHAR(10) NOT NULL,
+    old_data JSONB NULL,
+    new_data JSONB NULL,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    ip_address INET NULL,
+    user_agent TEXT NULL,
+    changed_by UUID NULL,
+    CONSTRAINT audit_log_pkey PRIMARY KEY (id, changed_at),
+    CONSTRAINT audit_log_changed_by_fk_users_id FOREIGN KEY (changed_by)
+        REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED
+) PARTITION BY RANGE (changed_at);
+
+CREATE INDEX audit_log_changed_by_idx ON audit_log (changed_by);
+
+-- يستقبل الصفوف التي لا يوجد لشهرها قسم بعد؛ تُنقل عند إنشاء القسم
+CREATE TABLE audit_log_default PARTITION OF audit_log DEFAULT;
+
+-- إنشاء قسم شهر (audit_log_YYYY_MM) ونقل صفوفه من القسم الافتراضي
+CREATE OR REPLACE FUNCTION audit_log_create_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    start_at TIMESTAMPTZ := date_trunc('month', p_month::timestamp) AT TIME ZONE 'UTC';
+    end_at TIMESTAMPTZ := (date_trunc('month', p_month::timestamp) + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    partition_name TEXT := 'audit_log_' || to_char(p_month, 'YYYY_MM');
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_inherits
+        WHERE inhparent = 'audit_log'::regclass AND inhrelid::regclass::text = partition_name
+    ) THEN
+        RETURN partition_name;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE audit_log INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM audit_log_default WHERE changed_at >= %L AND changed_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        start_at, end_at, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE audit_log ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_at, end_at
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT audit_log_create_partition(month::date)
+FROM (
+    SELECT DISTINCT date_trunc('month', changed_at AT TIME ZONE 'UTC') AS month FROM audit_log_unpartitioned
+    UNION
+    SELECT date_trunc('month', (NOW() AT TIME ZONE 'UTC') + n * INTERVAL '1 month') FROM generate_series(0, 2) AS n
+) months;
+
+INSERT INTO audit_log (id, table_name, record_id, action, old_data, new_data, changed_at, ip_address, user_agent, changed_by)
+SELECT id, table_name, record_id, action, old_data, new_data, changed_at, ip_address, user_agent, changed_by
+FROM audit_log_unpartitioned;
+
+SELECT setval(pg_get_serial_sequence('audit_log', 'id'), COALESCE((SELECT MAX(id) FROM audit_log), 0) + 1, false);
+
+DROP TABLE audit_log_unpartitioned;
+"""
+
+UNPARTITION_SQL = """
+ALTER TABLE audit_log RENAME TO audit_log_partitioned;
+ALTER TABLE audit_log_partitioned RENAME CONSTRAINT audit_log_pkey TO audit_log_partitioned_pkey;
+CREATE TABLE audit_log (
+    id BIGINT NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    table_name VARCHAR(100) NOT NULL,
+    record_id UUID NULL,
+    action VARCHAR(10) NOT NULL,
+    old_data JSONB NULL,
+    new_data JSONB NULL,
+    changed_at TIMESTAMPTZ NOT NULL,
+    ip_address INET NULL,
+    user_agent TEXT NULL,
+    changed_by UUID NULL REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX audit_log_changed_by_id_9ab2cc66 ON audit_log (changed_by);
+INSERT INTO audit_log SELECT id, table_name, record_id, action, old_data, new_data, changed_at, ip_address,
+    user_agent, changed_by FROM audit_log_partitioned;
+SELECT setval(pg_get_serial_sequence('audit_log', 'id'), COALESCE((SELECT MAX(id) FROM audit_log), 0) + 1, false);
+DROP TABLE audit_log_partitioned;
+DROP FUNCTION IF EXISTS audit_log_create_partition(DATE);
+"""
+
+# جداول التدقيق والأعمدة التي لا تُسجل (الأعمدة المولدة تُستثنى تلقائياً)
+AUDITED_TABLES = (
+    ('users', ('password_hash',)),
+    ('delegation', ()),
+    ('member', ()),
+    ('check_out', ()),
+)
+
+AUDIT_INSTALL_SQL = """
+-- تنشئ دالة التدقيق audit_<table>_changed() ومشغلاتها الثلاثة (مرة واحدة لكل استعلام، جداول الانتقال)
+-- الإضافة والحذف: الصف كاملاً؛ التعديل: الأعمدة التي تغيرت فقط (old_data القيم السابقة و new_data الجديدة)
+-- المقارنة عمود بعمود مكتوبة في الدالة، لذلك يجب استدعاؤها مجدداً بعد إضافة عمود إلى جدول مُدقق
+CREATE OR REPLACE FUNCTION audit_install(p_table REGCLASS, p_skipped TEXT[] DEFAULT '{}')
+RETURNS VOID AS $$
+DECLARE
+    function_name TEXT := 'audit_' || p_table::text || '_changed';
+    skipped TEXT[];
+    old_diff TEXT;
+    new_diff TEXT;
+    event TEXT;
+BEGIN
+    SELECT
+        p_skipped || COALESCE(array_agg(attname::text) FILTER (WHERE attgenerated <> ''), '{}'),
+        string_agg(
+            format('CASE WHEN n.%1$I IS DISTINCT FROM o.%1$I THEN jsonb_build_object(%1$L, o.%1$I) ELSE ''{}'' END', attname),
+            ' || ' ORDER BY attnum
+        ) FILTER (WHERE attgenerated = '' AND attname <> ALL (p_skipped)),
+        string_agg(
+            format('CASE WHEN n.%1$I IS DISTINCT FROM o.%1$I THEN jsonb_build_object(%1$L, n.%1$I) ELSE ''{}'' END', attname),
+            ' || ' ORDER BY attnum
+        ) FILTER (WHERE attgenerated = '' AND attname <> ALL (p_skipped))
+    INTO skipped, old_diff, new_diff
+    FROM pg_attribute
+    WHERE attrelid = p_table AND attnum > 0 AND NOT attisdropped;
+
+    -- enable_nestloop: خطة ربط old_rows/new_rows تُحفظ من الاستعلامات الصغيرة وتصبح بطيئة مع الكبيرة
+    EXECUTE format($function$
+CREATE OR REPLACE FUNCTION %1$I()
+RETURNS TRIGGER AS $body$
+DECLARE
+    actor UUID := NULLIF(current_setting('app.current_user', true), '')::uuid;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO audit_log (table_name, record_id, action, new_data, changed_by)
+        SELECT TG_TABLE_NAME, n.id, TG_OP, to_jsonb(n) - %2$L::text[], actor
+        FROM new_rows n;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO audit_log (table_name, record_id, action, old_data, changed_by)
+        SELECT TG_TABLE_NAME, o.id, TG_OP, to_jsonb(o) - %2$L::text[], actor
+        FROM old_rows o;
+    ELSE
+        INSERT INTO audit_log (table_name, record_id, action, old_data, new_data, changed_by)
+        SELECT TG_TABLE_NAME, n.id, TG_OP, diff.old_data, diff.new_data, actor
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        CROSS JOIN LATERAL (SELECT %3$s AS old_data, %4$s AS new_data) diff
+        WHERE diff.new_data <> '{}';
+    END IF;
+    RETURN NULL;
+END;
+$body$ LANGUAGE plpgsql SET enable_nestloop = off;
+$function$, function_name, skipped, old_diff, new_diff);
+
+    FOREACH event IN ARRAY ARRAY['insert', 'update', 'delete'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %s', 'trg_audit_' || p_table::text || '_' || event, p_table);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER %s ON %s REFERENCING %s FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            'trg_audit_' || p_table::text || '_' || event, upper(event), p_table,
+            CASE event
+                WHEN 'insert' THEN 'NEW TABLE AS new_rows'
+                WHEN 'update' THEN 'OLD TABLE AS old_rows NEW TABLE AS new_rows'
+                ELSE 'OLD TABLE AS old_rows'
+            END,
+            function_name
+        );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def install_audit_sql(tables=AUDITED_TABLES):
+    return '\n'.join(
+        f"SELECT audit_install('{table}', ARRAY[{', '.join(repr(key) for key in skipped)}]::text[]);"
+        for table, skipped in tables
+    )
+
+
+def drop_audit_triggers_sql(tables=AUDITED_TABLES):
+    return '\n'.join(
+        f'DROP TRIGGER IF EXISTS trg_audit_{table}_{event} ON {table};'
+        for table, _ in tables for event in ('insert', 'update', 'delete')
+    )
+
+
+def drop_audit_sql(tables=AUDITED_TABLES):
+    return drop_audit_triggers_sql(tables) + '\n' + '\n'.join(
+        f'DROP FUNCTION IF EXISTS audit_{table}_changed();' for table, _ in tables
+    ) + '\nDROP FUNCTION IF EXISTS audit_install(REGCLASS, TEXT[]);'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_adminaccesstoken'),
+        # The audited tables
+        ('api', '0014_search_columns'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, reverse_sql=UNPARTITION_SQL),
+        migrations.RunSQL(AUDIT_INSTALL_SQL + install_audit_sql(), reverse_sql=drop_audit_sql()),
+    ]
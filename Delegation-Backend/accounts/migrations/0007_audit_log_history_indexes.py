@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_partition_audit_log'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='auditlog',
+            options={'ordering': ['-changed_at', '-id'], 'verbose_name': 'سجل التدقيق', 'verbose_name_plural': 'سجلات التدقيق'},
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['table_name', 'record_id', '-changed_at', '-id'], name='audit_log_record_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['table_name', '-changed_at', '-id'], name='audit_log_table_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-changed_at', '-id'], name='audit_log_changed_idx'),
+        ),
+    ]
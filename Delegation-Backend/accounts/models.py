@@ -1,5 +1,10 @@
 from django.contrib.auth.models import AbstractUser
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+import datetime
+import hashlib
+import secrets
 import uuid
 
 
@@ -153,6 +158,57 @@ class LoginLogs(models.Model):
         return f"{self.user.full_name} - {self.login_time}"
 
 
+class AdminAccessToken(models.Model):
+    """
+    Short-lived, single-use token that hands a Super Admin over from the
+    frontend to Django Admin (``/admin/?admin_token=...``).
+
+    Only the SHA-256 of the token is stored, as the primary key, so the
+    middleware finds it with one index lookup; ``consume`` deletes it in
+    the same statement.
+    """
+    token_hash = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='admin_access_tokens')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'admin_access_token'
+        verbose_name = 'رمز دخول لوحة الإدارة'
+        verbose_name_plural = 'رموز دخول لوحة الإدارة'
+
+    def __str__(self):
+        return f"{self.user.full_name} - {self.expires_at}"
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        """Store a new token for ``user`` and return it (the only time it is available in clear)"""
+        now = timezone.now()
+        # Expired tokens that were never used
+        cls.objects.filter(expires_at__lte=now).delete()
+        token = secrets.token_urlsafe(32)
+        cls.objects.create(
+            token_hash=cls.hash_token(token), user=user,
+            expires_at=now + datetime.timedelta(seconds=settings.ADMIN_TOKEN_TTL),
+        )
+        return token
+
+    @classmethod
+    def consume(cls, token):
+        """Delete the token and return its user if it was valid and unexpired, else ``None`` (one query)"""
+        users = list(User.objects.raw(
+            f"WITH used AS ("
+            f"DELETE FROM {cls._meta.db_table} WHERE token_hash = %s AND expires_at > %s RETURNING user_id"
+            f") SELECT u.* FROM {User._meta.db_table} u JOIN used ON used.user_id = u.id",
+            [cls.hash_token(token), timezone.now()],
+        ))
+        return users[0] if users else None
+
+
 class AuditLog(models.Model):
     """
     Audit log for tracking all changes
@@ -178,7 +234,13 @@ class AuditLog(models.Model):
         db_table = 'audit_log'
         verbose_name = 'سجل التدقيق'
         verbose_name_plural = 'سجلات التدقيق'
-        ordering = ['-changed_at']
+        ordering = ['-changed_at', '-id']
+        indexes = [
+            # Keyset pagination of the audit trail: one record, one table, everything
+            models.Index(fields=['table_name', 'record_id', '-changed_at', '-id'], name='audit_log_record_history_idx'),
+            models.Index(fields=['table_name', '-changed_at', '-id'], name='audit_log_table_changed_idx'),
+            models.Index(fields=['-changed_at', '-id'], name='audit_log_changed_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action} - {self.table_name} - {self.changed_at}"
\ No newline at end of file
@@ -1,3 +1,291 @@
-from django.test import TestCase
+import datetime
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.models import MainEvent, SubEvent, Delegation, Member, CheckOut
+
+from . import audit
+from .admin import AuditLogAdmin
+from .authentication import cache_key
+from .log_writer import LogWriter
+from .models import AdminAccessToken, AuditLog, LoginLogs
+
+User = get_user_model()
+
+
+class AdminHandOffTests(TestCase):
+    """create_admin_session hands over to Django Admin with a hashed, expiring, single-use token"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.super_admin = User.objects.create(username='root', full_name='مدير النظام', role='SUPER_ADMIN')
+
+    def issue_token(self):
+        client = APIClient()
+        client.force_authenticate(self.super_admin)
+        response = client.post('/api/auth/create_admin_session/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['admin_token']
+
+    def test_token_opens_one_admin_session(self):
+        token = self.issue_token()
+        self.assertFalse(AdminAccessToken.objects.filter(token_hash=token).exists())
+
+        browser = Client()
+        response = browser.get('/admin/', {'admin_token': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.super_admin)
+        # The hand-off left a normal session behind; the token itself is spent
+        self.assertEqual(browser.get('/admin/').status_code, 200)
+        self.assertFalse(AdminAccessToken.objects.exists())
+        self.assertEqual(Client().get('/admin/', {'admin_token': token}).status_code, 302)
+
+    def test_lookup_is_one_query_whatever_the_session_count(self):
+        token = self.issue_token()
+        Session.objects.bulk_create([
+            Session(session_key=f'{n:040d}', session_data=SessionStore().encode({'n': n}),
+                    expire_date=timezone.now() + datetime.timedelta(days=1))
+            for n in range(200)
+        ])
+        with self.assertNumQueries(1):
+            self.assertEqual(AdminAccessToken.consume(token), self.super_admin)
+        with self.assertNumQueries(1):
+            self.assertIsNone(AdminAccessToken.consume(token))
+
+    @override_settings(ADMIN_TOKEN_TTL=-1)
+    def test_expired_token_is_rejected_and_purged(self):
+        token = self.issue_token()
+        self.assertIsNone(AdminAccessToken.consume(token))
+        self.issue_token()
+        self.assertEqual(AdminAccessToken.objects.count(), 1)
+
+
+@override_settings(LOG_FLUSH_MS=0, AUTH_TOKEN_CACHE_TTL=300)
+class TokenAuthenticationTests(TestCase):
+    """CachedTokenAuthentication: no auth query once cached, and revocation takes effect at once"""
+
+    # Failed authentication answers 403: SessionAuthentication comes first and sends no WWW-Authenticate
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(username='desk', full_name='موظف الاستقبال', role='USER')
+        self.user.set_password('secret-123')
+        self.user.save()
+        self.client = APIClient()
+        response = self.client.post('/api/auth/login/', {'username': 'desk', 'password': 'secret-123'}, format='json')
+        self.key = response.data['token']
+        self.client = APIClient(HTTP_AUTHORIZATION=f'Token {self.key}')
+
+    def test_cached_requests_skip_the_token_query(self):
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.client.get('/api/dashboard/stats/').status_code, 200)
+        with CaptureQueriesContext(connection) as cached:
+            self.assertEqual(self.client.get('/api/dashboard/stats/').status_code, 200)
+        self.assertTrue(any('authtoken_token' in q['sql'] for q in first.captured_queries))
+        self.assertFalse(any('authtoken_token' in q['sql'] for q in cached.captured_queries))
+        self.assertEqual(len(cached.captured_queries), len(first.captured_queries) - 1)
+
+    @override_settings(AUTH_TOKEN_CACHE_TTL=0)
+    def test_without_a_shared_cache_every_request_reads_the_token(self):
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+            self.assertTrue(any('authtoken_token' in q['sql'] for q in captured.captured_queries))
+        self.assertIsNone(cache.get(cache_key(self.key)))
+
+    def test_role_change_and_deactivation_apply_immediately(self):
+        self.assertEqual(self.client.get('/api/auth/me/').data['role'], 'USER')
+        self.user.role = 'ADMIN'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/me/').data['role'], 'ADMIN')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/dashboard/stats/').status_code, 403)
+
+    def test_logout_and_rotation_revoke_the_old_key(self):
+        new_key = self.client.post('/api/auth/rotate_token/').data['token']
+        self.assertNotEqual(new_key, self.key)
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 403)
+
+        client = APIClient(HTTP_AUTHORIZATION=f'Token {new_key}')
+        self.assertEqual(client.get('/api/auth/me/').status_code, 200)
+        self.assertEqual(client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(client.get('/api/dashboard/stats/').status_code, 403)
+
+    @override_settings(AUTH_TOKEN_TTL=3600)
+    def test_expired_token_is_rejected_and_replaced_at_login(self):
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+        Token.objects.filter(key=self.key).update(created=timezone.now() - datetime.timedelta(hours=2))
+        cache.clear()
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 403)
+        self.assertFalse(Token.objects.filter(key=self.key).exists())
+
+        response = APIClient().post('/api/auth/login/', {'username': 'desk', 'password': 'secret-123'}, format='json')
+        self.assertNotEqual(response.data['token'], self.key)
+
+
+class LogWriterTests(TestCase):
+    """Login logs are queued during the request and written in batches"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(username='gate', full_name='موظف البوابة', role='USER')
+        cls.user.set_password('secret-123')
+        cls.user.save()
+
+    def setUp(self):
+        # A long interval: batches are written by the explicit flush()/close() below
+        self.writer = LogWriter(flush_ms=60_000, batch_size=1000)
+        self.addCleanup(self.writer.close)
+        patcher = mock.patch('api.views.log_writer', self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self, username, password):
+        return APIClient().post('/api/auth/login/', {'username': username, 'password': password}, format='json')
+
+    def test_logins_are_logged_in_one_batch(self):
+        self.assertEqual(self.login('gate', 'secret-123').status_code, 200)
+        # Only authenticate()'s own user lookup: no second lookup, no INSERT
+        with self.assertNumQueries(1):
+            self.assertEqual(self.login('gate', 'wrong').status_code, 401)
+        self.assertEqual(self.login('nobody', 'wrong').status_code, 401)
+        self.assertFalse(LoginLogs.objects.exists())
+
+        # Username lookup and one INSERT, inside a savepoint
+        with self.assertNumQueries(4):
+            self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(
+            sorted(LoginLogs.objects.filter(user=self.user).values_list('success', flat=True)), [False, True],
+        )
+        stats = self.writer.stats()
+        self.assertEqual((stats['records_in'], stats['records_written'], stats['dropped']), (3, 2, 0))
+
+    def test_full_queue_drops_and_close_writes_the_rest(self):
+        writer = LogWriter(flush_ms=60_000, batch_size=1000, max_pending=2)
+        results = [writer.put(LoginLogs(user=self.user, success=True)) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        writer.close()
+        self.assertEqual(LoginLogs.objects.count(), 2)
+        self.assertEqual(writer.stats()['dropped'], 1)
+        # Once closed, records are written by the caller
+        writer.put(LoginLogs(user=self.user, success=False))
+        self.assertEqual(LoginLogs.objects.count(), 3)
+
+
+class AuditLogTests(TestCase):
+    """Partitioned, diff-only audit_log (accounts migration 0006) and the retention command"""
+
+    def audit_rows(self, table):
+        return list(AuditLog.objects.filter(table_name=table).order_by('id').values_list('action', 'old_data', 'new_data'))
+
+    def test_updates_store_only_the_changed_keys(self):
+        main_event = MainEvent.objects.create(event_name='الحدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='قائد', type='MILITARY')
+        member = Member.objects.create(delegation_id=delegation, name='عضو', job_title='ملحق')
+        member.job_title = 'مستشار'
+        member.save()
+
+        (_, _, inserted), (action, old_data, new_data) = self.audit_rows('member')
+        self.assertEqual(inserted['job_title'], 'ملحق')
+        self.assertNotIn('name_search', inserted)
+        self.assertEqual(action, 'UPDATE')
+        self.assertEqual(set(new_data), {'job_title', 'updated_at'})
+        self.assertEqual((old_data['job_title'], new_data['job_title']), ('ملحق', 'مستشار'))
+
+        # Generated schedule columns (migration 0016) are skipped like the search columns
+        CheckOut.objects.create(delegation_id=delegation, checkout_date=datetime.date(2026, 1, 2), checkout_time=datetime.time(9))
+        (action, _, inserted), *_ = self.audit_rows('delegation')
+        self.assertEqual((action, inserted['type']), ('INSERT', 'MILITARY'))
+        self.assertNotIn('arrive_at', inserted)
+        ((_, _, inserted),) = self.audit_rows('check_out')
+        self.assertEqual(inserted['checkout_date'], '2026-01-02')
+        self.assertNotIn('depart_at', inserted)
+
+        user = User(username='auditor', full_name='مدقق', role='USER')
+        user.set_password('secret-123')
+        user.save()
+        ((_, _, inserted),) = self.audit_rows('users')
+        self.assertNotIn('password_hash', inserted)
+
+    def test_retention_detaches_whole_months(self):
+        old_month = audit.add_months(audit.month_start(timezone.now().date()), -13)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO audit_log (table_name, action, changed_at) "
+                "SELECT 'member', 'INSERT', %s::timestamptz + n * INTERVAL '1 hour' FROM generate_series(1, 3) n",
+                [old_month],
+            )
+            # No partition for that month yet: the rows wait in the default partition
+            cursor.execute('SELECT COUNT(*) FROM audit_log_default')
+            self.assertEqual(cursor.fetchone()[0], 3)
+
+        out = StringIO()
+        call_command('audit_partitions', keep_months=12, stdout=out)
+        name = f'audit_log_{old_month:%Y_%m}'
+        self.assertIn(f'detached: {name}', out.getvalue())
+        self.assertNotIn(name, [partition for partition, _ in audit.partitions()])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM audit_log WHERE changed_at < %s', [old_month + datetime.timedelta(days=40)])
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f'SELECT COUNT(*) FROM audit_archive_{old_month:%Y_%m}')
+            self.assertEqual(cursor.fetchone()[0], 3)
+
+        call_command('audit_partitions', keep_months=1, drop=True, stdout=StringIO())
+        self.assertEqual([month for _, month in audit.partitions()][0], audit.month_start(timezone.now().date()))
+
+
+class AuditLogAdminTests(TestCase):
+    """The audit log admin changelist: keyset pages, record history and user search"""
+
+    def test_admin_changelist_follows_the_cursor(self):
+        root = User.objects.create(username='root', full_name='مدير', role='SUPER_ADMIN', is_staff=True)
+        self.client.force_login(root)
+        main_event = MainEvent.objects.create(event_name='الحدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='قائد', type='MILITARY')
+        member = Member.objects.create(delegation_id=delegation, name='عضو')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('app.current_user', %s, true)", [str(root.id)])
+        for job_title in ('ملحق', 'مستشار'):
+            member.job_title = job_title
+            member.save()
+
+        url = reverse('admin:accounts_auditlog_changelist')
+        with mock.patch.object(AuditLogAdmin, 'list_per_page', 2):
+            response = self.client.get(url, {'q': str(member.id)})
+            self.assertEqual(response.status_code, 200)
+            cl = response.context['cl']
+            self.assertEqual([row.action for row in cl.result_list], ['UPDATE', 'UPDATE'])
+            self.assertIsNone(cl.first_url)
+            response = self.client.get(url + cl.next_url)
+            cl = response.context['cl']
+            self.assertEqual([row.action for row in cl.result_list], ['INSERT'])
+            self.assertIsNone(cl.next_url)
+            self.assertEqual(cl.result_count, 3)
+            self.assertContains(response, 'الأحدث')
+
+        # Other input matches parts of the table name, username or full name
+        for term in ('RO', 'مدي'):
+            response = self.client.get(url, {'q': term})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row.changed_by for row in response.context['cl'].result_list], [root, root])
+        rows = self.client.get(url, {'q': 'memb'}).context['cl'].result_list
+        self.assertEqual([row.table_name for row in rows], ['member'] * 3)
+
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 302)
@@ -222,7 +222,7 @@ class DelegationAdmin(admin.ModelAdmin):
     list_filter = ('type', 'status', 'sub_event_id__main_event_id', 'created_at')
     search_fields = ('delegation_leader_name', 'nationality_id__name', 'sub_event_id__event_name')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at', 'current_members')
+    readonly_fields = ('created_at', 'updated_at', 'current_members', 'departed_members', 'status')
     list_editable = ('member_count',)
     list_per_page = 25
     
@@ -0,0 +1,376 @@
+"""
+Coalescing WebSocket broadcast buffer.
+
+Signal handlers queue change events with ``queue_update``. Events are only
+accepted once their transaction commits (``transaction.on_commit``), are
+deduplicated by ``(model, id)`` and are flushed to ``UpdatesConsumer`` as one
+``batch_update`` frame per window (``BROADCAST_WINDOW_MS`` in settings).
+
+Each frame carries the serialized changed rows (restricted to
+``PAYLOAD_FIELDS``) and the global dashboard counters. The payload is
+rendered once per flush and shared by every subscriber, so clients can patch
+their state without refetching.
+
+Sockets that never subscribe stay in the global ``updates`` group and get
+every event. Sockets that subscribe to topics (``main_event:<id>``,
+``sub_event:<id>``, ``delegation:<id>``) only get the events of those
+topics plus the small structural group (events, sub events and lookups).
+A changed row is sent to its own topic and to every ancestor topic, so a
+member change reaches ``delegation:``, ``sub_event:`` and ``main_event:``
+subscribers. All frames of one flush share a ``frame_id`` so a socket
+subscribed at several levels can drop the duplicates.
+"""
+import atexit
+import json
+import threading
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import connections, transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+UPDATES_GROUP = 'updates'
+STRUCTURE_GROUP = 'updates.structure'
+DEFAULT_WINDOW_MS = 150
+
+TOPIC_KINDS = ('main_event', 'sub_event', 'delegation')
+
+# Topic kind of each model's own rows and of its direct parent. The rest of the
+# ancestor chain is resolved in bulk when the window is flushed.
+OWN_TOPIC = {'MainEvent': 'main_event', 'SubEvent': 'sub_event', 'Delegation': 'delegation'}
+PARENT_TOPIC = {
+    'SubEvent': 'main_event',
+    'Delegation': 'sub_event',
+    'Member': 'delegation',
+    'CheckOut': 'delegation',
+}
+
+# Models whose events also go to topic subscribers regardless of their topics
+STRUCTURE_MODELS = (
+    'MainEvent', 'SubEvent', 'Nationality', 'Cities', 'AirLine', 'AirPort', 'EquivalentJob',
+    # One per window for any lookup change: clients revalidate /api/lookups/
+    'Lookups',
+)
+
+# Fields sent with each changed row. Large text fields (goods, notes) and nested
+# collections (delegation members, main event sub events) are left out on purpose.
+PAYLOAD_FIELDS = {
+    'MainEvent': ('id', 'event_name', 'event_link', 'event_icon', 'created_at', 'updated_at'),
+    'SubEvent': ('id', 'main_event_id', 'main_event_name', 'event_name', 'created_at', 'updated_at'),
+    'Delegation': (
+        'id', 'sub_event_id', 'sub_event_name', 'main_event_name',
+        'nationality_id', 'nationality_name', 'airport_id', 'airport_name',
+        'airline_id', 'airline_name', 'city_id', 'city_name',
+        'delegation_leader_name', 'member_count', 'current_members', 'departed_members', 'flight_number',
+        'type', 'status', 'arrive_date', 'arrive_time', 'receiver_name', 'going_to',
+        'created_at', 'updated_at',
+    ),
+    'Member': (
+        'id', 'delegation_id', 'delegation_nationality', 'delegation_sub_event',
+        'rank', 'name', 'job_title', 'equivalent_job_id', 'equivalent_job_name',
+        'status', 'departure_date', 'created_at', 'updated_at',
+    ),
+    'CheckOut': (
+        'id', 'delegation_id', 'delegation_nationality', 'delegation_sub_event',
+        'nationality_id', 'airport_id', 'airport_name', 'airline_id', 'airline_name',
+        'city_id', 'city_name', 'flight_number', 'checkout_date', 'checkout_time',
+        'depositor_name', 'members', 'created_at', 'updated_at',
+    ),
+    'Nationality': ('id', 'name'),
+    'Cities': ('id', 'city_name'),
+    'AirLine': ('id', 'name'),
+    'AirPort': ('id', 'name'),
+    'EquivalentJob': ('id', 'name'),
+}
+
+
+def _payload_sources():
+    """Model, serializer and select_related paths used to render each model's payload"""
+    from . import models, serializers
+    return {
+        'MainEvent': (models.MainEvent, serializers.MainEventSerializer, ()),
+        'SubEvent': (models.SubEvent, serializers.SubEventSerializer, ('main_event_id',)),
+        'Delegation': (models.Delegation, serializers.DelegationSerializer, (
+            'nationality_id', 'airport_id', 'airline_id', 'city_id', 'sub_event_id__main_event_id',
+        )),
+        'Member': (models.Member, serializers.MemberSerializer, (
+            'delegation_id__nationality_id', 'delegation_id__sub_event_id', 'equivalent_job_id',
+        )),
+        'CheckOut': (models.CheckOut, serializers.CheckOutSerializer, (
+            'delegation_id__nationality_id', 'delegation_id__sub_event_id',
+            'airport_id', 'airline_id', 'city_id',
+        )),
+        'Nationality': (models.Nationality, serializers.NationalitySerializer, ()),
+        'Cities': (models.Cities, serializers.CitiesSerializer, ()),
+        'AirLine': (models.AirLine, serializers.AirLineSerializer, ()),
+        'AirPort': (models.AirPort, serializers.AirPortSerializer, ()),
+        'EquivalentJob': (models.EquivalentJob, serializers.EquivalentJobSerializer, ()),
+    }
+
+
+def render_rows(model_name, ids):
+    """Serialize the given rows of one model with its payload allowlist, keyed by id"""
+    model, serializer_class, related = _payload_sources()[model_name]
+    instances = model.objects.filter(pk__in=ids).select_related(*related)
+    serializer = serializer_class(instances, many=True)
+    allowed = PAYLOAD_FIELDS[model_name]
+    fields = serializer.child.fields
+    for name in [name for name in fields if name not in allowed]:
+        fields.pop(name)
+    # Plain JSON types only, so the frame can go through any channel layer as-is
+    data = json.loads(json.dumps(serializer.data, cls=JSONEncoder))
+    return {row['id']: row for row in data}
+
+
+def render_payload(events):
+    """Attach row data to created/updated events and return the global counters"""
+    from .models import DashboardCounter
+
+    wanted = {}
+    for event in events:
+        if event['action'] != 'deleted' and event['id'] and event['model'] in PAYLOAD_FIELDS:
+            wanted.setdefault(event['model'], []).append(event['id'])
+    rows = {}
+    for model_name, ids in wanted.items():
+        rows[model_name] = render_rows(model_name, ids)
+    for event in events:
+        event['data'] = rows.get(event['model'], {}).get(event['id'])
+    return DashboardCounter.for_scope(DashboardCounter.GLOBAL_KEY).as_stats()
+
+
+def parse_topic(topic):
+    """Return ``(kind, id)`` for a valid topic string, ``None`` otherwise"""
+    if not isinstance(topic, str):
+        return None
+    kind, _, object_id = topic.partition(':')
+    if kind not in TOPIC_KINDS:
+        return None
+    try:
+        return kind, str(uuid.UUID(object_id))
+    except ValueError:
+        return None
+
+
+def topic_group(kind, object_id):
+    """Channel layer group name of a topic (group names cannot contain ':')"""
+    return f'topic.{kind}.{object_id}'
+
+
+def resolve_topics(entries):
+    """
+    Map each ``(model, id, parent_id)`` entry to its topics, own topic first.
+
+    Parents known from the events themselves win over the database, so rows
+    deleted in the same window still resolve. Costs at most two queries.
+    """
+    from .models import Delegation, SubEvent
+
+    delegation_parent = {}
+    sub_event_parent = {}
+    for model_name, object_id, parent_id in entries:
+        if model_name == 'Delegation' and parent_id:
+            delegation_parent[object_id] = parent_id
+        elif model_name == 'SubEvent' and parent_id:
+            sub_event_parent[object_id] = parent_id
+
+    missing = {
+        parent_id for model_name, _, parent_id in entries
+        if PARENT_TOPIC.get(model_name) == 'delegation' and parent_id and parent_id not in delegation_parent
+    }
+    # Delegation events queued without their sub event are looked up in the same query
+    missing |= {
+        object_id for model_name, object_id, parent_id in entries
+        if model_name == 'Delegation' and object_id and not parent_id and object_id not in delegation_parent
+    }
+    if missing:
+        for pk, sub_event_id in Delegation.objects.filter(pk__in=missing).values_list('id', 'sub_event_id'):
+            delegation_parent[str(pk)] = str(sub_event_id)
+
+    missing = {sub_event_id for sub_event_id in delegation_parent.values() if sub_event_id not in sub_event_parent}
+    if missing:
+        for pk, main_event_id in SubEvent.objects.filter(pk__in=missing).values_list('id', 'main_event_id'):
+            sub_event_parent[str(pk)] = str(main_event_id)
+
+    parents_of = {'delegation': delegation_parent, 'sub_event': sub_event_parent, 'main_event': {}}
+    next_kind = {'delegation': 'sub_event', 'sub_event': 'main_event', 'main_event': None}
+
+    result = []
+    for model_name, object_id, parent_id in entries:
+        topics = []
+        if model_name in OWN_TOPIC and object_id:
+            topics.append((OWN_TOPIC[model_name], object_id))
+        kind = PARENT_TOPIC.get(model_name)
+        current = parent_id
+        if model_name == 'Delegation' and not current:
+            current = delegation_parent.get(object_id)
+        while kind and current:
+            topics.append((kind, current))
+            current = parents_of[kind].get(current)
+            kind = next_kind[kind]
+        result.append(topics)
+    return result
+
+
+def build_frames(events, topics):
+    """Group events into ``{group: [events]}``; every event also goes to ``updates``"""
+    frames = {UPDATES_GROUP: list(events)}
+    for event, event_topics in zip(events, topics):
+        groups = [topic_group(kind, object_id) for kind, object_id in event_topics]
+        if event['model'] in STRUCTURE_MODELS:
+            groups.append(STRUCTURE_GROUP)
+        for group in groups:
+            frames.setdefault(group, []).append(event)
+    return frames
+
+
+class BroadcastBuffer:
+    """Collects committed change events and sends them in batched frames"""
+
+    def __init__(self, group=UPDATES_GROUP, window_ms=None):
+        self.group = group
+        self._window_ms = window_ms
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._timer = None
+        # Frame ids must not collide between worker processes sharing a channel layer
+        self._frame_prefix = uuid.uuid4().hex[:8]
+        self._frame_seq = 0
+        self.events_in = 0
+        self.events_out = 0
+        self.frames_out = 0
+        self.group_sends = 0
+
+    @property
+    def window_ms(self):
+        if self._window_ms is not None:
+            return self._window_ms
+        return getattr(settings, 'BROADCAST_WINDOW_MS', DEFAULT_WINDOW_MS)
+
+    def add(self, model_name, action, instance_id=None, parent_id=None):
+        """Add a committed event; starts the flush timer for the current window"""
+        # Events without a row (bulk member writes) are kept per parent
+        key = (model_name, instance_id) if instance_id else (model_name, action, parent_id)
+        with self._lock:
+            self.events_in += 1
+            previous = self._pending.pop(key, None)
+            if previous is not None:
+                # Events queued without a parent (derived updates) keep the one already known
+                parent_id = parent_id or previous[1]
+            if previous is not None and previous[0]['action'] == 'created':
+                if action == 'deleted':
+                    # Created and deleted inside one window: clients never need to see it
+                    return
+                action = 'created'
+            event = {
+                'model': model_name,
+                'action': action,
+                'id': instance_id,
+            }
+            if not instance_id:
+                # Tells apart the bulk events of different parents in one frame
+                event['parent_id'] = parent_id
+            self._pending[key] = (event, parent_id)
+            window_ms = self.window_ms
+            timer = None
+            if window_ms > 0 and self._timer is None:
+                timer = self._timer = threading.Timer(window_ms / 1000.0, self._flush_from_timer)
+                timer.daemon = True
+        if window_ms <= 0:
+            self.flush()
+        elif timer is not None:
+            timer.start()
+
+    def flush(self):
+        """Send everything pending as one frame per subscribed group"""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not pending:
+                return
+            self._frame_seq += 1
+            frame_id = f'{self._frame_prefix}-{self._frame_seq}'
+            self.events_out += len(pending)
+            self.frames_out += 1
+        events = [event for event, _ in pending]
+        try:
+            counters = render_payload(events)
+        except Exception:
+            # Send the bare events; clients fall back to refetching
+            counters = None
+        try:
+            topics = resolve_topics([(event['model'], event['id'], parent_id) for event, parent_id in pending])
+        except Exception:
+            # Without topics the events still reach the global group
+            topics = [[] for _ in pending]
+        frames = build_frames(events, topics)
+        with self._lock:
+            self.group_sends += len(frames)
+        self.send(frames, counters, frame_id)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads open their own database connections
+            connections.close_all()
+
+    def send(self, frames, counters=None, frame_id=None):
+        """Send ``{group: events}`` frames; the global group is ``self.group``"""
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(self._send_frames)(channel_layer, frames, counters, frame_id)
+
+    async def _send_frames(self, channel_layer, frames, counters, frame_id):
+        for group, events in frames.items():
+            await channel_layer.group_send(
+                self.group if group == UPDATES_GROUP else group,
+                {
+                    'type': 'batch_update',
+                    'frame_id': frame_id,
+                    'events': events,
+                    'counters': counters,
+                },
+            )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window_ms': self.window_ms,
+                'events_in': self.events_in,
+                'events_out': self.events_out,
+                'frames_out': self.frames_out,
+                'group_sends': self.group_sends,
+                'pending': len(self._pending),
+                'coalescing_ratio': round(self.events_in / self.frames_out, 2) if self.frames_out else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.events_in = 0
+            self.events_out = 0
+            self.frames_out = 0
+            self.group_sends = 0
+
+
+buffer = BroadcastBuffer()
+atexit.register(buffer.flush)
+
+
+def queue_update(model_name, action, instance_id=None, parent_id=None):
+    """
+    Queue a change event; it is only buffered if the surrounding transaction commits.
+
+    ``parent_id`` is the row's direct parent in the topic tree (see
+    ``PARENT_TOPIC``). It is captured now because deleted rows can no longer
+    be looked up when the window is flushed.
+    """
+    instance_id = str(instance_id) if instance_id else None
+    parent_id = str(parent_id) if parent_id else None
+    transaction.on_commit(lambda: buffer.add(model_name, action, instance_id, parent_id))
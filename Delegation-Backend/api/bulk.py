@@ -0,0 +1,70 @@
+"""
+Validation helpers for the bulk endpoints (``/api/members/bulk/``,
+``/api/check-outs/bulk/``).
+
+``validate_items`` runs one serializer instance over a whole list. The rows
+referenced by its writable relations (``delegation_id``,
+``equivalent_job_id``...) are loaded up front, one query per relation, and
+``PreloadedPrimaryKeyRelatedField`` reads them from there, so validating a
+list costs a fixed number of queries whatever its size.
+
+Items that fail are reported by position (``{'index': 3, 'errors': {...}}``)
+and the valid ones are still written.
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Reads related rows from ``context['preloaded'][field_name]``; unknown keys fall back to a query"""
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is not None and isinstance(data, str):
+            instance = preloaded.get(data)
+            if instance is not None:
+                return instance
+        return super().to_internal_value(data)
+
+
+def preload_relations(serializer, items):
+    """Map each writable relation field to ``{pk string: row}`` for the keys used in ``items``"""
+    preloaded = {}
+    for name, field in serializer.fields.items():
+        if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+        queryset = field.get_queryset()
+        pk_field = queryset.model._meta.pk
+        keys = set()
+        for item in items:
+            value = item.get(name) if isinstance(item, dict) else None
+            if not isinstance(value, str):
+                continue
+            try:
+                keys.add(pk_field.to_python(value))
+            except DjangoValidationError:
+                # Malformed keys are reported by the field itself
+                continue
+        preloaded[name] = {str(pk): row for pk, row in queryset.in_bulk(keys).items()} if keys else {}
+    return preloaded
+
+
+def validate_items(serializer, items, instances=None):
+    """
+    Validate ``items`` with ``serializer`` and return ``(valid, errors)``.
+
+    ``valid`` lists ``(index, validated_data)``, ``errors`` lists
+    ``{'index', 'errors'}``. ``instances`` (one per item) are the rows being
+    updated; build the serializer with ``partial=True`` for patches.
+    """
+    serializer.context['preloaded'] = preload_relations(serializer, items)
+    valid = []
+    errors = []
+    for index, item in enumerate(items):
+        serializer.instance = instances[index] if instances is not None else None
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    serializer.instance = None
+    return valid, errors
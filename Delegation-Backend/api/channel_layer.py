@@ -0,0 +1,42 @@
+"""
+Channel layer helpers.
+
+``settings.CHANNEL_LAYER_BACKEND`` picks the in-memory layer (one process) or
+the Redis layer (several Daphne workers). ``channel_layer_health`` checks the
+configured layer end to end by sending a message to a fresh channel and
+reading it back, which is what every broadcast depends on.
+"""
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import DEFAULT_CHANNEL_LAYER, get_channel_layer
+
+HEALTH_TIMEOUT = 2.0
+
+
+async def _round_trip(layer, timeout):
+    channel = await layer.new_channel('health.')
+    started = time.perf_counter()
+    await layer.send(channel, {'type': 'health.ping'})
+    await asyncio.wait_for(layer.receive(channel), timeout)
+    return (time.perf_counter() - started) * 1000
+
+
+def channel_layer_health(timeout=HEALTH_TIMEOUT, alias=DEFAULT_CHANNEL_LAYER):
+    """
+    Send and receive one message through the channel layer.
+
+    Returns ``{'backend', 'ok', 'latency_ms', 'error'}``; never raises.
+    """
+    layer = get_channel_layer(alias)
+    if layer is None:
+        return {'backend': None, 'ok': False, 'latency_ms': None, 'error': 'لا توجد طبقة قنوات مهيأة'}
+    backend = f'{type(layer).__module__}.{type(layer).__name__}'
+    try:
+        latency_ms = async_to_sync(_round_trip)(layer, timeout)
+    except asyncio.TimeoutError:
+        return {'backend': backend, 'ok': False, 'latency_ms': None, 'error': 'انتهت مهلة استلام الرسالة'}
+    except Exception as exc:
+        return {'backend': backend, 'ok': False, 'latency_ms': None, 'error': str(exc)}
+    return {'backend': backend, 'ok': True, 'latency_ms': round(latency_ms, 2), 'error': None}
@@ -1,13 +1,71 @@
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from .broadcast import UPDATES_GROUP, STRUCTURE_GROUP, parse_topic, topic_group
+
+# Upper bound on topics per socket so one client cannot join unbounded groups
+MAX_TOPICS = 50
+
+
 class UpdatesConsumer(AsyncJsonWebsocketConsumer):
     async def connect(self):
-        # Add to general updates group
-        await self.channel_layer.group_add("updates", self.channel_name)
+        # Until the client subscribes to topics it gets every update
+        self.topics = set()
+        self.last_frame_id = None
+        self.sent_in_frame = set()
+        await self.channel_layer.group_add(UPDATES_GROUP, self.channel_name)
         await self.accept()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("updates", self.channel_name)
+        await self.channel_layer.group_discard(UPDATES_GROUP, self.channel_name)
+        await self.channel_layer.group_discard(STRUCTURE_GROUP, self.channel_name)
+        for kind, object_id in self.topics:
+            await self.channel_layer.group_discard(topic_group(kind, object_id), self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # {"action": "subscribe" | "unsubscribe", "topics": ["sub_event:<id>", ...]}
+        action = content.get('action') if isinstance(content, dict) else None
+        if action not in ('subscribe', 'unsubscribe'):
+            await self.send_json({'type': 'error', 'message': 'إجراء غير معروف'})
+            return
+        topics = content.get('topics')
+        if not isinstance(topics, list):
+            topics = []
+        parsed = [parse_topic(topic) for topic in topics]
+        invalid = [topic for topic, parsed_topic in zip(topics, parsed) if parsed_topic is None]
+        parsed = {topic for topic in parsed if topic is not None}
+
+        if action == 'subscribe':
+            await self.subscribe(parsed)
+        else:
+            await self.unsubscribe(parsed)
+
+        await self.send_json({
+            'type': 'subscriptions',
+            'topics': sorted(f'{kind}:{object_id}' for kind, object_id in self.topics),
+            'invalid': invalid,
+        })
+
+    async def subscribe(self, topics):
+        was_scoped = bool(self.topics)
+        for topic in topics - self.topics:
+            if len(self.topics) >= MAX_TOPICS:
+                break
+            await self.channel_layer.group_add(topic_group(*topic), self.channel_name)
+            self.topics.add(topic)
+        if self.topics and not was_scoped:
+            # Join the scoped groups before leaving the global one so nothing is missed
+            await self.channel_layer.group_add(STRUCTURE_GROUP, self.channel_name)
+            await self.channel_layer.group_discard(UPDATES_GROUP, self.channel_name)
+
+    async def unsubscribe(self, topics):
+        was_scoped = bool(self.topics)
+        for topic in topics & self.topics:
+            await self.channel_layer.group_discard(topic_group(*topic), self.channel_name)
+            self.topics.discard(topic)
+        if was_scoped and not self.topics:
+            # No topics left: back to every update
+            await self.channel_layer.group_add(UPDATES_GROUP, self.channel_name)
+            await self.channel_layer.group_discard(STRUCTURE_GROUP, self.channel_name)
 
     # Real-time update handlers
     async def stats_update(self, event):
@@ -18,4 +76,31 @@ class UpdatesConsumer(AsyncJsonWebsocketConsumer):
             'action': event.get('action', ''),
             'id': event.get('id', ''),
             'data': event.get('data', {})
-        })
\ No newline at end of file
+        })
+
+    async def batch_update(self, event):
+        # One frame per broadcast window with deduplicated change events.
+        # A socket subscribed at several levels (e.g. a main event and one of its
+        # sub events) gets the same frame_id from several groups; send each event once.
+        frame_id = event.get('frame_id')
+        if frame_id is None or frame_id != self.last_frame_id:
+            self.last_frame_id = frame_id
+            self.sent_in_frame = set()
+        events = []
+        for change in event.get('events', []):
+            # Same keys as the broadcast buffer: the row, or the parent for bulk events without one
+            if change.get('id'):
+                key = (change.get('model'), change.get('id'))
+            else:
+                key = (change.get('model'), change.get('action'), change.get('parent_id'))
+            if key in self.sent_in_frame:
+                continue
+            self.sent_in_frame.add(key)
+            events.append(change)
+        if not events:
+            return
+        await self.send_json({
+            'type': 'batch_update',
+            'events': events,
+            'counters': event.get('counters'),
+        })
@@ -0,0 +1,252 @@
+"""
+Dashboard counters helpers.
+
+The ``dashboard_counter`` table is maintained incrementally by database
+triggers (see ``database_schema.sql`` and migration ``0008``). This module
+reads it, recomputes the same numbers from the live tables and rebuilds it
+when the two drift apart.
+
+``Delegation.current_members``, ``departed_members`` and ``status`` are kept
+the same way by the member triggers (migration ``0012``);
+``delegation_drift`` and ``reconcile_delegations`` check and repair them.
+
+``dashboard_daily`` (migration ``0017``) holds member arrivals and departures
+per sub event and day; ``timeseries`` turns it into the daily in-country
+curve and ``daily_drift`` / ``rebuild_daily`` check and repair it.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from .models import DashboardCounter, DashboardDaily, MainEvent, SubEvent, Delegation, Member, CheckOut
+
+
+def _empty():
+    return {field: 0 for field in DashboardCounter.COUNTER_FIELDS}
+
+
+def live_counters():
+    """Compute all counter scopes from the live tables using grouped aggregates"""
+    per_sub = defaultdict(_empty)
+    sub_to_main = {}
+
+    for sub_event in SubEvent.objects.values('id', 'main_event_id'):
+        sub_to_main[sub_event['id']] = sub_event['main_event_id']
+        per_sub[sub_event['id']]['sub_events'] = 1
+
+    delegation_rows = Delegation.objects.values('sub_event_id').annotate(
+        delegations=Count('id'),
+        military_delegations=Count('id', filter=Q(type='MILITARY')),
+        civilian_delegations=Count('id', filter=Q(type='CIVILIAN')),
+        not_departed_delegations=Count('id', filter=Q(status='NOT_DEPARTED')),
+        partially_departed_delegations=Count('id', filter=Q(status='PARTIALLY_DEPARTED')),
+        fully_departed_delegations=Count('id', filter=Q(status='FULLY_DEPARTED')),
+    ).order_by()
+    member_rows = Member.objects.values(sub_event_id=F('delegation_id__sub_event_id')).annotate(
+        members=Count('id'),
+        not_departed_members=Count('id', filter=Q(status='NOT_DEPARTED')),
+        departed_members=Count('id', filter=Q(status='DEPARTED')),
+    ).order_by()
+    check_out_rows = CheckOut.objects.values(sub_event_id=F('delegation_id__sub_event_id')).annotate(
+        check_outs=Count('id'),
+    ).order_by()
+
+    for rows in (delegation_rows, member_rows, check_out_rows):
+        for row in rows:
+            counters = per_sub[row.pop('sub_event_id')]
+            for field, value in row.items():
+                counters[field] += value
+
+    result = {DashboardCounter.GLOBAL_KEY: _empty()}
+    result[DashboardCounter.GLOBAL_KEY]['main_events'] = MainEvent.objects.count()
+    for main_event_id in MainEvent.objects.values_list('id', flat=True):
+        counters = _empty()
+        counters['main_events'] = 1
+        result[DashboardCounter.scope_key_for(main_event_id=main_event_id)] = counters
+
+    for sub_event_id, counters in per_sub.items():
+        result[DashboardCounter.scope_key_for(sub_event_id=sub_event_id)] = dict(counters)
+        parents = [DashboardCounter.GLOBAL_KEY]
+        if sub_event_id in sub_to_main:
+            parents.append(DashboardCounter.scope_key_for(main_event_id=sub_to_main[sub_event_id]))
+        for key in parents:
+            target = result.setdefault(key, _empty())
+            for field, value in counters.items():
+                target[field] += value
+
+    return result
+
+
+def stored_counters():
+    """Read every counter row as ``{scope_key: {field: value}}``"""
+    return {row.scope_key: row.as_dict() for row in DashboardCounter.objects.all()}
+
+
+def find_drift(stored=None, live=None):
+    """
+    Compare stored counters with the live aggregates.
+
+    Returns a list of ``(scope_key, field, stored_value, live_value)`` tuples.
+    A scope missing on one side counts as all zeros.
+    """
+    stored = stored_counters() if stored is None else stored
+    live = live_counters() if live is None else live
+    drift = []
+    for key in sorted(set(stored) | set(live)):
+        stored_row = stored.get(key) or _empty()
+        live_row = live.get(key) or _empty()
+        for field in DashboardCounter.COUNTER_FIELDS:
+            if stored_row[field] != live_row[field]:
+                drift.append((key, field, stored_row[field], live_row[field]))
+    return drift
+
+
+def rebuild():
+    """Recompute every counter row in one set-based statement"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT dashboard_counter_rebuild()')
+
+
+def delegation_status_for(members, departed):
+    """Same rule as the ``delegation_status_for`` SQL function"""
+    if departed == 0:
+        return 'NOT_DEPARTED'
+    if departed == members:
+        return 'FULLY_DEPARTED'
+    return 'PARTIALLY_DEPARTED'
+
+
+def delegation_drift():
+    """
+    Compare each delegation's stored member totals with the member table.
+
+    Returns a list of ``(delegation_id, field, stored_value, live_value)`` tuples.
+    """
+    rows = Delegation.objects.annotate(
+        live_members=Count('members'),
+        live_departed=Count('members', filter=Q(members__status='DEPARTED')),
+    ).values_list('id', 'current_members', 'departed_members', 'status', 'live_members', 'live_departed')
+    drift = []
+    for delegation_id, members, departed, status, live_members, live_departed in rows.order_by('id'):
+        live = {
+            'current_members': live_members,
+            'departed_members': live_departed,
+            'status': delegation_status_for(live_members, live_departed),
+        }
+        stored = {'current_members': members, 'departed_members': departed, 'status': status}
+        for field, value in stored.items():
+            if value != live[field]:
+                drift.append((delegation_id, field, value, live[field]))
+    return drift
+
+
+def reconcile_delegations():
+    """Recompute every delegation's member totals in one set-based statement; returns rows fixed"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reconcile_delegation_counters()')
+            return cursor.fetchone()[0]
+
+
+def live_daily():
+    """Member arrivals and departures per ``(sub_event_id, day)`` from the live tables"""
+    result = defaultdict(lambda: {field: 0 for field in DashboardDaily.ROLLUP_FIELDS})
+    members = Member.objects.filter(delegation_id__arrive_date__isnull=False)
+    arrival_rows = members.values_list('delegation_id__sub_event_id', 'delegation_id__arrive_date').annotate(
+        count=Count('id'),
+    ).order_by()
+    departure_rows = members.filter(status='DEPARTED', departure_date__isnull=False).values_list(
+        'delegation_id__sub_event_id', 'departure_date',
+    ).annotate(count=Count('id')).order_by()
+    for field, rows in (('arrivals', arrival_rows), ('departures', departure_rows)):
+        for sub_event_id, day, count in rows:
+            result[(sub_event_id, day)][field] += count
+    return dict(result)
+
+
+def stored_daily():
+    """Read every daily row as ``{(sub_event_id, day): {field: value}}``"""
+    return {
+        (row['sub_event_id'], row['day']): {field: row[field] for field in DashboardDaily.ROLLUP_FIELDS}
+        for row in DashboardDaily.objects.values('sub_event_id', 'day', *DashboardDaily.ROLLUP_FIELDS)
+    }
+
+
+def daily_drift(stored=None, live=None):
+    """
+    Compare the daily rows with the live tables.
+
+    Returns a list of ``(sub_event_id, day, field, stored_value, live_value)``
+    tuples. A day missing on one side counts as zeros.
+    """
+    stored = stored_daily() if stored is None else stored
+    live = live_daily() if live is None else live
+    empty = {field: 0 for field in DashboardDaily.ROLLUP_FIELDS}
+    drift = []
+    for key in sorted(set(stored) | set(live), key=lambda key: (str(key[0]), key[1])):
+        stored_row = stored.get(key) or empty
+        live_row = live.get(key) or empty
+        for field in DashboardDaily.ROLLUP_FIELDS:
+            if stored_row[field] != live_row[field]:
+                drift.append((*key, field, stored_row[field], live_row[field]))
+    return drift
+
+
+def rebuild_daily():
+    """Recompute every daily row in one set-based statement"""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT dashboard_daily_rebuild()')
+
+
+# Longest series returned by /api/dashboard/timeseries/
+TIMESERIES_MAX_DAYS = 366
+
+_TIMESERIES_SQL = """
+WITH daily AS (
+    SELECT day, SUM(arrivals)::INT AS arrivals, SUM(departures)::INT AS departures
+    FROM dashboard_daily
+    {where}
+    GROUP BY day
+), bounds AS (
+    SELECT COALESCE(%(start)s::date, MIN(day)) AS first_day, COALESCE(%(end)s::date, MAX(day)) AS last_day
+    FROM daily
+), opening AS (
+    SELECT COALESCE(SUM(daily.arrivals - daily.departures), 0)::INT AS in_country
+    FROM daily, bounds
+    WHERE daily.day < bounds.first_day
+)
+SELECT g.day::date, COALESCE(daily.arrivals, 0), COALESCE(daily.departures, 0),
+       opening.in_country
+       + SUM(COALESCE(daily.arrivals, 0) - COALESCE(daily.departures, 0)) OVER (ORDER BY g.day)::INT
+FROM bounds
+CROSS JOIN opening
+CROSS JOIN generate_series(
+    bounds.first_day, LEAST(bounds.last_day, bounds.first_day + %(max_days)s - 1), INTERVAL '1 day'
+) AS g(day)
+LEFT JOIN daily ON daily.day = g.day
+ORDER BY g.day
+"""
+
+
+def timeseries(start=None, end=None, main_event_id=None, sub_event_id=None):
+    """
+    One row per day of ``[start, end]`` (the recorded days by default, at most
+    ``TIMESERIES_MAX_DAYS``) with arrivals, departures and the in-country
+    headcount at the end of the day, read from ``dashboard_daily`` in one query.
+    """
+    if sub_event_id:
+        where = 'WHERE sub_event_id = %(scope)s'
+    elif main_event_id:
+        where = 'WHERE main_event_id = %(scope)s'
+    else:
+        where = ''
+    params = {'start': start, 'end': end, 'scope': sub_event_id or main_event_id, 'max_days': TIMESERIES_MAX_DAYS}
+    with connection.cursor() as cursor:
+        cursor.execute(_TIMESERIES_SQL.format(where=where), params)
+        return [
+            {'day': day, 'arrivals': arrivals, 'departures': departures, 'in_country': in_country}
+            for day, arrivals, departures, in_country in cursor.fetchall()
+        ]
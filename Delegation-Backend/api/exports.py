@@ -0,0 +1,242 @@
+"""
+Streaming CSV / XLSX exports (``/api/exports/...``).
+
+An export is a list of ``(header, source, formatter)`` columns read with
+``values_list`` from the filtered queryset, so lookup names (nationality,
+airport...) come from joins in the same query, and rows are fetched with
+``.iterator()`` (a server-side cursor on PostgreSQL). Rows are written into
+the response as they are read, so memory use stays flat whatever the number
+of rows.
+
+XLSX files are written without a third-party library: a workbook is a zip of
+a few fixed XML parts and one sheet, and ``zipfile`` can stream the sheet row
+by row into an unseekable output. Cells are inline strings and numbers.
+"""
+import csv
+import datetime
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from django.contrib.postgres.aggregates import StringAgg
+
+from .models import Delegation, Member
+
+CHUNK_SIZE = 2000
+# Rows written between two chunks of the response
+ROWS_PER_CHUNK = 500
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _choices(model, field):
+    labels = dict(model._meta.get_field(field).choices)
+    return lambda value: labels.get(value, value or '')
+
+
+def _time(value):
+    return value.strftime('%H:%M') if value else ''
+
+
+DELEGATION_COLUMNS = [
+    ('الحدث', 'sub_event_id__event_name', None),
+    ('الجنسية', 'nationality_id__name', None),
+    ('رئيس الوفد', 'delegation_leader_name', None),
+    ('نوع الوفد', 'type', _choices(Delegation, 'type')),
+    ('عدد الأعضاء', 'current_members', None),
+    ('عدد المغادرين', 'departed_members', None),
+    ('حالة الوفد', 'status', _choices(Delegation, 'status')),
+    ('تاريخ الوصول', 'arrive_date', None),
+    ('سعت الوصول', 'arrive_time', _time),
+    ('المطار', 'airport_id__name', None),
+    ('شركة الطيران', 'airline_id__name', None),
+    ('رقم الرحلة', 'flight_number', None),
+    ('قادمة من', 'city_id__city_name', None),
+    ('الوجهة', 'going_to', None),
+    ('المستقبل', 'receiver_name', None),
+    ('الشحنات', 'goods', None),
+]
+
+MEMBER_COLUMNS = [
+    ('الرتبة', 'rank', None),
+    ('الاسم', 'name', None),
+    ('الوظيفة', 'job_title', None),
+    ('الوظيفة المعادلة', 'equivalent_job_id__name', None),
+    ('الجنسية', 'delegation_id__nationality_id__name', None),
+    ('رئيس الوفد', 'delegation_id__delegation_leader_name', None),
+    ('الحدث', 'delegation_id__sub_event_id__event_name', None),
+    ('حالة العضو', 'status', _choices(Member, 'status')),
+    ('تاريخ الوصول', 'delegation_id__arrive_date', None),
+    ('تاريخ المغادرة', 'departure_date', None),
+]
+
+CHECK_OUT_COLUMNS = [
+    ('الجنسية', 'delegation_id__nationality_id__name', None),
+    ('رئيس الوفد', 'delegation_id__delegation_leader_name', None),
+    ('تاريخ المغادرة', 'checkout_date', None),
+    ('سعت المغادرة', 'checkout_time', _time),
+    ('المطار', 'airport_id__name', None),
+    ('شركة الطيران', 'airline_id__name', None),
+    ('رقم الرحلة', 'flight_number', None),
+    ('الوجهة', 'city_id__city_name', None),
+    ('اسم المودع', 'depositor_name', None),
+    ('الأعضاء', 'member_names', None),
+    ('الشحنات', 'goods', None),
+]
+
+# name -> (sheet title, columns, annotations)
+EXPORTS = {
+    'delegations': ('تقرير الوفود', DELEGATION_COLUMNS, {}),
+    'members': ('تقرير الأعضاء', MEMBER_COLUMNS, {}),
+    'check-outs': ('تقرير المغادرات', CHECK_OUT_COLUMNS, {
+        # Member names through checkout_member, grouped per session in the same query
+        'member_names': StringAgg('member_links__member_id__name', delimiter='، ', default=''),
+    }),
+}
+
+
+def _plain(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_rows(queryset, columns, annotations=None):
+    """Yield one list of cell values per row, read in chunks from a server-side cursor"""
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    sources = [source for _, source, _ in columns]
+    formatters = [formatter or _plain for _, _, formatter in columns]
+    for row in queryset.values_list(*sources).iterator(chunk_size=CHUNK_SIZE):
+        yield [formatter(value) for formatter, value in zip(formatters, row)]
+
+
+class _Echo:
+    """``csv.writer`` target that returns each line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    """UTF-8 CSV with a BOM so Excel reads the Arabic text, in chunks of ``ROWS_PER_CHUNK`` rows"""
+    writer = csv.writer(_Echo())
+    lines = ['\ufeff' + writer.writerow(headers)]
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        yield ''.join(lines).encode('utf-8')
+
+
+class _Sink:
+    """Unseekable file for ``zipfile``; ``drain`` hands over what was written since the last call"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_DOC_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+# Characters XML 1.0 does not allow
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _workbook_parts(sheet_title):
+    # Sheet names are at most 31 characters and cannot contain []:*?/\
+    title = re.sub(r'[\[\]:*?/\\]', ' ', sheet_title)[:31]
+    return [
+        ('[Content_Types].xml', _XML_HEADER + (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        )),
+        ('_rels/.rels', _XML_HEADER + (
+            f'<Relationships xmlns="{_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_DOC_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        )),
+        ('xl/workbook.xml', _XML_HEADER + (
+            f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_DOC_REL}">'
+            f'<sheets><sheet name={quoteattr(title)} sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        )),
+        ('xl/_rels/workbook.xml.rels', _XML_HEADER + (
+            f'<Relationships xmlns="{_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_DOC_REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'
+        )),
+    ]
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML.sub('', str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+def stream_xlsx(sheet_title, headers, rows):
+    """One-sheet right-to-left workbook, in chunks of ``ROWS_PER_CHUNK`` rows"""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        for name, xml in _workbook_parts(sheet_title):
+            workbook.writestr(name, xml)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((
+                _XML_HEADER + f'<worksheet xmlns="{_MAIN_NS}">'
+                '<sheetViews><sheetView rightToLeft="1" workbookViewId="0"/></sheetViews>'
+                '<sheetData>' + _xlsx_row(headers)
+            ).encode('utf-8'))
+            lines = []
+            for row in rows:
+                lines.append(_xlsx_row(row))
+                if len(lines) >= ROWS_PER_CHUNK:
+                    sheet.write(''.join(lines).encode('utf-8'))
+                    lines = []
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write((''.join(lines) + '</sheetData></worksheet>').encode('utf-8'))
+    yield sink.drain()
+
+
+def stream_export(name, queryset, file_format):
+    """Response body of export ``name`` over ``queryset`` as ``csv`` or ``xlsx``"""
+    sheet_title, columns, annotations = EXPORTS[name]
+    headers = [header for header, _, _ in columns]
+    rows = export_rows(queryset, columns, annotations)
+    if file_format == 'csv':
+        return stream_csv(headers, rows)
+    return stream_xlsx(sheet_title, headers, rows)
@@ -0,0 +1,65 @@
+"""
+Combined lookup tables (``/api/lookups/``) with a version number and ETags.
+
+The five lookup tables (nationalities, cities, airlines, airports, equivalent
+jobs) change a few times a day but are read on almost every page. Their
+version number is the ``lookups`` row of ``report_version``, bumped by the
+lookup table triggers in the writing transaction (migrations ``0013`` and
+``0019``), so every worker sees a change as soon as it commits. The rendered
+payload is cached under that version; a worker whose cache does not hold it
+renders it once.
+
+A request whose ``If-None-Match`` matches the current ETag therefore gets
+``304 Not Modified`` after a single primary key read.
+"""
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+PAYLOAD_KEY = 'lookups:payload:{version}'
+# Cached payloads of old versions expire on their own
+PAYLOAD_TIMEOUT = 24 * 60 * 60
+
+
+def _sources():
+    from .models import Nationality, Cities, AirLine, AirPort, EquivalentJob
+    from .serializers import (
+        NationalitySerializer, CitiesSerializer, AirLineSerializer, AirPortSerializer, EquivalentJobSerializer,
+    )
+    # key -> (queryset in the order of its list endpoint, serializer)
+    return {
+        'nationalities': (Nationality.objects.order_by('name'), NationalitySerializer),
+        'cities': (Cities.objects.order_by('city_name'), CitiesSerializer),
+        'airlines': (AirLine.objects.order_by('name'), AirLineSerializer),
+        'airports': (AirPort.objects.order_by('name'), AirPortSerializer),
+        'equivalent_jobs': (EquivalentJob.objects.order_by('name'), EquivalentJobSerializer),
+    }
+
+
+def current_version():
+    from .models import ReportVersion
+    version = ReportVersion.objects.filter(pk=ReportVersion.LOOKUPS_KEY).values_list('version', flat=True).first()
+    return version or 0
+
+
+def etag_for(version):
+    return f'"lookups-{version}"'
+
+
+def not_modified(if_none_match, etag):
+    """Whether an ``If-None-Match`` header value matches ``etag`` (weak comparison, as RFC 9110 asks)"""
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in [tag.removeprefix('W/') for tag in etags]
+
+
+def payload(version):
+    """All lookup tables as ``{key: rows}`` plus ``version``, rendered once per version"""
+    key = PAYLOAD_KEY.format(version=version)
+    data = cache.get(key)
+    if data is None:
+        data = {'version': version}
+        for name, (queryset, serializer_class) in _sources().items():
+            data[name] = serializer_class(queryset, many=True).data
+        cache.set(key, data, PAYLOAD_TIMEOUT)
+    return data
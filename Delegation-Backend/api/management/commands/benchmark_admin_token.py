@@ -0,0 +1,72 @@
+import datetime
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import AdminAccessToken
+
+User = get_user_model()
+
+
+def scan_sessions(admin_token):
+    """The lookup AdminSessionMiddleware did before AdminAccessToken: decode every session"""
+    for session in Session.objects.all():
+        session_data = session.get_decoded()
+        if session_data.get('admin_access_token') == admin_token and session_data.get('admin_user_id'):
+            return User.objects.get(id=session_data['admin_user_id'])
+    return None
+
+
+class Command(BaseCommand):
+    help = ('Time the admin_token lookup: scanning every session (old) against one indexed, '
+            'single-use AdminAccessToken row. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=100_000, help='Sessions to seed (default: 100000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Lookups per method (default: 5)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(username=f'benchmark-{time.time_ns()}', full_name='قياس', role='SUPER_ADMIN')
+            started = time.perf_counter()
+            legacy_token = self.seed(options['sessions'], user)
+            self.stdout.write(f'seeded {options["sessions"]} sessions in {time.perf_counter() - started:.1f} s')
+
+            scan = self.time(lambda: scan_sessions(legacy_token), options['repeat'])
+            indexed = self.time(lambda: AdminAccessToken.consume(AdminAccessToken.issue(user)), options['repeat'])
+            self.stdout.write(f'{"lookup":<20} {"median ms":>10} {"max ms":>8}')
+            for label, timings in (('session scan', scan), ('issue + consume', indexed)):
+                self.stdout.write(f'{label:<20} {statistics.median(timings):>10.2f} {max(timings):>8.2f}')
+            transaction.set_rollback(True)
+
+    def seed(self, sessions, user):
+        """Plain sessions plus, last (the worst case for the scan), one holding an old-style token"""
+        expire_date = timezone.now() + datetime.timedelta(days=1)
+        stamp = time.time_ns()
+        store = SessionStore()
+        legacy_token = f'legacy-{stamp}'
+        rows = [
+            Session(session_key=f'b{stamp}{n:012d}', expire_date=expire_date,
+                    session_data=store.encode({'_auth_user_id': str(user.id), 'n': n}))
+            for n in range(sessions - 1)
+        ]
+        rows.append(Session(
+            session_key=f'b{stamp}target', expire_date=expire_date,
+            session_data=store.encode({'admin_access_token': legacy_token, 'admin_user_id': str(user.id)}),
+        ))
+        Session.objects.bulk_create(rows, batch_size=5_000)
+        return legacy_token
+
+    def time(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            assert run() is not None
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,161 @@
+import datetime
+import importlib
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import MainEvent, SubEvent
+
+audit_migration = importlib.import_module('accounts.migrations.0006_partition_audit_log')
+
+# The per-row, full-snapshot audit trigger replaced by accounts migration 0006
+# (database_schema.sql before it), installed under a legacy_* name for comparison.
+LEGACY_AUDIT_SQL = """
+CREATE OR REPLACE FUNCTION legacy_audit_trigger_func()
+RETURNS TRIGGER AS $$
+DECLARE
+    actor UUID := NULLIF(current_setting('app.current_user', true), '')::uuid;
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        INSERT INTO audit_log (table_name, record_id, action, old_data, changed_by)
+        VALUES (TG_TABLE_NAME, OLD.id, TG_OP, to_jsonb(OLD), actor);
+        RETURN OLD;
+    ELSIF (TG_OP = 'UPDATE') THEN
+        INSERT INTO audit_log (table_name, record_id, action, old_data, new_data, changed_by)
+        VALUES (TG_TABLE_NAME, NEW.id, TG_OP, to_jsonb(OLD), to_jsonb(NEW), actor);
+        RETURN NEW;
+    ELSE
+        INSERT INTO audit_log (table_name, record_id, action, new_data, changed_by)
+        VALUES (TG_TABLE_NAME, NEW.id, TG_OP, to_jsonb(NEW), actor);
+        RETURN NEW;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def use_legacy_audit():
+    """Swap the statement-level audit triggers for the legacy row triggers (inside a transaction)"""
+    statements = [audit_migration.drop_audit_triggers_sql(), LEGACY_AUDIT_SQL]
+    for table, _ in audit_migration.AUDITED_TABLES:
+        statements.append(
+            f'CREATE TRIGGER trg_audit_{table} AFTER INSERT OR UPDATE OR DELETE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION legacy_audit_trigger_func();'
+        )
+    with connection.cursor() as cursor:
+        cursor.execute('\n'.join(statements))
+
+
+class Command(BaseCommand):
+    help = ('Audit rows, audit bytes and time spent in the audit trigger over a simulated week of event traffic, with the '
+            'legacy per-row full-snapshot audit trigger and with the statement-level diff-only one. '
+            'Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Days of traffic (default: 7)')
+        parser.add_argument('--delegations', type=int, default=40, help='Delegations arriving per day (default: 40)')
+        parser.add_argument('--members', type=int, default=25, help='Members per delegation (default: 25)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Time spent inside the audit functions: the insert cost, apart from the rest of the traffic
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL track_functions = 'pl'")
+            main_event = MainEvent.objects.create(event_name='حدث قياس التدقيق')
+            self.sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='أسبوع الحدث')
+            self.stdout.write(
+                f'{"audit trigger":<18} {"rows":>8} {"MB":>8} {"bytes/row":>10} {"calls":>8} {"trigger ms":>11}'
+            )
+            for label, legacy, functions in (
+                ('row, full rows', True, 'legacy_audit_trigger_func'),
+                ('statement, diff', False, 'audit\\_%\\_changed'),
+            ):
+                with transaction.atomic():
+                    if legacy:
+                        use_legacy_audit()
+                    first_id = self.last_audit_id()
+                    self.simulate_week(options['days'], options['delegations'], options['members'])
+                    rows, size = self.audit_size(first_id)
+                    calls, total_ms = self.function_time(functions)
+                    self.stdout.write(
+                        f'{label:<18} {rows:>8} {size / 1e6:>8.1f} {size / max(rows, 1):>10.0f} '
+                        f'{calls:>8} {total_ms:>11.0f}'
+                    )
+                    # Back to the migrated triggers and an empty week for the next run
+                    transaction.set_rollback(True)
+            transaction.set_rollback(True)
+
+    def function_time(self, pattern):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(total_time), 0) '
+                'FROM pg_stat_xact_user_functions WHERE funcname LIKE %s', [pattern],
+            )
+            return cursor.fetchone()
+
+    def last_audit_id(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM audit_log')
+            return cursor.fetchone()[0]
+
+    def audit_size(self, first_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*), COALESCE(SUM(pg_column_size(a.*)), 0) FROM audit_log a WHERE id > %s', [first_id],
+            )
+            return cursor.fetchone()
+
+    def simulate_week(self, days, delegations, members):
+        """
+        Each day: delegations arrive with their members, the receivers complete their
+        records (flight, arrival time, job titles), and the delegations that arrived two
+        days earlier leave in one departure session each.
+        """
+        start = datetime.date.today()
+        with connection.cursor() as cursor:
+            for day in range(days):
+                date = start + datetime.timedelta(days=day)
+                cursor.execute(
+                    "INSERT INTO delegation (id, sub_event_id, delegation_leader_name, type, status, member_count, "
+                    "current_members, departed_members, arrive_date, created_at, updated_at) "
+                    "SELECT gen_random_uuid(), %s, 'رئيس الوفد ' || n, 'MILITARY', 'NOT_DEPARTED', %s, 0, 0, %s, "
+                    "now(), now() FROM generate_series(1, %s) AS n",
+                    [self.sub_event.id, members, date, delegations],
+                )
+                cursor.execute(
+                    "INSERT INTO member (id, delegation_id, name, rank, status, created_at, updated_at) "
+                    "SELECT gen_random_uuid(), d.id, 'عضو ' || n, 'عقيد', 'NOT_DEPARTED', now(), now() "
+                    "FROM delegation d, generate_series(1, %s) AS n WHERE d.sub_event_id = %s AND d.arrive_date = %s",
+                    [members, self.sub_event.id, date],
+                )
+                # Edits through the API are single-row statements
+                cursor.execute(
+                    "SELECT id FROM delegation WHERE sub_event_id = %s AND arrive_date = %s", [self.sub_event.id, date],
+                )
+                for (delegation_id,) in cursor.fetchall():
+                    cursor.execute(
+                        "UPDATE delegation SET flight_number = 'EK' || (random() * 900 + 100)::int, "
+                        "arrive_time = '14:30', updated_at = now() WHERE id = %s", [delegation_id],
+                    )
+                cursor.execute(
+                    "SELECT m.id FROM member m JOIN delegation d ON d.id = m.delegation_id "
+                    "WHERE d.sub_event_id = %s AND d.arrive_date = %s AND m.name LIKE '%%1'",
+                    [self.sub_event.id, date],
+                )
+                for (member_id,) in cursor.fetchall():
+                    cursor.execute(
+                        "UPDATE member SET job_title = 'ملحق عسكري', updated_at = now() WHERE id = %s", [member_id],
+                    )
+                # Departure sessions of the delegations that arrived two days ago
+                cursor.execute(
+                    "SELECT d.id, jsonb_agg(m.id) FROM delegation d JOIN member m ON m.delegation_id = d.id "
+                    "WHERE d.sub_event_id = %s AND d.arrive_date = %s GROUP BY d.id",
+                    [self.sub_event.id, date - datetime.timedelta(days=2)],
+                )
+                for delegation_id, member_ids in cursor.fetchall():
+                    # The check-out trigger marks the session's members departed
+                    cursor.execute(
+                        "INSERT INTO check_out (id, delegation_id, members, checkout_date, created_at, updated_at) "
+                        "VALUES (gen_random_uuid(), %s, %s::jsonb, %s, now(), now())",
+                        [delegation_id, member_ids, date],
+                    )
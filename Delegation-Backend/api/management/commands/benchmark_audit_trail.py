@@ -0,0 +1,119 @@
+import datetime
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts import audit
+from accounts.models import AuditLog
+from api.pagination import AuditLogPagination
+
+User = get_user_model()
+
+# The indexes audit_log had before the history indexes (database_schema.sql)
+LEGACY_INDEXES_SQL = """
+DROP INDEX audit_log_record_history_idx;
+DROP INDEX audit_log_table_changed_idx;
+DROP INDEX audit_log_changed_idx;
+CREATE INDEX legacy_audit_log_table_name ON audit_log (table_name);
+CREATE INDEX legacy_audit_log_changed_at ON audit_log (changed_at);
+"""
+
+
+def _timed(func, repeat):
+    """Median milliseconds of ``repeat`` calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = ('Benchmark /api/audit/ (keyset pages, estimated total, history indexes) against COUNT(*) + OFFSET '
+            'on the previous single-column indexes, over a year of audit rows. '
+            'Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Audit rows to seed (default: 1000000)')
+        parser.add_argument('--changes', type=int, default=20, help='Audit rows per record (default: 20)')
+        parser.add_argument('--page-size', type=int, default=50, help='Rows per page (default: 50)')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            record_id = self.seed(options['rows'], options['changes'])
+            self.stdout.write(f'seeded {options["rows"]} audit rows in {time.perf_counter() - started:.1f} s')
+            self.page_size = options['page_size']
+            self.repeat = options['repeat']
+            self.client = APIClient()
+            self.client.force_authenticate(User.objects.create(
+                username=f'benchmark{time.time_ns()}', full_name='قياس الأداء', role='SUPER_ADMIN',
+            ))
+
+            deep = options['rows'] // 2
+            scenarios = [
+                ('record history', {'table': 'member', 'record_id': record_id}, 0),
+                ('one table, first page', {'table': 'users'}, 0),
+                ('all rows, first page', {}, 0),
+                (f'all rows, row {deep}', {}, deep),
+            ]
+            keyset = [self.keyset(params, offset) for _, params, offset in scenarios]
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(LEGACY_INDEXES_SQL)
+                    cursor.execute('ANALYZE audit_log')
+                legacy = [self.legacy(params, offset) for _, params, offset in scenarios]
+                transaction.set_rollback(True)
+
+            self.stdout.write(f'{"page":<24} {"keyset + estimate ms":>21} {"COUNT + OFFSET ms":>18}')
+            for (label, _, _), keyset_ms, legacy_ms in zip(scenarios, keyset, legacy):
+                self.stdout.write(f'{label:<24} {keyset_ms:>21.1f} {legacy_ms:>18.1f}')
+            transaction.set_rollback(True)
+
+    def seed(self, rows, changes):
+        """A year of rows over the audited tables, ``changes`` per record; returns one member's id"""
+        this_month = audit.month_start(timezone.now().date())
+        for count in range(-12, 1):
+            audit.create_partition(audit.add_months(this_month, count))
+        start = timezone.now() - datetime.timedelta(days=365)
+        with connection.cursor() as cursor:
+            # users are rare, members most of the traffic; a record's changes are spread over the year
+            cursor.execute(
+                "INSERT INTO audit_log (table_name, record_id, action, new_data, changed_at) "
+                "SELECT CASE WHEN n %% 100 = 0 THEN 'users' WHEN n %% 10 < 3 THEN 'delegation' ELSE 'member' END, "
+                "md5((n %% %s)::text)::uuid, 'UPDATE', jsonb_build_object('updated_at', now()), "
+                "%s::timestamptz + (n * (365 * 86400.0 / %s)) * INTERVAL '1 second' "
+                "FROM generate_series(1, %s) AS n",
+                [max(rows // changes, 1), start, rows, rows],
+            )
+            # Run the deferred changed_by checks now: DDL is refused while they are pending
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute('ANALYZE audit_log')
+        return str(AuditLog.objects.filter(table_name='member').values_list('record_id', flat=True).first())
+
+    def keyset(self, params, offset):
+        params = {**params, 'page_size': self.page_size}
+        if offset:
+            # Cursor that opens the page, as a client would reach by following next links
+            anchor = AuditLog.objects.order_by('-changed_at', '-id')[offset - 1]
+            params['cursor'] = AuditLogPagination().encode_cursor(anchor)
+        return _timed(lambda: self.client.get('/api/audit/', params), self.repeat)
+
+    def legacy(self, params, offset):
+        def page():
+            # Previous admin behaviour: COUNT(*) of the filtered rows and an OFFSET page
+            queryset = AuditLog.objects.select_related('changed_by').order_by('-changed_at')
+            if 'table' in params:
+                queryset = queryset.filter(table_name=params['table'])
+            if 'record_id' in params:
+                queryset = queryset.filter(record_id=params['record_id'])
+            queryset.count()
+            list(queryset[offset:offset + self.page_size])
+        return _timed(page, self.repeat)
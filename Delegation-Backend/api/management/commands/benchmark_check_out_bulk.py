@@ -0,0 +1,103 @@
+import importlib
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.models import AuditLog
+from api.models import MainEvent, SubEvent, Delegation, Member
+
+User = get_user_model()
+
+checkout_migration = importlib.import_module('api.migrations.0015_checkout_statement_trigger')
+
+
+def use_row_trigger():
+    """The per-session member update of database_schema.sql before migration 0015 (inside a transaction)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            checkout_migration.DROP_CHECKOUT_STATEMENT_SQL
+            + 'CREATE TRIGGER trg_update_member_status_on_checkout AFTER INSERT OR UPDATE ON check_out '
+              'FOR EACH ROW EXECUTE FUNCTION update_member_status_on_checkout();'
+        )
+
+
+class Command(BaseCommand):
+    help = ('Check out every delegation of one outbound flight: one POST /api/check-outs/ per delegation '
+            'with the per-row member trigger, against one POST /api/check-outs/bulk/. '
+            'Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delegations', type=int, default=30, help='Delegations on the flight (default: 30)')
+        parser.add_argument('--members', type=int, default=40, help='Members per delegation (default: 40)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.client = APIClient()
+            self.client.force_authenticate(User.objects.create(
+                username=f'benchmark{time.time_ns()}', full_name='قياس الأداء', role='SUPER_ADMIN',
+            ))
+            main_event = MainEvent.objects.create(event_name='حدث قياس المغادرة')
+            self.sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+
+            self.stdout.write(
+                f'{"departure":<28} {"ms":>8} {"queries":>8} {"audit rows":>11} {"events":>7} {"departed":>9}'
+            )
+            for label, bulk in (('per session, row trigger', False), ('bulk, statement trigger', True)):
+                with transaction.atomic():
+                    delegations = self.seed(options['delegations'], options['members'])
+                    if not bulk:
+                        use_row_trigger()
+                    first_audit_id = AuditLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+                    with mock.patch('api.signals.queue_update') as queued, \
+                            CaptureQueriesContext(connection) as captured:
+                        started = time.perf_counter()
+                        if bulk:
+                            self.bulk(delegations)
+                        else:
+                            self.per_session(delegations)
+                        elapsed = (time.perf_counter() - started) * 1000
+                    departed = Member.objects.filter(delegation_id__in=delegations, status='DEPARTED').count()
+                    audit_rows = AuditLog.objects.filter(id__gt=first_audit_id).count()
+                    self.stdout.write(
+                        f'{label:<28} {elapsed:>8.1f} {len(captured.captured_queries):>8} {audit_rows:>11} '
+                        f'{queued.call_count:>7} {departed:>9}'
+                    )
+                    transaction.set_rollback(True)
+            transaction.set_rollback(True)
+
+    def seed(self, delegations, members):
+        rows = Delegation.objects.bulk_create([
+            Delegation(sub_event_id=self.sub_event, delegation_leader_name=f'رئيس الوفد {n}', type='MILITARY')
+            for n in range(delegations)
+        ])
+        Member.objects.bulk_create([
+            Member(delegation_id=delegation, name=f'عضو {n}', rank='عقيد')
+            for delegation in rows for n in range(members)
+        ])
+        return [delegation.id for delegation in rows]
+
+    def flight(self):
+        return {'flight_number': 'SV 1021', 'checkout_date': '2026-11-02', 'checkout_time': '23:40'}
+
+    def per_session(self, delegations):
+        members = {}
+        for delegation_id, member_id in Member.objects.filter(delegation_id__in=delegations).values_list(
+            'delegation_id', 'id'
+        ):
+            members.setdefault(delegation_id, []).append(str(member_id))
+        for delegation_id in delegations:
+            response = self.client.post('/api/check-outs/', {
+                **self.flight(), 'delegation_id': str(delegation_id), 'members': members[delegation_id],
+            }, format='json')
+            assert response.status_code == 201, response.data
+
+    def bulk(self, delegations):
+        response = self.client.post('/api/check-outs/bulk/', {
+            **self.flight(), 'delegation_ids': [str(delegation_id) for delegation_id in delegations],
+        }, format='json')
+        assert response.status_code == 201, response.data
@@ -0,0 +1,119 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+
+from api.models import MainEvent, SubEvent, Nationality, Delegation, Member, CheckOut
+
+# Each pair is (JSON array scan as before, join on checkout_member)
+MEMBER_SESSIONS_SQL = (
+    "SELECT id FROM check_out WHERE members @> jsonb_build_array(%s::text)",
+    "SELECT check_out_id FROM checkout_member WHERE member_id = %s",
+)
+SESSION_MEMBERS_SQL = (
+    "UPDATE member SET status = 'DEPARTED' WHERE id = ANY("
+    "SELECT jsonb_array_elements_text(members)::uuid FROM check_out WHERE id = %s)",
+    "UPDATE member m SET status = 'DEPARTED' FROM checkout_member cm "
+    "WHERE cm.check_out_id = %s AND m.id = cm.member_id",
+)
+DEPARTURE_REPORT_SQL = (
+    "SELECT m.name, co.flight_number, co.checkout_date FROM check_out co "
+    "CROSS JOIN LATERAL jsonb_array_elements_text(co.members) AS value "
+    "JOIN member m ON m.id = value::uuid "
+    "JOIN delegation d ON d.id = co.delegation_id WHERE d.sub_event_id = %s",
+    "SELECT m.name, co.flight_number, co.checkout_date FROM check_out co "
+    "JOIN checkout_member cm ON cm.check_out_id = co.id "
+    "JOIN member m ON m.id = cm.member_id "
+    "JOIN delegation d ON d.id = co.delegation_id WHERE d.sub_event_id = %s",
+)
+
+
+def _timed(cursor, sql, params_list, repeat):
+    """Median milliseconds to run ``sql`` once per parameter set"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for params in params_list:
+            cursor.execute(sql, params)
+            if cursor.description:
+                cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = ('Benchmark member/session lookups on check_out.members (JSON scans) against the '
+            'checkout_member table. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=50000, help='Members to seed (default: 50000)')
+        parser.add_argument('--per-session', type=int, default=10, help='Members per session (default: 10)')
+        parser.add_argument('--lookups', type=int, default=200, help='Lookups per measurement (default: 200)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            sub_events = self.seed(options['members'], options['per_session'])
+            rng = random.Random(0)
+            member_ids = list(Member.objects.values_list('id', flat=True))
+            check_out_ids = list(CheckOut.objects.values_list('id', flat=True))
+            lookups = options['lookups']
+            cases = [
+                ('member -> sessions', MEMBER_SESSIONS_SQL,
+                 [[str(member_id)] for member_id in rng.sample(member_ids, min(lookups, len(member_ids)))]),
+                ('session -> members (update)', SESSION_MEMBERS_SQL,
+                 [[check_out_id] for check_out_id in rng.sample(check_out_ids, min(lookups, len(check_out_ids)))]),
+                ('departure report', DEPARTURE_REPORT_SQL, [[sub_event.id] for sub_event in sub_events]),
+            ]
+            self.stdout.write(f'{len(member_ids)} members, {len(check_out_ids)} sessions')
+            self.stdout.write(f'{"query":<28} {"runs":>5} {"json ms":>9} {"join ms":>9}')
+            with connection.cursor() as cursor:
+                for label, (json_sql, join_sql), params_list in cases:
+                    json_ms = _timed(cursor, json_sql, params_list, options['repeat'])
+                    join_ms = _timed(cursor, join_sql, params_list, options['repeat'])
+                    self.stdout.write(f'{label:<28} {len(params_list):>5} {json_ms:>9.1f} {join_ms:>9.1f}')
+            transaction.set_rollback(True)
+
+    def seed(self, total_members, per_session):
+        # Member row triggers (counters) are skipped when allowed; check_out triggers must run
+        # so checkout_member is filled the same way as in production
+        replica = False
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SET LOCAL session_replication_role = replica')
+            replica = True
+        except DatabaseError:
+            self.stderr.write('Could not disable triggers for seeding; this will be slow')
+        main_event = MainEvent.objects.create(event_name='حدث قياس الأداء')
+        sub_events = [
+            SubEvent.objects.create(main_event_id=main_event, event_name=f'فرعي {index}') for index in range(5)
+        ]
+        nationality = Nationality.objects.create(name=f'جنسية قياس {time.time_ns()}')
+        delegation_size = per_session * 2
+        delegations = Delegation.objects.bulk_create([
+            Delegation(
+                sub_event_id=sub_events[index % len(sub_events)], nationality_id=nationality,
+                delegation_leader_name=f'رئيس الوفد {index}', type='MILITARY',
+            )
+            for index in range(max(total_members // delegation_size, 1))
+        ])
+        members = Member.objects.bulk_create([
+            Member(delegation_id=delegation, name=f'عضو {number}', rank='عقيد')
+            for delegation in delegations
+            for number in range(delegation_size)
+        ], batch_size=5000)
+        if replica:
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL session_replication_role = origin')
+        CheckOut.objects.bulk_create([
+            CheckOut(
+                delegation_id=members[start].delegation_id, flight_number=f'MS{start}',
+                members=[str(member.id) for member in members[start:start + per_session]],
+            )
+            for start in range(0, len(members), per_session)
+        ], batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE member; ANALYZE check_out; ANALYZE checkout_member')
+        return sub_events
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.models import MainEvent, SubEvent, Nationality, Delegation, Member, CheckOut
+from api.query_plan import plan_queryset
+from api.serializers import CheckOutSerializer
+
+
+def _timed(func, repeat):
+    """Median milliseconds and query count of ``repeat`` calls"""
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(captured.captured_queries)
+    return statistics.median(timings), queries
+
+
+class Command(BaseCommand):
+    help = ('Benchmark check-out member resolution: one query per session (previous behaviour) '
+            'against one query per page. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=500, help='Check-out sessions (default: 500)')
+        parser.add_argument('--members', type=int, default=30, help='Members per session (default: 30)')
+        parser.add_argument('--page-size', type=int, default=20, help='Rows per API page (default: 20)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['sessions'], options['members'])
+            self.stdout.write(f'{"rows":>5}  {"resolution":<22} {"ms":>8} {"queries":>8}')
+            for rows in (options['page_size'], options['sessions']):
+                queryset = plan_queryset(CheckOut.objects.order_by('-created_at'), CheckOutSerializer())[:rows]
+
+                def per_row():
+                    # Serializing rows one by one resolves members per session, as before
+                    return [CheckOutSerializer(check_out).data for check_out in queryset.all()]
+
+                def batched():
+                    return CheckOutSerializer(queryset.all(), many=True).data
+
+                for label, func in (('per session', per_row), ('batched (list)', batched)):
+                    ms, queries = _timed(func, options['repeat'])
+                    self.stdout.write(f'{rows:>5}  {label:<22} {ms:>8.1f} {queries:>8}')
+            transaction.set_rollback(True)
+
+    def seed(self, sessions, members_per_session):
+        # The seed is rolled back, so row triggers (member status, counters) are skipped when allowed
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SET LOCAL session_replication_role = replica')
+        except DatabaseError:
+            self.stderr.write('Could not disable triggers for seeding; this will be slow')
+        main_event = MainEvent.objects.create(event_name='حدث قياس الأداء')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        nationality = Nationality.objects.create(name=f'جنسية قياس {time.time_ns()}')
+        delegations = Delegation.objects.bulk_create([
+            Delegation(
+                sub_event_id=sub_event, nationality_id=nationality,
+                delegation_leader_name=f'رئيس الوفد {index}', type='MILITARY',
+            )
+            for index in range(sessions)
+        ])
+        members = Member.objects.bulk_create([
+            Member(delegation_id=delegation, name=f'عضو {number}', rank='عقيد', job_title='ملحق')
+            for delegation in delegations
+            for number in range(members_per_session)
+        ])
+        CheckOut.objects.bulk_create([
+            CheckOut(
+                delegation_id=delegation,
+                members=[str(member.id) for member in members[index * members_per_session:(index + 1) * members_per_session]],
+            )
+            for index, delegation in enumerate(delegations)
+        ])
@@ -0,0 +1,108 @@
+import datetime
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from api import counters
+from api.models import MainEvent, SubEvent
+
+User = get_user_model()
+
+
+def _timed(func, repeat):
+    """Median milliseconds of ``repeat`` calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = ('Benchmark /api/dashboard/timeseries/ (dashboard_daily rollup) against aggregating the member table '
+            'per request, and time a full rebuild. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delegations', type=int, default=20_000, help='Delegations to seed (default: 20000)')
+        parser.add_argument('--members', type=int, default=15, help='Members per delegation (default: 15)')
+        parser.add_argument('--sub-events', type=int, default=20, help='Sub events (default: 20)')
+        parser.add_argument('--days', type=int, default=90, help='Days the arrivals are spread over (default: 90)')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            sub_event_id = self.seed(options)
+            self.stdout.write(
+                f'seeded {options["delegations"] * options["members"]} members in {time.perf_counter() - started:.1f} s'
+            )
+            started = time.perf_counter()
+            counters.rebuild_daily()
+            self.stdout.write(f'rebuild_dashboard_daily: {(time.perf_counter() - started) * 1000:.1f} ms')
+
+            client = APIClient()
+            client.force_authenticate(User.objects.create(
+                username=f'benchmark{time.time_ns()}', full_name='قياس الأداء', role='SUPER_ADMIN',
+            ))
+            scopes = [('all events', {}), ('one sub event', {'sub_event_id': sub_event_id})]
+            self.stdout.write(f'{"series":<16} {"rollup ms":>10} {"live aggregate ms":>18}')
+            for label, params in scopes:
+                rollup = _timed(lambda: client.get('/api/dashboard/timeseries/', params), options['repeat'])
+                live = _timed(lambda: self.live_series(params.get('sub_event_id')), options['repeat'])
+                self.stdout.write(f'{label:<16} {rollup:>10.1f} {live:>18.1f}')
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        """Delegations arriving over ``days`` days, two thirds of their members departed a week later"""
+        main_event = MainEvent.objects.create(event_name='حدث قياس السلسلة اليومية')
+        sub_event_ids = [
+            SubEvent.objects.create(main_event_id=main_event, event_name=f'فرعي {n}').id
+            for n in range(options['sub_events'])
+        ]
+        start = datetime.date.today()
+        with connection.cursor() as cursor:
+            # Seed without triggers: the rollup is filled by the rebuild being measured
+            cursor.execute('SET LOCAL session_replication_role = replica')
+            cursor.execute(
+                "INSERT INTO delegation (id, sub_event_id, delegation_leader_name, type, arrive_date, "
+                "member_count, current_members, departed_members, status, created_at, updated_at) "
+                "SELECT gen_random_uuid(), (%s::uuid[])[1 + n %% %s], 'رئيس الوفد ' || n, 'MILITARY', "
+                "%s::date + (n %% %s), 0, 0, 0, 'NOT_DEPARTED', now(), now() "
+                "FROM generate_series(1, %s) AS n",
+                [sub_event_ids, len(sub_event_ids), start, options['days'], options['delegations']],
+            )
+            cursor.execute(
+                "INSERT INTO member (id, delegation_id, name, status, departure_date, created_at, updated_at) "
+                "SELECT gen_random_uuid(), d.id, 'عضو ' || n, "
+                "CASE WHEN n %% 3 = 0 THEN 'NOT_DEPARTED' ELSE 'DEPARTED' END, "
+                "CASE WHEN n %% 3 = 0 THEN NULL ELSE d.arrive_date + 7 END, now(), now() "
+                "FROM delegation d CROSS JOIN generate_series(1, %s) AS n "
+                "WHERE d.sub_event_id = ANY(%s::uuid[])",
+                [options['members'], sub_event_ids],
+            )
+            cursor.execute('SET LOCAL session_replication_role = origin')
+            cursor.execute('ANALYZE delegation')
+            cursor.execute('ANALYZE member')
+        return str(sub_event_ids[0])
+
+    def live_series(self, sub_event_id):
+        """The same series from the member table: grouped counts per day and a running total"""
+        daily = counters.live_daily()
+        if sub_event_id:
+            daily = {key: value for key, value in daily.items() if str(key[0]) == sub_event_id}
+        totals = {}
+        for (_, day), row in daily.items():
+            total = totals.setdefault(day, [0, 0])
+            total[0] += row['arrivals']
+            total[1] += row['departures']
+        in_country = 0
+        series = []
+        for day in sorted(totals):
+            in_country += totals[day][0] - totals[day][1]
+            series.append((day, *totals[day], in_country))
+        return series
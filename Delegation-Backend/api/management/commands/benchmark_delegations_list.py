@@ -0,0 +1,116 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.models import MainEvent, SubEvent, Nationality, Delegation, Member
+from api.pagination import KeysetPagination
+from api.serializers import DelegationSerializer
+
+User = get_user_model()
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def _timed(func, repeat):
+    """Median milliseconds of ``repeat`` calls and the last result"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+class Command(BaseCommand):
+    help = ('Benchmark /api/delegations/ (keyset pages, members on demand) against the previous '
+            'offset pagination with embedded members. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=_int_list, default=[1000, 10000, 100000],
+                            help='Comma separated delegation counts (default: 1000,10000,100000)')
+        parser.add_argument('--members', type=int, default=5, help='Members per delegation (default: 5)')
+        parser.add_argument('--page-size', type=int, default=20, help='Rows per page (default: 20)')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"delegations":>11}  {"request":<34} {"ms":>8} {"bytes":>9}')
+        for size in options['sizes']:
+            with transaction.atomic():
+                for label, ms, size_bytes in self.run_size(size, options):
+                    self.stdout.write(f'{size:>11}  {label:<34} {ms:>8.1f} {size_bytes:>9}')
+                transaction.set_rollback(True)
+
+    def seed(self, size, members_per_delegation):
+        # The seed is rolled back, so row triggers (dashboard counters) are skipped when allowed
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SET LOCAL session_replication_role = replica')
+        except DatabaseError:
+            self.stderr.write('Could not disable triggers for seeding; this will be slow')
+        main_event = MainEvent.objects.create(event_name='حدث قياس الأداء')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        nationality = Nationality.objects.create(name=f'جنسية قياس {time.time_ns()}')
+        for start in range(0, size, 5000):
+            delegations = Delegation.objects.bulk_create([
+                Delegation(
+                    sub_event_id=sub_event, nationality_id=nationality,
+                    delegation_leader_name=f'رئيس الوفد {start + index}', type='MILITARY',
+                )
+                for index in range(min(5000, size - start))
+            ])
+            Member.objects.bulk_create([
+                Member(delegation_id=delegation, name=f'عضو {number}', rank='عقيد', job_title='ملحق')
+                for delegation in delegations
+                for number in range(members_per_delegation)
+            ])
+
+    def run_size(self, size, options):
+        page_size = options['page_size']
+        repeat = options['repeat']
+        self.seed(size, options['members'])
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(
+            username=f'benchmark{time.time_ns()}', full_name='قياس الأداء', role='SUPER_ADMIN',
+        ))
+
+        def get(params):
+            response = client.get('/api/delegations/', params)
+            return len(response.content)
+
+        ms, size_bytes = _timed(lambda: get({'page_size': page_size}), repeat)
+        yield 'keyset first page', ms, size_bytes
+
+        ms, size_bytes = _timed(lambda: get({'page_size': page_size, 'expand': 'members'}), repeat)
+        yield 'keyset first page ?expand=members', ms, size_bytes
+
+        # Cursor that opens the last page, as a client would reach by following next links
+        ordered = Delegation.objects.order_by('-created_at', '-id')
+        anchor = ordered[max(size - page_size - 1, 0)]
+        cursor = KeysetPagination().encode_cursor(anchor)
+        ms, size_bytes = _timed(lambda: get({'page_size': page_size, 'cursor': cursor}), repeat)
+        yield 'keyset last page', ms, size_bytes
+
+        def legacy(page):
+            # Previous behaviour: COUNT(*) + OFFSET page with every member embedded
+            queryset = Delegation.objects.select_related(
+                'nationality_id', 'sub_event_id__main_event_id'
+            ).prefetch_related('members').order_by('-created_at')
+            count = queryset.count()
+            offset = (page - 1) * page_size
+            rows = DelegationSerializer(queryset[offset:offset + page_size], many=True).data
+            return len(JSONRenderer().render({'count': count, 'results': rows}))
+
+        ms, size_bytes = _timed(lambda: legacy(1), repeat)
+        yield 'offset first page (members)', ms, size_bytes
+        last_page = max((size + page_size - 1) // page_size, 1)
+        ms, size_bytes = _timed(lambda: legacy(last_page), repeat)
+        yield 'offset last page (members)', ms, size_bytes
@@ -0,0 +1,74 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from accounts.log_writer import LogWriter
+from accounts.models import LoginLogs
+from api import views
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('p50/p95 latency of POST /api/auth/login/ for a shift change (every operator logs in, '
+            'some mistype their password) with login logs written during the request and in the '
+            'background. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operators', type=int, default=200, help='Operators logging in (default: 200)')
+        parser.add_argument('--failed-every', type=int, default=10,
+                            help='Every Nth attempt uses a wrong password (default: 10)')
+        parser.add_argument('--fast-hasher', action='store_true',
+                            help='Hash passwords with MD5, so PBKDF2 does not hide the rest of the request')
+
+    def handle(self, *args, **options):
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher'] if options['fast_hasher'] else None
+        with override_settings(**({'PASSWORD_HASHERS': hashers} if hashers else {})), transaction.atomic():
+            stamp = time.time_ns()
+            password = make_password('benchmark-123')
+            usernames = [f'operator-{stamp}-{n}' for n in range(options['operators'])]
+            User.objects.bulk_create([
+                User(username=username, full_name=f'مشغل {n}', role='USER', password_hash=password)
+                for n, username in enumerate(usernames)
+            ])
+            self.view = views.AuthViewSet.as_view({'post': 'login'})
+            self.factory = APIRequestFactory()
+
+            self.stdout.write(f'{"login logs":<14} {"p50 ms":>8} {"p95 ms":>8} {"flush ms":>9} {"logs":>6}')
+            for label, writer in (('in request', LogWriter(flush_ms=0)), ('background', LogWriter(flush_ms=60_000))):
+                before = LoginLogs.objects.count()
+                timings = self.shift_change(writer, usernames, options['failed_every'])
+                # The background batch is written here, in this transaction, so it can be rolled back
+                started = time.perf_counter()
+                writer.close()
+                flush_ms = (time.perf_counter() - started) * 1000
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                self.stdout.write(
+                    f'{label:<14} {statistics.median(timings):>8.2f} {p95:>8.2f} {flush_ms:>9.2f} '
+                    f'{LoginLogs.objects.count() - before:>6}'
+                )
+            transaction.set_rollback(True)
+
+    def shift_change(self, writer, usernames, failed_every):
+        original = views.log_writer
+        views.log_writer = writer
+        try:
+            timings = []
+            for n, username in enumerate(usernames):
+                password = 'wrong' if failed_every and n % failed_every == 0 else 'benchmark-123'
+                request = self.factory.post('/api/auth/login/', {'username': username, 'password': password},
+                                            format='json')
+                SessionMiddleware(lambda request: None).process_request(request)
+                started = time.perf_counter()
+                self.view(request)
+                timings.append((time.perf_counter() - started) * 1000)
+            return timings
+        finally:
+            views.log_writer = original
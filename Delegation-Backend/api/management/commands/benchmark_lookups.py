@@ -0,0 +1,80 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import Nationality, Cities, AirLine, AirPort, EquivalentJob
+from api.views import (
+    LookupsViewSet, NationalityViewSet, CitiesViewSet, AirLineViewSet, AirPortViewSet, EquivalentJobViewSet,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Loads per second of the lookup tables: five list GETs, one GET /api/lookups/, '
+            'and its 304 revalidation. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Rows per lookup table (default: 100)')
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each measurement (default: 3)')
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        with transaction.atomic():
+            self.user = User.objects.create(username=f'benchmark-{time.time_ns()}', full_name='قياس', role='ADMIN')
+            self.seed(options['rows'])
+            lookups_view = LookupsViewSet.as_view({'get': 'list'})
+            list_views = [
+                (view.as_view({'get': 'list'}), path) for view, path in (
+                    (NationalityViewSet, '/api/nationalities/'), (CitiesViewSet, '/api/cities/'),
+                    (AirLineViewSet, '/api/airlines/'), (AirPortViewSet, '/api/airports/'),
+                    (EquivalentJobViewSet, '/api/equivalent-jobs/'),
+                )
+            ]
+            etag = self.get(lookups_view, '/api/lookups/')['ETag']
+
+            def five_lists():
+                for view, path in list_views:
+                    self.get(view, path)
+
+            self.stdout.write(f'{"path":<22} {"loads/s":>9} {"queries":>8}')
+            for label, run in (
+                ('5 list GETs', five_lists),
+                ('/api/lookups/ 200', lambda: self.get(lookups_view, '/api/lookups/')),
+                ('/api/lookups/ 304', lambda: self.get(lookups_view, '/api/lookups/', etag, expect=304)),
+            ):
+                rate, queries = self.measure(run, options['seconds'])
+                self.stdout.write(f'{label:<22} {rate:>9.0f} {queries:>8}')
+            transaction.set_rollback(True)
+
+    def seed(self, rows):
+        stamp = time.time_ns()
+        Nationality.objects.bulk_create([Nationality(name=f'جنسية {stamp}-{n}') for n in range(rows)])
+        Cities.objects.bulk_create([Cities(city_name=f'مدينة {stamp}-{n}') for n in range(rows)])
+        AirLine.objects.bulk_create([AirLine(name=f'شركة {stamp}-{n}') for n in range(rows)])
+        AirPort.objects.bulk_create([AirPort(name=f'مطار {stamp}-{n}') for n in range(rows)])
+        EquivalentJob.objects.bulk_create([EquivalentJob(name=f'وظيفة {stamp}-{n}') for n in range(rows)])
+
+    def get(self, view, path, etag=None, expect=200):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        request = self.factory.get(path, **headers)
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        response.render()
+        assert response.status_code == expect, response.status_code
+        return response
+
+    def measure(self, run, seconds):
+        """Runs per second of ``run`` and the queries of one run"""
+        with CaptureQueriesContext(connection) as captured:
+            run()
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            run()
+            count += 1
+        return count / (time.perf_counter() - started), len(captured.captured_queries)
@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import MainEvent, SubEvent, EquivalentJob, Delegation
+from api.views import MemberViewSet
+
+User = get_user_model()
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark registering a delegation\'s members one POST /api/members/ at a time against '
+            'one POST /api/members/bulk/. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=_int_list, default=[60, 1000],
+                            help='Comma separated members per delegation (default: 60,1000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        self.create_view = MemberViewSet.as_view({'post': 'create'})
+        self.bulk_view = MemberViewSet.as_view({'post': 'bulk'})
+        self.stdout.write(f'{"rows":>5}  {"path":<10} {"ms":>9} {"queries":>8}')
+        with transaction.atomic():
+            self.user = User.objects.create(username=f'benchmark-{time.time_ns()}', full_name='قياس', role='ADMIN')
+            main_event = MainEvent.objects.create(event_name='حدث قياس الأداء')
+            self.sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+            self.job = EquivalentJob.objects.create(name=f'وظيفة قياس {time.time_ns()}')
+            for rows in options['rows']:
+                for label, bulk in (('per-row', False), ('bulk', True)):
+                    ms, queries = self.measure(rows, bulk, options['repeat'])
+                    self.stdout.write(f'{rows:>5}  {label:<10} {ms:>9.1f} {queries:>8}')
+            transaction.set_rollback(True)
+
+    def post(self, view, path, data):
+        request = self.factory.post(path, data, format='json')
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        assert response.status_code == 201, response.data
+
+    def measure(self, rows, bulk, repeat):
+        """Median milliseconds and query count of registering ``rows`` members; each run is rolled back"""
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            with transaction.atomic():
+                delegation = Delegation.objects.create(
+                    sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY',
+                )
+                items = [
+                    {'delegation_id': str(delegation.id), 'name': f'عضو {number}', 'rank': 'عقيد',
+                     'equivalent_job_id': str(self.job.id)}
+                    for number in range(rows)
+                ]
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    if bulk:
+                        self.post(self.bulk_view, '/api/members/bulk/', items)
+                    else:
+                        for item in items:
+                            self.post(self.create_view, '/api/members/', item)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries = len(captured.captured_queries)
+                transaction.set_rollback(True)
+        return statistics.median(timings), queries
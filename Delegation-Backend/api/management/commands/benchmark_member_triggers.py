@@ -0,0 +1,160 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import MainEvent, SubEvent, Delegation, Member
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+# The per-row member triggers replaced by migrations 0011/0012 (database_schema.sql and
+# migration 0008), installed under legacy_* names for timing and parity checks.
+# They do not maintain departed_members.
+ROW_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS trg_member_totals_insert ON member;
+DROP TRIGGER IF EXISTS trg_member_totals_update ON member;
+DROP TRIGGER IF EXISTS trg_member_totals_delete ON member;
+
+CREATE OR REPLACE FUNCTION legacy_update_delegation_member_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR TG_OP = 'DELETE' THEN
+        UPDATE delegation
+        SET current_members = (
+            SELECT COUNT(*) FROM member
+            WHERE delegation_id = COALESCE(NEW.delegation_id, OLD.delegation_id)
+        )
+        WHERE id = COALESCE(NEW.delegation_id, OLD.delegation_id);
+    END IF;
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION legacy_update_delegation_status()
+RETURNS TRIGGER AS $$
+DECLARE
+    total_members INT;
+    departed_members INT;
+    new_status TEXT;
+    delegation_uuid UUID;
+BEGIN
+    delegation_uuid := COALESCE(NEW.delegation_id, OLD.delegation_id);
+    SELECT COUNT(*) INTO total_members FROM member WHERE delegation_id = delegation_uuid;
+    SELECT COUNT(*) INTO departed_members FROM member WHERE delegation_id = delegation_uuid AND status = 'DEPARTED';
+    IF departed_members = 0 THEN
+        new_status := 'NOT_DEPARTED';
+    ELSIF departed_members = total_members AND total_members > 0 THEN
+        new_status := 'FULLY_DEPARTED';
+    ELSE
+        new_status := 'PARTIALLY_DEPARTED';
+    END IF;
+    UPDATE delegation SET status = new_status, current_members = total_members WHERE id = delegation_uuid;
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION legacy_dashboard_counter_member()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.delegation_id IS NOT DISTINCT FROM OLD.delegation_id THEN
+        RETURN NEW;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM dashboard_counter_apply(
+            dashboard_counter_delegation_keys(OLD.delegation_id),
+            d_members => -1,
+            d_not_departed_members => CASE WHEN OLD.status = 'NOT_DEPARTED' THEN -1 ELSE 0 END,
+            d_departed_members => CASE WHEN OLD.status = 'DEPARTED' THEN -1 ELSE 0 END
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM dashboard_counter_apply(
+            dashboard_counter_delegation_keys(NEW.delegation_id),
+            d_members => 1,
+            d_not_departed_members => CASE WHEN NEW.status = 'NOT_DEPARTED' THEN 1 ELSE 0 END,
+            d_departed_members => CASE WHEN NEW.status = 'DEPARTED' THEN 1 ELSE 0 END
+        );
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_update_member_count
+AFTER INSERT OR DELETE ON member
+FOR EACH ROW EXECUTE FUNCTION legacy_update_delegation_member_count();
+
+CREATE TRIGGER trg_update_delegation_status
+AFTER INSERT OR UPDATE OR DELETE ON member
+FOR EACH ROW EXECUTE FUNCTION legacy_update_delegation_status();
+
+CREATE TRIGGER trg_dashboard_counter_member
+AFTER INSERT OR UPDATE OR DELETE ON member
+FOR EACH ROW EXECUTE FUNCTION legacy_dashboard_counter_member();
+"""
+
+
+def use_row_triggers():
+    """Swap in the per-row member triggers; only meant inside a transaction that is rolled back"""
+    with connection.cursor() as cursor:
+        cursor.execute(ROW_TRIGGERS_SQL)
+
+
+def run_statement(operation, delegation, rows):
+    """Run one ``operation`` statement touching ``rows`` members of ``delegation``"""
+    if operation == 'insert':
+        Member.objects.bulk_create([
+            Member(delegation_id=delegation, name=f'عضو {number}') for number in range(rows)
+        ])
+        return
+    with connection.cursor() as cursor:
+        if operation == 'update':
+            cursor.execute("UPDATE member SET status = 'DEPARTED' WHERE delegation_id = %s", [delegation.id])
+        else:
+            cursor.execute('DELETE FROM member WHERE delegation_id = %s', [delegation.id])
+
+
+class Command(BaseCommand):
+    help = ('Time member INSERT/UPDATE/DELETE statements with the per-row member triggers against '
+            'the statement-level ones. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=_int_list, default=[10, 100, 1000],
+                            help='Comma separated rows per statement (default: 10,100,1000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (default: 3)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"rows":>5}  {"statement":<9} {"per-row ms":>11} {"statement ms":>13}')
+        with transaction.atomic():
+            main_event = MainEvent.objects.create(event_name='حدث قياس الأداء')
+            self.sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+            for rows in options['rows']:
+                for operation in ('insert', 'update', 'delete'):
+                    per_row = self.measure(operation, rows, options['repeat'], row_triggers=True)
+                    per_statement = self.measure(operation, rows, options['repeat'], row_triggers=False)
+                    self.stdout.write(f'{rows:>5}  {operation:<9} {per_row:>11.1f} {per_statement:>13.1f}')
+            transaction.set_rollback(True)
+
+    def measure(self, operation, rows, repeat, row_triggers):
+        """Median milliseconds of the statement alone; each run is rolled back"""
+        timings = []
+        for _ in range(repeat):
+            with transaction.atomic():
+                if row_triggers:
+                    use_row_triggers()
+                delegation = Delegation.objects.create(
+                    sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY',
+                )
+                if operation != 'insert':
+                    run_statement('insert', delegation, rows)
+                started = time.perf_counter()
+                run_statement(operation, delegation, rows)
+                timings.append((time.perf_counter() - started) * 1000)
+                transaction.set_rollback(True)
+        return statistics.median(timings)
@@ -0,0 +1,107 @@
+import datetime
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from api.models import MainEvent, SubEvent, AirPort, AirLine
+
+User = get_user_model()
+
+# Without the (airport_id, arrive_at) / (airport_id, depart_at) indexes of migration 0016
+DROP_INDEXES_SQL = """
+DROP INDEX delegation_airport_arrive_idx;
+DROP INDEX check_out_airport_depart_idx;
+"""
+
+
+def _timed(func, repeat):
+    """Median milliseconds of ``repeat`` calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = ('Benchmark /api/schedule/ over many events: a 4-hour window at one airport and across all airports, '
+            'with and without the airport/timestamp indexes. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delegations', type=int, default=50_000, help='Delegations to seed (default: 50000)')
+        parser.add_argument('--airports', type=int, default=10, help='Airports (default: 10)')
+        parser.add_argument('--days', type=int, default=60, help='Days the arrivals are spread over (default: 60)')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement (default: 5)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            airport_id, day = self.seed(options['delegations'], options['airports'], options['days'])
+            self.stdout.write(f'seeded {options["delegations"]} delegations in {time.perf_counter() - started:.1f} s')
+            self.repeat = options['repeat']
+            self.client = APIClient()
+            self.client.force_authenticate(User.objects.create(
+                username=f'benchmark{time.time_ns()}', full_name='قياس الأداء', role='SUPER_ADMIN',
+            ))
+
+            window = {'from': f'{day}T14:00', 'to': f'{day}T18:00'}
+            scenarios = [
+                ('one airport, 4 hours', {**window, 'airport_id': airport_id}),
+                ('all airports, 4 hours', window),
+                ('all airports, one day', {'from': str(day)}),
+            ]
+            indexed = [self.request(params) for _, params in scenarios]
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(DROP_INDEXES_SQL)
+                unindexed = [self.request(params) for _, params in scenarios]
+                transaction.set_rollback(True)
+
+            self.stdout.write(f'{"window":<24} {"slots":>6} {"indexed ms":>11} {"no index ms":>12}')
+            for (label, _), (slots, indexed_ms), (_, unindexed_ms) in zip(scenarios, indexed, unindexed):
+                self.stdout.write(f'{label:<24} {slots:>6} {indexed_ms:>11.1f} {unindexed_ms:>12.1f}')
+            transaction.set_rollback(True)
+
+    def seed(self, delegations, airports, days):
+        """Delegations arriving on the hour and half hour over ``days`` days, a check-out for every other one"""
+        main_event = MainEvent.objects.create(event_name='حدث قياس المواعيد')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        airport_ids = [AirPort.objects.create(name=f'مطار قياس {n}').id for n in range(airports)]
+        airline = AirLine.objects.create(name='شركة قياس')
+        start = datetime.date.today()
+        with connection.cursor() as cursor:
+            # Seed without triggers: the per-row dashboard counter upserts of one transaction slow down with
+            # every row, and nothing here reads counters, audit rows or session members
+            cursor.execute('SET LOCAL session_replication_role = replica')
+            cursor.execute(
+                "INSERT INTO delegation (id, sub_event_id, delegation_leader_name, type, airport_id, airline_id, "
+                "flight_number, arrive_date, arrive_time, member_count, current_members, departed_members, "
+                "status, created_at, updated_at) "
+                "SELECT gen_random_uuid(), %s, 'رئيس الوفد ' || n, 'MILITARY', (%s::uuid[])[1 + n %% %s], %s, "
+                "'FL ' || (n %% 400), %s::date + (n %% %s), make_time((n / %s) %% 24, 30 * ((n / %s) %% 2), 0), "
+                "n %% 40, n %% 40, 0, 'NOT_DEPARTED', now(), now() "
+                "FROM generate_series(1, %s) AS n",
+                [sub_event.id, airport_ids, airports, airline.id, start, days, days, days * 24, delegations],
+            )
+            cursor.execute(
+                "INSERT INTO check_out (id, delegation_id, airport_id, airline_id, flight_number, checkout_date, "
+                "checkout_time, members, created_at, updated_at) "
+                "SELECT gen_random_uuid(), id, airport_id, airline_id, flight_number, arrive_date + 5, arrive_time, "
+                "'[]', now(), now() "
+                "FROM delegation WHERE sub_event_id = %s AND random() < 0.5",
+                [sub_event.id],
+            )
+            cursor.execute('SET LOCAL session_replication_role = origin')
+            cursor.execute('ANALYZE delegation')
+            cursor.execute('ANALYZE check_out')
+        return str(airport_ids[0]), start + datetime.timedelta(days=days // 2)
+
+    def request(self, params):
+        response = self.client.get('/api/schedule/', params)
+        assert response.status_code == 200, response.data
+        return len(response.data['slots']), _timed(lambda: self.client.get('/api/schedule/', params), self.repeat)
@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import MainEvent, SubEvent
+from api.search import top_hits, trigram_available
+
+# Spelling variants a search has to fold together
+FIRST_NAMES = ['أحمد', 'احمد', 'محمد', 'مُحمّد', 'إبراهيم', 'ابراهيم', 'مصطفى', 'مصطفي', 'علي', 'عمر',
+               'خالد', 'يوسف', 'حسن', 'حسين', 'عبدالله', 'سامي', 'سامى', 'طارق', 'وليد', 'هشام']
+LAST_NAMES = ['الشريف', 'العطار', 'المصري', 'الحسيني', 'عبدالرحمن', 'الزهراء', 'فاطمة', 'الكعبي',
+              'النعيمي', 'القحطاني', 'الهاشمي', 'الأنصاري', 'البلوشي', 'الدوسري', 'المنصوري', 'الرميثي']
+QUERIES = ['احمد', 'ابراهيم الشريف', 'مصطفي', 'الانصاري', 'عبدالله الكعبي', 'فاطمه', 'سامي']
+
+
+class Command(BaseCommand):
+    help = ('Time /api/search/ queries over a seeded member table (200k members by default). '
+            'Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=200_000, help='Members to seed (default: 200000)')
+        parser.add_argument('--delegations', type=int, default=2_000, help='Delegations to seed (default: 2000)')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query (default: 5)')
+        parser.add_argument('--limit', type=int, default=10, help='Hits per query (default: 10)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'pg_trgm installed: {trigram_available()}')
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed(options['members'], options['delegations'])
+            self.stdout.write(f'seeded {options["members"]} members in {time.perf_counter() - started:.1f} s')
+            self.stdout.write(f'{"query":<18} {"median ms":>10} {"max ms":>8} {"hits":>5}')
+            for query in QUERIES:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    hits = top_hits(query, limit=options['limit'])
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(f'{query:<18} {statistics.median(timings):>10.1f} {max(timings):>8.1f} {len(hits):>5}')
+            transaction.set_rollback(True)
+
+    def seed(self, members, delegations):
+        main_event = MainEvent.objects.create(event_name='حدث قياس الأداء')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO delegation (id, sub_event_id, delegation_leader_name, receiver_name, type, status, "
+                "member_count, current_members, departed_members, created_at, updated_at) "
+                "SELECT gen_random_uuid(), %s, (%s::text[])[1 + n %% %s] || ' ' || (%s::text[])[1 + n %% %s], "
+                "(%s::text[])[1 + (n * 7) %% %s], 'MILITARY', 'NOT_DEPARTED', 0, 0, 0, now(), now() "
+                "FROM generate_series(1, %s) AS n",
+                [sub_event.id, FIRST_NAMES, len(FIRST_NAMES), LAST_NAMES, len(LAST_NAMES),
+                 FIRST_NAMES, len(FIRST_NAMES), delegations],
+            )
+            # Three-part names: first, father and family, with a number so names are not all alike
+            cursor.execute(
+                "INSERT INTO member (id, delegation_id, name, rank, status, created_at, updated_at) "
+                "SELECT gen_random_uuid(), d.ids[1 + n %% cardinality(d.ids)], "
+                "(%s::text[])[1 + n %% %s] || ' ' || (%s::text[])[1 + (n / 7) %% %s] || ' ' "
+                "|| (%s::text[])[1 + (n / 3) %% %s] || ' ' || n, 'عقيد', 'NOT_DEPARTED', now(), now() "
+                "FROM generate_series(1, %s) AS n, "
+                "(SELECT array_agg(id) AS ids FROM delegation WHERE sub_event_id = %s) AS d",
+                [FIRST_NAMES, len(FIRST_NAMES), FIRST_NAMES, len(FIRST_NAMES), LAST_NAMES, len(LAST_NAMES),
+                 members, sub_event.id],
+            )
+            cursor.execute('ANALYZE member')
+            cursor.execute('ANALYZE delegation')
@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from accounts.authentication import CachedTokenAuthentication, cache_key
+from api.views import DashboardViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Queries and requests per second of GET /api/dashboard/stats/ with DRF TokenAuthentication '
+            'and with CachedTokenAuthentication. Runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each measurement (default: 3)')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        with transaction.atomic():
+            user = User.objects.create(username=f'benchmark-{time.time_ns()}', full_name='قياس', role='ADMIN')
+            token = Token.objects.create(user=user)
+
+            def request(view):
+                response = view(factory.get('/api/dashboard/stats/', HTTP_AUTHORIZATION=f'Token {token.key}'))
+                response.render()
+                assert response.status_code == 200, response.status_code
+
+            if not settings.AUTH_TOKEN_CACHE_TTL:
+                self.stdout.write('AUTH_TOKEN_CACHE_TTL is 0 (no shared cache): both read the token from the database')
+            self.stdout.write(f'{"authentication":<28} {"queries":>8} {"req/s":>8}')
+            for authentication in (TokenAuthentication, CachedTokenAuthentication):
+                view = DashboardViewSet.as_view({'get': 'stats'}, authentication_classes=[authentication])
+                request(view)  # warms the token cache
+                with CaptureQueriesContext(connection) as captured:
+                    request(view)
+                count = 0
+                started = time.perf_counter()
+                while time.perf_counter() - started < options['seconds']:
+                    request(view)
+                    count += 1
+                rate = count / (time.perf_counter() - started)
+                self.stdout.write(f'{authentication.__name__:<28} {len(captured.captured_queries):>8} {rate:>8.0f}')
+            cache.delete(cache_key(token.key))
+            transaction.set_rollback(True)
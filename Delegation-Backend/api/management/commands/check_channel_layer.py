@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.channel_layer import HEALTH_TIMEOUT, channel_layer_health
+
+
+class Command(BaseCommand):
+    help = 'Check the configured channel layer with one send/receive round trip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=float, default=HEALTH_TIMEOUT,
+                            help=f'Seconds to wait for the message (default: {HEALTH_TIMEOUT})')
+
+    def handle(self, *args, **options):
+        health = channel_layer_health(timeout=options['timeout'])
+        if not health['ok']:
+            raise CommandError(f'{health["backend"]}: {health["error"]}')
+        self.stdout.write(self.style.SUCCESS(f'{health["backend"]}: ok ({health["latency_ms"]} ms)'))
@@ -0,0 +1,109 @@
+import asyncio
+import random
+import time
+import uuid
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from api.broadcast import UPDATES_GROUP, STRUCTURE_GROUP, build_frames, topic_group
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+async def run_fanout(subscribers, topics, events_per_frame, frames, scoped, seed=0):
+    """
+    Push ``frames`` broadcast windows through an in-memory channel layer.
+
+    Every window holds ``events_per_frame`` member changes spread over
+    ``topics`` concurrent sub events. Unscoped sockets sit in the global group;
+    scoped sockets are spread evenly over the sub event topics. Returns the
+    send time and what the sockets received.
+    """
+    rng = random.Random(seed)
+    layer = InMemoryChannelLayer(capacity=frames * (topics + 2) + 10)
+    main_event_id = str(uuid.uuid4())
+    sub_event_ids = [str(uuid.uuid4()) for _ in range(topics)]
+
+    channels = []
+    for index in range(subscribers):
+        channel = await layer.new_channel()
+        channels.append(channel)
+        if scoped:
+            await layer.group_add(topic_group('sub_event', sub_event_ids[index % topics]), channel)
+            await layer.group_add(STRUCTURE_GROUP, channel)
+        else:
+            await layer.group_add(UPDATES_GROUP, channel)
+
+    send_seconds = 0.0
+    group_sends = 0
+    for frame_id in range(frames):
+        events = []
+        event_topics = []
+        for _ in range(events_per_frame):
+            sub_event_id = rng.choice(sub_event_ids)
+            events.append({'model': 'Member', 'action': 'updated', 'id': str(uuid.uuid4()), 'data': None})
+            event_topics.append([
+                ('delegation', str(uuid.uuid4())),
+                ('sub_event', sub_event_id),
+                ('main_event', main_event_id),
+            ])
+        started = time.perf_counter()
+        for group, group_events in build_frames(events, event_topics).items():
+            await layer.group_send(group, {
+                'type': 'batch_update',
+                'frame_id': frame_id,
+                'events': group_events,
+                'counters': None,
+            })
+            group_sends += 1
+        send_seconds += time.perf_counter() - started
+
+    messages = 0
+    events_received = 0
+    for channel in channels:
+        queue = layer.channels.get(channel)
+        for _ in range(queue.qsize() if queue else 0):
+            message = await layer.receive(channel)
+            messages += 1
+            events_received += len(message['events'])
+
+    return {
+        'send_ms': send_seconds * 1000,
+        'group_sends': group_sends,
+        'messages': messages,
+        'events_per_socket': events_received / subscribers if subscribers else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measure WebSocket fan-out cost against subscriber count, global vs topic-scoped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=_int_list, default=[10, 100, 500, 1000],
+                            help='Comma separated subscriber counts (default: 10,100,500,1000)')
+        parser.add_argument('--topics', type=int, default=10,
+                            help='Concurrent sub events the subscribers are spread over (default: 10)')
+        parser.add_argument('--events', type=int, default=20, help='Changes per broadcast window (default: 20)')
+        parser.add_argument('--frames', type=int, default=20, help='Broadcast windows to send (default: 20)')
+
+    def handle(self, *args, **options):
+        topics = max(options['topics'], 1)
+        self.stdout.write(
+            f'{options["frames"]} windows x {options["events"]} changes over {topics} sub events'
+        )
+        self.stdout.write(
+            f'{"subscribers":>11} {"mode":>7} {"send ms":>9} {"group sends":>11} '
+            f'{"messages":>9} {"events/socket":>13}'
+        )
+        for subscribers in options['subscribers']:
+            for scoped in (False, True):
+                result = asyncio.run(run_fanout(
+                    subscribers, topics, options['events'], options['frames'], scoped,
+                ))
+                self.stdout.write(
+                    f'{subscribers:>11} {"topic" if scoped else "global":>7} {result["send_ms"]:>9.1f} '
+                    f'{result["group_sends"]:>11} {result["messages"]:>9} {result["events_per_socket"]:>13.1f}'
+                )
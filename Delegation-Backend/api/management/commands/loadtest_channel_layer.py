@@ -0,0 +1,159 @@
+import asyncio
+import copy
+import multiprocessing
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from api.broadcast import UPDATES_GROUP
+
+
+def _int_list(value):
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def start_fake_redis():
+    """Start an in-process fakeredis TCP server; returns ``(url, server)``"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        raise CommandError('fakeredis[lua] is not installed; pass --redis-url to use a real Redis')
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = TcpFakeServer(('127.0.0.1', port), server_type='redis')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'redis://127.0.0.1:{port}/0', server
+
+
+def redis_layer(url, prefix):
+    """The Redis channel layer of settings (pool, expiry, capacity) on ``url``, under its own ``prefix``"""
+    layer = copy.deepcopy(settings.CHANNEL_REDIS_LAYER)
+    layer['CONFIG']['hosts'][0]['address'] = url
+    layer['CONFIG']['prefix'] = prefix
+    return import_string(layer['BACKEND'])(**layer['CONFIG'])
+
+
+async def _worker_main(url, prefix, index, workers, sockets, frames, ready, start):
+    expected = frames * workers
+    layer = redis_layer(url, prefix)
+    channels = [await layer.new_channel() for _ in range(sockets)]
+    for channel in channels:
+        await layer.group_add(UPDATES_GROUP, channel)
+
+    # Every worker's sockets must be in the group before anyone publishes
+    ready.put(index)
+    await asyncio.get_running_loop().run_in_executor(None, start.wait)
+    started = time.perf_counter()
+
+    async def publish():
+        for seq in range(frames):
+            await layer.group_send(UPDATES_GROUP, {'type': 'batch_update', 'worker': index, 'seq': seq})
+
+    async def consume(channel):
+        origins = set()
+        received = 0
+        while received < expected:
+            message = await layer.receive(channel)
+            origins.add(message['worker'])
+            received += 1
+        return received, origins
+
+    results = await asyncio.wait_for(
+        asyncio.gather(publish(), *[consume(channel) for channel in channels]), timeout=120,
+    )
+    elapsed = time.perf_counter() - started
+    # close_pools, not flush: flush deletes every key under the prefix, other workers' included
+    await layer.close_pools()
+    received = sum(count for count, _ in results[1:])
+    cross_worker = all(len(origins) == workers for _, origins in results[1:])
+    return {'received': received, 'cross_worker': cross_worker, 'seconds': elapsed}
+
+
+def _worker(url, prefix, index, workers, sockets, frames, ready, start, results):
+    try:
+        results.put((index, asyncio.run(_worker_main(url, prefix, index, workers, sockets, frames, ready, start))))
+    except Exception as exc:
+        results.put((index, {'error': repr(exc)}))
+
+
+def run_workers(url, workers, sockets, frames):
+    """
+    Run ``workers`` processes on one Redis channel layer.
+
+    Each worker hosts ``sockets`` channels in the ``updates`` group and
+    publishes ``frames`` group messages, so every channel must receive the
+    frames of every worker. Returns delivery and throughput totals.
+    """
+    context = multiprocessing.get_context('fork')
+    ready = context.Queue()
+    start = context.Event()
+    results = context.Queue()
+    prefix = f'loadtest{time.time_ns()}'
+    processes = [
+        context.Process(target=_worker, args=(url, prefix, index, workers, sockets, frames, ready, start, results))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=60)
+    start.set()
+    outcome = dict(results.get(timeout=180) for _ in processes)
+    for process in processes:
+        process.join()
+
+    errors = [result['error'] for result in outcome.values() if 'error' in result]
+    if errors:
+        raise CommandError('; '.join(errors))
+    received = sum(result['received'] for result in outcome.values())
+    seconds = max(result['seconds'] for result in outcome.values())
+    return {
+        'workers': workers,
+        'sent': workers * frames,
+        'received': received,
+        'expected': workers * sockets * workers * frames,
+        'cross_worker': all(result['cross_worker'] for result in outcome.values()),
+        'seconds': seconds,
+        'throughput': received / seconds if seconds else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Cross-worker delivery and throughput of the Redis channel layer at several worker counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--redis-url', help='Redis to test against (default: an in-process fakeredis server)')
+        parser.add_argument('--workers', type=_int_list, default=[1, 2, 4],
+                            help='Comma separated worker process counts (default: 1,2,4)')
+        parser.add_argument('--sockets', type=int, default=5, help='Channels per worker (default: 5)')
+        parser.add_argument('--frames', type=int, default=50, help='Group messages sent per worker (default: 50)')
+
+    def handle(self, *args, **options):
+        url = options['redis_url']
+        server = None
+        if not url:
+            url, server = start_fake_redis()
+            self.stdout.write(f'Using fakeredis at {url}')
+        try:
+            self.stdout.write(
+                f'{"workers":>7} {"sent":>6} {"received":>9} {"expected":>9} '
+                f'{"cross-worker":>12} {"seconds":>8} {"msgs/s":>9}'
+            )
+            for workers in options['workers']:
+                result = run_workers(url, workers, options['sockets'], options['frames'])
+                self.stdout.write(
+                    f'{result["workers"]:>7} {result["sent"]:>6} {result["received"]:>9} {result["expected"]:>9} '
+                    f'{"yes" if result["cross_worker"] else "NO":>12} {result["seconds"]:>8.2f} '
+                    f'{result["throughput"]:>9.0f}'
+                )
+                if result['received'] != result['expected'] or not result['cross_worker']:
+                    raise CommandError(f'{workers} worker(s): messages were lost between workers')
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
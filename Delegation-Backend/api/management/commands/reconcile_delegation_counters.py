@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import counters
+
+
+class Command(BaseCommand):
+    help = ("Recompute every delegation's current_members, departed_members and status from its "
+            'members in one statement, or report drift with --check')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare stored totals with the member table, do not rewrite them',
+        )
+
+    def handle(self, *args, **options):
+        drift = counters.delegation_drift()
+        for delegation_id, field, stored, live in drift:
+            self.stdout.write(f'{delegation_id} {field}: stored={stored} live={live}')
+
+        if options['check']:
+            if drift:
+                raise CommandError(f'{len(drift)} delegation value(s) drifted')
+            self.stdout.write(self.style.SUCCESS('Delegation totals match live data'))
+            return
+
+        fixed = counters.reconcile_delegations()
+        self.stdout.write(self.style.SUCCESS(f'Delegation totals reconciled ({fixed} delegation(s) fixed)'))
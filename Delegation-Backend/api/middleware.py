@@ -1,9 +1,10 @@
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from django.contrib.sessions.models import Session
+from django.contrib.auth import get_user_model, login
 import re
 
+from accounts.models import AdminAccessToken
+
 User = get_user_model()
 
 
@@ -26,32 +27,19 @@ class CSRFExemptMiddleware(MiddlewareMixin):
 class AdminSessionMiddleware(MiddlewareMixin):
     """
     Middleware to handle admin session authentication from frontend
+
+    ``?admin_token=`` is a one-time token from ``AuthViewSet.create_admin_session``
+    (``AdminAccessToken``); it is consumed here and replaced by a normal admin session.
     """
     
     def process_request(self, request):
         # Check if this is an admin request with admin_token parameter
         if request.path.startswith('/admin/') and request.GET.get('admin_token'):
-            admin_token = request.GET.get('admin_token')
-            
-            try:
-                # Find session with matching admin token
-                sessions = Session.objects.all()
-                for session in sessions:
-                    session_data = session.get_decoded()
-                    stored_token = session_data.get('admin_access_token')
-                    user_id = session_data.get('admin_user_id')
-                    
-                    if stored_token == admin_token and user_id:
-                        # Get user and authenticate
-                        user = User.objects.get(id=user_id)
-                        if user.is_active and user.is_super_admin():
-                            # Set the user in the request
-                            request.user = user
-                            request._admin_session_authenticated = True
-                            break
-                        
-            except (Session.DoesNotExist, User.DoesNotExist, KeyError):
-                pass
+            user = AdminAccessToken.consume(request.GET['admin_token'])
+            if user is not None and user.is_active and user.is_super_admin():
+                # The token is gone after this request: keep the user logged in through the session
+                login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+                request._admin_session_authenticated = True
         
         return None
 
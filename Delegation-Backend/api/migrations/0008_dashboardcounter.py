@@ -0,0 +1,436 @@
+# Generated by Django 5.2.7 on 2025-10-25 11:02
+
+from django.db import migrations, models
+
+
+COUNTER_FUNCTIONS_SQL = """
+-- دالة لتطبيق فرق (delta) على عدادات لوحة التحكم لمجموعة من النطاقات
+CREATE OR REPLACE FUNCTION dashboard_counter_apply(
+    p_keys TEXT[],
+    d_main_events INT DEFAULT 0,
+    d_sub_events INT DEFAULT 0,
+    d_delegations INT DEFAULT 0,
+    d_military_delegations INT DEFAULT 0,
+    d_civilian_delegations INT DEFAULT 0,
+    d_not_departed_delegations INT DEFAULT 0,
+    d_partially_departed_delegations INT DEFAULT 0,
+    d_fully_departed_delegations INT DEFAULT 0,
+    d_members INT DEFAULT 0,
+    d_not_departed_members INT DEFAULT 0,
+    d_departed_members INT DEFAULT 0,
+    d_check_outs INT DEFAULT 0
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO dashboard_counter AS c (
+        scope_key, main_events, sub_events, delegations,
+        military_delegations, civilian_delegations,
+        not_departed_delegations, partially_departed_delegations, fully_departed_delegations,
+        members, not_departed_members, departed_members, check_outs, updated_at
+    )
+    SELECT k, d_main_events, d_sub_events, d_delegations,
+           d_military_delegations, d_civilian_delegations,
+           d_not_departed_delegations, d_partially_departed_delegations, d_fully_departed_delegations,
+           d_members, d_not_departed_members, d_departed_members, d_check_outs, NOW()
+    FROM unnest(p_keys) AS k
+    WHERE k IS NOT NULL
+    ON CONFLICT (scope_key) DO UPDATE SET
+        main_events = c.main_events + EXCLUDED.main_events,
+        sub_events = c.sub_events + EXCLUDED.sub_events,
+        delegations = c.delegations + EXCLUDED.delegations,
+        military_delegations = c.military_delegations + EXCLUDED.military_delegations,
+        civilian_delegations = c.civilian_delegations + EXCLUDED.civilian_delegations,
+        not_departed_delegations = c.not_departed_delegations + EXCLUDED.not_departed_delegations,
+        partially_departed_delegations = c.partially_departed_delegations + EXCLUDED.partially_departed_delegations,
+        fully_departed_delegations = c.fully_departed_delegations + EXCLUDED.fully_departed_delegations,
+        members = c.members + EXCLUDED.members,
+        not_departed_members = c.not_departed_members + EXCLUDED.not_departed_members,
+        departed_members = c.departed_members + EXCLUDED.departed_members,
+        check_outs = c.check_outs + EXCLUDED.check_outs,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لتحديد نطاقات العدادات (عام، حدث رئيسي، حدث فرعي) لحدث فرعي
+CREATE OR REPLACE FUNCTION dashboard_counter_keys(p_sub_event_id UUID)
+RETURNS TEXT[] AS $$
+DECLARE
+    v_main_event_id UUID;
+BEGIN
+    SELECT main_event_id INTO v_main_event_id FROM sub_event WHERE id = p_sub_event_id;
+    IF NOT FOUND THEN
+        RETURN ARRAY['global'];
+    END IF;
+    RETURN ARRAY['global', 'main_event:' || v_main_event_id::text, 'sub_event:' || p_sub_event_id::text];
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لتحديد نطاقات العدادات لوفد
+CREATE OR REPLACE FUNCTION dashboard_counter_delegation_keys(p_delegation_id UUID)
+RETURNS TEXT[] AS $$
+DECLARE
+    v_sub_event_id UUID;
+BEGIN
+    SELECT sub_event_id INTO v_sub_event_id FROM delegation WHERE id = p_delegation_id;
+    IF NOT FOUND THEN
+        RETURN ARRAY['global'];
+    END IF;
+    RETURN dashboard_counter_keys(v_sub_event_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لتطبيق مساهمة وفد واحد (مع أعضائه وجلسات مغادرته عند النقل) على العدادات
+CREATE OR REPLACE FUNCTION dashboard_counter_delegation_delta(
+    p_keys TEXT[],
+    p_sign INT,
+    p_type TEXT,
+    p_status TEXT,
+    p_members INT DEFAULT 0,
+    p_not_departed_members INT DEFAULT 0,
+    p_departed_members INT DEFAULT 0,
+    p_check_outs INT DEFAULT 0
+)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM dashboard_counter_apply(
+        p_keys,
+        d_delegations => p_sign,
+        d_military_delegations => CASE WHEN p_type = 'MILITARY' THEN p_sign ELSE 0 END,
+        d_civilian_delegations => CASE WHEN p_type = 'CIVILIAN' THEN p_sign ELSE 0 END,
+        d_not_departed_delegations => CASE WHEN p_status = 'NOT_DEPARTED' THEN p_sign ELSE 0 END,
+        d_partially_departed_delegations => CASE WHEN p_status = 'PARTIALLY_DEPARTED' THEN p_sign ELSE 0 END,
+        d_fully_departed_delegations => CASE WHEN p_status = 'FULLY_DEPARTED' THEN p_sign ELSE 0 END,
+        d_members => p_sign * p_members,
+        d_not_departed_members => p_sign * p_not_departed_members,
+        d_departed_members => p_sign * p_departed_members,
+        d_check_outs => p_sign * p_check_outs
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات الأحداث الرئيسية
+CREATE OR REPLACE FUNCTION dashboard_counter_main_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_counter_apply(ARRAY['global', 'main_event:' || NEW.id::text], d_main_events => 1);
+        RETURN NEW;
+    END IF;
+    PERFORM dashboard_counter_apply(ARRAY['global'], d_main_events => -1);
+    DELETE FROM dashboard_counter WHERE scope_key = 'main_event:' || OLD.id::text;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات الأحداث الفرعية (نقل الحدث الفرعي ينقل مجاميعه إلى الحدث الرئيسي الجديد)
+CREATE OR REPLACE FUNCTION dashboard_counter_sub_event()
+RETURNS TRIGGER AS $$
+DECLARE
+    c dashboard_counter;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_counter_apply(dashboard_counter_keys(NEW.id), d_sub_events => 1);
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_counter_apply(ARRAY['global', 'main_event:' || OLD.main_event_id::text], d_sub_events => -1);
+        DELETE FROM dashboard_counter WHERE scope_key = 'sub_event:' || OLD.id::text;
+        RETURN OLD;
+    END IF;
+
+    IF NEW.main_event_id IS DISTINCT FROM OLD.main_event_id THEN
+        SELECT * INTO c FROM dashboard_counter WHERE scope_key = 'sub_event:' || NEW.id::text;
+        IF FOUND THEN
+            PERFORM dashboard_counter_apply(
+                ARRAY['main_event:' || OLD.main_event_id::text],
+                d_sub_events => -c.sub_events,
+                d_delegations => -c.delegations,
+                d_military_delegations => -c.military_delegations,
+                d_civilian_delegations => -c.civilian_delegations,
+                d_not_departed_delegations => -c.not_departed_delegations,
+                d_partially_departed_delegations => -c.partially_departed_delegations,
+                d_fully_departed_delegations => -c.fully_departed_delegations,
+                d_members => -c.members,
+                d_not_departed_members => -c.not_departed_members,
+                d_departed_members => -c.departed_members,
+                d_check_outs => -c.check_outs
+            );
+            PERFORM dashboard_counter_apply(
+                ARRAY['main_event:' || NEW.main_event_id::text],
+                d_sub_events => c.sub_events,
+                d_delegations => c.delegations,
+                d_military_delegations => c.military_delegations,
+                d_civilian_delegations => c.civilian_delegations,
+                d_not_departed_delegations => c.not_departed_delegations,
+                d_partially_departed_delegations => c.partially_departed_delegations,
+                d_fully_departed_delegations => c.fully_departed_delegations,
+                d_members => c.members,
+                d_not_departed_members => c.not_departed_members,
+                d_departed_members => c.departed_members,
+                d_check_outs => c.check_outs
+            );
+        END IF;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات الوفود (النوع والحالة، ونقل الأعضاء والجلسات عند تغيير الحدث الفرعي)
+CREATE OR REPLACE FUNCTION dashboard_counter_delegation()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_members INT := 0;
+    v_not_departed INT := 0;
+    v_departed INT := 0;
+    v_check_outs INT := 0;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_counter_delegation_delta(
+            dashboard_counter_keys(NEW.sub_event_id), 1, NEW.type::text, NEW.status::text
+        );
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_counter_delegation_delta(
+            dashboard_counter_keys(OLD.sub_event_id), -1, OLD.type::text, OLD.status::text
+        );
+        RETURN OLD;
+    END IF;
+
+    IF NEW.type IS NOT DISTINCT FROM OLD.type
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.sub_event_id IS NOT DISTINCT FROM OLD.sub_event_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF NEW.sub_event_id IS DISTINCT FROM OLD.sub_event_id THEN
+        SELECT COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'NOT_DEPARTED'),
+               COUNT(*) FILTER (WHERE status = 'DEPARTED')
+        INTO v_members, v_not_departed, v_departed
+        FROM member WHERE delegation_id = NEW.id;
+        SELECT COUNT(*) INTO v_check_outs FROM check_out WHERE delegation_id = NEW.id;
+    END IF;
+
+    PERFORM dashboard_counter_delegation_delta(
+        dashboard_counter_keys(OLD.sub_event_id), -1, OLD.type::text, OLD.status::text,
+        v_members, v_not_departed, v_departed, v_check_outs
+    );
+    PERFORM dashboard_counter_delegation_delta(
+        dashboard_counter_keys(NEW.sub_event_id), 1, NEW.type::text, NEW.status::text,
+        v_members, v_not_departed, v_departed, v_check_outs
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات الأعضاء (الإجمالي والمغادرين وغير المغادرين)
+CREATE OR REPLACE FUNCTION dashboard_counter_member()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.delegation_id IS NOT DISTINCT FROM OLD.delegation_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM dashboard_counter_apply(
+            dashboard_counter_delegation_keys(OLD.delegation_id),
+            d_members => -1,
+            d_not_departed_members => CASE WHEN OLD.status = 'NOT_DEPARTED' THEN -1 ELSE 0 END,
+            d_departed_members => CASE WHEN OLD.status = 'DEPARTED' THEN -1 ELSE 0 END
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM dashboard_counter_apply(
+            dashboard_counter_delegation_keys(NEW.delegation_id),
+            d_members => 1,
+            d_not_departed_members => CASE WHEN NEW.status = 'NOT_DEPARTED' THEN 1 ELSE 0 END,
+            d_departed_members => CASE WHEN NEW.status = 'DEPARTED' THEN 1 ELSE 0 END
+        );
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات جلسات المغادرة
+CREATE OR REPLACE FUNCTION dashboard_counter_check_out()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.delegation_id IS NOT DISTINCT FROM OLD.delegation_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM dashboard_counter_apply(dashboard_counter_delegation_keys(OLD.delegation_id), d_check_outs => -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM dashboard_counter_apply(dashboard_counter_delegation_keys(NEW.delegation_id), d_check_outs => 1);
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لإعادة بناء جميع العدادات من البيانات الفعلية (استعلام واحد مجمّع)
+CREATE OR REPLACE FUNCTION dashboard_counter_rebuild()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM dashboard_counter;
+
+    INSERT INTO dashboard_counter (
+        scope_key, main_events, sub_events, delegations,
+        military_delegations, civilian_delegations,
+        not_departed_delegations, partially_departed_delegations, fully_departed_delegations,
+        members, not_departed_members, departed_members, check_outs, updated_at
+    )
+    WITH d AS (
+        SELECT sub_event_id,
+               COUNT(*) AS delegations,
+               COUNT(*) FILTER (WHERE type = 'MILITARY') AS military_delegations,
+               COUNT(*) FILTER (WHERE type = 'CIVILIAN') AS civilian_delegations,
+               COUNT(*) FILTER (WHERE status = 'NOT_DEPARTED') AS not_departed_delegations,
+               COUNT(*) FILTER (WHERE status = 'PARTIALLY_DEPARTED') AS partially_departed_delegations,
+               COUNT(*) FILTER (WHERE status = 'FULLY_DEPARTED') AS fully_departed_delegations
+        FROM delegation
+        GROUP BY sub_event_id
+    ), m AS (
+        SELECT dl.sub_event_id,
+               COUNT(*) AS members,
+               COUNT(*) FILTER (WHERE mb.status = 'NOT_DEPARTED') AS not_departed_members,
+               COUNT(*) FILTER (WHERE mb.status = 'DEPARTED') AS departed_members
+        FROM member mb
+        JOIN delegation dl ON dl.id = mb.delegation_id
+        GROUP BY dl.sub_event_id
+    ), c AS (
+        SELECT dl.sub_event_id, COUNT(*) AS check_outs
+        FROM check_out co
+        JOIN delegation dl ON dl.id = co.delegation_id
+        GROUP BY dl.sub_event_id
+    ), per_sub AS (
+        SELECT s.id, s.main_event_id,
+               COALESCE(d.delegations, 0) AS delegations,
+               COALESCE(d.military_delegations, 0) AS military_delegations,
+               COALESCE(d.civilian_delegations, 0) AS civilian_delegations,
+               COALESCE(d.not_departed_delegations, 0) AS not_departed_delegations,
+               COALESCE(d.partially_departed_delegations, 0) AS partially_departed_delegations,
+               COALESCE(d.fully_departed_delegations, 0) AS fully_departed_delegations,
+               COALESCE(m.members, 0) AS members,
+               COALESCE(m.not_departed_members, 0) AS not_departed_members,
+               COALESCE(m.departed_members, 0) AS departed_members,
+               COALESCE(c.check_outs, 0) AS check_outs
+        FROM sub_event s
+        LEFT JOIN d ON d.sub_event_id = s.id
+        LEFT JOIN m ON m.sub_event_id = s.id
+        LEFT JOIN c ON c.sub_event_id = s.id
+    )
+    SELECT 'sub_event:' || p.id::text, 0, 1, p.delegations,
+           p.military_delegations, p.civilian_delegations,
+           p.not_departed_delegations, p.partially_departed_delegations, p.fully_departed_delegations,
+           p.members, p.not_departed_members, p.departed_members, p.check_outs, NOW()
+    FROM per_sub p
+    UNION ALL
+    SELECT 'main_event:' || me.id::text, 1, COUNT(p.id),
+           COALESCE(SUM(p.delegations), 0),
+           COALESCE(SUM(p.military_delegations), 0), COALESCE(SUM(p.civilian_delegations), 0),
+           COALESCE(SUM(p.not_departed_delegations), 0), COALESCE(SUM(p.partially_departed_delegations), 0),
+           COALESCE(SUM(p.fully_departed_delegations), 0),
+           COALESCE(SUM(p.members), 0), COALESCE(SUM(p.not_departed_members), 0),
+           COALESCE(SUM(p.departed_members), 0), COALESCE(SUM(p.check_outs), 0), NOW()
+    FROM main_event me
+    LEFT JOIN per_sub p ON p.main_event_id = me.id
+    GROUP BY me.id
+    UNION ALL
+    SELECT 'global', (SELECT COUNT(*) FROM main_event), COUNT(p.id),
+           COALESCE(SUM(p.delegations), 0),
+           COALESCE(SUM(p.military_delegations), 0), COALESCE(SUM(p.civilian_delegations), 0),
+           COALESCE(SUM(p.not_departed_delegations), 0), COALESCE(SUM(p.partially_departed_delegations), 0),
+           COALESCE(SUM(p.fully_departed_delegations), 0),
+           COALESCE(SUM(p.members), 0), COALESCE(SUM(p.not_departed_members), 0),
+           COALESCE(SUM(p.departed_members), 0), COALESCE(SUM(p.check_outs), 0), NOW()
+    FROM per_sub p;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+COUNTER_TRIGGERS_SQL = """
+CREATE TRIGGER trg_dashboard_counter_main_event
+AFTER INSERT OR DELETE ON main_event
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_main_event();
+
+CREATE TRIGGER trg_dashboard_counter_sub_event
+AFTER INSERT OR UPDATE OR DELETE ON sub_event
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_sub_event();
+
+CREATE TRIGGER trg_dashboard_counter_delegation
+AFTER INSERT OR UPDATE OR DELETE ON delegation
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_delegation();
+
+CREATE TRIGGER trg_dashboard_counter_member
+AFTER INSERT OR UPDATE OR DELETE ON member
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_member();
+
+CREATE TRIGGER trg_dashboard_counter_check_out
+AFTER INSERT OR UPDATE OR DELETE ON check_out
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_check_out();
+"""
+
+DROP_COUNTER_SQL = """
+DROP TRIGGER IF EXISTS trg_dashboard_counter_main_event ON main_event;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_sub_event ON sub_event;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_delegation ON delegation;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_check_out ON check_out;
+DROP FUNCTION IF EXISTS dashboard_counter_rebuild();
+DROP FUNCTION IF EXISTS dashboard_counter_check_out();
+DROP FUNCTION IF EXISTS dashboard_counter_member();
+DROP FUNCTION IF EXISTS dashboard_counter_delegation();
+DROP FUNCTION IF EXISTS dashboard_counter_sub_event();
+DROP FUNCTION IF EXISTS dashboard_counter_main_event();
+DROP FUNCTION IF EXISTS dashboard_counter_delegation_delta(TEXT[], INT, TEXT, TEXT, INT, INT, INT, INT);
+DROP FUNCTION IF EXISTS dashboard_counter_delegation_keys(UUID);
+DROP FUNCTION IF EXISTS dashboard_counter_keys(UUID);
+DROP FUNCTION IF EXISTS dashboard_counter_apply(TEXT[], INT, INT, INT, INT, INT, INT, INT, INT, INT, INT, INT, INT);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_alter_checkout_airline_id_alter_checkout_airport_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('scope_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('main_events', models.IntegerField(default=0)),
+                ('sub_events', models.IntegerField(default=0)),
+                ('delegations', models.IntegerField(default=0)),
+                ('military_delegations', models.IntegerField(default=0)),
+                ('civilian_delegations', models.IntegerField(default=0)),
+                ('not_departed_delegations', models.IntegerField(default=0)),
+                ('partially_departed_delegations', models.IntegerField(default=0)),
+                ('fully_departed_delegations', models.IntegerField(default=0)),
+                ('members', models.IntegerField(default=0)),
+                ('not_departed_members', models.IntegerField(default=0)),
+                ('departed_members', models.IntegerField(default=0)),
+                ('check_outs', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'عداد لوحة التحكم',
+                'verbose_name_plural': 'عدادات لوحة التحكم',
+                'db_table': 'dashboard_counter',
+            },
+        ),
+        migrations.RunSQL(
+            COUNTER_FUNCTIONS_SQL + COUNTER_TRIGGERS_SQL,
+            reverse_sql=DROP_COUNTER_SQL,
+        ),
+        # Backfill counters from existing data
+        migrations.RunSQL("SELECT dashboard_counter_rebuild();", reverse_sql="SELECT 1;"),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_dashboardcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delegation',
+            index=models.Index(fields=['-created_at', '-id'], name='delegation_created_id_idx'),
+        ),
+    ]
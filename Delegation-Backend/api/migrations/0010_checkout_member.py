@@ -0,0 +1,113 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CHECKOUT_MEMBER_SQL = """
+-- معرفات الأعضاء الموجودين فعلاً في مصفوفة JSON لجلسة مغادرة (تتجاهل القيم غير الصالحة)
+CREATE OR REPLACE FUNCTION checkout_member_ids(p_members JSONB)
+RETURNS SETOF UUID AS $$
+    SELECT m.id
+    FROM member m
+    WHERE m.id IN (
+        SELECT CASE WHEN value ~* '^[0-9a-f]{8}-?([0-9a-f]{4}-?){3}[0-9a-f]{12}$' THEN value::uuid END
+        FROM jsonb_array_elements_text(
+            CASE WHEN jsonb_typeof(p_members) = 'array' THEN p_members ELSE '[]'::jsonb END
+        ) AS value
+    );
+$$ LANGUAGE sql STABLE;
+
+-- مزامنة جدول checkout_member مع check_out.members
+CREATE OR REPLACE FUNCTION checkout_member_sync()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        DELETE FROM checkout_member
+        WHERE check_out_id = NEW.id
+        AND member_id NOT IN (SELECT checkout_member_ids(NEW.members));
+    END IF;
+    INSERT INTO checkout_member (check_out_id, member_id)
+    SELECT NEW.id, ids.member_id FROM checkout_member_ids(NEW.members) AS ids(member_id)
+    ON CONFLICT (check_out_id, member_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fires before trg_update_member_status_on_checkout (triggers run in name order)
+CREATE TRIGGER trg_checkout_member_sync
+AFTER INSERT OR UPDATE OF members ON check_out
+FOR EACH ROW EXECUTE FUNCTION checkout_member_sync();
+
+-- دالة لتحديث حالة الأعضاء عند إنشاء جلسة مغادرة (عبر checkout_member)
+CREATE OR REPLACE FUNCTION update_member_status_on_checkout()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+        UPDATE member m
+        SET status = 'DEPARTED',
+            departure_date = NEW.checkout_date
+        FROM checkout_member cm
+        WHERE cm.check_out_id = NEW.id
+        AND m.id = cm.member_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+BACKFILL_SQL = """
+INSERT INTO checkout_member (check_out_id, member_id)
+SELECT co.id, ids.member_id
+FROM check_out co
+CROSS JOIN LATERAL checkout_member_ids(co.members) AS ids(member_id)
+ON CONFLICT (check_out_id, member_id) DO NOTHING;
+"""
+
+DROP_CHECKOUT_MEMBER_SQL = """
+DROP TRIGGER IF EXISTS trg_checkout_member_sync ON check_out;
+DROP FUNCTION IF EXISTS checkout_member_sync();
+DROP FUNCTION IF EXISTS checkout_member_ids(JSONB);
+
+CREATE OR REPLACE FUNCTION update_member_status_on_checkout()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+        UPDATE member 
+        SET status = 'DEPARTED', 
+            departure_date = NEW.checkout_date
+        WHERE id = ANY(
+            SELECT jsonb_array_elements_text(NEW.members)::uuid
+        );
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_delegation_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckOutMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_out_id', models.ForeignKey(db_column='check_out_id', on_delete=django.db.models.deletion.CASCADE, related_name='member_links', to='api.checkout')),
+                ('member_id', models.ForeignKey(db_column='member_id', on_delete=django.db.models.deletion.CASCADE, related_name='check_out_links', to='api.member')),
+            ],
+            options={
+                'verbose_name': 'عضو جلسة المغادرة',
+                'verbose_name_plural': 'أعضاء جلسات المغادرة',
+                'db_table': 'checkout_member',
+                'constraints': [models.UniqueConstraint(fields=('check_out_id', 'member_id'), name='checkout_member_unique')],
+            },
+        ),
+        migrations.RunSQL(CHECKOUT_MEMBER_SQL, reverse_sql=DROP_CHECKOUT_MEMBER_SQL),
+        # Backfill from the existing JSON arrays
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql="SELECT 1;"),
+    ]
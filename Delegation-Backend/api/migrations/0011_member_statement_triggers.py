@@ -0,0 +1,216 @@
+from django.db import migrations
+
+
+MEMBER_TRIGGERS_SQL = """
+-- إعادة حساب عدد الأعضاء وحالة مجموعة من الوفود في استعلام واحد
+CREATE OR REPLACE FUNCTION refresh_delegation_members(p_delegation_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+    UPDATE delegation d
+    SET current_members = agg.total_members,
+        status = agg.new_status
+    FROM (
+        SELECT ids.id,
+               COUNT(m.id) AS total_members,
+               CASE
+                   WHEN COUNT(m.id) FILTER (WHERE m.status = 'DEPARTED') = 0 THEN 'NOT_DEPARTED'
+                   WHEN COUNT(m.id) FILTER (WHERE m.status = 'DEPARTED') = COUNT(m.id) THEN 'FULLY_DEPARTED'
+                   ELSE 'PARTIALLY_DEPARTED'
+               END AS new_status
+        FROM (SELECT DISTINCT unnest(p_delegation_ids) AS id) ids
+        LEFT JOIN member m ON m.delegation_id = ids.id
+        GROUP BY ids.id
+    ) agg
+    WHERE d.id = agg.id
+    AND (d.current_members IS DISTINCT FROM agg.total_members OR d.status IS DISTINCT FROM agg.new_status);
+END;
+$$ LANGUAGE plpgsql;
+
+-- تحديث الوفود المتأثرة مرة واحدة لكل استعلام (جداول الانتقال new_rows / old_rows)
+CREATE OR REPLACE FUNCTION update_delegation_members()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_delegation_members(ARRAY(SELECT DISTINCT delegation_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_delegation_members(ARRAY(SELECT DISTINCT delegation_id FROM old_rows));
+    ELSE
+        PERFORM refresh_delegation_members(ARRAY(
+            SELECT unnest(ARRAY[o.delegation_id, n.delegation_id])
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status
+            OR n.delegation_id IS DISTINCT FROM o.delegation_id
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- تطبيق فروق الأعضاء على العدادات، مجمّعة لكل نطاق (صف واحد لكل نطاق لكل استعلام)
+CREATE OR REPLACE FUNCTION dashboard_counter_member_apply(
+    p_delegation_ids UUID[],
+    p_signs INT[],
+    p_statuses TEXT[]
+)
+RETURNS VOID AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT k.key,
+               SUM(c.members)::INT AS members,
+               SUM(c.not_departed)::INT AS not_departed,
+               SUM(c.departed)::INT AS departed
+        FROM (
+            SELECT delegation_id,
+                   SUM(sign) AS members,
+                   COALESCE(SUM(sign) FILTER (WHERE status = 'NOT_DEPARTED'), 0) AS not_departed,
+                   COALESCE(SUM(sign) FILTER (WHERE status = 'DEPARTED'), 0) AS departed
+            FROM unnest(p_delegation_ids, p_signs, p_statuses) AS u(delegation_id, sign, status)
+            GROUP BY delegation_id
+        ) c
+        CROSS JOIN LATERAL unnest(dashboard_counter_delegation_keys(c.delegation_id)) AS k(key)
+        GROUP BY k.key
+    LOOP
+        IF r.members <> 0 OR r.not_departed <> 0 OR r.departed <> 0 THEN
+            PERFORM dashboard_counter_apply(
+                ARRAY[r.key],
+                d_members => r.members,
+                d_not_departed_members => r.not_departed,
+                d_departed_members => r.departed
+            );
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات الأعضاء (الإجمالي والمغادرين وغير المغادرين) مرة واحدة لكل استعلام
+CREATE OR REPLACE FUNCTION dashboard_counter_member()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids UUID[];
+    v_signs INT[];
+    v_statuses TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(delegation_id), array_agg(1), array_agg(status::text)
+        INTO v_ids, v_signs, v_statuses
+        FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(delegation_id), array_agg(-1), array_agg(status::text)
+        INTO v_ids, v_signs, v_statuses
+        FROM old_rows;
+    ELSE
+        SELECT array_agg(c.delegation_id), array_agg(c.sign), array_agg(c.status)
+        INTO v_ids, v_signs, v_statuses
+        FROM (
+            SELECT o.delegation_id, -1 AS sign, o.status::text AS status
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status OR n.delegation_id IS DISTINCT FROM o.delegation_id
+            UNION ALL
+            SELECT n.delegation_id, 1, n.status::text
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status OR n.delegation_id IS DISTINCT FROM o.delegation_id
+        ) c;
+    END IF;
+    IF v_ids IS NOT NULL THEN
+        PERFORM dashboard_counter_member_apply(v_ids, v_signs, v_statuses);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Per-row triggers from database_schema.sql, when the schema was loaded from it
+DROP TRIGGER IF EXISTS trg_update_member_count ON member;
+DROP TRIGGER IF EXISTS trg_update_delegation_status ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member ON member;
+
+-- A trigger with transition tables can only handle one event, hence three of each
+CREATE TRIGGER trg_update_delegation_members_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_delegation_members();
+
+CREATE TRIGGER trg_update_delegation_members_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_delegation_members();
+
+CREATE TRIGGER trg_update_delegation_members_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_delegation_members();
+
+CREATE TRIGGER trg_dashboard_counter_member_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counter_member();
+
+CREATE TRIGGER trg_dashboard_counter_member_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counter_member();
+
+CREATE TRIGGER trg_dashboard_counter_member_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_counter_member();
+"""
+
+# Back to the per-row dashboard trigger of migration 0008
+DROP_MEMBER_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS trg_update_delegation_members_insert ON member;
+DROP TRIGGER IF EXISTS trg_update_delegation_members_update ON member;
+DROP TRIGGER IF EXISTS trg_update_delegation_members_delete ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member_insert ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member_update ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member_delete ON member;
+DROP FUNCTION IF EXISTS update_delegation_members();
+DROP FUNCTION IF EXISTS refresh_delegation_members(UUID[]);
+DROP FUNCTION IF EXISTS dashboard_counter_member_apply(UUID[], INT[], TEXT[]);
+
+CREATE OR REPLACE FUNCTION dashboard_counter_member()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.delegation_id IS NOT DISTINCT FROM OLD.delegation_id THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM dashboard_counter_apply(
+            dashboard_counter_delegation_keys(OLD.delegation_id),
+            d_members => -1,
+            d_not_departed_members => CASE WHEN OLD.status = 'NOT_DEPARTED' THEN -1 ELSE 0 END,
+            d_departed_members => CASE WHEN OLD.status = 'DEPARTED' THEN -1 ELSE 0 END
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM dashboard_counter_apply(
+            dashboard_counter_delegation_keys(NEW.delegation_id),
+            d_members => 1,
+            d_not_departed_members => CASE WHEN NEW.status = 'NOT_DEPARTED' THEN 1 ELSE 0 END,
+            d_departed_members => CASE WHEN NEW.status = 'DEPARTED' THEN 1 ELSE 0 END
+        );
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_dashboard_counter_member
+AFTER INSERT OR UPDATE OR DELETE ON member
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_member();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_checkout_member'),
+    ]
+
+    operations = [
+        migrations.RunSQL(MEMBER_TRIGGERS_SQL, reverse_sql=DROP_MEMBER_TRIGGERS_SQL),
+        # Bring current_members and status in line with the members already stored
+        migrations.RunSQL(
+            "SELECT refresh_delegation_members(ARRAY(SELECT id FROM delegation));",
+            reverse_sql="SELECT 1;",
+        ),
+    ]
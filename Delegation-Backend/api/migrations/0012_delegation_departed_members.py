@@ -0,0 +1,159 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:01
+
+import importlib
+
+from django.db import migrations, models
+
+
+MEMBER_TOTALS_SQL = """
+-- حالة الوفد من عدد أعضائه وعدد المغادرين منهم
+CREATE OR REPLACE FUNCTION delegation_status_for(p_members INT, p_departed INT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN p_departed = 0 THEN 'NOT_DEPARTED'
+        WHEN p_departed = p_members THEN 'FULLY_DEPARTED'
+        ELSE 'PARTIALLY_DEPARTED'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- تطبيق فروق الأعضاء (+1/-1) على current_members و departed_members وحالة الوفود
+CREATE OR REPLACE FUNCTION delegation_member_apply(
+    p_delegation_ids UUID[],
+    p_signs INT[],
+    p_statuses TEXT[]
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE delegation d
+    SET current_members = d.current_members + c.members,
+        departed_members = d.departed_members + c.departed,
+        status = delegation_status_for(d.current_members + c.members, d.departed_members + c.departed)
+    FROM (
+        SELECT delegation_id,
+               SUM(sign)::INT AS members,
+               COALESCE(SUM(sign) FILTER (WHERE status = 'DEPARTED'), 0)::INT AS departed
+        FROM unnest(p_delegation_ids, p_signs, p_statuses) AS u(delegation_id, sign, status)
+        GROUP BY delegation_id
+    ) c
+    WHERE d.id = c.delegation_id
+    AND (c.members <> 0 OR c.departed <> 0);
+END;
+$$ LANGUAGE plpgsql;
+
+-- فروق الأعضاء لكل استعلام (جداول الانتقال new_rows / old_rows): الوفود ثم عدادات لوحة التحكم
+CREATE OR REPLACE FUNCTION member_totals_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids UUID[];
+    v_signs INT[];
+    v_statuses TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(delegation_id), array_agg(1), array_agg(status::text)
+        INTO v_ids, v_signs, v_statuses
+        FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(delegation_id), array_agg(-1), array_agg(status::text)
+        INTO v_ids, v_signs, v_statuses
+        FROM old_rows;
+    ELSE
+        SELECT array_agg(c.delegation_id), array_agg(c.sign), array_agg(c.status)
+        INTO v_ids, v_signs, v_statuses
+        FROM (
+            SELECT o.delegation_id, -1 AS sign, o.status::text AS status
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status OR n.delegation_id IS DISTINCT FROM o.delegation_id
+            UNION ALL
+            SELECT n.delegation_id, 1, n.status::text
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status OR n.delegation_id IS DISTINCT FROM o.delegation_id
+        ) c;
+    END IF;
+    IF v_ids IS NOT NULL THEN
+        PERFORM delegation_member_apply(v_ids, v_signs, v_statuses);
+        PERFORM dashboard_counter_member_apply(v_ids, v_signs, v_statuses);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- إعادة حساب أعداد وحالة جميع الوفود من جدول member في استعلام واحد؛ يعيد عدد الوفود المصححة
+CREATE OR REPLACE FUNCTION reconcile_delegation_counters()
+RETURNS INT AS $$
+DECLARE
+    v_fixed INT;
+BEGIN
+    UPDATE delegation d
+    SET current_members = live.members,
+        departed_members = live.departed,
+        status = delegation_status_for(live.members, live.departed)
+    FROM (
+        SELECT dl.id,
+               COUNT(m.id)::INT AS members,
+               (COUNT(m.id) FILTER (WHERE m.status = 'DEPARTED'))::INT AS departed
+        FROM delegation dl
+        LEFT JOIN member m ON m.delegation_id = dl.id
+        GROUP BY dl.id
+    ) live
+    WHERE d.id = live.id
+    AND (d.current_members IS DISTINCT FROM live.members
+         OR d.departed_members IS DISTINCT FROM live.departed
+         OR d.status::text IS DISTINCT FROM delegation_status_for(live.members, live.departed));
+    GET DIAGNOSTICS v_fixed = ROW_COUNT;
+    RETURN v_fixed;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_update_delegation_members_insert ON member;
+DROP TRIGGER IF EXISTS trg_update_delegation_members_update ON member;
+DROP TRIGGER IF EXISTS trg_update_delegation_members_delete ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member_insert ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member_update ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_counter_member_delete ON member;
+DROP FUNCTION IF EXISTS update_delegation_members();
+DROP FUNCTION IF EXISTS refresh_delegation_members(UUID[]);
+DROP FUNCTION IF EXISTS dashboard_counter_member();
+
+CREATE TRIGGER trg_member_totals_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION member_totals_changed();
+
+CREATE TRIGGER trg_member_totals_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION member_totals_changed();
+
+CREATE TRIGGER trg_member_totals_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION member_totals_changed();
+"""
+
+# Back to the triggers of migration 0011
+STATEMENT_TRIGGERS_0011_SQL = importlib.import_module('api.migrations.0011_member_statement_triggers').MEMBER_TRIGGERS_SQL
+
+DROP_MEMBER_TOTALS_SQL = """
+DROP TRIGGER IF EXISTS trg_member_totals_insert ON member;
+DROP TRIGGER IF EXISTS trg_member_totals_update ON member;
+DROP TRIGGER IF EXISTS trg_member_totals_delete ON member;
+DROP FUNCTION IF EXISTS member_totals_changed();
+DROP FUNCTION IF EXISTS reconcile_delegation_counters();
+DROP FUNCTION IF EXISTS delegation_member_apply(UUID[], INT[], TEXT[]);
+DROP FUNCTION IF EXISTS delegation_status_for(INT, INT);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_member_statement_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delegation',
+            name='departed_members',
+            field=models.IntegerField(default=0, verbose_name='عدد الأعضاء المغادرين'),
+        ),
+        migrations.RunSQL(MEMBER_TOTALS_SQL, reverse_sql=DROP_MEMBER_TOTALS_SQL + STATEMENT_TRIGGERS_0011_SQL),
+        # Fill departed_members and fix any drift left by the earlier recounts
+        migrations.RunSQL("SELECT reconcile_delegation_counters();", reverse_sql="SELECT 1;"),
+    ]
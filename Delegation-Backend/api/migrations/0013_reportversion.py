@@ -0,0 +1,167 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+REPORT_VERSION_SQL = """
+-- رفع إصدار بيانات التقارير لمجموعة من النطاقات (sub_event:<id> أو lookups)
+CREATE OR REPLACE FUNCTION report_version_bump(p_keys TEXT[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO report_version AS v (scope_key, version)
+    SELECT DISTINCT k, 1 FROM unnest(p_keys) AS k
+    WHERE k IS NOT NULL
+    ON CONFLICT (scope_key) DO UPDATE SET version = v.version + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+-- الأحداث الفرعية المتأثرة بتغيير الوفود، مرة واحدة لكل استعلام
+CREATE OR REPLACE FUNCTION report_version_delegation()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM report_version_bump(ARRAY(SELECT 'sub_event:' || sub_event_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM report_version_bump(ARRAY(SELECT 'sub_event:' || sub_event_id FROM old_rows));
+    ELSE
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || sub_event_id FROM new_rows
+            UNION SELECT 'sub_event:' || sub_event_id FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- الأحداث الفرعية المتأثرة بتغيير الأعضاء أو جلسات المغادرة (عبر الوفد)
+CREATE OR REPLACE FUNCTION report_version_delegation_child()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || d.sub_event_id FROM new_rows r JOIN delegation d ON d.id = r.delegation_id
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || d.sub_event_id FROM old_rows r JOIN delegation d ON d.id = r.delegation_id
+        ));
+    ELSE
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || d.sub_event_id FROM new_rows r JOIN delegation d ON d.id = r.delegation_id
+            UNION SELECT 'sub_event:' || d.sub_event_id FROM old_rows r JOIN delegation d ON d.id = r.delegation_id
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- تعديل أو حذف الجداول المرجعية (الجنسيات، المدن...) يغير كل التقارير
+CREATE OR REPLACE FUNCTION report_version_lookups()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM report_version_bump(ARRAY['lookups']);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A trigger with transition tables can only handle one event, hence three per table
+CREATE TRIGGER trg_report_version_delegation_insert
+AFTER INSERT ON delegation REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation();
+
+CREATE TRIGGER trg_report_version_delegation_update
+AFTER UPDATE ON delegation REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation();
+
+CREATE TRIGGER trg_report_version_delegation_delete
+AFTER DELETE ON delegation REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation();
+
+CREATE TRIGGER trg_report_version_member_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_member_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_member_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_check_out_insert
+AFTER INSERT ON check_out REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_check_out_update
+AFTER UPDATE ON check_out REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_check_out_delete
+AFTER DELETE ON check_out REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_nationality
+AFTER UPDATE OR DELETE ON nationality
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_cities
+AFTER UPDATE OR DELETE ON cities
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_air_line
+AFTER UPDATE OR DELETE ON air_line
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_air_port
+AFTER UPDATE OR DELETE ON air_port
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_equivalent_job
+AFTER UPDATE OR DELETE ON equivalent_job
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+"""
+
+DROP_REPORT_VERSION_SQL = """
+DROP TRIGGER IF EXISTS trg_report_version_delegation_insert ON delegation;
+DROP TRIGGER IF EXISTS trg_report_version_delegation_update ON delegation;
+DROP TRIGGER IF EXISTS trg_report_version_delegation_delete ON delegation;
+DROP TRIGGER IF EXISTS trg_report_version_member_insert ON member;
+DROP TRIGGER IF EXISTS trg_report_version_member_update ON member;
+DROP TRIGGER IF EXISTS trg_report_version_member_delete ON member;
+DROP TRIGGER IF EXISTS trg_report_version_check_out_insert ON check_out;
+DROP TRIGGER IF EXISTS trg_report_version_check_out_update ON check_out;
+DROP TRIGGER IF EXISTS trg_report_version_check_out_delete ON check_out;
+DROP TRIGGER IF EXISTS trg_report_version_nationality ON nationality;
+DROP TRIGGER IF EXISTS trg_report_version_cities ON cities;
+DROP TRIGGER IF EXISTS trg_report_version_air_line ON air_line;
+DROP TRIGGER IF EXISTS trg_report_version_air_port ON air_port;
+DROP TRIGGER IF EXISTS trg_report_version_equivalent_job ON equivalent_job;
+DROP FUNCTION IF EXISTS report_version_lookups();
+DROP FUNCTION IF EXISTS report_version_delegation_child();
+DROP FUNCTION IF EXISTS report_version_delegation();
+DROP FUNCTION IF EXISTS report_version_bump(TEXT[]);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_delegation_departed_members'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportVersion',
+            fields=[
+                ('scope_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'إصدار بيانات التقارير',
+                'verbose_name_plural': 'إصدارات بيانات التقارير',
+                'db_table': 'report_version',
+            },
+        ),
+        migrations.RunSQL(REPORT_VERSION_SQL, reverse_sql=DROP_REPORT_VERSION_SQL),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:23
+
+import api.search
+from django.db import migrations, models
+
+
+ARABIC_NORMALIZE_SQL = r"""
+-- تطبيع النص العربي للبحث: توحيد أشكال الألف والياء والتاء المربوطة والهمزة،
+-- حذف التشكيل والتطويل، تحويل الحروف اللاتينية إلى صغيرة وضغط المسافات
+CREATE OR REPLACE FUNCTION arabic_normalize(p_text TEXT)
+RETURNS TEXT AS $$
+    SELECT btrim(regexp_replace(
+        translate(
+            regexp_replace(lower(p_text), '[\u064B-\u0652\u0670\u0640]', '', 'g'),
+            'أإآٱىیةؤئ', 'ااااييهوي'
+        ),
+        '\s+', ' ', 'g'
+    ))
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+"""
+
+DROP_ARABIC_NORMALIZE_SQL = """
+DROP FUNCTION IF EXISTS arabic_normalize(TEXT);
+"""
+
+# pg_trgm is a contrib module; servers without it keep the columns and search by sequential LIKE scans
+TRIGRAM_INDEXES_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS member_name_search_trgm ON member USING gin (name_search gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS delegation_leader_search_trgm ON delegation USING gin (leader_search gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS delegation_receiver_search_trgm ON delegation USING gin (receiver_search gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS nationality_name_trgm ON nationality USING gin (arabic_normalize(name) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS cities_city_name_trgm ON cities USING gin (arabic_normalize(city_name) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS air_line_name_trgm ON air_line USING gin (arabic_normalize(name) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS air_port_name_trgm ON air_port USING gin (arabic_normalize(name) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS equivalent_job_name_trgm ON equivalent_job USING gin (arabic_normalize(name) gin_trgm_ops);
+    END IF;
+END;
+$$;
+"""
+
+DROP_TRIGRAM_INDEXES_SQL = """
+DROP INDEX IF EXISTS member_name_search_trgm;
+DROP INDEX IF EXISTS delegation_leader_search_trgm;
+DROP INDEX IF EXISTS delegation_receiver_search_trgm;
+DROP INDEX IF EXISTS nationality_name_trgm;
+DROP INDEX IF EXISTS cities_city_name_trgm;
+DROP INDEX IF EXISTS air_line_name_trgm;
+DROP INDEX IF EXISTS air_port_name_trgm;
+DROP INDEX IF EXISTS equivalent_job_name_trgm;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_reportversion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(ARABIC_NORMALIZE_SQL, reverse_sql=DROP_ARABIC_NORMALIZE_SQL),
+        migrations.AddField(
+            model_name='delegation',
+            name='leader_search',
+            field=models.GeneratedField(db_persist=True, expression=api.search.ArabicNormalize('delegation_leader_name'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='delegation',
+            name='receiver_search',
+            field=models.GeneratedField(db_persist=True, expression=api.search.ArabicNormalize('receiver_name'), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='name_search',
+            field=models.GeneratedField(db_persist=True, expression=api.search.ArabicNormalize('name'), output_field=models.TextField()),
+        ),
+        migrations.RunSQL(TRIGRAM_INDEXES_SQL, reverse_sql=DROP_TRIGRAM_INDEXES_SQL),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+CHECKOUT_STATEMENT_SQL = """
+-- تحديث حالة أعضاء جلسات المغادرة مرة واحدة لكل استعلام (جدول الانتقال new_rows)
+-- يعمل بعد مشغل المزامنة checkout_member_sync (مشغلات الصفوف تسبق مشغلات الاستعلام)
+-- الأعضاء الذين غادروا بنفس التاريخ لا يُعاد تحديثهم
+CREATE OR REPLACE FUNCTION update_member_status_on_checkout()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE member m
+    SET status = 'DEPARTED',
+        departure_date = n.checkout_date
+    FROM new_rows n
+    JOIN checkout_member cm ON cm.check_out_id = n.id
+    WHERE m.id = cm.member_id
+    AND (m.status <> 'DEPARTED' OR m.departure_date IS DISTINCT FROM n.checkout_date);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_update_member_status_on_checkout ON check_out;
+
+CREATE TRIGGER trg_update_member_status_on_checkout_insert
+AFTER INSERT ON check_out REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_member_status_on_checkout();
+
+CREATE TRIGGER trg_update_member_status_on_checkout_update
+AFTER UPDATE ON check_out REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_member_status_on_checkout();
+"""
+
+# The row-level function of migration 0010 (the trigger itself was only in database_schema.sql)
+DROP_CHECKOUT_STATEMENT_SQL = """
+DROP TRIGGER IF EXISTS trg_update_member_status_on_checkout_insert ON check_out;
+DROP TRIGGER IF EXISTS trg_update_member_status_on_checkout_update ON check_out;
+
+CREATE OR REPLACE FUNCTION update_member_status_on_checkout()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
+        UPDATE member m
+        SET status = 'DEPARTED',
+            departure_date = NEW.checkout_date
+        FROM checkout_member cm
+        WHERE cm.check_out_id = NEW.id
+        AND m.id = cm.member_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_search_columns'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CHECKOUT_STATEMENT_SQL, reverse_sql=DROP_CHECKOUT_STATEMENT_SQL),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:04
+
+import api.schedule
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_checkout_statement_trigger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # audit_install()
+        ('accounts', '0006_partition_audit_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkout',
+            name='depart_at',
+            field=models.GeneratedField(db_persist=True, expression=api.schedule.LocalDateTime('checkout_date', 'checkout_time', zone='Africa/Cairo'), output_field=models.DateTimeField()),
+        ),
+        migrations.AddField(
+            model_name='delegation',
+            name='arrive_at',
+            field=models.GeneratedField(db_persist=True, expression=api.schedule.LocalDateTime('arrive_date', 'arrive_time', zone='Africa/Cairo'), output_field=models.DateTimeField()),
+        ),
+        migrations.AddIndex(
+            model_name='checkout',
+            index=models.Index(fields=['airport_id', 'depart_at'], name='check_out_airport_depart_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delegation',
+            index=models.Index(fields=['airport_id', 'arrive_at'], name='delegation_airport_arrive_idx'),
+        ),
+        # Regenerate the audit functions so the new generated columns are skipped like the others
+        migrations.RunSQL(
+            "SELECT audit_install('delegation'); SELECT audit_install('check_out');",
+            reverse_sql="SELECT 1;",
+        ),
+    ]
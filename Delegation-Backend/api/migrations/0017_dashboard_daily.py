@@ -0,0 +1,283 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+DAILY_SQL = """
+-- تطبيق فروق الوصول والمغادرة على الملخص اليومي، مجمّعة لكل (حدث فرعي، يوم)
+-- الأحداث الفرعية المحذوفة تُتجاهل (صفوفها تُحذف بمشغل sub_event)
+CREATE OR REPLACE FUNCTION dashboard_daily_apply(
+    p_sub_event_ids UUID[],
+    p_days DATE[],
+    p_arrivals INT[],
+    p_departures INT[]
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO dashboard_daily AS t (main_event_id, sub_event_id, day, arrivals, departures)
+    SELECT s.main_event_id, c.sub_event_id, c.day, c.arrivals, c.departures
+    FROM (
+        SELECT sub_event_id, day, SUM(arrivals)::INT AS arrivals, SUM(departures)::INT AS departures
+        FROM unnest(p_sub_event_ids, p_days, p_arrivals, p_departures) AS u(sub_event_id, day, arrivals, departures)
+        GROUP BY sub_event_id, day
+    ) c
+    JOIN sub_event s ON s.id = c.sub_event_id
+    WHERE c.arrivals <> 0 OR c.departures <> 0
+    ON CONFLICT (sub_event_id, day) DO UPDATE SET
+        arrivals = t.arrivals + EXCLUDED.arrivals,
+        departures = t.departures + EXCLUDED.departures;
+END;
+$$ LANGUAGE plpgsql;
+
+-- مساهمة مجموعة أعضاء (+1/-1): الوصول بتاريخ وصول الوفد، والمغادرة بتاريخ مغادرة العضو
+CREATE OR REPLACE FUNCTION dashboard_daily_member_apply(
+    p_delegation_ids UUID[],
+    p_signs INT[],
+    p_statuses TEXT[],
+    p_departure_dates DATE[]
+)
+RETURNS VOID AS $$
+DECLARE
+    v_sub_event_ids UUID[];
+    v_days DATE[];
+    v_arrivals INT[];
+    v_departures INT[];
+BEGIN
+    SELECT array_agg(x.sub_event_id), array_agg(x.day), array_agg(x.arrivals), array_agg(x.departures)
+    INTO v_sub_event_ids, v_days, v_arrivals, v_departures
+    FROM (
+        SELECT d.sub_event_id, d.arrive_date AS day, u.sign AS arrivals, 0 AS departures
+        FROM unnest(p_delegation_ids, p_signs) AS u(delegation_id, sign)
+        JOIN delegation d ON d.id = u.delegation_id
+        WHERE d.arrive_date IS NOT NULL
+        UNION ALL
+        SELECT d.sub_event_id, u.departure_date, 0, u.sign
+        FROM unnest(p_delegation_ids, p_signs, p_statuses, p_departure_dates)
+             AS u(delegation_id, sign, status, departure_date)
+        JOIN delegation d ON d.id = u.delegation_id
+        WHERE d.arrive_date IS NOT NULL AND u.status = 'DEPARTED' AND u.departure_date IS NOT NULL
+    ) x;
+    IF v_sub_event_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_apply(v_sub_event_ids, v_days, v_arrivals, v_departures);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- مساهمة أعضاء مجموعة وفود بحدث فرعي وتاريخ وصول محددين (عند نقل الوفد أو حذفه)
+CREATE OR REPLACE FUNCTION dashboard_daily_delegation_apply(
+    p_delegation_ids UUID[],
+    p_sub_event_ids UUID[],
+    p_arrive_dates DATE[],
+    p_sign INT
+)
+RETURNS VOID AS $$
+DECLARE
+    v_sub_event_ids UUID[];
+    v_days DATE[];
+    v_arrivals INT[];
+    v_departures INT[];
+BEGIN
+    SELECT array_agg(x.sub_event_id), array_agg(x.day), array_agg(x.arrivals), array_agg(x.departures)
+    INTO v_sub_event_ids, v_days, v_arrivals, v_departures
+    FROM (
+        SELECT u.sub_event_id, u.arrive_date AS day, p_sign * COUNT(*)::INT AS arrivals, 0 AS departures
+        FROM unnest(p_delegation_ids, p_sub_event_ids, p_arrive_dates) AS u(id, sub_event_id, arrive_date)
+        JOIN member m ON m.delegation_id = u.id
+        WHERE u.arrive_date IS NOT NULL
+        GROUP BY u.sub_event_id, u.arrive_date
+        UNION ALL
+        SELECT u.sub_event_id, m.departure_date, 0, p_sign * COUNT(*)::INT
+        FROM unnest(p_delegation_ids, p_sub_event_ids, p_arrive_dates) AS u(id, sub_event_id, arrive_date)
+        JOIN member m ON m.delegation_id = u.id
+        WHERE u.arrive_date IS NOT NULL AND m.status = 'DEPARTED' AND m.departure_date IS NOT NULL
+        GROUP BY u.sub_event_id, m.departure_date
+    ) x;
+    IF v_sub_event_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_apply(v_sub_event_ids, v_days, v_arrivals, v_departures);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- الملخص اليومي من تغييرات الأعضاء، مرة واحدة لكل استعلام (جداول الانتقال new_rows / old_rows)
+-- يشمل المغادرة بجلسات المغادرة (مشغل update_member_status_on_checkout يعدّل member)
+CREATE OR REPLACE FUNCTION dashboard_daily_member()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids UUID[];
+    v_signs INT[];
+    v_statuses TEXT[];
+    v_dates DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(delegation_id), array_agg(1), array_agg(status::text), array_agg(departure_date)
+        INTO v_ids, v_signs, v_statuses, v_dates
+        FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(delegation_id), array_agg(-1), array_agg(status::text), array_agg(departure_date)
+        INTO v_ids, v_signs, v_statuses, v_dates
+        FROM old_rows;
+    ELSE
+        SELECT array_agg(c.delegation_id), array_agg(c.sign), array_agg(c.status), array_agg(c.departure_date)
+        INTO v_ids, v_signs, v_statuses, v_dates
+        FROM (
+            SELECT o.delegation_id, -1 AS sign, o.status::text AS status, o.departure_date
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status
+            OR n.departure_date IS DISTINCT FROM o.departure_date
+            OR n.delegation_id IS DISTINCT FROM o.delegation_id
+            UNION ALL
+            SELECT n.delegation_id, 1, n.status::text, n.departure_date
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status
+            OR n.departure_date IS DISTINCT FROM o.departure_date
+            OR n.delegation_id IS DISTINCT FROM o.delegation_id
+        ) c;
+    END IF;
+    IF v_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_member_apply(v_ids, v_signs, v_statuses, v_dates);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- نقل أعضاء الوفود التي تغير تاريخ وصولها أو حدثها الفرعي، مرة واحدة لكل استعلام
+CREATE OR REPLACE FUNCTION dashboard_daily_delegation_moved()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids UUID[];
+    v_old_sub_event_ids UUID[];
+    v_old_dates DATE[];
+    v_new_sub_event_ids UUID[];
+    v_new_dates DATE[];
+BEGIN
+    SELECT array_agg(n.id), array_agg(o.sub_event_id), array_agg(o.arrive_date),
+           array_agg(n.sub_event_id), array_agg(n.arrive_date)
+    INTO v_ids, v_old_sub_event_ids, v_old_dates, v_new_sub_event_ids, v_new_dates
+    FROM old_rows o JOIN new_rows n ON n.id = o.id
+    WHERE n.arrive_date IS DISTINCT FROM o.arrive_date OR n.sub_event_id IS DISTINCT FROM o.sub_event_id;
+    IF v_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_delegation_apply(v_ids, v_old_sub_event_ids, v_old_dates, -1);
+        PERFORM dashboard_daily_delegation_apply(v_ids, v_new_sub_event_ids, v_new_dates, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- حذف وفد يحذف أعضاءه بالتتابع بعد أن يختفي الوفد، لذلك تُطرح مساهمتهم قبل الحذف
+CREATE OR REPLACE FUNCTION dashboard_daily_delegation_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM dashboard_daily_delegation_apply(ARRAY[OLD.id], ARRAY[OLD.sub_event_id], ARRAY[OLD.arrive_date], -1);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- نقل الحدث الفرعي إلى حدث رئيسي آخر، وحذف صفوفه مع حذفه
+CREATE OR REPLACE FUNCTION dashboard_daily_sub_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM dashboard_daily WHERE sub_event_id = OLD.id;
+        RETURN OLD;
+    END IF;
+    IF NEW.main_event_id IS DISTINCT FROM OLD.main_event_id THEN
+        UPDATE dashboard_daily SET main_event_id = NEW.main_event_id WHERE sub_event_id = NEW.id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- إعادة بناء الملخص اليومي بالكامل من البيانات الفعلية (استعلام واحد مجمّع)
+CREATE OR REPLACE FUNCTION dashboard_daily_rebuild()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM dashboard_daily;
+
+    INSERT INTO dashboard_daily (main_event_id, sub_event_id, day, arrivals, departures)
+    SELECT s.main_event_id, x.sub_event_id, x.day, SUM(x.arrivals)::INT, SUM(x.departures)::INT
+    FROM (
+        SELECT d.sub_event_id, d.arrive_date AS day, 1 AS arrivals, 0 AS departures
+        FROM member m JOIN delegation d ON d.id = m.delegation_id
+        WHERE d.arrive_date IS NOT NULL
+        UNION ALL
+        SELECT d.sub_event_id, m.departure_date, 0, 1
+        FROM member m JOIN delegation d ON d.id = m.delegation_id
+        WHERE d.arrive_date IS NOT NULL AND m.status = 'DEPARTED' AND m.departure_date IS NOT NULL
+    ) x
+    JOIN sub_event s ON s.id = x.sub_event_id
+    GROUP BY s.main_event_id, x.sub_event_id, x.day;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_dashboard_daily_member_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_member();
+
+CREATE TRIGGER trg_dashboard_daily_member_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_member();
+
+CREATE TRIGGER trg_dashboard_daily_member_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_member();
+
+CREATE TRIGGER trg_dashboard_daily_delegation_update
+AFTER UPDATE ON delegation REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_delegation_moved();
+
+CREATE TRIGGER trg_dashboard_daily_delegation_delete
+BEFORE DELETE ON delegation
+FOR EACH ROW EXECUTE FUNCTION dashboard_daily_delegation_deleted();
+
+CREATE TRIGGER trg_dashboard_daily_sub_event
+AFTER UPDATE OR DELETE ON sub_event
+FOR EACH ROW EXECUTE FUNCTION dashboard_daily_sub_event();
+"""
+
+DROP_DAILY_SQL = """
+DROP TRIGGER IF EXISTS trg_dashboard_daily_member_insert ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_daily_member_update ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_daily_member_delete ON member;
+DROP TRIGGER IF EXISTS trg_dashboard_daily_delegation_update ON delegation;
+DROP TRIGGER IF EXISTS trg_dashboard_daily_delegation_delete ON delegation;
+DROP TRIGGER IF EXISTS trg_dashboard_daily_sub_event ON sub_event;
+DROP FUNCTION IF EXISTS dashboard_daily_rebuild();
+DROP FUNCTION IF EXISTS dashboard_daily_sub_event();
+DROP FUNCTION IF EXISTS dashboard_daily_delegation_deleted();
+DROP FUNCTION IF EXISTS dashboard_daily_delegation_moved();
+DROP FUNCTION IF EXISTS dashboard_daily_member();
+DROP FUNCTION IF EXISTS dashboard_daily_delegation_apply(UUID[], UUID[], DATE[], INT);
+DROP FUNCTION IF EXISTS dashboard_daily_member_apply(UUID[], INT[], TEXT[], DATE[]);
+DROP FUNCTION IF EXISTS dashboard_daily_apply(UUID[], DATE[], INT[], INT[]);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_schedule_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('main_event_id', models.UUIDField()),
+                ('sub_event_id', models.UUIDField()),
+                ('day', models.DateField()),
+                ('arrivals', models.IntegerField(default=0)),
+                ('departures', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'ملخص يومي للوحة التحكم',
+                'verbose_name_plural': 'الملخصات اليومية للوحة التحكم',
+                'db_table': 'dashboard_daily',
+                'indexes': [models.Index(fields=['main_event_id', 'day'], name='dashboard_daily_main_event_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sub_event_id', 'day'), name='dashboard_daily_sub_event_day')],
+            },
+        ),
+        migrations.RunSQL(DAILY_SQL, reverse_sql=DROP_DAILY_SQL),
+        # Backfill from existing members
+        migrations.RunSQL("SELECT dashboard_daily_rebuild();", reverse_sql="SELECT 1;"),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+SUB_EVENT_SQL = """
+-- التقرير يطبع اسم الحدث الفرعي: تغيير الاسم يرفع إصدار ذلك الحدث
+CREATE OR REPLACE FUNCTION report_version_sub_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM report_version_bump(ARRAY(
+        SELECT 'sub_event:' || n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.event_name IS DISTINCT FROM o.event_name
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_report_version_sub_event_update
+AFTER UPDATE ON sub_event REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_sub_event();
+"""
+
+DROP_SUB_EVENT_SQL = """
+DROP TRIGGER IF EXISTS trg_report_version_sub_event_update ON sub_event;
+DROP FUNCTION IF EXISTS report_version_sub_event();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_dashboard_daily'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SUB_EVENT_SQL, reverse_sql=DROP_SUB_EVENT_SQL),
+    ]
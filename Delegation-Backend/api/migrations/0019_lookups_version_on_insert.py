@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+TABLES = ('nationality', 'cities', 'air_line', 'air_port', 'equivalent_job')
+
+# /api/lookups/ also lists new rows, so its version (report_version 'lookups') follows inserts too
+INSERT_SQL = '\n'.join(f"""
+DROP TRIGGER IF EXISTS trg_report_version_{table} ON {table};
+CREATE TRIGGER trg_report_version_{table}
+AFTER INSERT OR UPDATE OR DELETE ON {table}
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+""" for table in TABLES)
+
+UPDATE_DELETE_SQL = '\n'.join(f"""
+DROP TRIGGER IF EXISTS trg_report_version_{table} ON {table};
+CREATE TRIGGER trg_report_version_{table}
+AFTER UPDATE OR DELETE ON {table}
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+""" for table in TABLES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_report_version_sub_event'),
+    ]
+
+    operations = [
+        migrations.RunSQL(INSERT_SQL, reverse_sql=UPDATE_DELETE_SQL),
+    ]
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
 import uuid
 
+from .schedule import LocalDateTime
+from .search import ArabicNormalize
+
 User = get_user_model()
 
 
@@ -179,6 +183,8 @@ class Delegation(models.Model):
     delegation_leader_name = models.CharField(max_length=100, verbose_name='اسم رئيس الوفد')
     member_count = models.IntegerField(default=0, verbose_name='عدد الأعضاء المحدد للوفد')
     current_members = models.IntegerField(default=0, verbose_name='العدد الحالي للأعضاء')
+    # current_members و departed_members و status تحدّثها مشغلات قاعدة البيانات على جدول member
+    departed_members = models.IntegerField(default=0, verbose_name='عدد الأعضاء المغادرين')
     flight_number = models.CharField(max_length=20, null=True, blank=True, verbose_name='رقم الرحلة')
     type = models.CharField(max_length=20, choices=DELEGATION_TYPES, verbose_name='نوع الوفد')
     status = models.CharField(max_length=20, choices=DELEGATION_STATUS, default='NOT_DEPARTED', verbose_name='حالة الوفد')
@@ -187,6 +193,11 @@ class Delegation(models.Model):
     receiver_name = models.CharField(max_length=100, null=True, blank=True, verbose_name='اسم المستقبل')
     going_to = models.CharField(max_length=255, null=True, blank=True, verbose_name='الوجهة')
     goods = models.TextField(null=True, blank=True, verbose_name='الشحنات')
+    # نسخ مطبّعة للبحث (انظر search.py)، تحسبها قاعدة البيانات عند كل كتابة
+    leader_search = models.GeneratedField(expression=ArabicNormalize('delegation_leader_name'), output_field=models.TextField(), db_persist=True)
+    receiver_search = models.GeneratedField(expression=ArabicNormalize('receiver_name'), output_field=models.TextField(), db_persist=True)
+    # الوصول كتاريخ ووقت واحد لجدول الوصول والمغادرة (انظر schedule.py)
+    arrive_at = models.GeneratedField(expression=LocalDateTime('arrive_date', 'arrive_time', zone=settings.TIME_ZONE), output_field=models.DateTimeField(), db_persist=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_delegations', db_column='created_by')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='updated_delegations', db_column='updated_by')
@@ -197,18 +208,47 @@ class Delegation(models.Model):
         verbose_name = 'الوفد'
         verbose_name_plural = 'الوفود'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the delegations list
+            models.Index(fields=['-created_at', '-id'], name='delegation_created_id_idx'),
+            # Arrivals at one airport in a time window (/api/schedule/)
+            models.Index(fields=['airport_id', 'arrive_at'], name='delegation_airport_arrive_idx'),
+        ]
     
+    # Written only by the member triggers (migration 0012)
+    TRIGGER_FIELDS = ('current_members', 'departed_members', 'status')
+
     def __str__(self):
         return f"{self.delegation_leader_name} - {self.nationality_id.name if self.nationality_id else 'غير محدد'}"
-    
+
+    def save(self, *args, **kwargs):
+        """
+        UPDATEs never write ``TRIGGER_FIELDS``: a save from an instance read
+        before members changed would overwrite the triggers' totals, which
+        their +1/-1 deltas cannot repair. A full save leaves them out, an
+        explicit ``update_fields`` naming one raises ``ValueError``. The
+        saved instance reloads them.
+        """
+        if self._state.adding or kwargs.get('force_insert'):
+            return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.name not in self.TRIGGER_FIELDS
+            ]
+        else:
+            trigger_fields = sorted(set(update_fields) & set(self.TRIGGER_FIELDS))
+            if trigger_fields:
+                raise ValueError(
+                    f"{', '.join(trigger_fields)} are maintained by the member triggers and cannot be saved"
+                )
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=self.TRIGGER_FIELDS)
+
     def get_members_count(self):
         """Get actual members count"""
         return self.members.count()
-    
-    def update_members_count(self):
-        """Update current members count"""
-        self.current_members = self.get_members_count()
-        self.save(update_fields=['current_members'])
 
 
 class Member(models.Model):
@@ -228,6 +268,8 @@ class Member(models.Model):
     equivalent_job_id = models.ForeignKey(EquivalentJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='members', db_column='equivalent_job_id')
     status = models.CharField(max_length=20, choices=MEMBER_STATUS, default='NOT_DEPARTED', verbose_name='حالة العضو')
     departure_date = models.DateField(null=True, blank=True, verbose_name='تاريخ المغادرة الفعلي للعضو')
+    # نسخة مطبّعة من الاسم للبحث (انظر search.py)
+    name_search = models.GeneratedField(expression=ArabicNormalize('name'), output_field=models.TextField(), db_persist=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_members', db_column='created_by')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='updated_members', db_column='updated_by')
@@ -241,19 +283,6 @@ class Member(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.delegation_id.delegation_leader_name if self.delegation_id else 'غير محدد'}"
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update delegation members count
-        if self.delegation_id:
-            self.delegation_id.update_members_count()
-    
-    def delete(self, *args, **kwargs):
-        delegation = self.delegation_id
-        super().delete(*args, **kwargs)
-        # Update delegation members count
-        if delegation:
-            delegation.update_members_count()
 
 
 class CheckOut(models.Model):
@@ -269,6 +298,8 @@ class CheckOut(models.Model):
     flight_number = models.CharField(max_length=20, null=True, blank=True, verbose_name='رقم رحلة المغادرة')
     checkout_date = models.DateField(null=True, blank=True, verbose_name='تاريخ المغادرة')
     checkout_time = models.TimeField(null=True, blank=True, verbose_name='ساعة المغادرة')
+    # المغادرة كتاريخ ووقت واحد لجدول الوصول والمغادرة (انظر schedule.py)
+    depart_at = models.GeneratedField(expression=LocalDateTime('checkout_date', 'checkout_time', zone=settings.TIME_ZONE), output_field=models.DateTimeField(), db_persist=True)
     depositor_name = models.CharField(max_length=100, null=True, blank=True, verbose_name='اسم المودع')
     goods = models.TextField(null=True, blank=True, verbose_name='الشحنات')
     notes = models.TextField(null=True, blank=True, verbose_name='ملاحظات إضافية')
@@ -283,6 +314,179 @@ class CheckOut(models.Model):
         verbose_name = 'جلسة المغادرة'
         verbose_name_plural = 'جلسات المغادرة'
         ordering = ['-created_at']
+        indexes = [
+            # Departures from one airport in a time window (/api/schedule/)
+            models.Index(fields=['airport_id', 'depart_at'], name='check_out_airport_depart_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.delegation_id.delegation_leader_name if self.delegation_id else 'غير محدد'} - {self.checkout_date}"
\ No newline at end of file
+        return f"{self.delegation_id.delegation_leader_name if self.delegation_id else 'غير محدد'} - {self.checkout_date}"
+
+
+class CheckOutMember(models.Model):
+    """
+    Members of a check out session, one row per (session, member).
+
+    ``CheckOut.members`` stays the API field; this table is kept in sync from
+    it by the ``checkout_member_sync`` trigger (migration ``0010``) so member
+    to session lookups are indexed joins instead of JSON scans.
+    """
+    check_out_id = models.ForeignKey(CheckOut, on_delete=models.CASCADE, related_name='member_links', db_column='check_out_id')
+    member_id = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='check_out_links', db_column='member_id')
+    
+    class Meta:
+        db_table = 'checkout_member'
+        verbose_name = 'عضو جلسة المغادرة'
+        verbose_name_plural = 'أعضاء جلسات المغادرة'
+        # Both foreign keys are indexed, member_id serves member -> sessions lookups
+        constraints = [
+            models.UniqueConstraint(fields=['check_out_id', 'member_id'], name='checkout_member_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.check_out_id_id} - {self.member_id_id}"
+
+
+class DashboardCounter(models.Model):
+    """
+    Materialized dashboard counters maintained by database triggers.
+
+    One row per scope: ``global``, ``main_event:<id>`` and ``sub_event:<id>``.
+    """
+    GLOBAL_KEY = 'global'
+
+    scope_key = models.CharField(max_length=64, primary_key=True)
+    main_events = models.IntegerField(default=0)
+    sub_events = models.IntegerField(default=0)
+    delegations = models.IntegerField(default=0)
+    military_delegations = models.IntegerField(default=0)
+    civilian_delegations = models.IntegerField(default=0)
+    not_departed_delegations = models.IntegerField(default=0)
+    partially_departed_delegations = models.IntegerField(default=0)
+    fully_departed_delegations = models.IntegerField(default=0)
+    members = models.IntegerField(default=0)
+    not_departed_members = models.IntegerField(default=0)
+    departed_members = models.IntegerField(default=0)
+    check_outs = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = (
+        'main_events', 'sub_events', 'delegations',
+        'military_delegations', 'civilian_delegations',
+        'not_departed_delegations', 'partially_departed_delegations', 'fully_departed_delegations',
+        'members', 'not_departed_members', 'departed_members', 'check_outs',
+    )
+
+    class Meta:
+        db_table = 'dashboard_counter'
+        verbose_name = 'عداد لوحة التحكم'
+        verbose_name_plural = 'عدادات لوحة التحكم'
+
+    def __str__(self):
+        return self.scope_key
+
+    @classmethod
+    def scope_key_for(cls, main_event_id=None, sub_event_id=None):
+        """Build the scope key for a sub event, a main event or the global scope"""
+        if sub_event_id:
+            return f'sub_event:{sub_event_id}'
+        if main_event_id:
+            return f'main_event:{main_event_id}'
+        return cls.GLOBAL_KEY
+
+    @classmethod
+    def for_scope(cls, scope_key):
+        """Read one scope in a single primary-key lookup (zeros if nothing was counted yet)"""
+        return cls.objects.filter(pk=scope_key).first() or cls(scope_key=scope_key)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.COUNTER_FIELDS}
+
+    def as_stats(self):
+        """Counters in the shape returned by /api/dashboard/stats/"""
+        return {
+            'event_stats': {
+                'total_main_events': self.main_events,
+                'total_sub_events': self.sub_events,
+                'total_delegations': self.delegations,
+                'total_members': self.members,
+                'total_check_outs': self.check_outs,
+            },
+            'delegation_stats': {
+                'total_delegations': self.delegations,
+                'military_delegations': self.military_delegations,
+                'civilian_delegations': self.civilian_delegations,
+                'not_departed': self.not_departed_delegations,
+                'partially_departed': self.partially_departed_delegations,
+                'fully_departed': self.fully_departed_delegations,
+            },
+            'member_stats': {
+                'total_members': self.members,
+                'not_departed_members': self.not_departed_members,
+                'departed_members': self.departed_members,
+            },
+        }
+
+
+class DashboardDaily(models.Model):
+    """
+    Daily member arrivals and departures per sub event, maintained by database
+    triggers (migration ``0017``) for ``/api/dashboard/timeseries/``.
+
+    A member arrives on its delegation's ``arrive_date`` and departs on its
+    ``departure_date``; members of delegations without an arrival date are
+    not counted. The in-country headcount of a day is the running total of
+    arrivals minus departures (``counters.timeseries``).
+    """
+    main_event_id = models.UUIDField()
+    sub_event_id = models.UUIDField()
+    day = models.DateField()
+    arrivals = models.IntegerField(default=0)
+    departures = models.IntegerField(default=0)
+
+    ROLLUP_FIELDS = ('arrivals', 'departures')
+
+    class Meta:
+        db_table = 'dashboard_daily'
+        verbose_name = 'ملخص يومي للوحة التحكم'
+        verbose_name_plural = 'الملخصات اليومية للوحة التحكم'
+        constraints = [
+            models.UniqueConstraint(fields=['sub_event_id', 'day'], name='dashboard_daily_sub_event_day'),
+        ]
+        indexes = [
+            models.Index(fields=['main_event_id', 'day'], name='dashboard_daily_main_event_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.sub_event_id} {self.day}'
+
+
+class ReportVersion(models.Model):
+    """
+    Data version stamps for the report cache, bumped by database triggers
+    (migration ``0013``) on every write that can change a report.
+
+    One row per scope: ``sub_event:<id>`` (its delegations, members and check
+    out sessions) and ``lookups`` (nationalities, cities, airlines, airports
+    and equivalent jobs). The ``lookups`` version is also the ETag of
+    ``/api/lookups/``.
+    """
+    LOOKUPS_KEY = 'lookups'
+
+    scope_key = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'report_version'
+        verbose_name = 'إصدار بيانات التقارير'
+        verbose_name_plural = 'إصدارات بيانات التقارير'
+
+    def __str__(self):
+        return f'{self.scope_key}@{self.version}'
+
+    @classmethod
+    def stamp(cls, sub_event_id):
+        """``'<sub event version>.<lookups version>'`` read in one query"""
+        sub_event_key = DashboardCounter.scope_key_for(sub_event_id=sub_event_id)
+        versions = dict(cls.objects.filter(pk__in=[sub_event_key, cls.LOOKUPS_KEY]).values_list('scope_key', 'version'))
+        return f'{versions.get(sub_event_key, 0)}.{versions.get(cls.LOOKUPS_KEY, 0)}'
@@ -0,0 +1,159 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are read with ``WHERE (created_at, id) < (cursor)`` on the
+``(created_at, id)`` index instead of ``OFFSET``, so a deep page costs the
+same as the first one and no ``COUNT(*)`` is run. The cursor is opaque to
+clients: they follow the ``next`` link.
+
+Where a total is still wanted, ``estimated_count`` gives the planner's row
+estimate, exact only while it is small.
+"""
+import base64
+import json
+import uuid
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimated_count(queryset, exact_below=1000):
+    """
+    Number of rows of ``queryset`` without counting them all.
+
+    The planner's estimate is used from ``exact_below`` rows up; under it the
+    rows are counted, with the count itself capped at ``exact_below`` rows.
+    """
+    queryset = queryset.order_by()
+    plan = json.loads(queryset.explain(format='json'))
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate >= exact_below:
+        return estimate
+    return queryset[:exact_below].count()
+
+
+def keyset_filter(queryset, field, value, pk):
+    """Rows after ``(value, pk)`` in ``(field, id)`` descending order"""
+    # The redundant bound lets the index scan, and partition pruning, start at the cursor
+    return queryset.filter(**{f'{field}__lte': value}).filter(
+        Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+    )
+
+
+class SizedPageNumberPagination(PageNumberPagination):
+    """The default numbered pages, with ``?page_size`` capped at ``max_page_size``"""
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Newest first on ``(ordering_field, id)``; ``?page_size`` is capped at ``max_page_size``"""
+
+    ordering_field = 'created_at'
+    pk_type = uuid.UUID
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'مؤشر الصفحة غير صالح'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, instance):
+        raw = f'{getattr(instance, self.ordering_field).isoformat()}|{instance.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        return self.parse_cursor(request.query_params.get(self.cursor_query_param))
+
+    def parse_cursor(self, value):
+        """``(position, pk)`` of an encoded cursor, ``None`` for none; a bad cursor is a 404"""
+        if not value:
+            return None
+        try:
+            position, pk = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+            position = parse_datetime(position)
+            pk = self.pk_type(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-id')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = keyset_filter(queryset, self.ordering_field, *cursor)
+
+        # One extra row tells whether there is a next page without counting
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('first', self.get_first_link()),
+            ('page_size', self.page_size_value),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'first': {'type': 'string', 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'results': schema,
+            },
+        }
+
+
+class AuditLogPagination(KeysetPagination):
+    """Newest first on ``(changed_at, id)``, with an ``estimated_total`` of the filtered rows"""
+
+    ordering_field = 'changed_at'
+    pk_type = int
+    page_size = 50
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.estimated_total = estimated_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['estimated_total'] = self.estimated_total
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['estimated_total'] = {'type': 'integer'}
+        return response_schema
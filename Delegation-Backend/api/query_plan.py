@@ -0,0 +1,110 @@
+"""
+Query plans derived from serializer fields.
+
+``plan_queryset`` walks the fields a serializer will actually render (after
+``?fields=`` / ``?expand=`` have been applied) and adds the matching
+``select_related`` paths and ``Prefetch`` objects, so a list page costs a
+fixed number of queries whatever its size:
+
+* a dotted ``source`` such as ``delegation_id.nationality_id.name`` follows
+  foreign keys and becomes ``select_related('delegation_id__nationality_id')``;
+* a nested serializer on a forward foreign key is joined the same way and
+  planned recursively under its prefix;
+* a nested ``many=True`` serializer on a reverse relation becomes a
+  ``Prefetch`` whose queryset is planned from the child serializer. Paths
+  that lead back to the parent are skipped, Django already caches it;
+* a rendered field listed in the serializer's ``field_annotations`` adds
+  those annotations (counts and the like) to the queryset it is read from,
+  the root one or a ``Prefetch`` one. Nested serializers on forward foreign
+  keys are not annotated and fall back to their own queries.
+
+Viewsets call ``plan_queryset(queryset, self.get_serializer())`` at the end
+of ``get_queryset``.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _relation(model, name):
+    """The model field called ``name`` if it is a relation, else ``None``"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _source_path(model, source):
+    """Longest forward foreign key chain in a dotted source, as ``(path, model)``"""
+    path = []
+    for name in source.split('.'):
+        field = _relation(model, name)
+        if field is None or not (field.many_to_one or field.one_to_one):
+            break
+        path.append(name)
+        model = field.related_model
+    return '__'.join(path), model
+
+
+def collect_plan(serializer, model, skip=None):
+    """
+    Return ``(select_related paths, Prefetch objects, annotations)`` for a serializer.
+
+    ``skip`` is a relation name that points back to an already loaded parent.
+    """
+    select = set()
+    prefetch = []
+    annotations = {}
+    field_annotations = getattr(serializer, 'field_annotations', {})
+    for name, field in serializer.fields.items():
+        annotations.update(field_annotations.get(name, {}))
+        if field.write_only or field.source == '*':
+            continue
+        source = field.source
+
+        if isinstance(field, serializers.ListSerializer):
+            relation = _relation(model, source)
+            if relation is None or not (relation.one_to_many or relation.many_to_many):
+                continue
+            child_model = relation.related_model
+            back = relation.field.name if relation.one_to_many else None
+            queryset = _apply(child_model._default_manager.all(), *collect_plan(field.child, child_model, skip=back))
+            prefetch.append(Prefetch(source, queryset=queryset))
+            continue
+
+        path, target = _source_path(model, source)
+        if not path:
+            continue
+        if skip and (path == skip or path.startswith(skip + '__')):
+            continue
+        if isinstance(field, serializers.RelatedField) and '__' not in path:
+            # A bare primary key needs no join (DRF reads the *_id attribute)
+            continue
+        select.add(path)
+        if isinstance(field, serializers.BaseSerializer):
+            nested_select, nested_prefetch, _ = collect_plan(field, target)
+            select.update(f'{path}__{nested}' for nested in nested_select)
+            for item in nested_prefetch:
+                prefetch.append(Prefetch(f'{path}__{item.prefetch_through}', queryset=item.queryset))
+
+    # select_related('a__b') already joins 'a'
+    select = {path for path in select if not any(other.startswith(path + '__') for other in select)}
+    return select, prefetch, annotations
+
+
+def _apply(queryset, select, prefetch, annotations):
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    return queryset
+
+
+def plan_queryset(queryset, serializer):
+    """Add the joins, prefetches and annotations ``serializer`` needs to ``queryset``"""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    return _apply(queryset, *collect_plan(serializer, queryset.model))
@@ -0,0 +1,257 @@
+"""
+Server-side printable reports with an on-disk cache (``/api/reports/...``).
+
+Each report type is read with one SQL query: delegations of a sub event with
+their lookup names joined, plus either their members (and each member's
+latest check-out session) or their check-out sessions aggregated as JSON per
+delegation. The rows are rendered with ``templates/reports/report.html`` into
+a right-to-left HTML page sized for A4 landscape printing. ``file_format=pdf``
+converts it with WeasyPrint (``requirements.txt``), which also needs the
+system's Pango libraries; without them PDF requests answer 501.
+
+Rendered reports are cached on disk under ``REPORT_CACHE_DIR``. The file name
+is a hash of the report type, its filters, the output format, today's date
+(printed in the header) and the sub event's data version stamp
+(``ReportVersion.stamp``, bumped by database triggers on every write that can
+change the report). Printing the same report again only costs the stamp
+query until its data changes; older versions of a report are removed when a
+new one is written.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Delegation, Member, ReportVersion
+
+# type -> (title, rows with members, rows with check-out sessions)
+REPORT_TYPES = {
+    'delegations': ('بيانات الوفود', False, False),
+    'members': ('بيانات أعضاء الوفود', True, False),
+    'combined': ('تقرير شامل', True, False),
+    'departures': ('تقرير المغادرات', False, True),
+}
+
+CONTENT_TYPES = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+}
+
+
+class ReportUnavailable(Exception):
+    """The requested output cannot be produced on this server"""
+
+
+_MEMBERS_SQL = """
+LEFT JOIN LATERAL (
+    SELECT json_agg(json_build_object(
+        'rank', m.rank,
+        'name', m.name,
+        'job', COALESCE(ej.name, m.job_title),
+        'status', m.status,
+        'departure_date', COALESCE(co.checkout_date, m.departure_date),
+        'departure_time', to_char(co.checkout_time, 'HH24MI'),
+        'departure_flight', co.flight_number,
+        'departure_airline', co_al.name,
+        'departure_city', co_c.city_name
+    ) ORDER BY m.created_at) AS items
+    FROM member m
+    LEFT JOIN equivalent_job ej ON ej.id = m.equivalent_job_id
+    LEFT JOIN LATERAL (
+        SELECT c.* FROM checkout_member cm JOIN check_out c ON c.id = cm.check_out_id
+        WHERE cm.member_id = m.id
+        ORDER BY c.created_at DESC
+        LIMIT 1
+    ) co ON TRUE
+    LEFT JOIN air_line co_al ON co_al.id = co.airline_id
+    LEFT JOIN cities co_c ON co_c.id = co.city_id
+    WHERE m.delegation_id = d.id
+) children ON TRUE
+"""
+
+_SESSIONS_SQL = """
+LEFT JOIN LATERAL (
+    SELECT json_agg(json_build_object(
+        'checkout_date', co.checkout_date,
+        'checkout_time', to_char(co.checkout_time, 'HH24MI'),
+        'flight_number', co.flight_number,
+        'airline', co_al.name,
+        'airport', co_ap.name,
+        'city', co_c.city_name,
+        'depositor', co.depositor_name,
+        'goods', co.goods,
+        'members', (
+            SELECT json_agg(json_build_object(
+                'rank', m.rank, 'name', m.name, 'job', COALESCE(ej.name, m.job_title)
+            ) ORDER BY m.created_at)
+            FROM checkout_member cm
+            JOIN member m ON m.id = cm.member_id
+            LEFT JOIN equivalent_job ej ON ej.id = m.equivalent_job_id
+            WHERE cm.check_out_id = co.id
+        )
+    ) ORDER BY co.checkout_date, co.checkout_time) AS items
+    FROM check_out co
+    LEFT JOIN air_line co_al ON co_al.id = co.airline_id
+    LEFT JOIN air_port co_ap ON co_ap.id = co.airport_id
+    LEFT JOIN cities co_c ON co_c.id = co.city_id
+    WHERE co.delegation_id = d.id
+) children ON TRUE
+"""
+
+_REPORT_SQL = """
+SELECT d.id, n.name, d.delegation_leader_name, d.type, d.status,
+       d.current_members, d.departed_members, d.arrive_date, to_char(d.arrive_time, 'HH24MI'),
+       ap.name, al.name, d.flight_number, c.city_name, d.going_to, d.receiver_name, d.goods,
+       {children}
+FROM delegation d
+LEFT JOIN nationality n ON n.id = d.nationality_id
+LEFT JOIN air_port ap ON ap.id = d.airport_id
+LEFT JOIN air_line al ON al.id = d.airline_id
+LEFT JOIN cities c ON c.id = d.city_id
+{join}
+WHERE {where}
+ORDER BY n.name NULLS LAST, d.delegation_leader_name
+"""
+
+_DELEGATION_KEYS = (
+    'id', 'nationality', 'leader', 'type', 'status', 'current_members', 'departed_members',
+    'arrive_date', 'arrive_time', 'airport', 'airline', 'flight_number', 'city', 'going_to',
+    'receiver', 'goods', 'children',
+)
+
+# Filters a report accepts besides sub_event_id, with their column
+FILTER_COLUMNS = {'delegation_id': 'd.id', 'type': 'd.type', 'status': 'd.status'}
+
+
+def report_rows(report_type, sub_event_id, filters):
+    """Delegations of the report with their members or sessions under ``children``, in one query"""
+    _, with_members, with_sessions = REPORT_TYPES[report_type]
+    where = ['d.sub_event_id = %s']
+    params = [sub_event_id]
+    for name, value in sorted(filters.items()):
+        where.append(f'{FILTER_COLUMNS[name]} = %s')
+        params.append(value)
+    if with_members or with_sessions:
+        children, join = "COALESCE(children.items, '[]'::json)", _MEMBERS_SQL if with_members else _SESSIONS_SQL
+    else:
+        children, join = "'[]'::json", ''
+    sql = _REPORT_SQL.format(children=children, join=join, where=' AND '.join(where))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(zip(_DELEGATION_KEYS, row)) for row in cursor.fetchall()]
+
+
+def render_report(report_type, sub_event, filters, file_format):
+    """Render a report as ``bytes`` in ``file_format`` (``html`` or ``pdf``)"""
+    title, with_members, with_sessions = REPORT_TYPES[report_type]
+    delegations = report_rows(report_type, sub_event.id, filters)
+    type_labels = dict(Delegation.DELEGATION_TYPES)
+    status_labels = dict(Delegation.DELEGATION_STATUS)
+    member_status_labels = dict(Member.MEMBER_STATUS)
+    for delegation in delegations:
+        delegation['type_label'] = type_labels.get(delegation['type'], '')
+        delegation['status_label'] = status_labels.get(delegation['status'], '')
+        if with_members:
+            for member in delegation['children']:
+                member['status_label'] = member_status_labels.get(member['status'], '')
+    html = render_to_string('reports/report.html', {
+        'title': title,
+        'sub_event': sub_event,
+        'date': timezone.localdate(),
+        'delegations': delegations,
+        'show_delegations': report_type in ('delegations', 'combined'),
+        'show_members': with_members,
+        'show_sessions': with_sessions,
+    })
+    if file_format == 'pdf':
+        return html_to_pdf(html)
+    return html.encode('utf-8')
+
+
+def html_to_pdf(html):
+    try:
+        from weasyprint import HTML
+    except (ImportError, OSError):  # OSError: the Pango libraries are missing
+        raise ReportUnavailable('تصدير PDF يتطلب تثبيت WeasyPrint؛ استخدم file_format=html للطباعة من المتصفح')
+    return HTML(string=html).write_pdf()
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+
+
+class ReportCache:
+    """Content-addressed report files on disk, with hit/miss and render time counters"""
+
+    def __init__(self, directory=None):
+        self._directory = directory
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def directory(self):
+        return Path(self._directory or settings.REPORT_CACHE_DIR)
+
+    def get_or_render(self, report_type, sub_event, filters, file_format):
+        """Return ``(content, hit)``; renders and stores the report on a miss"""
+        report_key = _digest([report_type, str(sub_event.id), filters, file_format])
+        version_key = _digest([timezone.localdate().isoformat(), ReportVersion.stamp(sub_event.id)])
+        path = self.directory / f'{report_key}-{version_key}.{file_format}'
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            pass
+        else:
+            with self._lock:
+                self.hits += 1
+            return content, True
+
+        started = time.perf_counter()
+        content = render_report(report_type, sub_event, filters, file_format)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.misses += 1
+            self.render_ms_total += elapsed_ms
+            self.render_ms_last = elapsed_ms
+        self._store(path, report_key, content)
+        return content, False
+
+    def _store(self, path, report_key, content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(content)
+        os.replace(tmp_path, path)
+        for stale in path.parent.glob(f'{report_key}-*'):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / requests, 3) if requests else 0.0,
+                'render_ms_avg': round(self.render_ms_total / self.misses, 1) if self.misses else 0.0,
+                'render_ms_last': round(self.render_ms_last, 1),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.render_ms_total = 0.0
+            self.render_ms_last = 0.0
+
+
+cache = ReportCache()
@@ -0,0 +1,107 @@
+"""
+Arrival and departure schedule (``/api/schedule/``).
+
+``delegation.arrive_at`` and ``check_out.depart_at`` are stored generated
+columns that combine the date and time the API takes separately into one
+``timestamptz``. The local date and time are read in ``settings.TIME_ZONE``.
+Rows without a time have no timestamp and are left out of the schedule.
+The ``(airport_id, arrive_at)`` and ``(airport_id, depart_at)`` indexes
+serve "who lands at airport X between 14:00 and 18:00".
+
+``slots`` returns the arrivals and departures of a window in one query.
+They are grouped by time, airport and flight, with the delegations of each
+slot and their member totals: registered members (``current_members``) for
+arrivals and the session's members for departures.
+"""
+import datetime
+import json
+
+from django.db import connection
+from django.db.models import DateTimeField, Func
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+KINDS = ('arrival', 'departure')
+# Widest window accepted by /api/schedule/
+MAX_WINDOW = datetime.timedelta(days=7)
+
+
+class LocalDateTime(Func):
+    """``(date + time) AT TIME ZONE zone``: a local date and time as a ``timestamptz``, NULL without a time"""
+    template = "((%(expressions)s) AT TIME ZONE '%(zone)s')"
+    arg_joiner = ' + '
+    output_field = DateTimeField()
+
+    def __init__(self, date, time, zone):
+        super().__init__(date, time, zone=zone)
+
+
+def parse_moment(value):
+    """An ISO 8601 datetime, or a date (its midnight), as an aware datetime; ``None`` if invalid"""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = day and datetime.datetime.combine(day, datetime.time.min)
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+_ARRIVALS_SQL = """
+SELECT 'arrival' AS kind, d.arrive_at AS at, d.airport_id, d.airline_id, d.flight_number,
+       d.id AS delegation_id, d.delegation_leader_name, d.nationality_id, d.current_members AS members
+FROM delegation d
+WHERE d.arrive_at >= %(start)s AND d.arrive_at < %(end)s{airport}
+"""
+
+_DEPARTURES_SQL = """
+SELECT 'departure' AS kind, co.depart_at AS at, co.airport_id, co.airline_id, co.flight_number,
+       co.delegation_id, d.delegation_leader_name, d.nationality_id,
+       (SELECT COUNT(*) FROM checkout_member cm WHERE cm.check_out_id = co.id)::int AS members
+FROM check_out co
+JOIN delegation d ON d.id = co.delegation_id
+WHERE co.depart_at >= %(start)s AND co.depart_at < %(end)s{airport}
+"""
+
+_SLOTS_SQL = """
+SELECT s.kind, s.at, s.airport_id, ap.name, s.flight_number, s.airline_id, al.name,
+       COUNT(*), SUM(s.members),
+       jsonb_agg(jsonb_build_object(
+           'id', s.delegation_id, 'delegation_leader_name', s.delegation_leader_name,
+           'nationality', n.name, 'members', s.members
+       ) ORDER BY s.delegation_leader_name)
+FROM ({branches}) s
+LEFT JOIN air_port ap ON ap.id = s.airport_id
+LEFT JOIN air_line al ON al.id = s.airline_id
+LEFT JOIN nationality n ON n.id = s.nationality_id
+GROUP BY s.kind, s.at, s.airport_id, ap.name, s.flight_number, s.airline_id, al.name
+ORDER BY s.at, s.kind, ap.name, s.flight_number
+"""
+
+
+def slots(start, end, airport_id=None, kinds=KINDS):
+    """Arrival and departure slots in ``[start, end)``, in time order, in one query"""
+    airport = ' AND {}.airport_id = %(airport_id)s'
+    branches = []
+    if 'arrival' in kinds:
+        branches.append(_ARRIVALS_SQL.format(airport=airport.format('d') if airport_id else ''))
+    if 'departure' in kinds:
+        branches.append(_DEPARTURES_SQL.format(airport=airport.format('co') if airport_id else ''))
+    sql = _SLOTS_SQL.format(branches=' UNION ALL '.join(branches))
+    params = {'start': start, 'end': end, 'airport_id': airport_id}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {
+                'kind': kind, 'at': timezone.localtime(at),
+                'airport_id': str(airport_pk) if airport_pk else None, 'airport_name': airport_name,
+                'flight_number': flight_number,
+                'airline_id': str(airline_pk) if airline_pk else None, 'airline_name': airline_name,
+                'delegation_count': delegation_count, 'member_count': member_count, 'delegations': json.loads(delegations),
+            }
+            for (kind, at, airport_pk, airport_name, flight_number, airline_pk, airline_name,
+                 delegation_count, member_count, delegations) in cursor.fetchall()
+        ]
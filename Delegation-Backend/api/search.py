@@ -0,0 +1,120 @@
+"""
+Arabic-normalized search (``/api/search/`` and the ``?search=`` list filters).
+
+``arabic_normalize(text)`` (migration 0014) folds the spelling variants that
+people type interchangeably: hamza forms of alef (أ إ آ ٱ) to ا, ى and ی to
+ي, ة to ه, ؤ to و and ئ to ي. It also drops diacritics and tatweel, lowercases
+Latin letters and collapses whitespace. Member names and delegation
+leader/receiver names keep their normalized form in stored generated columns
+(``name_search``, ``leader_search``, ``receiver_search``). Lookup names are
+normalized through expression indexes.
+
+When the server ships ``pg_trgm``, migration 0014 adds GIN trigram indexes on
+those columns. Substring filters are then index scans, and ``/api/search/``
+also returns near matches ranked by ``word_similarity``. Without it the same
+queries run as sequential ``LIKE`` scans on the normalized text.
+"""
+from django.db import connection
+from django.db.models import Func, TextField, Value
+
+# Shortest and longest accepted ``q``, and the most hits returned
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_LENGTH = 100
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+class ArabicNormalize(Func):
+    """``arabic_normalize(expression)``"""
+    function = 'arabic_normalize'
+    output_field = TextField()
+
+
+def normalized(value):
+    """``value`` normalized by the database, for ``__contains`` filters on normalized columns"""
+    return ArabicNormalize(Value(value))
+
+
+# kind -> (FROM, normalized text, label, delegation id, sub event filter)
+SOURCES = {
+    'member': (
+        'member t', 't.name_search', 't.name', 't.delegation_id',
+        't.delegation_id IN (SELECT id FROM delegation WHERE sub_event_id = %(sub_event_id)s)',
+    ),
+    'delegation_leader': (
+        'delegation t', 't.leader_search', 't.delegation_leader_name', 't.id', 't.sub_event_id = %(sub_event_id)s',
+    ),
+    'receiver': (
+        'delegation t', 't.receiver_search', 't.receiver_name', 't.id', 't.sub_event_id = %(sub_event_id)s',
+    ),
+    'nationality': ('nationality t', 'arabic_normalize(t.name)', 't.name', 'NULL::uuid', None),
+    'city': ('cities t', 'arabic_normalize(t.city_name)', 't.city_name', 'NULL::uuid', None),
+    'airline': ('air_line t', 'arabic_normalize(t.name)', 't.name', 'NULL::uuid', None),
+    'airport': ('air_port t', 'arabic_normalize(t.name)', 't.name', 'NULL::uuid', None),
+    'equivalent_job': ('equivalent_job t', 'arabic_normalize(t.name)', 't.name', 'NULL::uuid', None),
+}
+
+_TERM = 'arabic_normalize(%(q)s)'
+# %(pattern)s is ``q`` with LIKE wildcards escaped; normalization leaves them untouched
+_PATTERN = 'arabic_normalize(%(pattern)s)'
+
+_BRANCH_SQL = """
+(SELECT '{kind}' AS kind, t.id, {label} AS label, {delegation} AS delegation_id,
+        CASE WHEN {text} = {term} THEN 3
+             WHEN {text} LIKE {pattern} || '%%' OR {text} LIKE '%% ' || {pattern} || '%%' THEN 2
+             WHEN {text} LIKE '%%' || {pattern} || '%%' THEN 1
+             ELSE 0 END{similarity} AS score
+ FROM {table}
+ WHERE ({text} LIKE '%%' || {pattern} || '%%'{fuzzy}){scope}
+ ORDER BY score DESC, label
+ LIMIT %(limit)s)
+"""
+
+_trigram = None
+
+
+def trigram_available():
+    """Whether ``pg_trgm`` is installed (checked once per process)"""
+    global _trigram
+    if _trigram is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram = cursor.fetchone()[0]
+    return _trigram
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def top_hits(query, kinds=None, sub_event_id=None, limit=DEFAULT_LIMIT):
+    """
+    Best ``limit`` hits for ``query`` across ``kinds`` (all of ``SOURCES`` by
+    default), in one query.
+
+    Exact matches rank first, then matches at the start of a word, then
+    other substrings. With ``pg_trgm``, near matches (a missing letter, a
+    different spelling the normalization does not fold) are included and
+    ``word_similarity`` breaks ties. ``sub_event_id`` restricts members and
+    delegations; lookups are shared by all events.
+    """
+    fuzzy = trigram_available()
+    branches = []
+    for kind in kinds or SOURCES:
+        table, text, label, delegation, scope = SOURCES[kind]
+        branches.append(_BRANCH_SQL.format(
+            kind=kind, table=table, text=text, label=label, delegation=delegation,
+            term=_TERM, pattern=_PATTERN,
+            similarity=f' + word_similarity({_TERM}, {text})' if fuzzy else '',
+            fuzzy=f' OR {_TERM} <%% {text}' if fuzzy else '',
+            scope=f' AND {scope}' if sub_event_id and scope else '',
+        ))
+    sql = f'SELECT * FROM ({" UNION ALL ".join(branches)}) hits ORDER BY score DESC, label LIMIT %(limit)s'
+    params = {'q': query, 'pattern': _like_escape(query), 'limit': limit, 'sub_event_id': sub_event_id}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {'kind': kind, 'id': str(pk), 'label': label,
+             'delegation_id': str(delegation_id) if delegation_id else None, 'score': round(float(score), 3)}
+            for kind, pk, label, delegation_id, score in cursor.fetchall()
+        ]
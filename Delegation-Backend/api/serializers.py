@@ -1,16 +1,107 @@
+import uuid
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from accounts.models import AuditLog
 from .models import (
     MainEvent, SubEvent, Nationality, Cities,
     AirLine, AirPort, EquivalentJob, Delegation, Member, CheckOut
 )
+from .bulk import PreloadedPrimaryKeyRelatedField
 
 User = get_user_model()
 
 
-class SubEventSerializer(serializers.ModelSerializer):
+def parse_field_list(value):
+    """Split a comma separated query parameter into a set of names"""
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def count_subquery(queryset, outer_field):
+    """Correlated ``COUNT(*)`` of ``queryset`` rows whose ``outer_field`` is the outer row, 0 when none"""
+    counts = queryset.filter(**{outer_field: OuterRef('pk')}).order_by().values(outer_field).annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class SparseFieldsetMixin:
+    """
+    Shape GET responses from the query string.
+
+    ``?fields=a,b`` keeps only the listed fields of the top-level serializer
+    (``id`` is always kept) and ``?expand=`` opts into the heavy
+    ``expandable_fields`` at any nesting level. Expandable fields are left
+    out unless the view sets ``expand_by_default`` in the context. Write
+    responses are never restricted.
+
+    ``field_annotations`` maps a field name to the queryset annotations it
+    reads; ``query_plan.plan_queryset`` adds them when the field is rendered.
+    """
+    expandable_fields = ()
+    field_annotations = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        is_root = parent is None
+        requested = parse_field_list(request.query_params.get('fields')) if is_root else set()
+        by_default = is_root and self.context.get('expand_by_default', False)
+        expanded = self.expanded_fields(request, by_default, requested)
+        for name in list(fields):
+            if name in self.expandable_fields:
+                keep = name in expanded
+            else:
+                keep = not requested or name in requested or name == 'id'
+            if not keep:
+                fields.pop(name)
+        return fields
+
+    @classmethod
+    def expanded_fields(cls, request, by_default=False, requested=None):
+        """Expandable fields that the request will render"""
+        if requested is None:
+            requested = parse_field_list(request.query_params.get('fields'))
+        expanded = parse_field_list(request.query_params.get('expand'))
+        if requested:
+            # An explicit field list replaces the default
+            expanded |= requested
+        elif by_default:
+            expanded |= set(cls.expandable_fields)
+        return expanded & set(cls.expandable_fields)
+
+    def annotated(self, obj, name, fallback):
+        """Read an annotation set by the query plan, or compute it for a bare instance"""
+        value = getattr(obj, name, None)
+        return fallback() if value is None else value
+
+
+class SubEventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     main_event_name = serializers.CharField(source='main_event_id.event_name', read_only=True)
     delegations_count = serializers.SerializerMethodField()
+    # إجماليات الوفود والأعضاء للحدث الفرعي، فقط مع ?expand=totals
+    totals = serializers.SerializerMethodField()
+
+    expandable_fields = ('totals',)
+    field_annotations = {
+        'delegations_count': {
+            'delegations_total': count_subquery(Delegation.objects.all(), 'sub_event_id'),
+        },
+        'totals': {
+            'military_delegations_total': count_subquery(Delegation.objects.filter(type='MILITARY'), 'sub_event_id'),
+            'civilian_delegations_total': count_subquery(Delegation.objects.filter(type='CIVILIAN'), 'sub_event_id'),
+            'members_total': count_subquery(Member.objects.all(), 'delegation_id__sub_event_id'),
+            'departed_members_total': count_subquery(
+                Member.objects.filter(status='DEPARTED'), 'delegation_id__sub_event_id'
+            ),
+        },
+    }
     
     class Meta:
         model = SubEvent
@@ -18,12 +109,36 @@ class SubEventSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at', 'id')
     
     def get_delegations_count(self, obj):
-        return obj.delegations.count()
+        return self.annotated(obj, 'delegations_total', obj.delegations.count)
 
+    def get_totals(self, obj):
+        members = self.annotated(obj, 'members_total', Member.objects.filter(delegation_id__sub_event_id=obj).count)
+        departed = self.annotated(
+            obj, 'departed_members_total',
+            Member.objects.filter(delegation_id__sub_event_id=obj, status='DEPARTED').count,
+        )
+        return {
+            'military_delegations': self.annotated(
+                obj, 'military_delegations_total', obj.delegations.filter(type='MILITARY').count
+            ),
+            'civilian_delegations': self.annotated(
+                obj, 'civilian_delegations_total', obj.delegations.filter(type='CIVILIAN').count
+            ),
+            'members': members,
+            'departed_members': departed,
+            'not_departed_members': members - departed,
+        }
 
-class MainEventSerializer(serializers.ModelSerializer):
+
+class MainEventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     sub_events_count = serializers.SerializerMethodField()
     sub_events = SubEventSerializer(many=True, read_only=True)
+
+    field_annotations = {
+        'sub_events_count': {
+            'sub_events_total': count_subquery(SubEvent.objects.all(), 'main_event_id'),
+        },
+    }
     
     class Meta:
         model = MainEvent
@@ -31,7 +146,7 @@ class MainEventSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at', 'id')
     
     def get_sub_events_count(self, obj):
-        return obj.sub_events.count()
+        return self.annotated(obj, 'sub_events_total', obj.sub_events.count)
 
 
 class NationalitySerializer(serializers.ModelSerializer):
@@ -76,25 +191,17 @@ class MemberSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Member
-        fields = '__all__'
+        # name_search: normalized copy of name for search (search.py)
+        exclude = ('name_search',)
         read_only_fields = ('created_at', 'updated_at', 'id')
-    
-    def create(self, validated_data):
-        member = super().create(validated_data)
-        # Update delegation members count
-        if member.delegation_id:
-            member.delegation_id.update_members_count()
-        return member
-    
-    def update(self, instance, validated_data):
-        member = super().update(instance, validated_data)
-        # Update delegation members count
-        if member.delegation_id:
-            member.delegation_id.update_members_count()
-        return member
 
 
-class DelegationSerializer(serializers.ModelSerializer):
+class MemberBulkSerializer(MemberSerializer):
+    """MemberSerializer for ``/api/members/bulk/``: relations come from rows preloaded for the whole list"""
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
+
+class DelegationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     nationality_name = serializers.CharField(source='nationality_id.name', read_only=True)
     sub_event_name = serializers.CharField(source='sub_event_id.event_name', read_only=True)
     main_event_name = serializers.CharField(source='sub_event_id.main_event_id.event_name', read_only=True)
@@ -102,11 +209,48 @@ class DelegationSerializer(serializers.ModelSerializer):
     airline_name = serializers.CharField(source='airline_id.name', read_only=True)
     city_name = serializers.CharField(source='city_id.city_name', read_only=True)
     members = MemberSerializer(many=True, read_only=True)
+    # Generated from arrive_date and arrive_time (api/schedule.py)
+    arrive_at = serializers.DateTimeField(read_only=True)
+
+    expandable_fields = ('members',)
     
     class Meta:
         model = Delegation
-        fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'id', 'current_members')
+        exclude = ('leader_search', 'receiver_search')
+        # Maintained by the member triggers (migration 0012)
+        read_only_fields = ('created_at', 'updated_at', 'id', 'current_members', 'departed_members', 'status')
+
+
+def resolve_check_out_members(member_ids):
+    """Map member id (as a string) to ``{'id', 'name', 'rank'}`` in one query; malformed ids are skipped"""
+    valid_ids = set()
+    for member_id in member_ids:
+        try:
+            valid_ids.add(uuid.UUID(str(member_id)))
+        except (TypeError, ValueError, AttributeError):
+            continue
+    if not valid_ids:
+        return {}
+    members = Member.objects.filter(id__in=valid_ids).values('id', 'name', 'rank')
+    return {str(member['id']): member for member in members}
+
+
+class CheckOutListSerializer(serializers.ListSerializer):
+    """Resolve the members of every session on the page with a single query"""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        rows = list(iterable)
+        member_ids = [
+            member_id
+            for row in rows if isinstance(row.members, list)
+            for member_id in row.members
+        ]
+        self.child.resolved_members = resolve_check_out_members(member_ids)
+        try:
+            return [self.child.to_representation(row) for row in rows]
+        finally:
+            self.child.resolved_members = None
 
 
 class CheckOutSerializer(serializers.ModelSerializer):
@@ -115,22 +259,25 @@ class CheckOutSerializer(serializers.ModelSerializer):
     airport_name = serializers.CharField(source='airport_id.name', read_only=True)
     airline_name = serializers.CharField(source='airline_id.name', read_only=True)
     city_name = serializers.CharField(source='city_id.city_name', read_only=True)
+    # Generated from checkout_date and checkout_time (api/schedule.py)
+    depart_at = serializers.DateTimeField(read_only=True)
+
+    # Filled by CheckOutListSerializer for the rows it renders
+    resolved_members = None
     
     def to_representation(self, instance):
         data = super().to_representation(instance)
         
         # تحويل member IDs إلى member objects كاملة
-        if 'members' in data and data['members']:
-            from .models import Member
-            member_ids = data['members']
-            if isinstance(member_ids, list) and member_ids:
-                try:
-                    members = Member.objects.filter(id__in=member_ids).values('id', 'name', 'rank')
-                    member_dict = {str(member['id']): member for member in members}
-                    data['members'] = [member_dict.get(str(member_id), {'id': member_id, 'name': f'عضو #{member_id}', 'rank': ''}) for member_id in member_ids]
-                except Exception as e:
-                    # في حالة الخطأ، نترك البيانات كما هي
-                    pass
+        member_ids = data.get('members')
+        if isinstance(member_ids, list) and member_ids:
+            member_dict = self.resolved_members
+            if member_dict is None:
+                member_dict = resolve_check_out_members(member_ids)
+            data['members'] = [
+                member_dict.get(str(member_id), {'id': member_id, 'name': f'عضو #{member_id}', 'rank': ''})
+                for member_id in member_ids
+            ]
         
         return data
     
@@ -138,6 +285,12 @@ class CheckOutSerializer(serializers.ModelSerializer):
         model = CheckOut
         fields = '__all__'
         read_only_fields = ('created_at', 'updated_at', 'id')
+        list_serializer_class = CheckOutListSerializer
+
+
+class CheckOutBulkSerializer(CheckOutSerializer):
+    """CheckOutSerializer for ``/api/check-outs/bulk/``: relations come from rows preloaded for the whole list"""
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
 
 
 # Statistics Serializers
@@ -182,4 +335,18 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'full_name', 'role', 'is_active', 'created_at', 'last_login']
-        read_only_fields = ['id', 'created_at', 'last_login']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'last_login']
+
+
+class AuditLogSerializer(serializers.ModelSerializer):
+    """
+    One audit row. ``old_data``/``new_data`` hold whole rows for INSERT and
+    DELETE and only the changed columns for UPDATE.
+    """
+    changed_by_name = serializers.CharField(source='changed_by.full_name', read_only=True, default=None)
+
+    class Meta:
+        model = AuditLog
+        fields = ['id', 'table_name', 'record_id', 'action', 'old_data', 'new_data',
+                  'changed_by', 'changed_by_name', 'changed_at', 'ip_address']
+        read_only_fields = fields
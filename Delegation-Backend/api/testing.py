@@ -0,0 +1,31 @@
+"""
+Test helpers shared by the API test cases.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    ``assertQueryBudget`` fails when a list endpoint runs more than a fixed
+    number of queries at any of ``budget_page_sizes``. A budget that holds at
+    page size 1 and at the largest size means no query runs per row, so the
+    endpoint must honor ``?page_size`` and have rows to fill the largest page.
+    """
+
+    budget_page_sizes = (1, 10, 50)
+
+    def assertQueryBudget(self, url, budget, params=None):
+        for page_size in self.budget_page_sizes:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url, {**(params or {}), 'page_size': page_size})
+            self.assertEqual(response.status_code, 200, f'{url} page_size={page_size}')
+            executed = len(captured.captured_queries)
+            if executed > budget:
+                queries = '\n'.join(
+                    f'{index}. {query["sql"][:200]}'
+                    for index, query in enumerate(captured.captured_queries, start=1)
+                )
+                self.fail(
+                    f'{url} {params or ""} page_size={page_size}: {executed} queries, budget is {budget}\n{queries}'
+                )
@@ -1,3 +1,1540 @@
-from django.test import TestCase
+import importlib.util
+import datetime
+import random
+import tempfile
+import tracemalloc
+import unittest
+import uuid
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import counters, reports, search
+from .broadcast import UPDATES_GROUP, STRUCTURE_GROUP, buffer as broadcast_buffer, topic_group
+from .channel_layer import channel_layer_health
+from .consumers import UpdatesConsumer
+from .management.commands.benchmark_member_triggers import run_statement, use_row_triggers
+from .models import (
+    MainEvent, SubEvent, Nationality, Cities, AirLine, AirPort, EquivalentJob,
+    Delegation, Member, CheckOut, CheckOutMember, DashboardCounter, DashboardDaily,
+)
+from .testing import QueryBudgetMixin
+
+User = get_user_model()
+
+try:
+    import weasyprint  # noqa: F401
+except (ImportError, OSError):  # OSError: the Pango libraries are missing
+    WEASYPRINT = False
+else:
+    WEASYPRINT = True
+
+
+class DashboardCountersTests(TestCase):
+    """Trigger-maintained dashboard counters must always match the live aggregates"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNoDrift(self):
+        self.assertEqual(counters.find_drift(), [])
+        self.assertEqual(counters.daily_drift(), [])
+
+    def _mutate(self, rng):
+        main_events = list(MainEvent.objects.all())
+        sub_events = list(SubEvent.objects.all())
+        delegations = list(Delegation.objects.all())
+        members = list(Member.objects.all())
+        check_outs = list(CheckOut.objects.all())
+
+        days = [None, datetime.date(2026, 11, 1), datetime.date(2026, 11, 3)]
+        choice = rng.randrange(12)
+        if choice == 0 or not main_events:
+            MainEvent.objects.create(event_name=f'حدث {rng.random()}')
+        elif choice == 1 or not sub_events:
+            SubEvent.objects.create(main_event_id=rng.choice(main_events), event_name='فرعي')
+        elif choice == 2 or not delegations:
+            Delegation.objects.create(
+                sub_event_id=rng.choice(sub_events),
+                delegation_leader_name='رئيس',
+                type=rng.choice(['MILITARY', 'CIVILIAN']),
+                arrive_date=rng.choice(days),
+            )
+        elif choice == 3:
+            Member.objects.create(
+                delegation_id=rng.choice(delegations),
+                name='عضو',
+                status=rng.choice(['NOT_DEPARTED', 'DEPARTED']),
+                departure_date=rng.choice(days),
+            )
+        elif choice == 4 and members:
+            member = rng.choice(members)
+            member.status = 'DEPARTED' if member.status == 'NOT_DEPARTED' else 'NOT_DEPARTED'
+            member.save()
+        elif choice == 5 and members:
+            Member.objects.filter(id__in=[m.id for m in rng.sample(members, min(3, len(members)))]).update(
+                status=rng.choice(['NOT_DEPARTED', 'DEPARTED'])
+            )
+        elif choice == 6 and members:
+            rng.choice(members).delete()
+        elif choice == 7:
+            delegation = rng.choice(delegations)
+            delegation.status = rng.choice(['NOT_DEPARTED', 'PARTIALLY_DEPARTED', 'FULLY_DEPARTED'])
+            delegation.type = rng.choice(['MILITARY', 'CIVILIAN'])
+            delegation.arrive_date = rng.choice(days)
+            delegation.save()
+        elif choice == 8:
+            delegation = rng.choice(delegations)
+            delegation.sub_event_id = rng.choice(sub_events)
+            delegation.save()
+        elif choice == 9:
+            delegation = rng.choice(delegations)
+            CheckOut.objects.create(
+                delegation_id=delegation,
+                members=[str(m.id) for m in delegation.members.all()],
+                checkout_date=rng.choice(days),
+            )
+        elif choice == 10 and check_outs:
+            rng.choice(check_outs).delete()
+        elif choice == 11 and rng.random() < 0.3:
+            rng.choice(sub_events if rng.random() < 0.7 else main_events).delete()
+
+    def test_counters_match_live_aggregates_after_random_mutations(self):
+        for seed in range(3):
+            rng = random.Random(seed)
+            for _ in range(150):
+                self._mutate(rng)
+            self.assertNoDrift()
+
+    def test_moving_sub_event_carries_totals(self):
+        first = MainEvent.objects.create(event_name='أول')
+        second = MainEvent.objects.create(event_name='ثاني')
+        sub_event = SubEvent.objects.create(main_event_id=first, event_name='فرعي')
+        delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='رئيس', type='MILITARY')
+        Member.objects.create(delegation_id=delegation, name='عضو')
+
+        sub_event.main_event_id = second
+        sub_event.save()
+
+        self.assertNoDrift()
+        moved = DashboardCounter.for_scope(DashboardCounter.scope_key_for(main_event_id=second.id))
+        self.assertEqual(moved.members, 1)
+        self.assertEqual(moved.military_delegations, 1)
+
+    def test_rebuild_fixes_drift(self):
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='رئيس', type='CIVILIAN')
+        Member.objects.create(delegation_id=delegation, name='عضو')
+
+        DashboardCounter.objects.filter(pk=DashboardCounter.GLOBAL_KEY).update(members=99)
+        self.assertNotEqual(counters.find_drift(), [])
+
+        counters.rebuild()
+        self.assertNoDrift()
+
+    def test_stats_reads_scoped_counters(self):
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        other = SubEvent.objects.create(main_event_id=main_event, event_name='آخر')
+        delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='رئيس', type='MILITARY')
+        Delegation.objects.create(sub_event_id=other, delegation_leader_name='رئيس', type='CIVILIAN')
+        Member.objects.create(delegation_id=delegation, name='عضو', status='DEPARTED')
+
+        response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['event_stats']['total_delegations'], 2)
+        self.assertEqual(response.data['member_stats']['departed_members'], 1)
+
+        response = self.client.get('/api/dashboard/stats/', {'sub_event_id': str(other.id)})
+        self.assertEqual(response.data['delegation_stats']['civilian_delegations'], 1)
+        self.assertEqual(response.data['member_stats']['total_members'], 0)
+
+    def test_timeseries_follows_arrivals_and_check_outs(self):
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        other = SubEvent.objects.create(main_event_id=main_event, event_name='آخر')
+        delegation = Delegation.objects.create(
+            sub_event_id=sub_event, delegation_leader_name='رئيس', type='MILITARY', arrive_date=datetime.date(2026, 11, 1),
+        )
+        members = [Member.objects.create(delegation_id=delegation, name=f'عضو {i}') for i in range(3)]
+        Member.objects.create(
+            delegation_id=Delegation.objects.create(
+                sub_event_id=other, delegation_leader_name='رئيس', type='CIVILIAN', arrive_date=datetime.date(2026, 11, 2),
+            ),
+            name='عضو',
+        )
+        CheckOut.objects.create(
+            delegation_id=delegation, members=[str(member.id) for member in members[:2]],
+            checkout_date=datetime.date(2026, 11, 3),
+        )
+        self.assertNoDrift()
+
+        response = self.client.get('/api/dashboard/timeseries/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['day'], row['arrivals'], row['departures'], row['in_country']) for row in response.data['days']],
+            [
+                (datetime.date(2026, 11, 1), 3, 0, 3),
+                (datetime.date(2026, 11, 2), 1, 0, 4),
+                (datetime.date(2026, 11, 3), 0, 2, 2),
+            ],
+        )
+        # A window opens with everyone already in the country, empty days included
+        response = self.client.get('/api/dashboard/timeseries/', {
+            'sub_event_id': str(sub_event.id), 'from': '2026-11-02', 'to': '2026-11-04',
+        })
+        self.assertEqual([row['in_country'] for row in response.data['days']], [3, 1, 1])
+
+        # Moving the arrival date moves the arrivals with it
+        delegation.arrive_date = datetime.date(2026, 10, 31)
+        delegation.save()
+        self.assertNoDrift()
+        response = self.client.get('/api/dashboard/timeseries/', {'main_event_id': str(main_event.id)})
+        self.assertEqual(response.data['days'][0]['day'], datetime.date(2026, 10, 31))
+        self.assertEqual(response.data['days'][0]['arrivals'], 3)
+
+        for params in ({'from': 'غدا'}, {'from': '2026-11-05', 'to': '2026-11-01'}, {'main_event_id': 'x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/dashboard/timeseries/', params).status_code, 400)
+
+        delegation.delete()
+        self.assertNoDrift()
+
+    def test_rebuild_daily_fixes_drift(self):
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        delegation = Delegation.objects.create(
+            sub_event_id=sub_event, delegation_leader_name='رئيس', type='CIVILIAN', arrive_date=datetime.date(2026, 11, 1),
+        )
+        Member.objects.create(delegation_id=delegation, name='عضو')
+
+        DashboardDaily.objects.update(arrivals=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_dashboard_daily', '--check', stdout=StringIO())
+
+        call_command('rebuild_dashboard_daily', stdout=StringIO())
+        self.assertNoDrift()
+
+
+@override_settings(BROADCAST_WINDOW_MS=60000)
+class BroadcastBufferTests(TestCase):
+    """Change events are buffered after commit, deduplicated and sent as one frame per window"""
+
+    def setUp(self):
+        self.frames = []
+        self.group_frames = []
+
+        def capture(frames, counters=None, frame_id=None):
+            self.frames.append((frames[UPDATES_GROUP], counters))
+            self.group_frames.append(frames)
+
+        patcher = mock.patch.object(broadcast_buffer, 'send', side_effect=capture)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(broadcast_buffer.flush)
+        broadcast_buffer.flush()
+        broadcast_buffer.reset_stats()
+        self.frames.clear()
+
+        self.main_event = MainEvent.objects.create(event_name='حدث')
+        self.sub_event = SubEvent.objects.create(main_event_id=self.main_event, event_name='فرعي')
+
+    def test_check_out_of_many_members_is_one_frame(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            delegation = Delegation.objects.create(
+                sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY'
+            )
+            members = [Member.objects.create(delegation_id=delegation, name=f'عضو {i}') for i in range(40)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for member in members:
+                member.status = 'DEPARTED'
+                member.save()
+        broadcast_buffer.flush()
+
+        self.assertEqual(len(self.frames), 1)
+        events, counters = self.frames[0]
+        self.assertEqual(len(events), 41)
+        self.assertEqual(counters['member_stats']['departed_members'], 40)
+        self.assertEqual(len({(e['model'], e['id']) for e in events}), 41)
+        self.assertTrue(all(e['action'] == 'created' for e in events))
+
+        stats = broadcast_buffer.stats()
+        self.assertEqual(stats['frames_out'], 1)
+        self.assertEqual(stats['events_out'], 41)
+        self.assertGreater(stats['events_in'], stats['events_out'])
+        self.assertEqual(stats['coalescing_ratio'], stats['events_in'])
+
+    def test_rolled_back_changes_are_not_broadcast(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Delegation.objects.create(
+                        sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='CIVILIAN'
+                    )
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        broadcast_buffer.flush()
+        self.assertEqual(self.frames, [])
+
+    def test_created_then_deleted_in_one_window_is_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            delegation = Delegation.objects.create(
+                sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='CIVILIAN'
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            delegation.delete()
+        broadcast_buffer.flush()
+        self.assertEqual(self.frames, [])
+
+    @override_settings(BROADCAST_WINDOW_MS=0)
+    def test_zero_window_sends_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Delegation.objects.create(
+                sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='CIVILIAN'
+            )
+        self.assertEqual(len(self.frames), 1)
+
+    def test_frame_carries_allowlisted_rows_and_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            delegation = Delegation.objects.create(
+                sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY', goods='شحنة كبيرة'
+            )
+            member = Member.objects.create(delegation_id=delegation, name='عضو')
+            CheckOut.objects.create(delegation_id=delegation, members=[str(member.id)], notes='ملاحظات')
+
+        with self.assertNumQueries(6):
+            # One query per changed model, one for CheckOut member names, one counters read,
+            # one to resolve the sub event's main event for topic groups
+            broadcast_buffer.flush()
+
+        events, counters = self.frames[0]
+        by_model = {event['model']: event for event in events}
+        delegation_data = by_model['Delegation']['data']
+        self.assertEqual(delegation_data['id'], str(delegation.id))
+        self.assertEqual(delegation_data['sub_event_name'], 'فرعي')
+        self.assertNotIn('goods', delegation_data)
+        self.assertNotIn('members', delegation_data)
+        self.assertNotIn('notes', by_model['CheckOut']['data'])
+        self.assertEqual(by_model['CheckOut']['data']['members'][0]['name'], 'عضو')
+        self.assertEqual(by_model['Member']['data']['delegation_id'], str(delegation.id))
+        self.assertEqual(counters['event_stats']['total_check_outs'], 1)
+
+    def test_deleted_rows_carry_no_data(self):
+        delegation = Delegation.objects.create(
+            sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='CIVILIAN'
+        )
+        delegation_id = str(delegation.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            delegation.delete()
+        broadcast_buffer.flush()
+        events, counters = self.frames[0]
+        self.assertEqual(events, [{'model': 'Delegation', 'action': 'deleted', 'id': delegation_id, 'data': None}])
+        self.assertEqual(counters['event_stats']['total_delegations'], 0)
+
+    def test_changes_fan_out_to_their_topic_groups(self):
+        other = SubEvent.objects.create(main_event_id=self.main_event, event_name='آخر')
+        delegation = Delegation.objects.create(
+            sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            member = Member.objects.create(delegation_id=delegation, name='عضو')
+            Delegation.objects.create(sub_event_id=other, delegation_leader_name='رئيس', type='CIVILIAN')
+        broadcast_buffer.flush()
+
+        frames = self.group_frames[0]
+        member_groups = {
+            group for group, events in frames.items()
+            if any(event['id'] == str(member.id) for event in events)
+        }
+        self.assertEqual(member_groups, {
+            UPDATES_GROUP,
+            topic_group('delegation', str(delegation.id)),
+            topic_group('sub_event', str(self.sub_event.id)),
+            topic_group('main_event', str(self.main_event.id)),
+        })
+        self.assertEqual(len(frames[topic_group('sub_event', str(other.id))]), 1)
+        self.assertNotIn(STRUCTURE_GROUP, frames)
+
+    def test_deleted_member_still_reaches_its_topics(self):
+        delegation = Delegation.objects.create(
+            sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY'
+        )
+        member = Member.objects.create(delegation_id=delegation, name='عضو')
+        with self.captureOnCommitCallbacks(execute=True):
+            member.delete()
+        broadcast_buffer.flush()
+        self.assertIn(topic_group('sub_event', str(self.sub_event.id)), self.group_frames[0])
+
+    def test_member_change_broadcasts_its_delegation_totals(self):
+        delegation = Delegation.objects.create(
+            sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY'
+        )
+        member = Member.objects.create(delegation_id=delegation, name='عضو')
+        with self.captureOnCommitCallbacks(execute=True):
+            member.status = 'DEPARTED'
+            member.save()
+        broadcast_buffer.flush()
+
+        frames = self.group_frames[0]
+        updated = [event for event in frames[topic_group('sub_event', str(self.sub_event.id))]
+                   if event['model'] == 'Delegation']
+        self.assertEqual(len(updated), 1)
+        self.assertEqual(updated[0]['data']['current_members'], 1)
+        self.assertEqual(updated[0]['data']['status'], 'FULLY_DEPARTED')
+
+    def test_bulk_member_write_is_one_event_per_delegation(self):
+        delegation = Delegation.objects.create(
+            sub_event_id=self.sub_event, delegation_leader_name='رئيس', type='MILITARY'
+        )
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='user', full_name='مستخدم', role='USER'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/members/bulk/', [
+                {'delegation_id': str(delegation.id), 'name': f'عضو {i}'} for i in range(30)
+            ], format='json')
+        self.assertEqual(response.status_code, 201)
+        broadcast_buffer.flush()
+
+        events, counters = self.frames[-1]
+        self.assertEqual([(e['model'], e['action']) for e in events], [('Member', 'bulk'), ('Delegation', 'updated')])
+        self.assertEqual(events[1]['data']['current_members'], 30)
+        self.assertEqual(counters['member_stats']['total_members'], 30)
+        self.assertIn(events[0], self.group_frames[-1][topic_group('delegation', str(delegation.id))])
+
+
+    def test_lookup_changes_add_one_lookups_event(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Nationality.objects.create(name='جنسية')
+            Cities.objects.create(city_name='مدينة')
+            AirLine.objects.create(name='شركة')
+        broadcast_buffer.flush()
+
+        events, _ = self.frames[-1]
+        self.assertEqual([e['model'] for e in events], ['Nationality', 'Cities', 'AirLine', 'Lookups'])
+        self.assertIn(events[3], self.group_frames[-1][STRUCTURE_GROUP])
+
+
+class UpdatesConsumerTopicTests(SimpleTestCase):
+    """Sockets receive everything until they subscribe, then only their topics"""
+
+    sub_event = 'sub_event:11111111-1111-1111-1111-111111111111'
+    main_event = 'main_event:22222222-2222-2222-2222-222222222222'
+
+    def frame(self, frame_id, *ids):
+        return {
+            'type': 'batch_update',
+            'frame_id': frame_id,
+            'events': [{'model': 'Member', 'action': 'updated', 'id': object_id, 'data': None} for object_id in ids],
+            'counters': None,
+        }
+
+    async def test_subscribe_scopes_and_deduplicates_frames(self):
+        layer = get_channel_layer()
+        communicator = WebsocketCommunicator(UpdatesConsumer.as_asgi(), '/ws/updates/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await layer.group_send(UPDATES_GROUP, self.frame('a-1', 'x'))
+        self.assertEqual((await communicator.receive_json_from())['events'][0]['id'], 'x')
+
+        await communicator.send_json_to({'action': 'subscribe', 'topics': [self.sub_event, self.main_event, 'bad:1']})
+        reply = await communicator.receive_json_from()
+        self.assertEqual(reply['topics'], sorted([self.sub_event, self.main_event]))
+        self.assertEqual(reply['invalid'], ['bad:1'])
+
+        await layer.group_send(UPDATES_GROUP, self.frame('a-2', 'global-only'))
+        sub_group = topic_group(*self.sub_event.split(':'))
+        main_group = topic_group(*self.main_event.split(':'))
+        await layer.group_send(sub_group, self.frame('a-3', 'y'))
+        await layer.group_send(main_group, self.frame('a-3', 'y', 'z'))
+
+        self.assertEqual([e['id'] for e in (await communicator.receive_json_from())['events']], ['y'])
+        self.assertEqual([e['id'] for e in (await communicator.receive_json_from())['events']], ['z'])
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({'action': 'unsubscribe', 'topics': [self.sub_event, self.main_event]})
+        self.assertEqual((await communicator.receive_json_from())['topics'], [])
+        await layer.group_send(UPDATES_GROUP, self.frame('a-4', 'again'))
+        self.assertEqual((await communicator.receive_json_from())['events'][0]['id'], 'again')
+        await communicator.disconnect()
+
+    async def test_bulk_events_of_different_parents_are_all_sent(self):
+        layer = get_channel_layer()
+        communicator = WebsocketCommunicator(UpdatesConsumer.as_asgi(), '/ws/updates/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        frame = self.frame('b-1')
+        frame['events'] = [
+            {'model': 'Member', 'action': 'bulk', 'id': None, 'parent_id': parent_id, 'data': None}
+            for parent_id in ('d1', 'd2', 'd1')
+        ]
+        await layer.group_send(UPDATES_GROUP, frame)
+        received = await communicator.receive_json_from()
+        self.assertEqual([e['parent_id'] for e in received['events']], ['d1', 'd2'])
+        await communicator.disconnect()
+
+
+class BroadcastFanoutLoadTests(SimpleTestCase):
+    """Topic-scoped sockets receive a fraction of the global traffic"""
+
+    def test_loadtest_command_reports_both_modes(self):
+        out = StringIO()
+        call_command('loadtest_broadcast_fanout', subscribers=[20], topics=4, events=8, frames=3, stdout=out)
+        rows = [line.split() for line in out.getvalue().splitlines()[2:]]
+        per_socket = {row[1]: float(row[5]) for row in rows}
+        self.assertEqual(per_socket['global'], 24.0)
+        self.assertLess(per_socket['topic'], per_socket['global'])
+
+
+class ChannelLayerTests(TestCase):
+    """Configurable channel layer: health check and cross-worker delivery over Redis"""
+
+    def test_health_round_trip_on_default_layer(self):
+        health = channel_layer_health()
+        self.assertTrue(health['ok'])
+        self.assertEqual(health['backend'], 'channels.layers.InMemoryChannelLayer')
+
+        user = User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN')
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertEqual(client.get('/api/dashboard/channel-layer/').status_code, 200)
+
+    @override_settings(CHANNEL_LAYERS={'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {'hosts': [{'address': 'redis://127.0.0.1:1/0', 'socket_connect_timeout': 0.5}]},
+    }})
+    def test_health_reports_unreachable_redis(self):
+        health = channel_layer_health(timeout=1)
+        self.assertFalse(health['ok'])
+        self.assertEqual(health['backend'], 'channels_redis.core.RedisChannelLayer')
+        self.assertTrue(health['error'])
+
+    @unittest.skipUnless(importlib.util.find_spec('fakeredis'), 'fakeredis is not installed')
+    def test_redis_layer_delivers_across_workers(self):
+        out = StringIO()
+        call_command('loadtest_channel_layer', workers=[1, 2], sockets=2, frames=5, stdout=out)
+        rows = [line.split() for line in out.getvalue().splitlines()[2:]]
+        self.assertEqual([row[0] for row in rows], ['1', '2'])
+        for row in rows:
+            self.assertEqual(row[2], row[3])
+            self.assertEqual(row[4], 'yes')
+
+
+class DelegationListTests(TestCase):
+    """Keyset pages on (created_at, id) with members only on request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN'))
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        self.delegations = [
+            Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name=f'رئيس {i}', type='MILITARY')
+            for i in range(25)
+        ]
+        # Equal timestamps must still page without gaps or repeats
+        Delegation.objects.filter(pk__in=[d.pk for d in self.delegations[:10]]).update(
+            created_at=self.delegations[0].created_at
+        )
+        Member.objects.create(delegation_id=self.delegations[0], name='عضو')
+
+    def test_following_next_links_returns_every_row_once(self):
+        seen = []
+        response = self.client.get('/api/delegations/', {'page_size': 10})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 10)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(set(seen), {str(d.id) for d in self.delegations})
+        self.assertNotIn('count', response.data)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/delegations/', {'page_size': 5000})
+        self.assertEqual(response.data['page_size'], 100)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/delegations/', {'cursor': 'garbage'}).status_code, 404)
+
+    def test_members_only_embedded_on_request(self):
+        row = self.client.get('/api/delegations/').data['results'][0]
+        self.assertNotIn('members', row)
+
+        rows = self.client.get('/api/delegations/', {'expand': 'members', 'page_size': 100}).data['results']
+        by_id = {row['id']: row for row in rows}
+        self.assertEqual(len(by_id[str(self.delegations[0].id)]['members']), 1)
+
+        detail = self.client.get(f'/api/delegations/{self.delegations[0].id}/').data
+        self.assertEqual(len(detail['members']), 1)
+
+    def test_sparse_fieldset(self):
+        row = self.client.get('/api/delegations/', {'fields': 'delegation_leader_name,status'}).data['results'][0]
+        self.assertEqual(set(row), {'id', 'delegation_leader_name', 'status'})
+
+
+# Fixed query budgets for list endpoints, independent of page size
+ENDPOINT_QUERY_BUDGETS = [
+    ('/api/delegations/', None, 1),
+    ('/api/delegations/', {'expand': 'members'}, 2),
+    ('/api/delegations/', {'fields': 'id,delegation_leader_name'}, 1),
+    ('/api/members/', None, 2),
+    ('/api/sub-events/', None, 2),
+    ('/api/sub-events/', {'expand': 'totals'}, 2),
+    ('/api/main-events/', None, 3),
+    ('/api/main-events/', {'expand': 'totals'}, 3),
+    ('/api/check-outs/', None, 3),
+]
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """List endpoints must not run a query per row or per nested member"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN')
+        main_event = MainEvent.objects.create(event_name='حدث')
+        nationality = Nationality.objects.create(name='جنسية')
+        city = Cities.objects.create(city_name='مدينة')
+        airline = AirLine.objects.create(name='خط جوي')
+        airport = AirPort.objects.create(name='مطار')
+        job = EquivalentJob.objects.create(name='وظيفة')
+        for sub_index in range(2):
+            sub_event = SubEvent.objects.create(main_event_id=main_event, event_name=f'فرعي {sub_index}')
+            for index in range(30):
+                delegation = Delegation.objects.create(
+                    sub_event_id=sub_event, nationality_id=nationality, city_id=city,
+                    airline_id=airline, airport_id=airport,
+                    delegation_leader_name=f'رئيس {index}', type='MILITARY',
+                )
+                members = Member.objects.bulk_create([
+                    Member(
+                        delegation_id=delegation, name=f'عضو {number}', equivalent_job_id=job,
+                        status='DEPARTED' if sub_index == 0 and number == 0 else 'NOT_DEPARTED',
+                    )
+                    for number in range(3)
+                ])
+                if sub_index == 0:
+                    CheckOut.objects.create(
+                        delegation_id=delegation, airport_id=airport, airline_id=airline, city_id=city,
+                        members=[str(members[0].id), 'محذوف'],
+                    )
+        # Main events with empty sub-events, so per-row counts would show up, and more
+        # rows than the default page so the largest budget page size is filled
+        for index in range(25):
+            other = MainEvent.objects.create(event_name=f'حدث {index}')
+            SubEvent.objects.bulk_create([
+                SubEvent(main_event_id=other, event_name=f'فرعي {number}') for number in range(3)
+            ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_endpoints_stay_within_budget(self):
+        for url, params, budget in ENDPOINT_QUERY_BUDGETS:
+            with self.subTest(url=url, params=params):
+                self.assertQueryBudget(url, budget, params)
+
+    def test_budget_page_sizes_are_honored(self):
+        for url in sorted({url for url, _, _ in ENDPOINT_QUERY_BUDGETS}):
+            with self.subTest(url=url):
+                sizes = [len(self.client.get(url, {'page_size': size}).data['results']) for size in (1, 50, 100)]
+                self.assertEqual(sizes[:2], [1, min(50, sizes[2])])
+                self.assertGreater(sizes[1], 20)
+
+    def test_event_counts_come_from_annotations(self):
+        sub_events = self.client.get('/api/sub-events/', {'expand': 'totals', 'page_size': 100}).data['results']
+        by_name = {row['event_name']: row for row in sub_events if row['delegations_count']}
+        self.assertEqual(by_name['فرعي 0']['delegations_count'], 30)
+        self.assertEqual(by_name['فرعي 0']['totals'], {
+            'military_delegations': 30, 'civilian_delegations': 0,
+            'members': 90, 'departed_members': 30, 'not_departed_members': 60,
+        })
+        self.assertEqual(by_name['فرعي 1']['totals']['departed_members'], 0)
+        self.assertNotIn('totals', self.client.get('/api/sub-events/').data['results'][0])
+
+        main_events = self.client.get('/api/main-events/', {'expand': 'totals', 'page_size': 100}).data['results']
+        main_event = next(row for row in main_events if row['event_name'] == 'حدث')
+        self.assertEqual(main_event['sub_events_count'], 2)
+        self.assertEqual(sorted(row['totals']['members'] for row in main_event['sub_events']), [90, 90])
+
+    def test_check_out_members_resolved_in_one_query(self):
+        rows = self.client.get('/api/check-outs/', {'page_size': 5}).data['results']
+        self.assertEqual(rows[0]['members'][0]['name'], 'عضو 0')
+        self.assertEqual(rows[0]['members'][1], {'id': 'محذوف', 'name': 'عضو #محذوف', 'rank': ''})
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/dashboard/stats/')
+        recent = response.data['recent_check_outs']
+        self.assertEqual(len(recent), 10)
+        self.assertTrue(all(row['members'][0]['name'] == 'عضو 0' for row in recent))
+        member_queries = [query for query in captured.captured_queries if 'FROM "member"' in query['sql']]
+        # recent_members, the recent delegations' members and the check-out members
+        self.assertEqual(len(member_queries), 3)
+
+    def test_planned_members_carry_nested_names(self):
+        rows = self.client.get('/api/delegations/', {'expand': 'members', 'page_size': 5}).data['results']
+        member = rows[0]['members'][0]
+        self.assertEqual(member['delegation_nationality'], 'جنسية')
+        self.assertEqual(member['equivalent_job_name'], 'وظيفة')
+        self.assertEqual(rows[0]['airport_name'], 'مطار')
+
+
+class CheckOutMemberTests(TestCase):
+    """checkout_member follows check_out.members and backs member -> session lookups"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN'))
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        self.delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='رئيس', type='MILITARY')
+        self.members = [Member.objects.create(delegation_id=self.delegation, name=f'عضو {i}') for i in range(3)]
+
+    def linked(self, check_out):
+        return set(CheckOutMember.objects.filter(check_out_id=check_out).values_list('member_id', flat=True))
+
+    def test_links_follow_members_array(self):
+        first, second, third = self.members
+        check_out = CheckOut.objects.create(
+            delegation_id=self.delegation, members=[str(first.id), str(second.id), 'غير صالح', str(uuid.uuid4())],
+        )
+        self.assertEqual(self.linked(check_out), {first.id, second.id})
+
+        check_out.members = [str(second.id), str(third.id)]
+        check_out.save()
+        self.assertEqual(self.linked(check_out), {second.id, third.id})
+
+        response = self.client.get('/api/check-outs/', {'member_id': str(third.id)})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(check_out.id)])
+
+    def test_deleting_member_updates_its_sessions(self):
+        first, second, _ = self.members
+        shared = CheckOut.objects.create(delegation_id=self.delegation, members=[str(first.id), str(second.id)])
+        alone = CheckOut.objects.create(delegation_id=self.delegation, members=[str(first.id)])
+
+        self.assertEqual(self.client.delete(f'/api/members/{first.id}/').status_code, 204)
+        shared.refresh_from_db()
+        self.assertEqual(shared.members, [str(second.id)])
+        self.assertEqual(self.linked(shared), {second.id})
+        self.assertFalse(CheckOut.objects.filter(id=alone.id).exists())
+
+    def test_deleting_session_reverts_its_members(self):
+        first, second, _ = self.members
+        check_out = CheckOut.objects.create(delegation_id=self.delegation, members=[str(first.id)])
+        Member.objects.filter(id__in=[first.id, second.id]).update(status='DEPARTED')
+
+        self.assertEqual(self.client.delete(f'/api/check-outs/{check_out.id}/').status_code, 204)
+        self.assertEqual(Member.objects.get(id=first.id).status, 'NOT_DEPARTED')
+        self.assertEqual(Member.objects.get(id=second.id).status, 'DEPARTED')
+
+    def test_backfill_from_json(self):
+        migration = importlib.import_module('api.migrations.0010_checkout_member')
+        check_out = CheckOut.objects.create(delegation_id=self.delegation, members=[str(m.id) for m in self.members])
+        CheckOutMember.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(migration.BACKFILL_SQL)
+        self.assertEqual(self.linked(check_out), {m.id for m in self.members})
+
+
+class MemberStatementTriggerTests(TestCase):
+    """Statement-level member triggers leave the same delegation and counter state as the per-row ones"""
+
+    def setUp(self):
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_events = [SubEvent.objects.create(main_event_id=main_event, event_name=f'فرعي {i}') for i in range(2)]
+        self.delegations = [
+            Delegation.objects.create(sub_event_id=sub_events[i % 2], delegation_leader_name=f'رئيس {i}', type='MILITARY')
+            for i in range(4)
+        ]
+
+    def run_script(self):
+        first, second, third, fourth = self.delegations
+        for delegation, size in ((first, 12), (second, 5), (third, 30), (fourth, 1)):
+            run_statement('insert', delegation, size)
+        # A check-out of part of a delegation, then of all of it
+        departing = Member.objects.filter(delegation_id=first).order_by('name').values('id')[:4]
+        Member.objects.filter(id__in=departing).update(status='DEPARTED')
+        run_statement('update', second, 0)
+        Member.objects.filter(delegation_id=third).update(status='DEPARTED')
+        returning = Member.objects.filter(delegation_id=third).order_by('name').values('id')[:10]
+        Member.objects.filter(id__in=returning).update(status='NOT_DEPARTED')
+        # No-op update and partial delete
+        Member.objects.filter(delegation_id=fourth).update(name='عضو')
+        removed = Member.objects.filter(delegation_id=first).order_by('-name').values('id')[:6]
+        Member.objects.filter(id__in=removed).delete()
+        run_statement('delete', fourth, 0)
+        return self.snapshot()
+
+    def snapshot(self):
+        return (
+            {row['id']: (row['current_members'], row['status'])
+             for row in Delegation.objects.values('id', 'current_members', 'status')},
+            counters.stored_counters(),
+        )
+
+    def test_parity_with_row_triggers(self):
+        with transaction.atomic():
+            use_row_triggers()
+            expected = self.run_script()
+            transaction.set_rollback(True)
+
+        self.assertEqual(self.run_script(), expected)
+        self.assertEqual(counters.find_drift(), [])
+        self.assertEqual(counters.delegation_drift(), [])
+        self.assertEqual(
+            [expected[0][delegation.id] for delegation in self.delegations],
+            [(6, 'PARTIALLY_DEPARTED'), (5, 'FULLY_DEPARTED'), (30, 'PARTIALLY_DEPARTED'), (0, 'NOT_DEPARTED')],
+        )
+
+    def test_moving_members_refreshes_both_delegations(self):
+        source, target = self.delegations[:2]
+        run_statement('insert', source, 3)
+        Member.objects.filter(delegation_id=source).update(status='DEPARTED')
+        Member.objects.filter(delegation_id=source).update(delegation_id=target)
+
+        self.assertEqual(Delegation.objects.get(id=source.id).current_members, 0)
+        self.assertEqual(Delegation.objects.get(id=source.id).status, 'NOT_DEPARTED')
+        self.assertEqual(Delegation.objects.get(id=target.id).current_members, 3)
+        self.assertEqual(Delegation.objects.get(id=target.id).status, 'FULLY_DEPARTED')
+        self.assertEqual(counters.find_drift(), [])
+
+
+class MemberBulkTests(TestCase):
+    """/api/members/bulk/ writes whole lists and reports invalid items by index"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN'))
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        self.delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='رئيس', type='MILITARY')
+        self.job = EquivalentJob.objects.create(name='ملحق')
+
+    def totals(self):
+        self.delegation.refresh_from_db()
+        return self.delegation.current_members, self.delegation.departed_members, self.delegation.status
+
+    def create(self, count):
+        items = [
+            {'delegation_id': str(self.delegation.id), 'name': f'عضو {i}', 'equivalent_job_id': str(self.job.id)}
+            for i in range(count)
+        ]
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post('/api/members/bulk/', items, format='json')
+        return response, len(captured.captured_queries)
+
+    def test_create_validates_once_and_reports_item_errors(self):
+        _, small = self.create(5)
+        response, large = self.create(60)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 60)
+        self.assertEqual(response.data['created'][0]['equivalent_job_name'], 'ملحق')
+        self.assertEqual(small, large)
+        self.assertEqual(self.totals(), (65, 0, 'NOT_DEPARTED'))
+
+        response = self.client.post('/api/members/bulk/', [
+            {'delegation_id': str(self.delegation.id), 'name': 'عضو'},
+            {'delegation_id': str(self.delegation.id)},
+            {'delegation_id': str(uuid.uuid4()), 'name': 'عضو'},
+            'عضو',
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('name', response.data['errors'][0]['errors'])
+        self.assertIn('delegation_id', response.data['errors'][1]['errors'])
+
+        response = self.client.post('/api/members/bulk/', [{'name': 'عضو'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        with override_settings(BULK_MAX_ITEMS=2):
+            self.assertEqual(self.create(3)[0].status_code, 400)
+        self.assertEqual(self.totals(), (66, 0, 'NOT_DEPARTED'))
+
+    def test_update_in_one_statement(self):
+        members = Member.objects.bulk_create([Member(delegation_id=self.delegation, name=f'عضو {i}') for i in range(4)])
+        items = [{'id': str(member.id), 'status': 'DEPARTED'} for member in members[:3]]
+        items += [{'id': str(uuid.uuid4()), 'status': 'DEPARTED'}, {'id': str(members[3].id), 'status': 'مجهول'}]
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.patch('/api/members/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['updated']), 3)
+        self.assertEqual([error['index'] for error in response.data['errors']], [3, 4])
+        self.assertEqual(len([q for q in captured.captured_queries if q['sql'].startswith('UPDATE "member"')]), 1)
+        self.assertEqual(self.totals(), (4, 3, 'PARTIALLY_DEPARTED'))
+        self.assertEqual(counters.find_drift(), [])
+
+    def test_delete_detaches_check_outs(self):
+        first, second, third = Member.objects.bulk_create(
+            [Member(delegation_id=self.delegation, name=f'عضو {i}') for i in range(3)]
+        )
+        shared = CheckOut.objects.create(delegation_id=self.delegation, members=[str(first.id), str(third.id)])
+        alone = CheckOut.objects.create(delegation_id=self.delegation, members=[str(second.id)])
+
+        user_client = APIClient()
+        user_client.force_authenticate(User.objects.create(username='user', full_name='مستخدم', role='USER'))
+        self.assertEqual(user_client.delete('/api/members/bulk/', [str(first.id)], format='json').status_code, 403)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.delete(
+                '/api/members/bulk/', [str(first.id), str(second.id), 'غير صالح'], format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in captured.captured_queries if q['sql'].startswith('DELETE FROM "member"')]), 1)
+        self.assertEqual(response.data['deleted'], [str(first.id), str(second.id)])
+        self.assertEqual([error['index'] for error in response.data['errors']], [2])
+        shared.refresh_from_db()
+        self.assertEqual(shared.members, [str(third.id)])
+        self.assertFalse(CheckOut.objects.filter(id=alone.id).exists())
+        self.assertEqual(self.totals()[0], 1)
+        self.assertEqual(counters.find_drift(), [])
+
+
+class CheckOutBulkTests(TestCase):
+    """/api/check-outs/bulk/ writes many sessions with one INSERT and set-based member updates"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN'))
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        self.delegations = [
+            Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name=f'رئيس {i}', type='MILITARY')
+            for i in range(2)
+        ]
+        self.members = {
+            delegation.id: [Member.objects.create(delegation_id=delegation, name=f'عضو {i}') for i in range(3)]
+            for delegation in self.delegations
+        }
+
+    def totals(self, delegation):
+        delegation.refresh_from_db()
+        return delegation.current_members, delegation.departed_members, delegation.status
+
+    def test_flight_checks_out_whole_delegations(self):
+        first, second = self.delegations
+        with mock.patch('api.signals.queue_update') as queued, CaptureQueriesContext(connection) as captured:
+            response = self.client.post('/api/check-outs/bulk/', {
+                'delegation_ids': [str(first.id), str(second.id), str(uuid.uuid4())],
+                'flight_number': 'EK 412', 'checkout_date': '2026-10-20',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([row['flight_number'] for row in response.data['created']], ['EK 412', 'EK 412'])
+        self.assertEqual(len(response.data['created'][0]['members']), 3)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2])
+        self.assertEqual(len([q for q in captured.captured_queries if q['sql'].startswith('INSERT INTO "check_out"')]), 1)
+
+        self.assertEqual(self.totals(first), (3, 3, 'FULLY_DEPARTED'))
+        self.assertEqual(self.totals(second), (3, 3, 'FULLY_DEPARTED'))
+        self.assertEqual(set(Member.objects.values_list('departure_date', flat=True)), {datetime.date(2026, 10, 20)})
+        self.assertEqual(counters.find_drift(), [])
+        self.assertEqual(
+            [call.args[:2] for call in queued.call_args_list],
+            [('CheckOut', 'bulk'), ('Delegation', 'updated'), ('Delegation', 'updated')],
+        )
+
+        # Nobody is left to depart
+        response = self.client.post('/api/check-outs/bulk/', {'delegation_ids': [str(first.id)]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_listed_members_must_belong_to_the_delegation(self):
+        first, second = self.delegations
+        mine, theirs = self.members[first.id], self.members[second.id]
+        response = self.client.post('/api/check-outs/bulk/', [
+            {'delegation_id': str(first.id), 'members': [str(mine[0].id), str(mine[1].id)]},
+            {'delegation_id': str(first.id), 'members': [str(theirs[0].id)]},
+            {'delegation_id': str(second.id), 'members': ['غير صالح']},
+            {'members': [str(theirs[1].id)]},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('members', response.data['errors'][0]['errors'])
+        self.assertIn('delegation_id', response.data['errors'][2]['errors'])
+        self.assertEqual(self.totals(first), (3, 2, 'PARTIALLY_DEPARTED'))
+        self.assertEqual(self.totals(second), (3, 0, 'NOT_DEPARTED'))
+
+        self.assertEqual(self.client.post('/api/check-outs/bulk/', 'x', format='json').status_code, 400)
+
+    def test_departed_members_are_rejected(self):
+        first, _ = self.delegations
+        mine = self.members[first.id]
+        response = self.client.post('/api/check-outs/bulk/', [
+            {'delegation_id': str(first.id), 'members': [str(mine[0].id)]},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/check-outs/bulk/', [
+            {'delegation_id': str(first.id), 'members': [str(mine[0].id), str(mine[1].id)]},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['errors']['members'], ['أعضاء غادروا بالفعل'])
+        self.assertEqual(CheckOut.objects.count(), 1)
+        self.assertEqual(self.totals(first), (3, 1, 'PARTIALLY_DEPARTED'))
+        self.assertEqual(counters.find_drift(), [])
+
+    def test_members_repeated_in_the_request_are_rejected(self):
+        first, _ = self.delegations
+        mine = self.members[first.id]
+        response = self.client.post('/api/check-outs/bulk/', [
+            {'delegation_id': str(first.id), 'members': [str(mine[0].id)]},
+            {'delegation_id': str(first.id), 'members': [str(mine[0].id), str(mine[1].id)]},
+            {'delegation_id': str(first.id), 'members': [str(mine[1].id), str(mine[1].id)]},
+            # The members no earlier session took
+            {'delegation_id': str(first.id)},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(response.data['errors'][0]['errors']['members'], ['أعضاء مكررون في هذا الطلب'])
+        self.assertEqual(
+            [[str(member['id']) for member in row['members']] for row in response.data['created']],
+            [[str(mine[0].id)], [str(mine[1].id), str(mine[2].id)]],
+        )
+        self.assertEqual(self.totals(first), (3, 3, 'FULLY_DEPARTED'))
+        self.assertEqual(counters.find_drift(), [])
+
+
+class ScheduleTests(TestCase):
+    """/api/schedule/ lists arrivals and departures by local time, airport and flight"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN'))
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_events = [SubEvent.objects.create(main_event_id=main_event, event_name=f'فرعي {i}') for i in range(2)]
+        self.cairo = AirPort.objects.create(name='مطار القاهرة')
+        self.borg = AirPort.objects.create(name='مطار برج العرب')
+        airline = AirLine.objects.create(name='مصر للطيران')
+        nationality = Nationality.objects.create(name='جنسية')
+        flight = {'airline_id': airline, 'flight_number': 'MS 986', 'arrive_date': datetime.date(2026, 11, 1)}
+        self.delegations = [
+            Delegation.objects.create(
+                sub_event_id=sub_event, delegation_leader_name=f'رئيس {i}', type='MILITARY', nationality_id=nationality,
+                airport_id=self.cairo, arrive_time=datetime.time(15, 30), **flight,
+            )
+            for i, sub_event in enumerate(sub_events)
+        ]
+        Delegation.objects.create(
+            sub_event_id=sub_events[0], delegation_leader_name='رئيس برج العرب', type='CIVIL',
+            airport_id=self.borg, arrive_time=datetime.time(23, 0), **flight,
+        )
+        # No time: left out of the schedule
+        Delegation.objects.create(
+            sub_event_id=sub_events[0], delegation_leader_name='بدون ساعة', type='CIVIL', airport_id=self.cairo, **flight,
+        )
+        for delegation in self.delegations:
+            for i in range(2):
+                Member.objects.create(delegation_id=delegation, name=f'عضو {i}')
+
+    def get(self, **params):
+        response = self.client.get('/api/schedule/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['slots']
+
+    def test_arrivals_and_departures_by_local_time(self):
+        first = self.delegations[0]
+        # Generated by the database in local time, returned by the INSERT
+        self.assertEqual(timezone.localtime(first.arrive_at).replace(tzinfo=None), datetime.datetime(2026, 11, 1, 15, 30))
+        CheckOut.objects.create(
+            delegation_id=first, airport_id=self.cairo, flight_number='MS 987',
+            checkout_date=datetime.date(2026, 11, 1), checkout_time=datetime.time(16, 0),
+            members=[str(member.id) for member in first.members.all()[:1]],
+        )
+
+        slots = self.get(**{'from': '2026-11-01T14:00', 'to': '2026-11-01T18:00'})
+        self.assertEqual(
+            [(slot['kind'], slot['flight_number'], slot['delegation_count'], slot['member_count']) for slot in slots],
+            [('arrival', 'MS 986', 2, 4), ('departure', 'MS 987', 1, 1)],
+        )
+        arrival = slots[0]
+        self.assertEqual((arrival['airport_name'], arrival['airline_name']), ('مطار القاهرة', 'مصر للطيران'))
+        self.assertEqual(arrival['at'].hour, 15)
+        self.assertEqual([row['members'] for row in arrival['delegations']], [2, 2])
+        self.assertEqual(arrival['delegations'][0]['nationality'], 'جنسية')
+
+        # A whole day across airports, then one airport and one kind
+        self.assertEqual(len(self.get(**{'from': '2026-11-01'})), 3)
+        self.assertEqual(len(self.get(**{'from': '2026-11-01', 'airport_id': str(self.borg.id)})), 1)
+        self.assertEqual(len(self.get(**{'from': '2026-11-01', 'kind': 'departure'})), 1)
+        self.assertEqual(self.get(**{'from': '2026-11-01T16:00', 'to': '2026-11-01T22:00', 'kind': 'arrival'}), [])
+
+    def test_invalid_windows_are_rejected(self):
+        for params in (
+            {},
+            {'from': 'أمس'},
+            {'from': '2026-11-02', 'to': '2026-11-01'},
+            {'from': '2026-11-01', 'to': '2026-11-30'},
+            {'from': '2026-11-01', 'kind': 'transit'},
+            {'from': '2026-11-01', 'airport_id': 'x'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/schedule/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+
+
+class ExportTests(TestCase):
+    """/api/exports/ streams CSV and XLSX with the list filters and a flat memory profile"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', full_name='مستخدم', role='USER')
+        main_event = MainEvent.objects.create(event_name='حدث')
+        cls.sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        cls.nationality = Nationality.objects.create(name='مصر')
+        cls.military = Delegation.objects.create(
+            sub_event_id=cls.sub_event, nationality_id=cls.nationality,
+            delegation_leader_name='رئيس عسكري', type='MILITARY',
+        )
+        cls.civilian = Delegation.objects.create(
+            sub_event_id=cls.sub_event, delegation_leader_name='رئيس مدني', type='CIVILIAN',
+        )
+        cls.members = Member.objects.bulk_create(
+            [Member(delegation_id=cls.military, name=f'عضو {i}', rank='عقيد') for i in range(3)]
+        )
+        CheckOut.objects.create(delegation_id=cls.military, members=[str(m.id) for m in cls.members[:2]])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def csv_rows(self, url, params=None):
+        body = self.download(url, {**(params or {}), 'file_format': 'csv'}).decode('utf-8-sig')
+        return [line.split(',') for line in body.splitlines()]
+
+    def test_csv_honors_list_filters_and_joins_names(self):
+        rows = self.csv_rows('/api/exports/delegations/', {'type': 'MILITARY'})
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:5], ['فرعي', 'مصر', 'رئيس عسكري', 'عسكري', '3'])
+
+        rows = self.csv_rows('/api/exports/members/', {'delegation_id': str(self.civilian.id)})
+        self.assertEqual(len(rows), 1)
+
+        rows = self.csv_rows('/api/exports/check-outs/')
+        self.assertEqual(sorted(rows[1][9].split('، ')), ['عضو 0', 'عضو 1'])
+
+        self.assertEqual(self.client.get('/api/exports/members/', {'file_format': 'pdf'}).status_code, 400)
+
+    def test_members_are_read_in_one_query(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.download('/api/exports/members/', {'file_format': 'csv'})
+            return len(captured.captured_queries)
+
+        before = queries()
+        Member.objects.bulk_create([Member(delegation_id=self.civilian, name=f'عضو {i}') for i in range(50)])
+        self.assertEqual(queries(), before)
+
+    def test_xlsx_is_a_right_to_left_workbook(self):
+        body = self.download('/api/exports/members/', {'file_format': 'xlsx'})
+        with zipfile.ZipFile(BytesIO(body)) as workbook:
+            sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        ns = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        self.assertEqual(sheet.find('x:sheetViews/x:sheetView', ns).get('rightToLeft'), '1')
+        rows = sheet.findall('x:sheetData/x:row', ns)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0].find('x:c/x:is/x:t', ns).text, 'الرتبة')
+
+    def test_export_memory_stays_flat(self):
+        # 100k members (a ~8 MB CSV); Python allocations while streaming stay under a fixed ceiling
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO member (id, delegation_id, name, rank, job_title, status, created_at, updated_at) "
+                "SELECT gen_random_uuid(), %s, 'عضو رقم ' || n, 'عقيد', 'ملحق', 'NOT_DEPARTED', now(), now() "
+                "FROM generate_series(1, 100000) AS n",
+                [self.civilian.id],
+            )
+        for file_format in ('csv', 'xlsx'):
+            response = self.client.get('/api/exports/members/', {'file_format': file_format})
+            size = 0
+            tracemalloc.start()
+            try:
+                for chunk in response.streaming_content:
+                    size += len(chunk)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertGreater(size, 100_000, file_format)
+            self.assertLess(peak, 6 * 1024 * 1024, f'{file_format}: {peak} bytes')
+
+
+class ReportTests(TestCase):
+    """/api/reports/ renders once per data version of the sub event and serves the rest from disk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', full_name='مستخدم', role='USER')
+        main_event = MainEvent.objects.create(event_name='حدث')
+        cls.sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        cls.other_sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي آخر')
+        cls.nationality = Nationality.objects.create(name='مصر')
+        cls.job = EquivalentJob.objects.create(name='ملحق')
+        cls.delegation = Delegation.objects.create(
+            sub_event_id=cls.sub_event, nationality_id=cls.nationality,
+            delegation_leader_name='رئيس عسكري', type='MILITARY',
+        )
+        cls.other_delegation = Delegation.objects.create(
+            sub_event_id=cls.other_sub_event, delegation_leader_name='رئيس آخر', type='CIVILIAN',
+        )
+        cls.members = Member.objects.bulk_create([
+            Member(delegation_id=cls.delegation, name=f'عضو {i}', rank='عقيد', equivalent_job_id=cls.job)
+            for i in range(3)
+        ])
+        CheckOut.objects.create(
+            delegation_id=cls.delegation, members=[str(cls.members[0].id)], flight_number='MS777',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.enterContext(override_settings(REPORT_CACHE_DIR=cache_dir.name))
+        reports.cache.reset_stats()
+
+    def get(self, report_type='combined', sub_event=None, **params):
+        sub_event = sub_event or self.sub_event
+        return self.client.get(f'/api/reports/{report_type}/', {'sub_event_id': str(sub_event.id), **params})
+
+    def test_renders_the_sub_event_in_one_query(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        # sub event, data version stamp, report rows
+        self.assertEqual(len(captured.captured_queries), 3)
+        html = response.content.decode('utf-8')
+        self.assertIn('dir="rtl"', html)
+        self.assertIn('رئيس عسكري', html)
+        self.assertIn('عضو 2', html)
+        self.assertIn('ملحق', html)
+        self.assertIn('MS777', html)
+        self.assertNotIn('رئيس آخر', html)
+
+        html = self.get('departures').content.decode('utf-8')
+        self.assertIn('MS777', html)
+        self.assertIn('عقيد عضو 0', html)
+        self.assertNotIn('عضو 1', html)
+
+    def test_cache_is_invalidated_by_writes_to_the_report_data_only(self):
+        self.assertEqual(self.get()['X-Report-Cache'], 'miss')
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.get()['X-Report-Cache'], 'hit')
+        self.assertEqual(len(captured.captured_queries), 2)
+
+        Member.objects.create(delegation_id=self.other_delegation, name='عضو خارجي')
+        self.assertEqual(self.get()['X-Report-Cache'], 'hit')
+
+        Member.objects.filter(id=self.members[1].id).update(name='عضو معدل')
+        response = self.get()
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        self.assertIn('عضو معدل', response.content.decode('utf-8'))
+
+        self.assertEqual(self.get()['X-Report-Cache'], 'hit')
+        EquivalentJob.objects.filter(id=self.job.id).update(name='ملحق عسكري')
+        response = self.get()
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        self.assertIn('ملحق عسكري', response.content.decode('utf-8'))
+
+        self.assertEqual(self.get()['X-Report-Cache'], 'hit')
+        SubEvent.objects.filter(id=self.sub_event.id).update(updated_at=timezone.now())
+        self.assertEqual(self.get()['X-Report-Cache'], 'hit')
+        SubEvent.objects.filter(id=self.sub_event.id).update(event_name='حدث فرعي معدل')
+        self.sub_event.refresh_from_db()
+        response = self.get()
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        self.assertIn('حدث فرعي معدل', response.content.decode('utf-8'))
+
+        # Other filters are cached separately; older versions are removed from disk
+        self.assertEqual(self.get(type='CIVILIAN')['X-Report-Cache'], 'miss')
+        self.assertEqual(len(list(reports.cache.directory.iterdir())), 2)
+        stats = self.client.get('/api/reports/stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (5, 5))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_rejects_unknown_reports_and_bad_parameters(self):
+        self.assertEqual(self.get('unknown').status_code, 404)
+        self.assertEqual(self.client.get('/api/reports/combined/').status_code, 400)
+        self.assertEqual(self.get(file_format='docx').status_code, 400)
+        self.assertEqual(self.get(delegation_id='x').status_code, 400)
+
+    @unittest.skipIf(WEASYPRINT, 'weasyprint is usable')
+    def test_pdf_needs_weasyprint(self):
+        self.assertEqual(self.get(file_format='pdf').status_code, 501)
+
+    @unittest.skipUnless(WEASYPRINT, 'weasyprint or the Pango libraries are missing')
+    def test_renders_and_caches_the_pdf(self):
+        response = self.get(file_format='pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('attachment; filename="combined-', response['Content-Disposition'])
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        self.assertTrue(response.content.startswith(b'%PDF-'))
+        cached = self.get(file_format='pdf')
+        self.assertEqual(cached['X-Report-Cache'], 'hit')
+        self.assertEqual(cached.content, response.content)
+
+
+class SearchTests(TestCase):
+    """Search matches Arabic spelling variants and ranks hits across members, delegations and lookups"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', full_name='مستخدم', role='USER')
+        main_event = MainEvent.objects.create(event_name='حدث')
+        cls.sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        other_sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي آخر')
+        cls.nationality = Nationality.objects.create(name='الإمارات')
+        cls.delegation = Delegation.objects.create(
+            sub_event_id=cls.sub_event, nationality_id=cls.nationality,
+            delegation_leader_name='مصطفى كامل', receiver_name='فاطمة الزهراء', type='MILITARY',
+        )
+        cls.other_delegation = Delegation.objects.create(
+            sub_event_id=other_sub_event, delegation_leader_name='علي حسن', type='CIVILIAN',
+        )
+        cls.ahmed = Member.objects.create(delegation_id=cls.delegation, name='أحمد إبراهيم')
+        cls.mohamed = Member.objects.create(delegation_id=cls.delegation, name='مُحَمَّـد علي')
+        cls.ali = Member.objects.create(delegation_id=cls.other_delegation, name='علي')
+        Member.objects.create(delegation_id=cls.other_delegation, name='عليان سالم')
+        Member.objects.create(delegation_id=cls.other_delegation, name='بعلي')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def hits(self, q, **params):
+        response = self.client.get('/api/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(hit['kind'], hit['label']) for hit in response.data['results']]
+
+    def test_spelling_variants_match(self):
+        self.assertEqual(self.hits('احمد ابراهيم'), [('member', 'أحمد إبراهيم')])
+        self.assertEqual(self.hits('محمد'), [('member', 'مُحَمَّـد علي')])
+        self.assertEqual(self.hits('مصطفي'), [('delegation_leader', 'مصطفى كامل')])
+        self.assertEqual(self.hits('فاطمه', kinds='receiver'), [('receiver', 'فاطمة الزهراء')])
+        self.assertEqual(self.hits('الامارات'), [('nationality', 'الإمارات')])
+
+        # The list filters use the same normalization
+        response = self.client.get('/api/members/', {'search': 'ابراهيم'})
+        self.assertEqual([member['id'] for member in response.data['results']], [str(self.ahmed.id)])
+        response = self.client.get('/api/delegations/', {'search': 'مصطفي'})
+        self.assertEqual([delegation['id'] for delegation in response.data['results']], [str(self.delegation.id)])
+        response = self.client.get('/api/nationalities/', {'search': 'الامارات'})
+        self.assertEqual([nationality['id'] for nationality in response.data['results']], [str(self.nationality.id)])
+
+    def test_ranking_and_scope(self):
+        hits = self.hits('علي')
+        # Exact match, then word starts (alphabetical), then other substrings
+        self.assertEqual(hits[0], ('member', 'علي'))
+        self.assertEqual(set(hits[1:4]), {('delegation_leader', 'علي حسن'), ('member', 'عليان سالم'),
+                                          ('member', 'مُحَمَّـد علي')})
+        self.assertEqual(hits[4], ('member', 'بعلي'))
+        self.assertEqual(self.hits('علي', limit=2)[0], ('member', 'علي'))
+
+        scoped = self.hits('علي', sub_event_id=str(self.sub_event.id))
+        self.assertEqual(scoped, [('member', 'مُحَمَّـد علي')])
+
+        # LIKE wildcards are literal
+        self.assertEqual(self.hits('%_'), [])
+
+    def test_rejects_bad_parameters(self):
+        for params in ({'q': 'ع'}, {'q': 'علي', 'kinds': 'member,unknown'}, {'q': 'علي', 'limit': '0'},
+                       {'q': 'علي', 'sub_event_id': 'x'}):
+            self.assertEqual(self.client.get('/api/search/', params).status_code, 400)
+
+    def test_near_matches_with_pg_trgm(self):
+        if not search.trigram_available():
+            self.skipTest('pg_trgm is not installed')
+        self.assertIn(('member', 'أحمد إبراهيم'), self.hits('ابراهم'))
+
+
+class LookupsTests(TestCase):
+    """/api/lookups/ bundles the lookup tables and answers revalidations from the version row alone"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='user', full_name='مستخدم', role='USER')
+        Nationality.objects.create(name='مصر')
+        Cities.objects.create(city_name='القاهرة')
+        AirLine.objects.create(name='مصر للطيران')
+        AirPort.objects.create(name='مطار القاهرة')
+        EquivalentJob.objects.create(name='ملحق')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(broadcast_buffer.flush)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified_reads_only_the_version(self):
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/lookups/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [len(response.data[key]) for key in ('nationalities', 'cities', 'airlines', 'airports', 'equivalent_jobs')],
+            [1, 1, 1, 1, 1],
+        )
+        self.assertEqual(response.data['cities'][0]['city_name'], 'القاهرة')
+        etag = response['ETag']
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/lookups/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+            # Other clients get the payload cached for this version
+            self.assertEqual(self.client.get('/api/lookups/').status_code, 200)
+            self.assertEqual(self.client.get('/api/lookups/', HTTP_IF_NONE_MATCH=f'"x", W/{etag}').status_code, 304)
+        self.assertEqual(self.client.get('/api/lookups/', HTTP_IF_NONE_MATCH='"lookups-0"').status_code, 200)
+
+    def test_committed_lookup_change_invalidates(self):
+        etag = self.client.get('/api/lookups/')['ETag']
+        with transaction.atomic():
+            AirPort.objects.create(name='مطار مرسى علم')
+            transaction.set_rollback(True)
+        self.assertEqual(self.client.get('/api/lookups/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        AirPort.objects.create(name='مطار مرسى علم')
+        response = self.client.get('/api/lookups/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['airports']), 2)
+
+    def test_version_is_shared_by_workers(self):
+        etag = self.client.get('/api/lookups/')['ETag']
+        # Another worker: its own cache, same database
+        cache.clear()
+        self.assertEqual(self.client.get('/api/lookups/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.get('/api/lookups/')
+        # Written without the ORM signals, e.g. by another worker or psql
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE cities SET city_name = 'الإسكندرية'")
+        response = self.client.get('/api/lookups/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cities'][0]['city_name'], 'الإسكندرية')
+
+
+class AuditLogApiTests(TestCase):
+    """/api/audit/ pages a record's history by keyset"""
+
+    def test_record_history_is_keyset_paginated(self):
+        client = APIClient()
+        super_admin = User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN')
+        client.force_authenticate(super_admin)
+        main_event = MainEvent.objects.create(event_name='الحدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='قائد', type='MILITARY')
+        member = Member.objects.create(delegation_id=delegation, name='عضو')
+        for job_title in ('ملحق', 'مستشار'):
+            member.job_title = job_title
+            member.save()
+        Member.objects.create(delegation_id=delegation, name='عضو آخر')
+
+        # Every row has the same changed_at (one transaction): the pages are told apart by id
+        actions = []
+        url = f'/api/audit/?table=member&record_id={member.id}&page_size=2'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['estimated_total'], 3)
+            actions += [row['action'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(actions, ['UPDATE', 'UPDATE', 'INSERT'])
+
+        self.assertEqual(client.get('/api/audit/?record_id=not-a-uuid').status_code, 400)
+        self.assertEqual(client.get('/api/audit/?since=yesterday').status_code, 400)
+        tomorrow = timezone.now().date() + datetime.timedelta(days=1)
+        self.assertEqual(client.get(f'/api/audit/?since={tomorrow}').data['results'], [])
+
+        user_client = APIClient()
+        user_client.force_authenticate(User.objects.create(username='user', full_name='مستخدم', role='USER'))
+        self.assertEqual(user_client.get('/api/audit/').status_code, 403)
+
+
+class DelegationTotalsTests(TestCase):
+    """current_members, departed_members and status come only from the member triggers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='admin', full_name='مدير النظام', role='SUPER_ADMIN'))
+        main_event = MainEvent.objects.create(event_name='حدث')
+        sub_event = SubEvent.objects.create(main_event_id=main_event, event_name='فرعي')
+        self.delegation = Delegation.objects.create(sub_event_id=sub_event, delegation_leader_name='رئيس', type='CIVILIAN')
+
+    def totals(self):
+        self.delegation.refresh_from_db()
+        return self.delegation.current_members, self.delegation.departed_members, self.delegation.status
+
+    def test_member_writes_do_not_save_the_delegation(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post('/api/members/', {'delegation_id': str(self.delegation.id), 'name': 'عضو'})
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse([query for query in captured.captured_queries if query['sql'].startswith('UPDATE "delegation"')])
+        self.assertEqual(self.totals(), (1, 0, 'NOT_DEPARTED'))
+
+        member_id = response.data['id']
+        self.client.patch(f'/api/members/{member_id}/', {'status': 'DEPARTED'})
+        self.assertEqual(self.totals(), (1, 1, 'FULLY_DEPARTED'))
+        Member.objects.create(delegation_id=self.delegation, name='عضو آخر')
+        self.assertEqual(self.totals(), (2, 1, 'PARTIALLY_DEPARTED'))
+        self.client.delete(f'/api/members/{member_id}/')
+        self.assertEqual(self.totals(), (1, 0, 'NOT_DEPARTED'))
+
+    def test_status_is_read_only(self):
+        response = self.client.patch(f'/api/delegations/{self.delegation.id}/', {'status': 'FULLY_DEPARTED'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(), (0, 0, 'NOT_DEPARTED'))
+
+    def test_stale_delegation_save_keeps_member_totals(self):
+        stale = Delegation.objects.get(id=self.delegation.id)
+        Member.objects.create(delegation_id=self.delegation, name='عضو')
+        Member.objects.create(delegation_id=self.delegation, name='عضو آخر', status='DEPARTED')
+        stale.delegation_leader_name = 'رئيس جديد'
+        stale.save()
+        self.assertEqual((stale.current_members, stale.departed_members, stale.status), (2, 1, 'PARTIALLY_DEPARTED'))
+        Member.objects.create(delegation_id=self.delegation, name='عضو ثالث')
+        self.assertEqual(self.totals(), (3, 1, 'PARTIALLY_DEPARTED'))
+        self.assertEqual(self.delegation.delegation_leader_name, 'رئيس جديد')
+        self.assertEqual(counters.delegation_drift(), [])
+
+        stale.status = 'FULLY_DEPARTED'
+        with self.assertRaises(ValueError):
+            stale.save(update_fields=['status', 'delegation_leader_name'])
+        self.assertEqual(self.totals(), (3, 1, 'PARTIALLY_DEPARTED'))
+
+    def test_reconcile_fixes_drift(self):
+        Member.objects.bulk_create([Member(delegation_id=self.delegation, name=f'عضو {i}') for i in range(3)])
+        Delegation.objects.filter(id=self.delegation.id).update(current_members=9, status='FULLY_DEPARTED')
+        self.assertEqual(len(counters.delegation_drift()), 2)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_delegation_counters', check=True, stdout=StringIO())
+
+        out = StringIO()
+        call_command('reconcile_delegation_counters', stdout=out)
+        self.assertIn('(1 delegation(s) fixed)', out.getvalue())
+        self.assertEqual(self.totals(), (3, 0, 'NOT_DEPARTED'))
+        self.assertEqual(counters.delegation_drift(), [])
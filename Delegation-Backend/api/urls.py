@@ -13,9 +13,15 @@ router.register(r'equivalent-jobs', views.EquivalentJobViewSet)
 router.register(r'delegations', views.DelegationViewSet)
 router.register(r'members', views.MemberViewSet)
 router.register(r'check-outs', views.CheckOutViewSet)
+router.register(r'lookups', views.LookupsViewSet, basename='lookups')
+router.register(r'exports', views.ExportViewSet, basename='exports')
+router.register(r'reports', views.ReportViewSet, basename='reports')
+router.register(r'search', views.SearchViewSet, basename='search')
+router.register(r'schedule', views.ScheduleViewSet, basename='schedule')
 router.register(r'dashboard', views.DashboardViewSet, basename='dashboard')
 router.register(r'auth', views.AuthViewSet, basename='auth')
 router.register(r'users', views.UserViewSet)
+router.register(r'audit', views.AuditLogViewSet, basename='audit')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,33 +1,53 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import mixins, viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Count, Q
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import transaction
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.authtoken.models import Token
+from accounts.authentication import issue_token, rotate_token
+from accounts.log_writer import writer as log_writer
+from accounts.models import AdminAccessToken, AuditLog
 from .permissions import (
     IsSuperAdminOrReadOnly, IsAdminOrReadOnly, IsUserOrReadOnly,
     IsSuperAdminOnly, IsAdminOrSuperAdmin, CanManageUsers, CanViewReports, CanDeleteData
 )
+from .broadcast import buffer as broadcast_buffer
+from .bulk import validate_items
+from .exports import CONTENT_TYPES, stream_export
+from . import counters, lookups, reports, schedule
+from .channel_layer import channel_layer_health
+from .pagination import AuditLogPagination, KeysetPagination, SizedPageNumberPagination
+from .query_plan import plan_queryset
+from .search import ArabicNormalize, normalized
+from . import search as search_index
+import datetime
 import json
+import uuid
 
 User = get_user_model()
 from .models import (
     MainEvent, SubEvent, Nationality, Cities,
-    AirLine, AirPort, EquivalentJob, Delegation, Member, CheckOut
+    AirLine, AirPort, EquivalentJob, Delegation, Member, CheckOut, CheckOutMember, DashboardCounter
 )
 from .serializers import (
     MainEventSerializer, SubEventSerializer, NationalitySerializer,
     CitiesSerializer, AirLineSerializer, AirPortSerializer, EquivalentJobSerializer,
-    DelegationSerializer, MemberSerializer, CheckOutSerializer,
-    DashboardDataSerializer, UserSerializer
+    DelegationSerializer, MemberSerializer, MemberBulkSerializer, CheckOutSerializer, CheckOutBulkSerializer,
+    DashboardDataSerializer, UserSerializer, AuditLogSerializer
 )
+from .signals import send_update_signal, delegation_totals_changed
 
 
 class MainEventViewSet(viewsets.ModelViewSet):
     queryset = MainEvent.objects.all()
     serializer_class = MainEventSerializer
+    pagination_class = SizedPageNumberPagination
     permission_classes = [IsAdminOrSuperAdmin]  # فقط ADMIN و SUPER_ADMIN يمكنهم إدارة الأحداث
     
     def get_permissions(self):
@@ -43,11 +63,11 @@ class MainEventViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        queryset = MainEvent.objects.all().prefetch_related('sub_events')
+        queryset = MainEvent.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(event_name__icontains=search)
-        return queryset.order_by('-created_at')
+            queryset = queryset.alias(event_name_search=ArabicNormalize('event_name')).filter(event_name_search__contains=normalized(search))
+        return plan_queryset(queryset.order_by('-created_at'), self.get_serializer())
     
     def perform_create(self, serializer):
         instance = serializer.save(created_by=self.request.user)
@@ -62,6 +82,7 @@ class MainEventViewSet(viewsets.ModelViewSet):
 class SubEventViewSet(viewsets.ModelViewSet):
     queryset = SubEvent.objects.all()
     serializer_class = SubEventSerializer
+    pagination_class = SizedPageNumberPagination
     permission_classes = [IsAdminOrSuperAdmin]  # فقط ADMIN و SUPER_ADMIN يمكنهم إدارة الأحداث الفرعية
     
     def get_permissions(self):
@@ -77,16 +98,16 @@ class SubEventViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
-        queryset = SubEvent.objects.all().select_related('main_event_id')
+        queryset = SubEvent.objects.all()
         main_event_id = self.request.query_params.get('main_event_id', None)
         search = self.request.query_params.get('search', None)
         
         if main_event_id:
             queryset = queryset.filter(main_event_id=main_event_id)
         if search:
-            queryset = queryset.filter(event_name__icontains=search)
+            queryset = queryset.alias(event_name_search=ArabicNormalize('event_name')).filter(event_name_search__contains=normalized(search))
         
-        return queryset.order_by('-created_at')
+        return plan_queryset(queryset.order_by('-created_at'), self.get_serializer())
 
 
 class NationalityViewSet(viewsets.ModelViewSet):
@@ -98,7 +119,7 @@ class NationalityViewSet(viewsets.ModelViewSet):
         queryset = Nationality.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = queryset.alias(name_search=ArabicNormalize('name')).filter(name_search__contains=normalized(search))
         return queryset.order_by('name')
     
     def perform_destroy(self, instance):
@@ -115,7 +136,7 @@ class CitiesViewSet(viewsets.ModelViewSet):
         queryset = Cities.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(city_name__icontains=search)
+            queryset = queryset.alias(name_search=ArabicNormalize('city_name')).filter(name_search__contains=normalized(search))
         return queryset.order_by('city_name')
     
     def perform_destroy(self, instance):
@@ -132,7 +153,7 @@ class AirLineViewSet(viewsets.ModelViewSet):
         queryset = AirLine.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = queryset.alias(name_search=ArabicNormalize('name')).filter(name_search__contains=normalized(search))
         return queryset.order_by('name')
     
     def perform_destroy(self, instance):
@@ -149,7 +170,7 @@ class AirPortViewSet(viewsets.ModelViewSet):
         queryset = AirPort.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = queryset.alias(name_search=ArabicNormalize('name')).filter(name_search__contains=normalized(search))
         return queryset.order_by('name')
     
     def perform_destroy(self, instance):
@@ -166,7 +187,7 @@ class EquivalentJobViewSet(viewsets.ModelViewSet):
         queryset = EquivalentJob.objects.all()
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = queryset.alias(name_search=ArabicNormalize('name')).filter(name_search__contains=normalized(search))
         return queryset.order_by('name')
 
 
@@ -175,17 +196,28 @@ class DelegationViewSet(viewsets.ModelViewSet):
     serializer_class = DelegationSerializer
     permission_classes = [IsAdminOrReadOnly]  # ADMIN/SUPER_ADMIN يمكنهم التعديل/الحذف، USER للقراءة فقط
     
+    pagination_class = KeysetPagination
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # القائمة لا تتضمن الأعضاء إلا مع ?expand=members
+        context['expand_by_default'] = self.action != 'list'
+        return context
+    
     def get_queryset(self):
-        queryset = Delegation.objects.all().select_related(
-            'nationality_id', 'sub_event_id__main_event_id'
-        ).prefetch_related('members')
+        queryset = self.filter_by_params(Delegation.objects.all(), self.request.query_params)
         
-        # Filters
-        sub_event_id = self.request.query_params.get('sub_event_id', None)
-        nationality_id = self.request.query_params.get('nationality_id', None)
-        delegation_type = self.request.query_params.get('type', None)
-        status_filter = self.request.query_params.get('status', None)
-        search = self.request.query_params.get('search', None)
+        # الربط والجلب المسبق حسب الحقول المطلوبة فعلاً (?fields= / ?expand=)
+        return plan_queryset(queryset.order_by('-created_at'), self.get_serializer())
+    
+    @staticmethod
+    def filter_by_params(queryset, params):
+        """List filters, shared with the delegations export"""
+        sub_event_id = params.get('sub_event_id', None)
+        nationality_id = params.get('nationality_id', None)
+        delegation_type = params.get('type', None)
+        status_filter = params.get('status', None)
+        search = params.get('search', None)
         
         if sub_event_id:
             queryset = queryset.filter(sub_event_id=sub_event_id)
@@ -196,9 +228,8 @@ class DelegationViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         if search:
-            queryset = queryset.filter(delegation_leader_name__icontains=search)
-        
-        return queryset.order_by('-created_at')
+            queryset = queryset.filter(leader_search__contains=normalized(search))
+        return queryset
     
     def perform_create(self, serializer):
         instance = serializer.save(created_by=self.request.user)
@@ -213,26 +244,27 @@ class DelegationViewSet(viewsets.ModelViewSet):
 class MemberViewSet(viewsets.ModelViewSet):
     queryset = Member.objects.all()
     serializer_class = MemberSerializer
+    pagination_class = SizedPageNumberPagination
     permission_classes = [IsUserOrReadOnly]  # USER يمكنه الإضافة، ADMIN/SUPER_ADMIN يمكنهم التعديل/الحذف
     
     def get_queryset(self):
-        queryset = Member.objects.all().select_related(
-            'delegation_id__nationality_id', 'delegation_id__sub_event_id'
-        )
-        
-        # Filters
-        delegation_id = self.request.query_params.get('delegation_id', None)
-        status_filter = self.request.query_params.get('status', None)
-        search = self.request.query_params.get('search', None)
+        queryset = self.filter_by_params(Member.objects.all(), self.request.query_params)
+        return plan_queryset(queryset.order_by('-created_at'), self.get_serializer())
+    
+    @staticmethod
+    def filter_by_params(queryset, params):
+        """List filters, shared with the members export"""
+        delegation_id = params.get('delegation_id', None)
+        status_filter = params.get('status', None)
+        search = params.get('search', None)
         
         if delegation_id:
             queryset = queryset.filter(delegation_id=delegation_id)
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         if search:
-            queryset = queryset.filter(name__icontains=search)
-        
-        return queryset.order_by('-created_at')
+            queryset = queryset.filter(name_search__contains=normalized(search))
+        return queryset
     
     def perform_create(self, serializer):
         instance = serializer.save(created_by=self.request.user)
@@ -243,10 +275,10 @@ class MemberViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         # Before deleting the member, handle checkout sessions
         try:
-            # Find all checkout sessions that contain this member
+            # Find all checkout sessions that contain this member (indexed join on checkout_member)
             checkout_sessions = CheckOut.objects.filter(
                 delegation_id=instance.delegation_id,
-                members__contains=[str(instance.id)]
+                member_links__member_id=instance
             )
             
             for session in checkout_sessions:
@@ -271,27 +303,170 @@ class MemberViewSet(viewsets.ModelViewSet):
             
         instance.delete()
 
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create (POST), update (PATCH, each item with its ``id``) or delete
+        (DELETE, a list of ids) many members in one transaction.
+
+        The list is validated in one pass and written with one statement, so
+        the member triggers update the delegation totals once. Invalid items
+        are reported by index in ``errors`` without failing the rest. One
+        ``Member`` "bulk" event per delegation is broadcast instead of one
+        event per member.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'يجب إرسال قائمة'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'الحد الأقصى {settings.BULK_MAX_ITEMS} عنصر في الطلب الواحد'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            if request.method == 'POST':
+                key, result, errors, delegation_ids = 'created', *self._bulk_create(items)
+            elif request.method == 'PATCH':
+                key, result, errors, delegation_ids = 'updated', *self._bulk_update(items)
+            else:
+                key, result, errors, delegation_ids = 'deleted', *self._bulk_delete(items)
+            for delegation_id in delegation_ids:
+                send_update_signal("Member", "bulk", None, delegation_id)
+                delegation_totals_changed(delegation_id)
+
+        if key != 'deleted':
+            result = self._render_members(result)
+        if not result and errors:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif key == 'created':
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({key: result, 'errors': errors}, status=response_status)
+
+    def _bulk_create(self, items):
+        serializer = MemberBulkSerializer(context=self.get_serializer_context())
+        valid, errors = validate_items(serializer, items)
+        members = [Member(**{**attrs, 'created_by': self.request.user}) for _, attrs in valid]
+        Member.objects.bulk_create(members)
+        return [member.pk for member in members], errors, {member.delegation_id_id for member in members}
+
+    def _bulk_update(self, items):
+        found = Member.objects.in_bulk(self._member_ids(items))
+        instances = [
+            found.get(self._member_id(item)) if isinstance(item, dict) else None
+            for item in items
+        ]
+        missing = {index for index, item in enumerate(items) if isinstance(item, dict) and instances[index] is None}
+        serializer = MemberBulkSerializer(context=self.get_serializer_context(), partial=True)
+        valid, errors = validate_items(serializer, items, instances)
+        valid = [(index, attrs) for index, attrs in valid if index not in missing]
+        errors = sorted(
+            [error for error in errors if error['index'] not in missing]
+            + [{'index': index, 'errors': {'id': ['العضو غير موجود']}} for index in missing],
+            key=lambda error: error['index'],
+        )
+
+        now = timezone.now()
+        fields = {'updated_by', 'updated_at'}
+        members = []
+        delegation_ids = set()
+        for index, attrs in valid:
+            member = instances[index]
+            # Both the old and the new delegation when a member is moved
+            delegation_ids.add(member.delegation_id_id)
+            for name, value in attrs.items():
+                setattr(member, name, value)
+            delegation_ids.add(member.delegation_id_id)
+            member.updated_by = self.request.user
+            member.updated_at = now
+            fields.update(attrs)
+            members.append(member)
+        if members:
+            Member.objects.bulk_update(members, sorted(fields))
+        return [member.pk for member in members], errors, delegation_ids
+
+    def _bulk_delete(self, ids):
+        found = dict(
+            Member.objects.filter(pk__in=self._member_ids(ids)).values_list('id', 'delegation_id')
+        )
+        deleted = []
+        errors = []
+        for index, value in enumerate(ids):
+            member_id = self._member_id({'id': value})
+            if member_id in found:
+                deleted.append(member_id)
+            else:
+                errors.append({'index': index, 'errors': {'id': ['العضو غير موجود']}})
+        if deleted:
+            self._remove_from_check_outs(deleted)
+            CheckOutMember.objects.filter(member_id__in=deleted).delete()
+            # One DELETE without the collector's per-row signals (the "bulk" event replaces them);
+            # the statement-level triggers keep the delegation totals and counters
+            members = Member.objects.filter(pk__in=deleted)
+            members._raw_delete(members.db)
+        return [str(member_id) for member_id in deleted], errors, {found[member_id] for member_id in deleted}
+
+    def _remove_from_check_outs(self, member_ids):
+        """Drop the members from their check-out sessions; sessions left empty are deleted"""
+        removed = {str(member_id) for member_id in member_ids}
+        empty = []
+        for session in CheckOut.objects.filter(member_links__member_id__in=member_ids).distinct():
+            remaining = [m for m in session.members or [] if str(m) not in removed]
+            if remaining:
+                session.members = remaining
+                session.save()
+            else:
+                empty.append(session.pk)
+        if empty:
+            CheckOut.objects.filter(pk__in=empty).delete()
+
+    @staticmethod
+    def _member_id(item):
+        """The item's member id as a UUID, ``None`` when missing or malformed"""
+        try:
+            return uuid.UUID(str(item.get('id')))
+        except ValueError:
+            return None
+
+    def _member_ids(self, items):
+        ids = {self._member_id(item if isinstance(item, dict) else {'id': item}) for item in items}
+        ids.discard(None)
+        return ids
+
+    def _render_members(self, member_ids):
+        """Serialize the written members in request order, in a fixed number of queries"""
+        serializer = MemberSerializer(many=True, context=self.get_serializer_context())
+        rows = plan_queryset(Member.objects.filter(pk__in=member_ids), serializer).in_bulk()
+        serializer.instance = [rows[member_id] for member_id in member_ids]
+        return serializer.data
+
 
 class CheckOutViewSet(viewsets.ModelViewSet):
     queryset = CheckOut.objects.all()
     serializer_class = CheckOutSerializer
+    pagination_class = SizedPageNumberPagination
     permission_classes = [IsUserOrReadOnly]  # USER يمكنه الإضافة، ADMIN/SUPER_ADMIN يمكنهم التعديل/الحذف
     
     def get_queryset(self):
-        queryset = CheckOut.objects.all().select_related(
-            'delegation_id__nationality_id', 'delegation_id__sub_event_id'
-        )
-        
-        # Filters
-        delegation_id = self.request.query_params.get('delegation_id', None)
-        checkout_date = self.request.query_params.get('checkout_date', None)
+        queryset = self.filter_by_params(CheckOut.objects.all(), self.request.query_params)
+        return plan_queryset(queryset.order_by('-created_at'), self.get_serializer())
+    
+    @staticmethod
+    def filter_by_params(queryset, params):
+        """List filters, shared with the check-outs export"""
+        delegation_id = params.get('delegation_id', None)
+        checkout_date = params.get('checkout_date', None)
+        member_id = params.get('member_id', None)
         
         if delegation_id:
             queryset = queryset.filter(delegation_id=delegation_id)
         if checkout_date:
             queryset = queryset.filter(checkout_date=checkout_date)
-        
-        return queryset.order_by('-created_at')
+        if member_id:
+            queryset = queryset.filter(member_links__member_id=member_id)
+        return queryset
     
     def perform_create(self, serializer):
         instance = serializer.save(created_by=self.request.user)
@@ -321,15 +496,294 @@ class CheckOutViewSet(viewsets.ModelViewSet):
     
     def perform_destroy(self, instance):
         # Before delete: revert members in this session to NOT_DEPARTED
+        Member.objects.filter(check_out_links__check_out_id=instance, delegation_id=instance.delegation_id).update(
+            status='NOT_DEPARTED', departure_date=None
+        )
+        instance.delete()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many check-out sessions in one transaction.
+
+        The body is a list of sessions, or ``{"delegation_ids": [...], ...}``
+        for one session per delegation sharing the other fields (the
+        delegations leaving on one flight). A session without ``members``
+        takes every member of its delegation that has not departed yet.
+
+        The sessions are written with one INSERT, so the check-out and member
+        triggers mark every member departed and recount each delegation once.
+        Invalid sessions are reported by index in ``errors`` without failing
+        the rest. One ``CheckOut`` "bulk" event is broadcast, plus one
+        ``Delegation`` update per delegation, instead of events per session.
+        """
+        items = request.data
+        if isinstance(items, dict) and isinstance(items.get('delegation_ids'), list):
+            shared = {key: value for key, value in items.items() if key != 'delegation_ids'}
+            items = [{**shared, 'delegation_id': delegation_id} for delegation_id in items['delegation_ids']]
+        if not isinstance(items, list):
+            return Response({'error': 'يجب إرسال قائمة أو delegation_ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'الحد الأقصى {settings.BULK_MAX_ITEMS} عنصر في الطلب الواحد'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            serializer = CheckOutBulkSerializer(context=self.get_serializer_context())
+            valid, errors = validate_items(serializer, items)
+            valid, member_errors = self._session_members(items, valid)
+            errors = sorted(errors + member_errors, key=lambda error: error['index'])
+            sessions = [CheckOut(**{**attrs, 'created_by': request.user}) for _, attrs in valid]
+            CheckOut.objects.bulk_create(sessions)
+            if sessions:
+                send_update_signal("CheckOut", "bulk")
+            for delegation_id in dict.fromkeys(session.delegation_id_id for session in sessions):
+                delegation_totals_changed(delegation_id)
+
+        if not sessions and errors:
+            return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = CheckOutSerializer(many=True, context=self.get_serializer_context())
+        rows = plan_queryset(CheckOut.objects.filter(pk__in=[session.pk for session in sessions]), serializer).in_bulk()
+        serializer.instance = [rows[session.pk] for session in sessions]
+        return Response({'created': serializer.data, 'errors': errors}, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _session_members(items, valid):
+        """
+        Check the members of each valid session against its delegation, in two queries.
+
+        Listed members must belong to the session's delegation, must not have
+        departed and may appear only once in the whole request; a session
+        without ``members`` gets the delegation's members that have not
+        departed and are not listed by an earlier session. Returns
+        ``(valid, errors)`` with ``members`` as id strings.
+        """
+        listed = {}
+        for index, attrs in valid:
+            if 'members' in items[index]:
+                members = attrs.get('members')
+                ids = []
+                for member_id in members if isinstance(members, list) else [None]:
+                    try:
+                        ids.append(uuid.UUID(str(member_id)))
+                    except ValueError:
+                        ids.append(None)
+                listed[index] = ids
+        known = {
+            member_id: (delegation_id, member_status)
+            for member_id, delegation_id, member_status in Member.objects.filter(
+                pk__in={member_id for ids in listed.values() for member_id in ids if member_id}
+            ).values_list('id', 'delegation_id', 'status')
+        }
+        remaining = {}
+        whole = {attrs['delegation_id'].pk for index, attrs in valid if index not in listed}
+        if whole:
+            for delegation_id, member_id in Member.objects.filter(delegation_id__in=whole).exclude(
+                status='DEPARTED'
+            ).order_by('created_at').values_list('delegation_id', 'id'):
+                remaining.setdefault(delegation_id, []).append(member_id)
+
+        checked = []
+        errors = []
+        # Members given to an earlier session of this request
+        claimed = set()
+        for index, attrs in valid:
+            delegation_id = attrs['delegation_id'].pk
+            if index in listed:
+                ids = listed[index]
+                if not ids or any(known.get(member_id, (None,))[0] != delegation_id for member_id in ids):
+                    errors.append({'index': index, 'errors': {'members': ['أعضاء غير موجودين في هذا الوفد']}})
+                    continue
+                if any(known[member_id][1] == 'DEPARTED' for member_id in ids):
+                    errors.append({'index': index, 'errors': {'members': ['أعضاء غادروا بالفعل']}})
+                    continue
+                if len(set(ids)) < len(ids) or claimed.intersection(ids):
+                    errors.append({'index': index, 'errors': {'members': ['أعضاء مكررون في هذا الطلب']}})
+                    continue
+            else:
+                ids = [member_id for member_id in remaining.get(delegation_id, []) if member_id not in claimed]
+                if not ids:
+                    errors.append({'index': index, 'errors': {'members': ['لا يوجد أعضاء لم يغادروا في هذا الوفد']}})
+                    continue
+            claimed.update(ids)
+            checked.append((index, {**attrs, 'members': [str(member_id) for member_id in ids]}))
+        return checked, errors
+
+
+class LookupsViewSet(viewsets.ViewSet):
+    """
+    All five lookup tables in one response (see ``lookups.py``), with a
+    strong ``ETag``. A matching ``If-None-Match`` gets ``304 Not Modified``
+    after reading only the version row.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        version = lookups.current_version()
+        etag = lookups.etag_for(version)
+        if lookups.not_modified(request.headers.get('If-None-Match'), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(lookups.payload(version))
+        response['ETag'] = etag
+        # Clients may keep the response but must revalidate it every time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    CSV / XLSX files of delegations, members and check-out sessions, streamed
+    row by row (see ``exports.py``). Take the same filters as the list
+    endpoints plus ``?file_format=csv|xlsx`` (xlsx by default).
+    """
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'])
+    def delegations(self, request):
+        return self.export('delegations', DelegationViewSet.filter_by_params(Delegation.objects.all(), request.query_params))
+
+    @action(detail=False, methods=['get'])
+    def members(self, request):
+        return self.export('members', MemberViewSet.filter_by_params(Member.objects.all(), request.query_params))
+
+    @action(detail=False, methods=['get'], url_path='check-outs')
+    def check_outs(self, request):
+        return self.export('check-outs', CheckOutViewSet.filter_by_params(CheckOut.objects.all(), request.query_params))
+
+    def export(self, name, queryset):
+        file_format = self.request.query_params.get('file_format', 'xlsx')
+        if file_format not in CONTENT_TYPES:
+            return Response({'error': 'file_format يجب أن يكون csv أو xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            stream_export(name, queryset.order_by('-created_at'), file_format),
+            content_type=CONTENT_TYPES[file_format],
+        )
+        filename = f'{name}-{timezone.localdate().isoformat()}.{file_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """
+    Printable reports of a sub event (see ``reports.py``):
+    ``/api/reports/<delegations|members|combined|departures>/?sub_event_id=...``
+    with optional ``delegation_id``, ``type``, ``status`` and
+    ``file_format=html|pdf`` (html by default). Rendered reports are cached on
+    disk until the sub event's data changes; ``X-Report-Cache`` tells whether
+    the response was a hit and ``/api/reports/stats/`` returns the hit ratio
+    and render times.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def retrieve(self, request, pk=None):
+        if pk not in reports.REPORT_TYPES:
+            return Response({'error': f'نوع التقرير يجب أن يكون أحد: {", ".join(reports.REPORT_TYPES)}'},
+                            status=status.HTTP_404_NOT_FOUND)
+        file_format = request.query_params.get('file_format', 'html')
+        if file_format not in reports.CONTENT_TYPES:
+            return Response({'error': 'file_format يجب أن يكون html أو pdf'}, status=status.HTTP_400_BAD_REQUEST)
+        filters = {
+            name: request.query_params[name]
+            for name in reports.FILTER_COLUMNS if request.query_params.get(name)
+        }
         try:
-            member_ids = [str(m) for m in (instance.members or [])]
-        except Exception:
-            member_ids = []
-        if member_ids:
-            Member.objects.filter(id__in=member_ids, delegation_id=instance.delegation_id).update(
-                status='NOT_DEPARTED', departure_date=None
+            sub_event_id = uuid.UUID(request.query_params.get('sub_event_id', ''))
+            if 'delegation_id' in filters:
+                filters['delegation_id'] = str(uuid.UUID(filters['delegation_id']))
+        except ValueError:
+            return Response({'error': 'sub_event_id مطلوب و delegation_id يجب أن يكون معرفاً صالحاً'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        sub_event = SubEvent.objects.filter(id=sub_event_id).first()
+        if sub_event is None:
+            return Response({'error': 'الحدث الفرعي غير موجود'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            content, hit = reports.cache.get_or_render(pk, sub_event, filters, file_format)
+        except reports.ReportUnavailable as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        response = HttpResponse(content, content_type=reports.CONTENT_TYPES[file_format])
+        response['X-Report-Cache'] = 'hit' if hit else 'miss'
+        if not hit:
+            response['X-Report-Render-Ms'] = str(reports.cache.stats()['render_ms_last'])
+        if file_format == 'pdf':
+            filename = f'{pk}-{timezone.localdate().isoformat()}.pdf'
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        return Response(reports.cache.stats())
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    ``/api/search/?q=...`` ranks members, delegation leaders, receivers and
+    lookup names matching ``q`` after Arabic normalization (see ``search.py``).
+    Optional: ``kinds`` (comma separated, from ``search.SOURCES``),
+    ``sub_event_id`` (restricts members and delegations) and ``limit``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not search_index.MIN_QUERY_LENGTH <= len(query) <= search_index.MAX_QUERY_LENGTH:
+            return Response(
+                {'error': f'q يجب أن يكون بين {search_index.MIN_QUERY_LENGTH} و {search_index.MAX_QUERY_LENGTH} حرفاً'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        instance.delete()
+        kinds = [kind for kind in request.query_params.get('kinds', '').split(',') if kind]
+        unknown = set(kinds) - set(search_index.SOURCES)
+        if unknown:
+            return Response({'error': f'أنواع غير معروفة: {", ".join(sorted(unknown))}'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', search_index.DEFAULT_LIMIT))
+            if limit < 1:
+                raise ValueError(limit)
+            sub_event_id = request.query_params.get('sub_event_id')
+            if sub_event_id:
+                sub_event_id = str(uuid.UUID(sub_event_id))
+        except ValueError:
+            return Response({'error': 'limit أو sub_event_id غير صالح'}, status=status.HTTP_400_BAD_REQUEST)
+        hits = search_index.top_hits(query, kinds=kinds, sub_event_id=sub_event_id,
+                                     limit=min(limit, search_index.MAX_LIMIT))
+        return Response({'query': query, 'results': hits})
+
+
+class ScheduleViewSet(viewsets.ViewSet):
+    """
+    ``/api/schedule/?from=...&to=...`` lists the arrivals and departures in
+    ``[from, to)`` across all events, one slot per time, airport and flight
+    with its delegations and member totals (see ``schedule.py``). ``to``
+    defaults to a day after ``from``. Optional: ``airport_id`` and ``kind``
+    (``arrival`` or ``departure``).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        start = schedule.parse_moment(request.query_params.get('from', ''))
+        end = request.query_params.get('to')
+        end = schedule.parse_moment(end) if end else start and start + datetime.timedelta(days=1)
+        if start is None or end is None:
+            return Response({'error': 'from و to يجب أن يكونا تاريخاً أو وقتاً بصيغة ISO 8601'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not start < end <= start + schedule.MAX_WINDOW:
+            return Response({'error': f'الفترة يجب أن تكون موجبة ولا تتجاوز {schedule.MAX_WINDOW.days} أيام'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        kind = request.query_params.get('kind')
+        if kind and kind not in schedule.KINDS:
+            return Response({'error': f'kind يجب أن يكون أحد: {", ".join(schedule.KINDS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            airport_id = request.query_params.get('airport_id')
+            if airport_id:
+                airport_id = str(uuid.UUID(airport_id))
+        except ValueError:
+            return Response({'error': 'airport_id غير صالح'}, status=status.HTTP_400_BAD_REQUEST)
+
+        slots = schedule.slots(start, end, airport_id=airport_id, kinds=[kind] if kind else schedule.KINDS)
+        return Response({'from': start, 'to': end, 'slots': slots})
 
 
 class DashboardViewSet(viewsets.ViewSet):
@@ -339,74 +793,70 @@ class DashboardViewSet(viewsets.ViewSet):
     def stats(self, request):
         """Get dashboard statistics"""
         
-        # Optimize queries using single aggregation
-        from django.db.models import Count, Q
-        
-        # Get all counts in optimized queries
-        delegation_counts = Delegation.objects.aggregate(
-            total=Count('id'),
-            military=Count('id', filter=Q(type='MILITARY')),
-            civilian=Count('id', filter=Q(type='CIVILIAN')),
-            not_departed=Count('id', filter=Q(status='NOT_DEPARTED')),
-            partially_departed=Count('id', filter=Q(status='PARTIALLY_DEPARTED')),
-            fully_departed=Count('id', filter=Q(status='FULLY_DEPARTED'))
-        )
-        
-        member_counts = Member.objects.aggregate(
-            total=Count('id'),
-            not_departed=Count('id', filter=Q(status='NOT_DEPARTED')),
-            departed=Count('id', filter=Q(status='DEPARTED'))
+        # Counters are maintained by database triggers, so this is a single primary-key read.
+        # Optional ?main_event_id= / ?sub_event_id= narrow the counters to one event.
+        scope_key = DashboardCounter.scope_key_for(
+            main_event_id=request.query_params.get('main_event_id'),
+            sub_event_id=request.query_params.get('sub_event_id'),
         )
-        
-        # Event stats
-        event_stats = {
-            'total_main_events': MainEvent.objects.count(),
-            'total_sub_events': SubEvent.objects.count(),
-            'total_delegations': delegation_counts['total'],
-            'total_members': member_counts['total'],
-            'total_check_outs': CheckOut.objects.count(),
-        }
-        
-        # Delegation stats
-        delegation_stats = {
-            'total_delegations': delegation_counts['total'],
-            'military_delegations': delegation_counts['military'],
-            'civilian_delegations': delegation_counts['civilian'],
-            'not_departed': delegation_counts['not_departed'],
-            'partially_departed': delegation_counts['partially_departed'],
-            'fully_departed': delegation_counts['fully_departed'],
-        }
-        
-        # Member stats
-        member_stats = {
-            'total_members': member_counts['total'],
-            'not_departed_members': member_counts['not_departed'],
-            'departed_members': member_counts['departed'],
-        }
+        scope_counters = DashboardCounter.for_scope(scope_key)
         
         # Recent data
-        recent_delegations = Delegation.objects.select_related(
-            'nationality_id', 'sub_event_id__main_event_id'
-        ).order_by('-created_at')[:10]
+        recent_delegations = plan_queryset(Delegation.objects.order_by('-created_at'), DelegationSerializer())[:10]
         
-        recent_members = Member.objects.select_related(
-            'delegation_id__nationality_id'
-        ).order_by('-created_at')[:10]
+        recent_members = plan_queryset(Member.objects.order_by('-created_at'), MemberSerializer())[:10]
         
-        recent_check_outs = CheckOut.objects.select_related(
-            'delegation_id__nationality_id'
-        ).order_by('-created_at')[:10]
+        # Members of all ten sessions are resolved together by CheckOutListSerializer
+        recent_check_outs = plan_queryset(CheckOut.objects.order_by('-created_at'), CheckOutSerializer())[:10]
         
         data = {
-            'event_stats': event_stats,
-            'delegation_stats': delegation_stats,
-            'member_stats': member_stats,
+            **scope_counters.as_stats(),
             'recent_delegations': DelegationSerializer(recent_delegations, many=True).data,
             'recent_members': MemberSerializer(recent_members, many=True).data,
             'recent_check_outs': CheckOutSerializer(recent_check_outs, many=True).data,
         }
         
         return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        """Daily arrivals, departures and in-country members, optionally for one event and ?from= / ?to= dates"""
+        params = request.query_params
+        try:
+            main_event_id = params.get('main_event_id') and str(uuid.UUID(params['main_event_id']))
+            sub_event_id = params.get('sub_event_id') and str(uuid.UUID(params['sub_event_id']))
+        except ValueError:
+            return Response({'error': 'معرف الحدث غير صالح'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = params.get('from') and parse_date(params['from'])
+            end = params.get('to') and parse_date(params['to'])
+        except ValueError:
+            start = end = None
+        if (params.get('from') and not start) or (params.get('to') and not end):
+            return Response({'error': 'from و to يجب أن يكونا تاريخاً بصيغة YYYY-MM-DD'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start and end and not 0 <= (end - start).days < counters.TIMESERIES_MAX_DAYS:
+            return Response({'error': f'الفترة يجب أن تكون موجبة ولا تتجاوز {counters.TIMESERIES_MAX_DAYS} يوماً'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        days = counters.timeseries(start, end, main_event_id=main_event_id, sub_event_id=sub_event_id)
+        return Response({'days': days})
+
+    @action(detail=False, methods=['get'])
+    def broadcast(self, request):
+        """WebSocket broadcast counters (events in, frames out, coalescing ratio)"""
+        return Response(broadcast_buffer.stats())
+
+    @action(detail=False, methods=['get'], url_path='log-writer')
+    def log_writer_stats(self, request):
+        """Background log writer counters (queued, written, pending, dropped)"""
+        return Response(log_writer.stats())
+
+    @action(detail=False, methods=['get'], url_path='channel-layer')
+    def channel_layer(self, request):
+        """Channel layer health: one message round trip through the configured backend"""
+        health = channel_layer_health()
+        return Response(health, status=status.HTTP_200_OK if health['ok'] else status.HTTP_503_SERVICE_UNAVAILABLE)
 
 
 class AuthViewSet(viewsets.ViewSet):
@@ -428,17 +878,17 @@ class AuthViewSet(viewsets.ViewSet):
         if user is not None:
             if user.is_active:
                 login(request, user)
-                token, created = Token.objects.get_or_create(user=user)
+                token = issue_token(user)
                 
-                # Create login log
+                # Login log, written in the background by accounts.log_writer
                 from accounts.models import LoginLogs
-                LoginLogs.objects.create(
+                log_writer.put(LoginLogs(
                     user=user,
                     device=request.data.get('device_info', {}).get('device', ''),
                     ip_address=self.get_client_ip(request),
                     user_agent=request.META.get('HTTP_USER_AGENT', ''),
                     success=True
-                )
+                ))
                 
                 return Response({
                     'token': token.key,
@@ -457,19 +907,14 @@ class AuthViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         else:
-            # Log failed login attempt
-            try:
-                user = User.objects.get(username=username)
-                from accounts.models import LoginLogs
-                LoginLogs.objects.create(
-                    user=user,
-                    device=request.data.get('device_info', {}).get('device', ''),
-                    ip_address=self.get_client_ip(request),
-                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    success=False
-                )
-            except User.DoesNotExist:
-                pass
+            # Log failed login attempt; the user is looked up by the log writer, unknown usernames are skipped
+            from accounts.models import LoginLogs
+            log_writer.put(LoginLogs(
+                device=request.data.get('device_info', {}).get('device', ''),
+                ip_address=self.get_client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                success=False
+            ), username=username)
             
             return Response(
                 {'error': 'Invalid credentials'}, 
@@ -480,10 +925,19 @@ class AuthViewSet(viewsets.ViewSet):
     def logout(self, request):
         """User logout"""
         if request.user.is_authenticated:
+            # Revoke the API token too (its cached lookup goes with it)
+            Token.objects.filter(user_id=request.user.pk).delete()
             logout(request)
             return Response({'message': 'Logged out successfully'})
         return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
     
+    @action(detail=False, methods=['post'])
+    def rotate_token(self, request):
+        """Replace the current API token with a new one"""
+        if request.user.is_authenticated:
+            return Response({'token': rotate_token(request.user).key})
+        return Response({'error': 'Not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
+    
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user info"""
@@ -532,13 +986,8 @@ class AuthViewSet(viewsets.ViewSet):
             from django.middleware.csrf import get_token
             csrf_token = get_token(request)
             
-            # Create a special admin token for direct access
-            import secrets
-            admin_token = secrets.token_urlsafe(32)
-            
-            # Store admin token in session for later verification
-            request.session['admin_access_token'] = admin_token
-            request.session['admin_user_id'] = str(request.user.id)
+            # One-time token for direct access, consumed by AdminSessionMiddleware
+            admin_token = AdminAccessToken.issue(request.user)
             
             return Response({
                 'success': True,
@@ -666,42 +1115,43 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             'created_at': user.created_at,
             'last_login': user.last_login,
         })
-    
-
-
-
-
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from django.dispatch import receiver
-from django.db.models.signals import post_save, post_delete
 
-channel_layer = get_channel_layer()
 
-def send_update_signal(model_name, action, instance_id=None):
-    """Send update message to all connected WebSocket clients."""
-    async_to_sync(channel_layer.group_send)(
-        "updates",
-        {
-            "type": "stats_update",
-            "message": f"{model_name} {action}",
-            "model": model_name,
-            "action": action,
-            "id": instance_id,
-        },
-    )
-    print(f"Sent update signal")
+class AuditLogViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    ``/api/audit/`` lists the audit trail newest first, in keyset pages with an
+    ``estimated_total``. Filters: ``table``, ``record_id`` (the history of one
+    record), ``action`` and ``since`` (a date or a datetime).
+    """
+    queryset = AuditLog.objects.all()
+    serializer_class = AuditLogSerializer
+    permission_classes = [IsSuperAdminOnly]
+    pagination_class = AuditLogPagination
 
-# ------------------------------
-# Generic signals for all models
-# ------------------------------
+    def get_queryset(self):
+        queryset = self.filter_by_params(AuditLog.objects.all(), self.request.query_params)
+        return plan_queryset(queryset, self.get_serializer())
 
-@receiver(post_save, sender=MainEvent)
-def main_event_saved(sender, instance, created, **kwargs):
-    action = "created" if created else "updated"
-    print(action)
-    send_update_signal("MainEvent", action, instance.id)
+    @staticmethod
+    def filter_by_params(queryset, params):
+        """Filters on the columns of the audit_log indexes; invalid values are a 400"""
+        table = params.get('table')
+        record_id = params.get('record_id')
+        action_filter = params.get('action')
+        since = params.get('since')
 
-@receiver(post_delete, sender=MainEvent)
-def main_event_deleted(sender, instance, **kwargs):
-    send_update_signal("MainEvent", "deleted", instance.id)
\ No newline at end of file
+        if table:
+            queryset = queryset.filter(table_name=table)
+        if record_id:
+            try:
+                queryset = queryset.filter(record_id=uuid.UUID(record_id))
+            except ValueError:
+                raise ValidationError({'error': 'record_id غير صالح'})
+        if action_filter:
+            queryset = queryset.filter(action=action_filter.upper())
+        if since:
+            moment = schedule.parse_moment(since)
+            if moment is None:
+                raise ValidationError({'error': 'since يجب أن يكون تاريخاً أو وقتاً بصيغة ISO 8601'})
+            queryset = queryset.filter(changed_at__gte=moment)
+        return queryset
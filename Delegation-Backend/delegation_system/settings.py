@@ -81,11 +81,87 @@ TEMPLATES = [
 WSGI_APPLICATION = 'delegation_system.wsgi.application'
 ASGI_APPLICATION = 'delegation_system.asgi.application'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
+# Channel layer: "memory" only reaches sockets in the same process; use "redis"
+# when running more than one Daphne worker behind the load balancer.
+CHANNEL_LAYER_BACKEND = config('CHANNEL_LAYER_BACKEND', default='memory')
+CHANNEL_REDIS_URL = config('CHANNEL_REDIS_URL', default='redis://127.0.0.1:6379/0')
+CHANNEL_GROUP_EXPIRY = config('CHANNEL_GROUP_EXPIRY', default=86400, cast=int)  # seconds
+CHANNEL_CAPACITY = config('CHANNEL_CAPACITY', default=100, cast=int)  # messages per channel
+
+# Also used by loadtest_channel_layer, so the load test runs with these settings
+CHANNEL_REDIS_LAYER = {
+    "BACKEND": "channels_redis.core.RedisChannelLayer",
+    "CONFIG": {
+        "hosts": [{
+            "address": CHANNEL_REDIS_URL,
+            # Connection pool per worker event loop
+            "max_connections": config('CHANNEL_REDIS_MAX_CONNECTIONS', default=50, cast=int),
+            "socket_connect_timeout": 5,
+            "socket_keepalive": True,
+            "health_check_interval": 30,
+            "retry_on_timeout": True,
+        }],
+        "prefix": config('CHANNEL_PREFIX', default='delegation'),
+        "group_expiry": CHANNEL_GROUP_EXPIRY,
+        "capacity": CHANNEL_CAPACITY,
+        "expiry": 60,
     },
 }
+
+if CHANNEL_LAYER_BACKEND == 'redis':
+    CHANNEL_LAYERS = {"default": CHANNEL_REDIS_LAYER}
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+            "CONFIG": {
+                "group_expiry": CHANNEL_GROUP_EXPIRY,
+                "capacity": CHANNEL_CAPACITY,
+            },
+        },
+    }
+
+# Cache of the /api/lookups/ payloads, keyed by their database version so a per-process cache is safe;
+# shared Redis when the channel layer uses Redis
+if CHANNEL_LAYER_BACKEND == 'redis':
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": config('CACHE_REDIS_URL', default=CHANNEL_REDIS_URL),
+            "KEY_PREFIX": config('CHANNEL_PREFIX', default='delegation'),
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# WebSocket broadcast coalescing window (milliseconds); 0 sends every commit immediately
+BROADCAST_WINDOW_MS = config('BROADCAST_WINDOW_MS', default=150, cast=int)
+
+# Background writes of login logs (accounts.log_writer): flush interval in
+# milliseconds (0 writes during the request), batch size and queue bound
+LOG_FLUSH_MS = config('LOG_FLUSH_MS', default=1000, cast=int)
+LOG_BATCH_SIZE = config('LOG_BATCH_SIZE', default=200, cast=int)
+LOG_QUEUE_MAX = config('LOG_QUEUE_MAX', default=10000, cast=int)
+
+# Lifetime of the one-time Django Admin hand-off tokens (seconds)
+ADMIN_TOKEN_TTL = config('ADMIN_TOKEN_TTL', default=120, cast=int)
+
+# API tokens: lifetime in seconds (0 = until logout or rotation), and how long
+# the token -> user lookup stays in the cache. Only with the shared Redis cache:
+# a per-process cache would forget a logout or deactivation in one worker only
+AUTH_TOKEN_TTL = config('AUTH_TOKEN_TTL', default=0, cast=int)
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=300, cast=int) if CHANNEL_LAYER_BACKEND == 'redis' else 0
+
+# Largest list accepted by the bulk endpoints (/api/members/bulk/, /api/check-outs/bulk/)
+BULK_MAX_ITEMS = config('BULK_MAX_ITEMS', default=1000, cast=int)
+
+# Rendered reports (/api/reports/), kept until the data of their sub event changes
+REPORT_CACHE_DIR = config('REPORT_CACHE_DIR', default=str(BASE_DIR / 'report_cache'))
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -168,7 +244,7 @@ CSRF_EXEMPT_URLS = [
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -10,11 +10,25 @@ import {
 import { Button } from "@/components/ui/button"
 import { pdf } from '@react-pdf/renderer'
 import { saveAs } from "file-saver"
+import { useDispatch } from 'react-redux'
+import { fetchDelegationDetail } from '../../store/slices/delegationsSlice'
 
 const DepartureReportExport = ({ delegation, departureSessions = [] }) => {
+    const dispatch = useDispatch()
+
     const exportDepartureReport = async () => {
+        // قائمة الوفود لا تتضمن الأعضاء، نجلبهم مع تفاصيل الوفد
+        let members = delegation.members
+        if (!members) {
+            try {
+                members = (await dispatch(fetchDelegationDetail(delegation.id)).unwrap()).members
+            } catch (error) {
+                members = []
+            }
+        }
         const delegationWithSessions = {
             ...delegation,
+            members,
             departureSessions: departureSessions
         }
         const blob = await pdf(<DepartureReportPDF delegation={delegationWithSessions} />).toBlob();
@@ -4,9 +4,16 @@ import { toast } from 'sonner';
 
 // Import all Redux actions that need to be triggered
 import { fetchMainEvents, fetchSubEvents } from '../store/slices/eventsSlice';
-import { fetchDelegations, fetchDepartureSessions } from '../store/slices/delegationsSlice';
-import { fetchAllMembers, fetchMembers } from '../store/slices/membersSlice';
-import { fetchStats } from '../store/slices/statsSlice';
+import {
+    fetchDelegations, fetchDepartureSessions,
+    addDelegationLocal, updateDelegationLocal, removeDelegationLocal,
+    addDepartureSessionLocal, updateDepartureSessionLocal, removeDepartureSessionLocal
+} from '../store/slices/delegationsSlice';
+import {
+    fetchAllMembers, fetchMembers,
+    addMemberLocal, updateMemberLocal, removeMemberLocal
+} from '../store/slices/membersSlice';
+import { fetchStats, setStats } from '../store/slices/statsSlice';
 import { fetchNationalities } from '../store/slices/nationalitiesSlice';
 import { fetchCities } from '../store/slices/citiesSlice';
 import { fetchAirlines } from '../store/slices/airlinesSlice';
@@ -32,6 +39,9 @@ export const WebSocketProvider = ({ children }) => {
     const isMountedRef = useRef(true);
     const reconnectAttemptsRef = useRef(0);
     const maxReconnectAttempts = 5;
+    // Topic subscriptions (e.g. "sub_event:<id>") with a reference count per topic,
+    // re-sent after every reconnect. With no topics the socket gets every update.
+    const topicsRef = useRef({});
 
     // WebSocket URL
     const getWebSocketUrl = () => {
@@ -58,7 +68,8 @@ export const WebSocketProvider = ({ children }) => {
         const actionNames = {
             'created': 'تم إنشاء',
             'updated': 'تم تحديث',
-            'deleted': 'تم حذف'
+            'deleted': 'تم حذف',
+            'bulk': 'تم تحديث'
         };
 
         const modelName = modelNames[model] || model;
@@ -175,6 +186,46 @@ export const WebSocketProvider = ({ children }) => {
         }
     };
 
+    // Patch the store from a change that carries its row data.
+    // Returns false when the model has to be refetched instead.
+    const applyChange = (change) => {
+        const { model, action, id, data } = change;
+        if (action !== 'deleted' && !data) return false;
+
+        switch (model) {
+            case 'Delegation':
+                if (action === 'deleted') {
+                    dispatch(removeDelegationLocal(id));
+                } else if (action === 'created') {
+                    dispatch(removeDelegationLocal(id));
+                    dispatch(addDelegationLocal({ members: [], ...data }));
+                } else {
+                    // Merge so the nested members already in the store are kept
+                    dispatch(updateDelegationLocal(data));
+                }
+                return true;
+
+            case 'Member':
+                if (action === 'deleted') {
+                    dispatch(removeMemberLocal(id));
+                } else if (action === 'created') {
+                    dispatch(removeMemberLocal(id));
+                    dispatch(addMemberLocal(data));
+                } else {
+                    dispatch(updateMemberLocal(data));
+                }
+                return true;
+
+            case 'CheckOut':
+                dispatch(removeDepartureSessionLocal(id));
+                if (action !== 'deleted') dispatch(addDepartureSessionLocal(data));
+                return true;
+
+            default:
+                return false;
+        }
+    };
+
     // Connect to WebSocket
     const connectWebSocket = () => {
         if (!isMountedRef.current) return;
@@ -188,6 +239,10 @@ export const WebSocketProvider = ({ children }) => {
                 if (!isMountedRef.current) return;
                 setIsConnected(true);
                 setConnectionState('CONNECTED');
+                const topics = Object.keys(topicsRef.current);
+                if (topics.length > 0) {
+                    sendMessage({ action: 'subscribe', topics });
+                }
                 // reconnectAttemptsRef.current = 0;
                 
                 // // Show connection success toast (only if it was previously disconnected)
@@ -216,6 +271,26 @@ export const WebSocketProvider = ({ children }) => {
                     // Handle different message types
                     if (data.type === 'stats_update' && data.model) {
                         handleModelUpdate(data);
+                    } else if (data.type === 'batch_update' && Array.isArray(data.events)) {
+                        if (data.counters) {
+                            dispatch(setStats(data.counters));
+                        }
+                        // Patch rows that came with data; refetch at most once per other model
+                        const latestByModel = new Map();
+                        const refetchModels = new Set();
+                        data.events.forEach((change) => {
+                            // Only tells /api/lookups/ readers to revalidate; lookup rows have their own events
+                            if (change.model === 'Lookups') return;
+                            latestByModel.set(change.model, change);
+                            if (!applyChange(change)) refetchModels.add(change.model);
+                        });
+                        latestByModel.forEach((change, model) => {
+                            if (refetchModels.has(model)) {
+                                handleModelUpdate(change);
+                            } else {
+                                showUpdateToast(change);
+                            }
+                        });
                     }
                 } catch (error) {
                     console.error('Error parsing WebSocket message:', error);
@@ -272,6 +347,30 @@ export const WebSocketProvider = ({ children }) => {
         }
     };
 
+    // Subscribe to topics; several components may hold the same topic
+    const subscribe = (topics) => {
+        const added = topics.filter(topic => {
+            topicsRef.current[topic] = (topicsRef.current[topic] || 0) + 1;
+            return topicsRef.current[topic] === 1;
+        });
+        if (added.length > 0) {
+            sendMessage({ action: 'subscribe', topics: added });
+        }
+    };
+
+    const unsubscribe = (topics) => {
+        const removed = topics.filter(topic => {
+            if (!topicsRef.current[topic]) return false;
+            topicsRef.current[topic] -= 1;
+            if (topicsRef.current[topic] > 0) return false;
+            delete topicsRef.current[topic];
+            return true;
+        });
+        if (removed.length > 0) {
+            sendMessage({ action: 'unsubscribe', topics: removed });
+        }
+    };
+
     // Manual reconnect
     const reconnect = () => {
         if (reconnectTimeoutRef.current) {
@@ -309,6 +408,8 @@ export const WebSocketProvider = ({ children }) => {
         isConnected,
         connectionState,
         sendMessage,
+        subscribe,
+        unsubscribe,
         reconnect
     };
 
@@ -15,14 +15,19 @@ export const useWebSocketUpdates = (models, callback, deps = []) => {
 
         const handleWebSocketMessage = (event) => {
             try {
-                const data = JSON.parse(event.data);
+                const data = event.detail || JSON.parse(event.data);
+                const modelArray = Array.isArray(models) ? models : [models];
                 
                 if (data.type === 'stats_update' && data.model) {
-                    const modelArray = Array.isArray(models) ? models : [models];
-                    
                     if (modelArray.includes(data.model)) {
                         callback(data);
                     }
+                } else if (data.type === 'batch_update' && Array.isArray(data.events)) {
+                    // Call back once per batch with every matching change
+                    const matching = data.events.filter((change) => modelArray.includes(change.model));
+                    if (matching.length > 0) {
+                        callback({ ...matching[matching.length - 1], events: matching });
+                    }
                 }
             } catch (error) {
                 console.error('Error in useWebSocketUpdates:', error);
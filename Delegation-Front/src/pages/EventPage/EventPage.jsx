@@ -8,7 +8,6 @@ import EventsList from "../../components/Events/EventsList"
 import { Button } from "@/components/ui/button"
 import Stats from "../../components/Stats"
 import { fetchSubEvents } from '../../store/slices/subEventsSlice'
-import { fetchDelegations } from '../../store/slices/delegationsSlice'
 import { fetchMainEvents } from '../../store/slices/eventsSlice'
 
 const EventPage = () => {
@@ -18,28 +17,17 @@ const EventPage = () => {
     
     // Redux state
     const { subEvents = [], loading: subEventsLoading } = useSelector(state => state.subEvents || {})
-    const { delegations = [], loading: delegationsLoading } = useSelector(state => state.delegations || {})
     const { mainEvents = [], loading: eventsLoading } = useSelector(state => state.events || {})
     
-    // حساب الإحصائيات مع useMemo
-    const stats = useMemo(() => ({
-        delegationNum: delegations?.length || 0,
-        militaryDelegationNum: delegations?.filter(d => d.delegation_type === 'military').length || 0,
-        civilDelegationNum: delegations?.filter(d => d.delegation_type === 'civilian').length || 0,
-        memebersNum: delegations?.reduce((total, d) => total + (d.current_members || 0), 0) || 0
-    }), [delegations])
-
     // دالة لإعادة تحميل الأحداث الفرعية عند إضافة حدث جديد
     const handleEventAdded = () => {
         dispatch(fetchSubEvents())
-        dispatch(fetchDelegations())
     }
 
     useEffect(() => {
         // تحميل البيانات باستخدام Redux
         dispatch(fetchMainEvents())
         dispatch(fetchSubEvents())
-        dispatch(fetchDelegations())
     }, [dispatch])
     
     useEffect(() => {
@@ -68,6 +56,15 @@ const EventPage = () => {
         )
     , [subEvents, eventData?.id])
 
+    // حساب الإحصائيات من إجماليات الأحداث الفرعية (تأتي مع ?expand=totals)
+    const stats = useMemo(() => filteredSubEvents.reduce((total, se) => ({
+        delegationNum: total.delegationNum + (se.delegations_count || 0),
+        militaryDelegationNum: total.militaryDelegationNum + (se.totals?.military_delegations || 0),
+        civilDelegationNum: total.civilDelegationNum + (se.totals?.civilian_delegations || 0),
+        memebersNum: total.memebersNum + (se.totals?.members || 0)
+    }), { delegationNum: 0, militaryDelegationNum: 0, civilDelegationNum: 0, memebersNum: 0 })
+    , [filteredSubEvents])
+
     if (!eventData) {
         return (
             <div className="content">
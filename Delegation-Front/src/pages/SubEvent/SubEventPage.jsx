@@ -7,6 +7,7 @@ import Stats from "../../components/Stats"
 import { fetchMainEvents, fetchSubEvents as fetchSubEventsFromEvents } from '../../store/slices/eventsSlice'
 import { fetchSubEvents } from '../../store/slices/subEventsSlice'
 import { fetchDelegations } from '../../store/slices/delegationsSlice'
+import { useWebSocket } from '../../contexts/WebSocketContext'
 
 const SubEventPage = () => {
     const dispatch = useDispatch()
@@ -33,6 +34,15 @@ const SubEventPage = () => {
         dispatch(fetchSubEventsFromEvents()) // Load all sub events from events slice
         dispatch(fetchDelegations(subEventId)) // Pass subEventId to fetch delegations for this specific sub-event
     }, [dispatch, eventName, subEventId])
+
+    // Only receive live updates for this sub event while the page is open
+    const { subscribe, unsubscribe } = useWebSocket()
+    useEffect(() => {
+        if (!subEventId) return
+        const topics = [`sub_event:${subEventId}`]
+        subscribe(topics)
+        return () => unsubscribe(topics)
+    }, [subEventId])
     
     // Find main event and sub event from Redux state - consolidated to prevent loops
     useEffect(() => {
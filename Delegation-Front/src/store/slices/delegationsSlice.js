@@ -72,17 +72,23 @@ export const fetchDelegations = createAsyncThunk(
     // Create new request
     const requestPromise = (async () => {
       try {
-        const params = subEventId ? { sub_event: subEventId } : {}
-        const response = await api.get('/delegations/', { params })
+        const params = subEventId ? { sub_event_id: subEventId, page_size: 100 } : { page_size: 100 }
+        // Cursor pagination: follow the next links until every page is loaded
+        let response = await api.get('/delegations/', { params })
+        const results = [...(response.data?.results || [])]
+        while (response.data?.next) {
+          response = await api.get(response.data.next)
+          results.push(...(response.data?.results || []))
+        }
         
         // Cache the successful response
         requestCache.set(cacheKey, {
-          data: response.data,
+          data: results,
           timestamp: Date.now(),
           promise: null
         })
         
-        return response.data
+        return results
       } catch (error) {
         // Remove failed request from cache
         requestCache.delete(cacheKey)
@@ -105,6 +111,19 @@ export const fetchDelegations = createAsyncThunk(
   }
 )
 
+// Single delegation with its members (the list endpoint only embeds members with ?expand=members)
+export const fetchDelegationDetail = createAsyncThunk(
+  'delegations/fetchDelegationDetail',
+  async (delegationId, { rejectWithValue }) => {
+    try {
+      const response = await api.get(`/delegations/${delegationId}/`)
+      return response.data
+    } catch (error) {
+      return rejectWithValue(error.response?.data?.message || 'خطأ في جلب بيانات الوفد')
+    }
+  }
+)
+
 export const createDelegation = createAsyncThunk(
   'delegations/createDelegation',
   async (delegationData, { rejectWithValue }) => {
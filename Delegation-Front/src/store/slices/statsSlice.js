@@ -52,6 +52,12 @@ const statsSlice = createSlice({
       };
       state.error = null;
     },
+    setStats: (state, action) => {
+      // Counters pushed over the WebSocket, same shape as /dashboard/stats/
+      state.delegation_stats = action.payload.delegation_stats || state.delegation_stats;
+      state.member_stats = action.payload.member_stats || state.member_stats;
+      state.event_stats = action.payload.event_stats || state.event_stats;
+    },
   },
   extraReducers: (builder) => {
     builder
@@ -72,5 +78,5 @@ const statsSlice = createSlice({
   },
 });
 
-export const { clearStats } = statsSlice.actions;
+export const { clearStats, setStats } = statsSlice.actions;
 export default statsSlice.reducer;
@@ -6,7 +6,8 @@ export const fetchSubEvents = createAsyncThunk(
   'subEvents/fetchSubEvents',
   async (mainEventId = null, { rejectWithValue }) => {
     try {
-      const params = mainEventId ? { main_event_id: mainEventId } : {};
+      // totals: إجماليات الوفود والأعضاء لكل حدث فرعي في نفس الطلب
+      const params = mainEventId ? { main_event_id: mainEventId, expand: 'totals' } : { expand: 'totals' };
       const response = await api.get('/sub-events/', { params });
       return {
         data: response.data.results || response.data,
@@ -46,6 +46,25 @@ CREATE TYPE member_status AS ENUM (
 -- ملاحظة: تم إزالة session_type لأنه غير مطلوب في النظام
 -- جلسات المغادرة بسيطة ومرنة بدون تصنيف معقد
 
+-- ================================================================
+-- 🔤 تطبيع النص العربي للبحث
+-- ================================================================
+--
+-- توحيد أشكال الألف والياء والتاء المربوطة والهمزة، حذف التشكيل والتطويل،
+-- تحويل الحروف اللاتينية إلى صغيرة وضغط المسافات
+-- تستخدمه أعمدة البحث المولّدة (name_search...) وفهارس pg_trgm
+--
+CREATE OR REPLACE FUNCTION arabic_normalize(p_text TEXT)
+RETURNS TEXT AS $$
+    SELECT btrim(regexp_replace(
+        translate(
+            regexp_replace(lower(p_text), '[\u064B-\u0652\u0670\u0640]', '', 'g'),
+            'أإآٱىیةؤئ', 'ااااييهوي'
+        ),
+        '\s+', ' ', 'g'
+    ))
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
 -- ================================================================
 -- 👥 جدول المستخدمين
 -- ================================================================
@@ -156,6 +175,13 @@ CREATE TABLE equivalent_job (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- فهارس البحث في أسماء البيانات المرجعية (بعد التطبيع)
+CREATE INDEX nationality_name_trgm ON nationality USING gin (arabic_normalize(name) gin_trgm_ops);
+CREATE INDEX cities_city_name_trgm ON cities USING gin (arabic_normalize(city_name) gin_trgm_ops);
+CREATE INDEX air_line_name_trgm ON air_line USING gin (arabic_normalize(name) gin_trgm_ops);
+CREATE INDEX air_port_name_trgm ON air_port USING gin (arabic_normalize(name) gin_trgm_ops);
+CREATE INDEX equivalent_job_name_trgm ON equivalent_job USING gin (arabic_normalize(name) gin_trgm_ops);
+
 -- ================================================================
 -- 🎪 الأحداث الرئيسية
 -- ================================================================
@@ -211,6 +237,7 @@ CREATE TABLE delegation (
     delegation_leader_name VARCHAR(100) NOT NULL,   -- اسم رئيس الوفد
     member_count INT CHECK (member_count >= 0),     -- عدد الأعضاء المحدد للوفد (من الفرونت)
     current_members INT DEFAULT 0,                  -- العدد الحالي للأعضاء (محسوب تلقائياً)
+    departed_members INT DEFAULT 0,                 -- عدد الأعضاء المغادرين (محسوب تلقائياً)
     flight_number VARCHAR(20),                      -- رقم الرحلة
     type delegation_type NOT NULL,                  -- نوع الوفد (عسكري/مدني)
     status delegation_status DEFAULT 'NOT_DEPARTED', -- حالة الوفد (محسوبة تلقائياً)
@@ -219,6 +246,9 @@ CREATE TABLE delegation (
     receiver_name VARCHAR(100),                     -- اسم المستقبل (ورتبته)
     going_to VARCHAR(255),                          -- الوجهة (الفندق أو المكان اللي هيروحوا عليه)
     goods TEXT,                                     -- الشحنات
+    leader_search TEXT GENERATED ALWAYS AS (arabic_normalize(delegation_leader_name)) STORED, -- للبحث
+    receiver_search TEXT GENERATED ALWAYS AS (arabic_normalize(receiver_name)) STORED,       -- للبحث
+    arrive_at TIMESTAMPTZ GENERATED ALWAYS AS ((arrive_date + arrive_time) AT TIME ZONE 'Africa/Cairo') STORED, -- موعد الوصول (لجدول المواعيد)
     -- ملاحظة: تم إزالة arrival_info و departure_info لتجنب التكرار
     -- جميع معلومات الوصول موجودة في الحقول العادية أعلاه
     created_by UUID REFERENCES users(id) ON DELETE SET NULL,
@@ -231,6 +261,10 @@ CREATE TABLE delegation (
 CREATE INDEX idx_delegation_event_id ON delegation(sub_event_id);
 CREATE INDEX idx_delegation_type ON delegation(type);
 CREATE INDEX idx_delegation_status ON delegation(status);
+CREATE INDEX delegation_created_id_idx ON delegation(created_at DESC, id DESC); -- ترقيم الصفحات بالمؤشر
+CREATE INDEX delegation_leader_search_trgm ON delegation USING gin (leader_search gin_trgm_ops);
+CREATE INDEX delegation_receiver_search_trgm ON delegation USING gin (receiver_search gin_trgm_ops);
+CREATE INDEX delegation_airport_arrive_idx ON delegation(airport_id, arrive_at); -- الوصول إلى مطار في فترة
 
 -- ================================================================
 -- 👤 الأعضاء
@@ -248,6 +282,7 @@ CREATE TABLE member (
     equivalent_job_id UUID REFERENCES equivalent_job(id) ON DELETE SET NULL, -- الوظيفة المعادلة
     status member_status DEFAULT 'NOT_DEPARTED',    -- حالة العضو (محسوبة تلقائياً)
     departure_date DATE,                            -- تاريخ المغادرة الفعلي للعضو
+    name_search TEXT GENERATED ALWAYS AS (arabic_normalize(name)) STORED, -- الاسم مطبّعاً للبحث
     created_by UUID REFERENCES users(id) ON DELETE SET NULL,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_by UUID REFERENCES users(id) ON DELETE SET NULL,
@@ -258,6 +293,7 @@ CREATE TABLE member (
 CREATE INDEX idx_member_delegation_id ON member(delegation_id);
 CREATE INDEX idx_member_equivalent_job_id ON member(equivalent_job_id);
 CREATE INDEX idx_member_status ON member(status);
+CREATE INDEX member_name_search_trgm ON member USING gin (name_search gin_trgm_ops);
 
 -- ================================================================
 -- 🛫 جلسات المغادرة
@@ -277,6 +313,7 @@ CREATE TABLE check_out (
     flight_number VARCHAR(20),                      -- رقم رحلة المغادرة
     checkout_date DATE,                             -- تاريخ المغادرة
     checkout_time TIME,                             -- ساعة المغادرة
+    depart_at TIMESTAMPTZ GENERATED ALWAYS AS ((checkout_date + checkout_time) AT TIME ZONE 'Africa/Cairo') STORED, -- موعد المغادرة (لجدول المواعيد)
     depositor_name VARCHAR(100),                    -- اسم المودع (ورتبته)
     goods TEXT,                                     -- الشحنات
     notes TEXT,                                     -- ملاحظات إضافية
@@ -289,6 +326,19 @@ CREATE TABLE check_out (
 
 -- فهرس لتحسين البحث حسب الوفد
 CREATE INDEX idx_checkout_delegation_id ON check_out(delegation_id);
+CREATE INDEX check_out_airport_depart_idx ON check_out(airport_id, depart_at); -- المغادرة من مطار في فترة
+
+-- أعضاء كل جلسة مغادرة (صف لكل عضو)، يُزامن من check_out.members بمشغل
+-- ليصبح البحث عن جلسات عضو ما ربطاً مفهرساً بدلاً من مسح JSON
+CREATE TABLE checkout_member (
+    id BIGSERIAL PRIMARY KEY,
+    check_out_id UUID NOT NULL REFERENCES check_out(id) ON DELETE CASCADE,
+    member_id UUID NOT NULL REFERENCES member(id) ON DELETE CASCADE,
+    CONSTRAINT checkout_member_unique UNIQUE (check_out_id, member_id)
+);
+
+CREATE INDEX idx_checkout_member_check_out_id ON checkout_member(check_out_id);
+CREATE INDEX idx_checkout_member_member_id ON checkout_member(member_id);
 
 -- ================================================================
 -- 🔐 سجلات تسجيل الدخول
@@ -311,165 +361,1139 @@ CREATE TABLE login_logs (
 CREATE INDEX idx_login_logs_user_id ON login_logs(user_id);
 CREATE INDEX idx_login_logs_success ON login_logs(success);
 
+-- 🔑 رموز الدخول إلى Django Admin
+-- ================================================================
+--
+-- رمز لمرة واحدة يصدره create_admin_session ويستهلكه AdminSessionMiddleware
+-- يُخزن الرمز مشفرًا (SHA-256) وينتهي بعد ADMIN_TOKEN_TTL ثانية
+--
+CREATE TABLE admin_access_token (
+    token_hash VARCHAR(64) PRIMARY KEY,             -- بصمة الرمز (لا يُخزن الرمز نفسه)
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- وقت الإصدار
+    expires_at TIMESTAMPTZ NOT NULL                 -- وقت الانتهاء
+);
+
+CREATE INDEX idx_admin_access_token_user_id ON admin_access_token(user_id);
+CREATE INDEX idx_admin_access_token_expires_at ON admin_access_token(expires_at);
+
 -- ================================================================
 -- 📝 سجل التدقيق (Audit Log)
 -- ================================================================
 -- 
 -- تتبع جميع التغييرات في النظام (إضافة، تعديل، حذف)
--- مع تفاصيل البيانات القديمة والجديدة
+-- الإضافة والحذف: الصف كاملاً؛ التعديل: الحقول التي تغيرت فقط
+-- مقسم حسب شهر changed_at (التوقيت العالمي): قسم audit_log_YYYY_MM لكل شهر
+-- الاحتفاظ يتم بفصل الأقسام القديمة (python manage.py audit_partitions) لا بحذف الصفوف
 --
 CREATE TABLE audit_log (
-    id BIGSERIAL PRIMARY KEY,
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
     table_name TEXT NOT NULL,                       -- اسم الجدول
     record_id UUID,                                 -- معرف السجل
     action VARCHAR(10) CHECK (action IN ('INSERT', 'UPDATE', 'DELETE')), -- نوع العملية
-    old_data JSONB,                                 -- البيانات القديمة
-    new_data JSONB,                                 -- البيانات الجديدة
+    old_data JSONB,                                 -- البيانات القديمة (في التعديل: الحقول المتغيرة فقط)
+    new_data JSONB,                                 -- البيانات الجديدة (في التعديل: الحقول المتغيرة فقط)
     changed_by UUID REFERENCES users(id),           -- من قام بالتغيير
-    changed_at TIMESTAMPTZ DEFAULT NOW(),           -- وقت التغيير
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- وقت التغيير (مفتاح التقسيم)
     ip_address INET,                                -- عنوان IP
-    user_agent TEXT                                 -- معلومات الجهاز
-);
+    user_agent TEXT,                                -- معلومات الجهاز
+    PRIMARY KEY (id, changed_at)                    -- يجب أن يتضمن مفتاح التقسيم
+) PARTITION BY RANGE (changed_at);
+
+-- يستقبل الصفوف التي لا يوجد لشهرها قسم بعد؛ تُنقل عند إنشاء القسم
+CREATE TABLE audit_log_default PARTITION OF audit_log DEFAULT;
 
--- فهارس لتحسين البحث في سجل التدقيق
-CREATE INDEX idx_audit_log_table_name ON audit_log(table_name);
+-- فهارس لتحسين البحث في سجل التدقيق (تُنشأ على كل قسم تلقائياً)
 CREATE INDEX idx_audit_log_changed_by ON audit_log(changed_by);
-CREATE INDEX idx_audit_log_changed_at ON audit_log(changed_at);
+-- ترقيم الصفحات بالمؤشر: سجل واحد، جدول واحد، كل السجلات
+CREATE INDEX audit_log_record_history_idx ON audit_log(table_name, record_id, changed_at DESC, id DESC);
+CREATE INDEX audit_log_table_changed_idx ON audit_log(table_name, changed_at DESC, id DESC);
+CREATE INDEX audit_log_changed_idx ON audit_log(changed_at DESC, id DESC);
+
+-- إنشاء قسم شهر (audit_log_YYYY_MM) ونقل صفوفه من القسم الافتراضي
+CREATE OR REPLACE FUNCTION audit_log_create_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    start_at TIMESTAMPTZ := date_trunc('month', p_month::timestamp) AT TIME ZONE 'UTC';
+    end_at TIMESTAMPTZ := (date_trunc('month', p_month::timestamp) + INTERVAL '1 month') AT TIME ZONE 'UTC';
+    partition_name TEXT := 'audit_log_' || to_char(p_month, 'YYYY_MM');
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_inherits
+        WHERE inhparent = 'audit_log'::regclass AND inhrelid::regclass::text = partition_name
+    ) THEN
+        RETURN partition_name;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE audit_log INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM audit_log_default WHERE changed_at >= %L AND changed_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        start_at, end_at, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE audit_log ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_at, end_at
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- الشهر الحالي والشهران التاليان
+SELECT audit_log_create_partition((date_trunc('month', NOW() AT TIME ZONE 'UTC') + n * INTERVAL '1 month')::date)
+FROM generate_series(0, 2) AS n;
 
 -- ================================================================
 -- 🔧 الدوال المساعدة (Functions)
 -- ================================================================
 
--- دالة لتحديث عدد الأعضاء في الوفد تلقائياً
-CREATE OR REPLACE FUNCTION update_delegation_member_count()
-RETURNS TRIGGER AS $$
+-- حالة الوفد من عدد أعضائه وعدد المغادرين منهم
+CREATE OR REPLACE FUNCTION delegation_status_for(p_members INT, p_departed INT)
+RETURNS delegation_status AS $$
+    SELECT CASE
+        WHEN p_departed = 0 THEN 'NOT_DEPARTED'
+        WHEN p_departed = p_members THEN 'FULLY_DEPARTED'
+        ELSE 'PARTIALLY_DEPARTED'
+    END::delegation_status;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- تطبيق فروق الأعضاء (+1/-1) على current_members و departed_members وحالة الوفود
+CREATE OR REPLACE FUNCTION delegation_member_apply(
+    p_delegation_ids UUID[],
+    p_signs INT[],
+    p_statuses TEXT[]
+)
+RETURNS VOID AS $$
 BEGIN
-    IF TG_OP = 'INSERT' OR TG_OP = 'DELETE' THEN
-        -- تحديث العدد الحالي للأعضاء في الوفد
-        UPDATE delegation 
-        SET current_members = (
-            SELECT COUNT(*) FROM member 
-            WHERE delegation_id = COALESCE(NEW.delegation_id, OLD.delegation_id)
-        )
-        WHERE id = COALESCE(NEW.delegation_id, OLD.delegation_id);
-    END IF;
-    RETURN COALESCE(NEW, OLD);
+    UPDATE delegation d
+    SET current_members = d.current_members + c.members,
+        departed_members = d.departed_members + c.departed,
+        status = delegation_status_for(d.current_members + c.members, d.departed_members + c.departed)
+    FROM (
+        SELECT delegation_id,
+               SUM(sign)::INT AS members,
+               COALESCE(SUM(sign) FILTER (WHERE status = 'DEPARTED'), 0)::INT AS departed
+        FROM unnest(p_delegation_ids, p_signs, p_statuses) AS u(delegation_id, sign, status)
+        GROUP BY delegation_id
+    ) c
+    WHERE d.id = c.delegation_id
+    AND (c.members <> 0 OR c.departed <> 0);
 END;
 $$ LANGUAGE plpgsql;
 
--- دالة لتحديث حالة الوفد بناءً على حالة أعضائه
-CREATE OR REPLACE FUNCTION update_delegation_status()
+-- فروق الأعضاء لكل استعلام (جداول الانتقال new_rows / old_rows): الوفود ثم عدادات لوحة التحكم
+CREATE OR REPLACE FUNCTION member_totals_changed()
 RETURNS TRIGGER AS $$
 DECLARE
-    total_members INT;
-    departed_members INT;
-    new_status delegation_status;
-    delegation_uuid UUID;
+    v_ids UUID[];
+    v_signs INT[];
+    v_statuses TEXT[];
 BEGIN
-    -- تحديد معرف الوفد
-    delegation_uuid := COALESCE(NEW.delegation_id, OLD.delegation_id);
-    
-    -- حساب عدد الأعضاء الإجمالي والمغادرين
-    SELECT COUNT(*) INTO total_members
-    FROM member 
-    WHERE delegation_id = delegation_uuid;
-    
-    SELECT COUNT(*) INTO departed_members
-    FROM member 
-    WHERE delegation_id = delegation_uuid 
-    AND status = 'DEPARTED';
-    
-    -- تحديد الحالة الجديدة للوفد
-    IF departed_members = 0 THEN
-        new_status := 'NOT_DEPARTED';
-    ELSIF departed_members = total_members AND total_members > 0 THEN
-        new_status := 'FULLY_DEPARTED';
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(delegation_id), array_agg(1), array_agg(status::text)
+        INTO v_ids, v_signs, v_statuses
+        FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(delegation_id), array_agg(-1), array_agg(status::text)
+        INTO v_ids, v_signs, v_statuses
+        FROM old_rows;
     ELSE
-        new_status := 'PARTIALLY_DEPARTED';
+        SELECT array_agg(c.delegation_id), array_agg(c.sign), array_agg(c.status)
+        INTO v_ids, v_signs, v_statuses
+        FROM (
+            SELECT o.delegation_id, -1 AS sign, o.status::text AS status
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status OR n.delegation_id IS DISTINCT FROM o.delegation_id
+            UNION ALL
+            SELECT n.delegation_id, 1, n.status::text
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status OR n.delegation_id IS DISTINCT FROM o.delegation_id
+        ) c;
     END IF;
-    
-    -- تحديث حالة الوفد
-    UPDATE delegation 
-    SET status = new_status,
-        current_members = total_members
-    WHERE id = delegation_uuid;
-    
-    RETURN COALESCE(NEW, OLD);
+    IF v_ids IS NOT NULL THEN
+        PERFORM delegation_member_apply(v_ids, v_signs, v_statuses);
+        PERFORM dashboard_counter_member_apply(v_ids, v_signs, v_statuses);
+    END IF;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- دالة لتحديث حالة الأعضاء عند إنشاء جلسة مغادرة
+-- إعادة حساب أعداد وحالة جميع الوفود من جدول member في استعلام واحد؛ يعيد عدد الوفود المصححة
+CREATE OR REPLACE FUNCTION reconcile_delegation_counters()
+RETURNS INT AS $$
+DECLARE
+    v_fixed INT;
+BEGIN
+    UPDATE delegation d
+    SET current_members = live.members,
+        departed_members = live.departed,
+        status = delegation_status_for(live.members, live.departed)
+    FROM (
+        SELECT dl.id,
+               COUNT(m.id)::INT AS members,
+               (COUNT(m.id) FILTER (WHERE m.status = 'DEPARTED'))::INT AS departed
+        FROM delegation dl
+        LEFT JOIN member m ON m.delegation_id = dl.id
+        GROUP BY dl.id
+    ) live
+    WHERE d.id = live.id
+    AND (d.current_members IS DISTINCT FROM live.members
+         OR d.departed_members IS DISTINCT FROM live.departed
+         OR d.status IS DISTINCT FROM delegation_status_for(live.members, live.departed));
+    GET DIAGNOSTICS v_fixed = ROW_COUNT;
+    RETURN v_fixed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- معرفات الأعضاء الموجودين فعلاً في مصفوفة JSON لجلسة مغادرة (تتجاهل القيم غير الصالحة)
+CREATE OR REPLACE FUNCTION checkout_member_ids(p_members JSONB)
+RETURNS SETOF UUID AS $$
+    SELECT m.id
+    FROM member m
+    WHERE m.id IN (
+        SELECT CASE WHEN value ~* '^[0-9a-f]{8}-?([0-9a-f]{4}-?){3}[0-9a-f]{12}$' THEN value::uuid END
+        FROM jsonb_array_elements_text(
+            CASE WHEN jsonb_typeof(p_members) = 'array' THEN p_members ELSE '[]'::jsonb END
+        ) AS value
+    );
+$$ LANGUAGE sql STABLE;
+
+-- مزامنة جدول checkout_member مع check_out.members
+CREATE OR REPLACE FUNCTION checkout_member_sync()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        DELETE FROM checkout_member
+        WHERE check_out_id = NEW.id
+        AND member_id NOT IN (SELECT checkout_member_ids(NEW.members));
+    END IF;
+    INSERT INTO checkout_member (check_out_id, member_id)
+    SELECT NEW.id, ids.member_id FROM checkout_member_ids(NEW.members) AS ids(member_id)
+    ON CONFLICT (check_out_id, member_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لتحديث حالة أعضاء جلسات المغادرة، مرة واحدة لكل استعلام (جدول الانتقال new_rows)
+-- الأعضاء الذين غادروا بنفس التاريخ لا يُعاد تحديثهم
 CREATE OR REPLACE FUNCTION update_member_status_on_checkout()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- تحديث حالة الأعضاء في الجلسة إلى DEPARTED
-    IF TG_OP = 'INSERT' OR TG_OP = 'UPDATE' THEN
-        UPDATE member 
-        SET status = 'DEPARTED', 
-            departure_date = NEW.checkout_date
-        WHERE id = ANY(
-            SELECT jsonb_array_elements_text(NEW.members)::uuid
+    -- تحديث حالة الأعضاء في الجلسات إلى DEPARTED (عبر checkout_member)
+    UPDATE member m
+    SET status = 'DEPARTED',
+        departure_date = n.checkout_date
+    FROM new_rows n
+    JOIN checkout_member cm ON cm.check_out_id = n.id
+    WHERE m.id = cm.member_id
+    AND (m.status <> 'DEPARTED' OR m.departure_date IS DISTINCT FROM n.checkout_date);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- تنشئ دالة التدقيق audit_<table>_changed() ومشغلاتها الثلاثة (مرة واحدة لكل استعلام، جداول الانتقال)
+-- الإضافة والحذف: الصف كاملاً؛ التعديل: الأعمدة التي تغيرت فقط (old_data القيم السابقة و new_data الجديدة)
+-- المقارنة عمود بعمود مكتوبة في الدالة، لذلك يجب استدعاؤها مجدداً بعد إضافة عمود إلى جدول مُدقق
+CREATE OR REPLACE FUNCTION audit_install(p_table REGCLASS, p_skipped TEXT[] DEFAULT '{}')
+RETURNS VOID AS $$
+DECLARE
+    function_name TEXT := 'audit_' || p_table::text || '_changed';
+    skipped TEXT[];
+    old_diff TEXT;
+    new_diff TEXT;
+    event TEXT;
+BEGIN
+    SELECT
+        p_skipped || COALESCE(array_agg(attname::text) FILTER (WHERE attgenerated <> ''), '{}'),
+        string_agg(
+            format('CASE WHEN n.%1$I IS DISTINCT FROM o.%1$I THEN jsonb_build_object(%1$L, o.%1$I) ELSE ''{}'' END', attname),
+            ' || ' ORDER BY attnum
+        ) FILTER (WHERE attgenerated = '' AND attname <> ALL (p_skipped)),
+        string_agg(
+            format('CASE WHEN n.%1$I IS DISTINCT FROM o.%1$I THEN jsonb_build_object(%1$L, n.%1$I) ELSE ''{}'' END', attname),
+            ' || ' ORDER BY attnum
+        ) FILTER (WHERE attgenerated = '' AND attname <> ALL (p_skipped))
+    INTO skipped, old_diff, new_diff
+    FROM pg_attribute
+    WHERE attrelid = p_table AND attnum > 0 AND NOT attisdropped;
+
+    -- enable_nestloop: خطة ربط old_rows/new_rows تُحفظ من الاستعلامات الصغيرة وتصبح بطيئة مع الكبيرة
+    EXECUTE format($function$
+CREATE OR REPLACE FUNCTION %1$I()
+RETURNS TRIGGER AS $body$
+DECLARE
+    actor UUID := NULLIF(current_setting('app.current_user', true), '')::uuid;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO audit_log (table_name, record_id, action, new_data, changed_by)
+        SELECT TG_TABLE_NAME, n.id, TG_OP, to_jsonb(n) - %2$L::text[], actor
+        FROM new_rows n;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO audit_log (table_name, record_id, action, old_data, changed_by)
+        SELECT TG_TABLE_NAME, o.id, TG_OP, to_jsonb(o) - %2$L::text[], actor
+        FROM old_rows o;
+    ELSE
+        INSERT INTO audit_log (table_name, record_id, action, old_data, new_data, changed_by)
+        SELECT TG_TABLE_NAME, n.id, TG_OP, diff.old_data, diff.new_data, actor
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        CROSS JOIN LATERAL (SELECT %3$s AS old_data, %4$s AS new_data) diff
+        WHERE diff.new_data <> '{}';
+    END IF;
+    RETURN NULL;
+END;
+$body$ LANGUAGE plpgsql SET enable_nestloop = off;
+$function$, function_name, skipped, old_diff, new_diff);
+
+    FOREACH event IN ARRAY ARRAY['insert', 'update', 'delete'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %s', 'trg_audit_' || p_table::text || '_' || event, p_table);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER %s ON %s REFERENCING %s FOR EACH STATEMENT EXECUTE FUNCTION %I()',
+            'trg_audit_' || p_table::text || '_' || event, upper(event), p_table,
+            CASE event
+                WHEN 'insert' THEN 'NEW TABLE AS new_rows'
+                WHEN 'update' THEN 'OLD TABLE AS old_rows NEW TABLE AS new_rows'
+                ELSE 'OLD TABLE AS old_rows'
+            END,
+            function_name
         );
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================================
+-- ⚡ المشغلات (Triggers)
+-- ================================================================
+
+-- مشغلات أعداد الأعضاء وحالة الوفد وعدادات لوحة التحكم، مرة واحدة لكل استعلام على member
+-- (المشغل ذو جداول الانتقال يقبل حدثاً واحداً، لذلك ثلاثة مشغلات)
+CREATE TRIGGER trg_member_totals_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION member_totals_changed();
+
+CREATE TRIGGER trg_member_totals_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION member_totals_changed();
+
+CREATE TRIGGER trg_member_totals_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION member_totals_changed();
+
+-- مشغل لمزامنة أعضاء الجلسة (مشغل صف، يعمل قبل مشغلات الاستعلام التالية)
+CREATE TRIGGER trg_checkout_member_sync
+AFTER INSERT OR UPDATE OF members ON check_out
+FOR EACH ROW EXECUTE FUNCTION checkout_member_sync();
+
+-- مشغلات تحديث حالة الأعضاء عند إنشاء أو تعديل جلسات المغادرة، مرة واحدة لكل استعلام
+CREATE TRIGGER trg_update_member_status_on_checkout_insert
+AFTER INSERT ON check_out REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_member_status_on_checkout();
+
+CREATE TRIGGER trg_update_member_status_on_checkout_update
+AFTER UPDATE ON check_out REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION update_member_status_on_checkout();
+
+-- مشغلات سجل التدقيق لجميع الجداول المهمة، مرة واحدة لكل استعلام (ثلاثة لكل جدول)
+SELECT audit_install('users', ARRAY['password_hash']::text[]);
+SELECT audit_install('delegation', ARRAY[]::text[]);
+SELECT audit_install('member', ARRAY[]::text[]);
+SELECT audit_install('check_out', ARRAY[]::text[]);
+
+-- ================================================================
+-- 📈 عدادات لوحة التحكم (Dashboard Counters)
+-- ================================================================
+-- 
+-- عدادات مجمعة مسبقاً لكل نطاق: عام، لكل حدث رئيسي، ولكل حدث فرعي
+-- تحدث تلقائياً عبر المشغلات بزيادة/نقصان (+1/-1) بدلاً من إعادة العد
+-- نقطة الإحصائيات تقرأ صفاً واحداً بالمفتاح الأساسي
+-- إعادة البناء: python manage.py rebuild_dashboard_counters
+--
+CREATE TABLE dashboard_counter (
+    scope_key VARCHAR(64) PRIMARY KEY,              -- 'global' أو 'main_event:<id>' أو 'sub_event:<id>'
+    main_events INT NOT NULL DEFAULT 0,
+    sub_events INT NOT NULL DEFAULT 0,
+    delegations INT NOT NULL DEFAULT 0,
+    military_delegations INT NOT NULL DEFAULT 0,
+    civilian_delegations INT NOT NULL DEFAULT 0,
+    not_departed_delegations INT NOT NULL DEFAULT 0,
+    partially_departed_delegations INT NOT NULL DEFAULT 0,
+    fully_departed_delegations INT NOT NULL DEFAULT 0,
+    members INT NOT NULL DEFAULT 0,
+    not_departed_members INT NOT NULL DEFAULT 0,
+    departed_members INT NOT NULL DEFAULT 0,
+    check_outs INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- دالة لتطبيق فرق (delta) على عدادات لوحة التحكم لمجموعة من النطاقات
+CREATE OR REPLACE FUNCTION dashboard_counter_apply(
+    p_keys TEXT[],
+    d_main_events INT DEFAULT 0,
+    d_sub_events INT DEFAULT 0,
+    d_delegations INT DEFAULT 0,
+    d_military_delegations INT DEFAULT 0,
+    d_civilian_delegations INT DEFAULT 0,
+    d_not_departed_delegations INT DEFAULT 0,
+    d_partially_departed_delegations INT DEFAULT 0,
+    d_fully_departed_delegations INT DEFAULT 0,
+    d_members INT DEFAULT 0,
+    d_not_departed_members INT DEFAULT 0,
+    d_departed_members INT DEFAULT 0,
+    d_check_outs INT DEFAULT 0
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO dashboard_counter AS c (
+        scope_key, main_events, sub_events, delegations,
+        military_delegations, civilian_delegations,
+        not_departed_delegations, partially_departed_delegations, fully_departed_delegations,
+        members, not_departed_members, departed_members, check_outs, updated_at
+    )
+    SELECT k, d_main_events, d_sub_events, d_delegations,
+           d_military_delegations, d_civilian_delegations,
+           d_not_departed_delegations, d_partially_departed_delegations, d_fully_departed_delegations,
+           d_members, d_not_departed_members, d_departed_members, d_check_outs, NOW()
+    FROM unnest(p_keys) AS k
+    WHERE k IS NOT NULL
+    ON CONFLICT (scope_key) DO UPDATE SET
+        main_events = c.main_events + EXCLUDED.main_events,
+        sub_events = c.sub_events + EXCLUDED.sub_events,
+        delegations = c.delegations + EXCLUDED.delegations,
+        military_delegations = c.military_delegations + EXCLUDED.military_delegations,
+        civilian_delegations = c.civilian_delegations + EXCLUDED.civilian_delegations,
+        not_departed_delegations = c.not_departed_delegations + EXCLUDED.not_departed_delegations,
+        partially_departed_delegations = c.partially_departed_delegations + EXCLUDED.partially_departed_delegations,
+        fully_departed_delegations = c.fully_departed_delegations + EXCLUDED.fully_departed_delegations,
+        members = c.members + EXCLUDED.members,
+        not_departed_members = c.not_departed_members + EXCLUDED.not_departed_members,
+        departed_members = c.departed_members + EXCLUDED.departed_members,
+        check_outs = c.check_outs + EXCLUDED.check_outs,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لتحديد نطاقات العدادات (عام، حدث رئيسي، حدث فرعي) لحدث فرعي
+CREATE OR REPLACE FUNCTION dashboard_counter_keys(p_sub_event_id UUID)
+RETURNS TEXT[] AS $$
+DECLARE
+    v_main_event_id UUID;
+BEGIN
+    SELECT main_event_id INTO v_main_event_id FROM sub_event WHERE id = p_sub_event_id;
+    IF NOT FOUND THEN
+        RETURN ARRAY['global'];
+    END IF;
+    RETURN ARRAY['global', 'main_event:' || v_main_event_id::text, 'sub_event:' || p_sub_event_id::text];
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لتحديد نطاقات العدادات لوفد
+CREATE OR REPLACE FUNCTION dashboard_counter_delegation_keys(p_delegation_id UUID)
+RETURNS TEXT[] AS $$
+DECLARE
+    v_sub_event_id UUID;
+BEGIN
+    SELECT sub_event_id INTO v_sub_event_id FROM delegation WHERE id = p_delegation_id;
+    IF NOT FOUND THEN
+        RETURN ARRAY['global'];
+    END IF;
+    RETURN dashboard_counter_keys(v_sub_event_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- دالة لتطبيق مساهمة وفد واحد (مع أعضائه وجلسات مغادرته عند النقل) على العدادات
+CREATE OR REPLACE FUNCTION dashboard_counter_delegation_delta(
+    p_keys TEXT[],
+    p_sign INT,
+    p_type TEXT,
+    p_status TEXT,
+    p_members INT DEFAULT 0,
+    p_not_departed_members INT DEFAULT 0,
+    p_departed_members INT DEFAULT 0,
+    p_check_outs INT DEFAULT 0
+)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM dashboard_counter_apply(
+        p_keys,
+        d_delegations => p_sign,
+        d_military_delegations => CASE WHEN p_type = 'MILITARY' THEN p_sign ELSE 0 END,
+        d_civilian_delegations => CASE WHEN p_type = 'CIVILIAN' THEN p_sign ELSE 0 END,
+        d_not_departed_delegations => CASE WHEN p_status = 'NOT_DEPARTED' THEN p_sign ELSE 0 END,
+        d_partially_departed_delegations => CASE WHEN p_status = 'PARTIALLY_DEPARTED' THEN p_sign ELSE 0 END,
+        d_fully_departed_delegations => CASE WHEN p_status = 'FULLY_DEPARTED' THEN p_sign ELSE 0 END,
+        d_members => p_sign * p_members,
+        d_not_departed_members => p_sign * p_not_departed_members,
+        d_departed_members => p_sign * p_departed_members,
+        d_check_outs => p_sign * p_check_outs
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات الأحداث الرئيسية
+CREATE OR REPLACE FUNCTION dashboard_counter_main_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_counter_apply(ARRAY['global', 'main_event:' || NEW.id::text], d_main_events => 1);
+        RETURN NEW;
+    END IF;
+    PERFORM dashboard_counter_apply(ARRAY['global'], d_main_events => -1);
+    DELETE FROM dashboard_counter WHERE scope_key = 'main_event:' || OLD.id::text;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات الأحداث الفرعية (نقل الحدث الفرعي ينقل مجاميعه إلى الحدث الرئيسي الجديد)
+CREATE OR REPLACE FUNCTION dashboard_counter_sub_event()
+RETURNS TRIGGER AS $$
+DECLARE
+    c dashboard_counter;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_counter_apply(dashboard_counter_keys(NEW.id), d_sub_events => 1);
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_counter_apply(ARRAY['global', 'main_event:' || OLD.main_event_id::text], d_sub_events => -1);
+        DELETE FROM dashboard_counter WHERE scope_key = 'sub_event:' || OLD.id::text;
+        RETURN OLD;
+    END IF;
+
+    IF NEW.main_event_id IS DISTINCT FROM OLD.main_event_id THEN
+        SELECT * INTO c FROM dashboard_counter WHERE scope_key = 'sub_event:' || NEW.id::text;
+        IF FOUND THEN
+            PERFORM dashboard_counter_apply(
+                ARRAY['main_event:' || OLD.main_event_id::text],
+                d_sub_events => -c.sub_events,
+                d_delegations => -c.delegations,
+                d_military_delegations => -c.military_delegations,
+                d_civilian_delegations => -c.civilian_delegations,
+                d_not_departed_delegations => -c.not_departed_delegations,
+                d_partially_departed_delegations => -c.partially_departed_delegations,
+                d_fully_departed_delegations => -c.fully_departed_delegations,
+                d_members => -c.members,
+                d_not_departed_members => -c.not_departed_members,
+                d_departed_members => -c.departed_members,
+                d_check_outs => -c.check_outs
+            );
+            PERFORM dashboard_counter_apply(
+                ARRAY['main_event:' || NEW.main_event_id::text],
+                d_sub_events => c.sub_events,
+                d_delegations => c.delegations,
+                d_military_delegations => c.military_delegations,
+                d_civilian_delegations => c.civilian_delegations,
+                d_not_departed_delegations => c.not_departed_delegations,
+                d_partially_departed_delegations => c.partially_departed_delegations,
+                d_fully_departed_delegations => c.fully_departed_delegations,
+                d_members => c.members,
+                d_not_departed_members => c.not_departed_members,
+                d_departed_members => c.departed_members,
+                d_check_outs => c.check_outs
+            );
+        END IF;
     END IF;
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
--- دالة لإنشاء سجل التدقيق
-CREATE OR REPLACE FUNCTION audit_trigger_func()
+-- عدادات الوفود (النوع والحالة، ونقل الأعضاء والجلسات عند تغيير الحدث الفرعي)
+CREATE OR REPLACE FUNCTION dashboard_counter_delegation()
 RETURNS TRIGGER AS $$
+DECLARE
+    v_members INT := 0;
+    v_not_departed INT := 0;
+    v_departed INT := 0;
+    v_check_outs INT := 0;
 BEGIN
-    IF (TG_OP = 'DELETE') THEN
-        INSERT INTO audit_log (table_name, record_id, action, old_data, changed_by)
-        VALUES (TG_TABLE_NAME, OLD.id, TG_OP, to_jsonb(OLD), current_setting('app.current_user')::uuid);
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_counter_delegation_delta(
+            dashboard_counter_keys(NEW.sub_event_id), 1, NEW.type::text, NEW.status::text
+        );
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_counter_delegation_delta(
+            dashboard_counter_keys(OLD.sub_event_id), -1, OLD.type::text, OLD.status::text
+        );
         RETURN OLD;
-    ELSIF (TG_OP = 'UPDATE') THEN
-        INSERT INTO audit_log (table_name, record_id, action, old_data, new_data, changed_by)
-        VALUES (TG_TABLE_NAME, NEW.id, TG_OP, to_jsonb(OLD), to_jsonb(NEW), current_setting('app.current_user')::uuid);
+    END IF;
+
+    IF NEW.type IS NOT DISTINCT FROM OLD.type
+       AND NEW.status IS NOT DISTINCT FROM OLD.status
+       AND NEW.sub_event_id IS NOT DISTINCT FROM OLD.sub_event_id THEN
         RETURN NEW;
-    ELSIF (TG_OP = 'INSERT') THEN
-        INSERT INTO audit_log (table_name, record_id, action, new_data, changed_by)
-        VALUES (TG_TABLE_NAME, NEW.id, TG_OP, to_jsonb(NEW), current_setting('app.current_user')::uuid);
+    END IF;
+
+    IF NEW.sub_event_id IS DISTINCT FROM OLD.sub_event_id THEN
+        SELECT COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'NOT_DEPARTED'),
+               COUNT(*) FILTER (WHERE status = 'DEPARTED')
+        INTO v_members, v_not_departed, v_departed
+        FROM member WHERE delegation_id = NEW.id;
+        SELECT COUNT(*) INTO v_check_outs FROM check_out WHERE delegation_id = NEW.id;
+    END IF;
+
+    PERFORM dashboard_counter_delegation_delta(
+        dashboard_counter_keys(OLD.sub_event_id), -1, OLD.type::text, OLD.status::text,
+        v_members, v_not_departed, v_departed, v_check_outs
+    );
+    PERFORM dashboard_counter_delegation_delta(
+        dashboard_counter_keys(NEW.sub_event_id), 1, NEW.type::text, NEW.status::text,
+        v_members, v_not_departed, v_departed, v_check_outs
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- تطبيق فروق الأعضاء على العدادات، مجمّعة لكل نطاق (صف واحد لكل نطاق لكل استعلام)
+CREATE OR REPLACE FUNCTION dashboard_counter_member_apply(
+    p_delegation_ids UUID[],
+    p_signs INT[],
+    p_statuses TEXT[]
+)
+RETURNS VOID AS $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT k.key,
+               SUM(c.members)::INT AS members,
+               SUM(c.not_departed)::INT AS not_departed,
+               SUM(c.departed)::INT AS departed
+        FROM (
+            SELECT delegation_id,
+                   SUM(sign) AS members,
+                   COALESCE(SUM(sign) FILTER (WHERE status = 'NOT_DEPARTED'), 0) AS not_departed,
+                   COALESCE(SUM(sign) FILTER (WHERE status = 'DEPARTED'), 0) AS departed
+            FROM unnest(p_delegation_ids, p_signs, p_statuses) AS u(delegation_id, sign, status)
+            GROUP BY delegation_id
+        ) c
+        CROSS JOIN LATERAL unnest(dashboard_counter_delegation_keys(c.delegation_id)) AS k(key)
+        GROUP BY k.key
+    LOOP
+        IF r.members <> 0 OR r.not_departed <> 0 OR r.departed <> 0 THEN
+            PERFORM dashboard_counter_apply(
+                ARRAY[r.key],
+                d_members => r.members,
+                d_not_departed_members => r.not_departed,
+                d_departed_members => r.departed
+            );
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- عدادات جلسات المغادرة
+CREATE OR REPLACE FUNCTION dashboard_counter_check_out()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.delegation_id IS NOT DISTINCT FROM OLD.delegation_id THEN
         RETURN NEW;
     END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM dashboard_counter_apply(dashboard_counter_delegation_keys(OLD.delegation_id), d_check_outs => -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM dashboard_counter_apply(dashboard_counter_delegation_keys(NEW.delegation_id), d_check_outs => 1);
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
 END;
 $$ LANGUAGE plpgsql;
 
+-- دالة لإعادة بناء جميع العدادات من البيانات الفعلية (استعلام واحد مجمّع)
+CREATE OR REPLACE FUNCTION dashboard_counter_rebuild()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM dashboard_counter;
+
+    INSERT INTO dashboard_counter (
+        scope_key, main_events, sub_events, delegations,
+        military_delegations, civilian_delegations,
+        not_departed_delegations, partially_departed_delegations, fully_departed_delegations,
+        members, not_departed_members, departed_members, check_outs, updated_at
+    )
+    WITH d AS (
+        SELECT sub_event_id,
+               COUNT(*) AS delegations,
+               COUNT(*) FILTER (WHERE type = 'MILITARY') AS military_delegations,
+               COUNT(*) FILTER (WHERE type = 'CIVILIAN') AS civilian_delegations,
+               COUNT(*) FILTER (WHERE status = 'NOT_DEPARTED') AS not_departed_delegations,
+               COUNT(*) FILTER (WHERE status = 'PARTIALLY_DEPARTED') AS partially_departed_delegations,
+               COUNT(*) FILTER (WHERE status = 'FULLY_DEPARTED') AS fully_departed_delegations
+        FROM delegation
+        GROUP BY sub_event_id
+    ), m AS (
+        SELECT dl.sub_event_id,
+               COUNT(*) AS members,
+               COUNT(*) FILTER (WHERE mb.status = 'NOT_DEPARTED') AS not_departed_members,
+               COUNT(*) FILTER (WHERE mb.status = 'DEPARTED') AS departed_members
+        FROM member mb
+        JOIN delegation dl ON dl.id = mb.delegation_id
+        GROUP BY dl.sub_event_id
+    ), c AS (
+        SELECT dl.sub_event_id, COUNT(*) AS check_outs
+        FROM check_out co
+        JOIN delegation dl ON dl.id = co.delegation_id
+        GROUP BY dl.sub_event_id
+    ), per_sub AS (
+        SELECT s.id, s.main_event_id,
+               COALESCE(d.delegations, 0) AS delegations,
+               COALESCE(d.military_delegations, 0) AS military_delegations,
+               COALESCE(d.civilian_delegations, 0) AS civilian_delegations,
+               COALESCE(d.not_departed_delegations, 0) AS not_departed_delegations,
+               COALESCE(d.partially_departed_delegations, 0) AS partially_departed_delegations,
+               COALESCE(d.fully_departed_delegations, 0) AS fully_departed_delegations,
+               COALESCE(m.members, 0) AS members,
+               COALESCE(m.not_departed_members, 0) AS not_departed_members,
+               COALESCE(m.departed_members, 0) AS departed_members,
+               COALESCE(c.check_outs, 0) AS check_outs
+        FROM sub_event s
+        LEFT JOIN d ON d.sub_event_id = s.id
+        LEFT JOIN m ON m.sub_event_id = s.id
+        LEFT JOIN c ON c.sub_event_id = s.id
+    )
+    SELECT 'sub_event:' || p.id::text, 0, 1, p.delegations,
+           p.military_delegations, p.civilian_delegations,
+           p.not_departed_delegations, p.partially_departed_delegations, p.fully_departed_delegations,
+           p.members, p.not_departed_members, p.departed_members, p.check_outs, NOW()
+    FROM per_sub p
+    UNION ALL
+    SELECT 'main_event:' || me.id::text, 1, COUNT(p.id),
+           COALESCE(SUM(p.delegations), 0),
+           COALESCE(SUM(p.military_delegations), 0), COALESCE(SUM(p.civilian_delegations), 0),
+           COALESCE(SUM(p.not_departed_delegations), 0), COALESCE(SUM(p.partially_departed_delegations), 0),
+           COALESCE(SUM(p.fully_departed_delegations), 0),
+           COALESCE(SUM(p.members), 0), COALESCE(SUM(p.not_departed_members), 0),
+           COALESCE(SUM(p.departed_members), 0), COALESCE(SUM(p.check_outs), 0), NOW()
+    FROM main_event me
+    LEFT JOIN per_sub p ON p.main_event_id = me.id
+    GROUP BY me.id
+    UNION ALL
+    SELECT 'global', (SELECT COUNT(*) FROM main_event), COUNT(p.id),
+           COALESCE(SUM(p.delegations), 0),
+           COALESCE(SUM(p.military_delegations), 0), COALESCE(SUM(p.civilian_delegations), 0),
+           COALESCE(SUM(p.not_departed_delegations), 0), COALESCE(SUM(p.partially_departed_delegations), 0),
+           COALESCE(SUM(p.fully_departed_delegations), 0),
+           COALESCE(SUM(p.members), 0), COALESCE(SUM(p.not_departed_members), 0),
+           COALESCE(SUM(p.departed_members), 0), COALESCE(SUM(p.check_outs), 0), NOW()
+    FROM per_sub p;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_dashboard_counter_main_event
+AFTER INSERT OR DELETE ON main_event
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_main_event();
+
+CREATE TRIGGER trg_dashboard_counter_sub_event
+AFTER INSERT OR UPDATE OR DELETE ON sub_event
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_sub_event();
+
+CREATE TRIGGER trg_dashboard_counter_delegation
+AFTER INSERT OR UPDATE OR DELETE ON delegation
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_delegation();
+
+-- عدادات الأعضاء: trg_member_totals_* (أعلاه) تستدعي dashboard_counter_member_apply
+
+CREATE TRIGGER trg_dashboard_counter_check_out
+AFTER INSERT OR UPDATE OR DELETE ON check_out
+FOR EACH ROW EXECUTE FUNCTION dashboard_counter_check_out();
+
 -- ================================================================
--- ⚡ المشغلات (Triggers)
+-- 📅 الملخص اليومي للوحة التحكم (Dashboard Daily)
 -- ================================================================
+-- 
+-- عدد الأعضاء الواصلين والمغادرين لكل (حدث فرعي، يوم)، يحدث عبر المشغلات
+-- الوصول بتاريخ وصول الوفد والمغادرة بتاريخ مغادرة العضو؛ أعضاء الوفود بلا تاريخ وصول لا يُحسبون
+-- عدد الموجودين في البلاد ليوم ما = مجموع الواصلين ناقص المغادرين حتى نهايته (/api/dashboard/timeseries/)
+-- إعادة البناء: python manage.py rebuild_dashboard_daily
+--
+CREATE TABLE dashboard_daily (
+    id BIGSERIAL PRIMARY KEY,
+    main_event_id UUID NOT NULL,                    -- الحدث الرئيسي للحدث الفرعي
+    sub_event_id UUID NOT NULL,
+    day DATE NOT NULL,
+    arrivals INT NOT NULL DEFAULT 0,                -- الأعضاء الواصلون في هذا اليوم
+    departures INT NOT NULL DEFAULT 0,              -- الأعضاء المغادرون في هذا اليوم
+    CONSTRAINT dashboard_daily_sub_event_day UNIQUE (sub_event_id, day)
+);
+
+CREATE INDEX dashboard_daily_main_event_idx ON dashboard_daily(main_event_id, day);
 
--- مشغل لتحديث عدد الأعضاء عند إضافة/حذف عضو
-CREATE TRIGGER trg_update_member_count
-AFTER INSERT OR DELETE ON member
-FOR EACH ROW EXECUTE FUNCTION update_delegation_member_count();
+-- تطبيق فروق الوصول والمغادرة على الملخص اليومي، مجمّعة لكل (حدث فرعي، يوم)
+-- الأحداث الفرعية المحذوفة تُتجاهل (صفوفها تُحذف بمشغل sub_event)
+CREATE OR REPLACE FUNCTION dashboard_daily_apply(
+    p_sub_event_ids UUID[],
+    p_days DATE[],
+    p_arrivals INT[],
+    p_departures INT[]
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO dashboard_daily AS t (main_event_id, sub_event_id, day, arrivals, departures)
+    SELECT s.main_event_id, c.sub_event_id, c.day, c.arrivals, c.departures
+    FROM (
+        SELECT sub_event_id, day, SUM(arrivals)::INT AS arrivals, SUM(departures)::INT AS departures
+        FROM unnest(p_sub_event_ids, p_days, p_arrivals, p_departures) AS u(sub_event_id, day, arrivals, departures)
+        GROUP BY sub_event_id, day
+    ) c
+    JOIN sub_event s ON s.id = c.sub_event_id
+    WHERE c.arrivals <> 0 OR c.departures <> 0
+    ON CONFLICT (sub_event_id, day) DO UPDATE SET
+        arrivals = t.arrivals + EXCLUDED.arrivals,
+        departures = t.departures + EXCLUDED.departures;
+END;
+$$ LANGUAGE plpgsql;
 
--- مشغل لتحديث حالة الوفد عند تغيير حالة الأعضاء
-CREATE TRIGGER trg_update_delegation_status
-AFTER INSERT OR UPDATE OR DELETE ON member
-FOR EACH ROW EXECUTE FUNCTION update_delegation_status();
+-- مساهمة مجموعة أعضاء (+1/-1): الوصول بتاريخ وصول الوفد، والمغادرة بتاريخ مغادرة العضو
+CREATE OR REPLACE FUNCTION dashboard_daily_member_apply(
+    p_delegation_ids UUID[],
+    p_signs INT[],
+    p_statuses TEXT[],
+    p_departure_dates DATE[]
+)
+RETURNS VOID AS $$
+DECLARE
+    v_sub_event_ids UUID[];
+    v_days DATE[];
+    v_arrivals INT[];
+    v_departures INT[];
+BEGIN
+    SELECT array_agg(x.sub_event_id), array_agg(x.day), array_agg(x.arrivals), array_agg(x.departures)
+    INTO v_sub_event_ids, v_days, v_arrivals, v_departures
+    FROM (
+        SELECT d.sub_event_id, d.arrive_date AS day, u.sign AS arrivals, 0 AS departures
+        FROM unnest(p_delegation_ids, p_signs) AS u(delegation_id, sign)
+        JOIN delegation d ON d.id = u.delegation_id
+        WHERE d.arrive_date IS NOT NULL
+        UNION ALL
+        SELECT d.sub_event_id, u.departure_date, 0, u.sign
+        FROM unnest(p_delegation_ids, p_signs, p_statuses, p_departure_dates)
+             AS u(delegation_id, sign, status, departure_date)
+        JOIN delegation d ON d.id = u.delegation_id
+        WHERE d.arrive_date IS NOT NULL AND u.status = 'DEPARTED' AND u.departure_date IS NOT NULL
+    ) x;
+    IF v_sub_event_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_apply(v_sub_event_ids, v_days, v_arrivals, v_departures);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
 
--- مشغل لتحديث حالة الأعضاء عند إنشاء جلسة مغادرة
-CREATE TRIGGER trg_update_member_status_on_checkout
-AFTER INSERT OR UPDATE ON check_out
-FOR EACH ROW EXECUTE FUNCTION update_member_status_on_checkout();
+-- مساهمة أعضاء مجموعة وفود بحدث فرعي وتاريخ وصول محددين (عند نقل الوفد أو حذفه)
+CREATE OR REPLACE FUNCTION dashboard_daily_delegation_apply(
+    p_delegation_ids UUID[],
+    p_sub_event_ids UUID[],
+    p_arrive_dates DATE[],
+    p_sign INT
+)
+RETURNS VOID AS $$
+DECLARE
+    v_sub_event_ids UUID[];
+    v_days DATE[];
+    v_arrivals INT[];
+    v_departures INT[];
+BEGIN
+    SELECT array_agg(x.sub_event_id), array_agg(x.day), array_agg(x.arrivals), array_agg(x.departures)
+    INTO v_sub_event_ids, v_days, v_arrivals, v_departures
+    FROM (
+        SELECT u.sub_event_id, u.arrive_date AS day, p_sign * COUNT(*)::INT AS arrivals, 0 AS departures
+        FROM unnest(p_delegation_ids, p_sub_event_ids, p_arrive_dates) AS u(id, sub_event_id, arrive_date)
+        JOIN member m ON m.delegation_id = u.id
+        WHERE u.arrive_date IS NOT NULL
+        GROUP BY u.sub_event_id, u.arrive_date
+        UNION ALL
+        SELECT u.sub_event_id, m.departure_date, 0, p_sign * COUNT(*)::INT
+        FROM unnest(p_delegation_ids, p_sub_event_ids, p_arrive_dates) AS u(id, sub_event_id, arrive_date)
+        JOIN member m ON m.delegation_id = u.id
+        WHERE u.arrive_date IS NOT NULL AND m.status = 'DEPARTED' AND m.departure_date IS NOT NULL
+        GROUP BY u.sub_event_id, m.departure_date
+    ) x;
+    IF v_sub_event_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_apply(v_sub_event_ids, v_days, v_arrivals, v_departures);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
 
--- مشغلات سجل التدقيق لجميع الجداول المهمة
-CREATE TRIGGER trg_audit_users
-AFTER INSERT OR UPDATE OR DELETE ON users
-FOR EACH ROW EXECUTE FUNCTION audit_trigger_func();
+-- الملخص اليومي من تغييرات الأعضاء، مرة واحدة لكل استعلام (جداول الانتقال new_rows / old_rows)
+-- يشمل المغادرة بجلسات المغادرة (مشغل update_member_status_on_checkout يعدّل member)
+CREATE OR REPLACE FUNCTION dashboard_daily_member()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids UUID[];
+    v_signs INT[];
+    v_statuses TEXT[];
+    v_dates DATE[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(delegation_id), array_agg(1), array_agg(status::text), array_agg(departure_date)
+        INTO v_ids, v_signs, v_statuses, v_dates
+        FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(delegation_id), array_agg(-1), array_agg(status::text), array_agg(departure_date)
+        INTO v_ids, v_signs, v_statuses, v_dates
+        FROM old_rows;
+    ELSE
+        SELECT array_agg(c.delegation_id), array_agg(c.sign), array_agg(c.status), array_agg(c.departure_date)
+        INTO v_ids, v_signs, v_statuses, v_dates
+        FROM (
+            SELECT o.delegation_id, -1 AS sign, o.status::text AS status, o.departure_date
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status
+            OR n.departure_date IS DISTINCT FROM o.departure_date
+            OR n.delegation_id IS DISTINCT FROM o.delegation_id
+            UNION ALL
+            SELECT n.delegation_id, 1, n.status::text, n.departure_date
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE n.status IS DISTINCT FROM o.status
+            OR n.departure_date IS DISTINCT FROM o.departure_date
+            OR n.delegation_id IS DISTINCT FROM o.delegation_id
+        ) c;
+    END IF;
+    IF v_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_member_apply(v_ids, v_signs, v_statuses, v_dates);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trg_audit_delegation
-AFTER INSERT OR UPDATE OR DELETE ON delegation
-FOR EACH ROW EXECUTE FUNCTION audit_trigger_func();
+-- نقل أعضاء الوفود التي تغير تاريخ وصولها أو حدثها الفرعي، مرة واحدة لكل استعلام
+CREATE OR REPLACE FUNCTION dashboard_daily_delegation_moved()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids UUID[];
+    v_old_sub_event_ids UUID[];
+    v_old_dates DATE[];
+    v_new_sub_event_ids UUID[];
+    v_new_dates DATE[];
+BEGIN
+    SELECT array_agg(n.id), array_agg(o.sub_event_id), array_agg(o.arrive_date),
+           array_agg(n.sub_event_id), array_agg(n.arrive_date)
+    INTO v_ids, v_old_sub_event_ids, v_old_dates, v_new_sub_event_ids, v_new_dates
+    FROM old_rows o JOIN new_rows n ON n.id = o.id
+    WHERE n.arrive_date IS DISTINCT FROM o.arrive_date OR n.sub_event_id IS DISTINCT FROM o.sub_event_id;
+    IF v_ids IS NOT NULL THEN
+        PERFORM dashboard_daily_delegation_apply(v_ids, v_old_sub_event_ids, v_old_dates, -1);
+        PERFORM dashboard_daily_delegation_apply(v_ids, v_new_sub_event_ids, v_new_dates, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trg_audit_member
-AFTER INSERT OR UPDATE OR DELETE ON member
-FOR EACH ROW EXECUTE FUNCTION audit_trigger_func();
+-- حذف وفد يحذف أعضاءه بالتتابع بعد أن يختفي الوفد، لذلك تُطرح مساهمتهم قبل الحذف
+CREATE OR REPLACE FUNCTION dashboard_daily_delegation_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM dashboard_daily_delegation_apply(ARRAY[OLD.id], ARRAY[OLD.sub_event_id], ARRAY[OLD.arrive_date], -1);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
 
-CREATE TRIGGER trg_audit_check_out
-AFTER INSERT OR UPDATE OR DELETE ON check_out
-FOR EACH ROW EXECUTE FUNCTION audit_trigger_func();
+-- نقل الحدث الفرعي إلى حدث رئيسي آخر، وحذف صفوفه مع حذفه
+CREATE OR REPLACE FUNCTION dashboard_daily_sub_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM dashboard_daily WHERE sub_event_id = OLD.id;
+        RETURN OLD;
+    END IF;
+    IF NEW.main_event_id IS DISTINCT FROM OLD.main_event_id THEN
+        UPDATE dashboard_daily SET main_event_id = NEW.main_event_id WHERE sub_event_id = NEW.id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- إعادة بناء الملخص اليومي بالكامل من البيانات الفعلية (استعلام واحد مجمّع)
+CREATE OR REPLACE FUNCTION dashboard_daily_rebuild()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM dashboard_daily;
+
+    INSERT INTO dashboard_daily (main_event_id, sub_event_id, day, arrivals, departures)
+    SELECT s.main_event_id, x.sub_event_id, x.day, SUM(x.arrivals)::INT, SUM(x.departures)::INT
+    FROM (
+        SELECT d.sub_event_id, d.arrive_date AS day, 1 AS arrivals, 0 AS departures
+        FROM member m JOIN delegation d ON d.id = m.delegation_id
+        WHERE d.arrive_date IS NOT NULL
+        UNION ALL
+        SELECT d.sub_event_id, m.departure_date, 0, 1
+        FROM member m JOIN delegation d ON d.id = m.delegation_id
+        WHERE d.arrive_date IS NOT NULL AND m.status = 'DEPARTED' AND m.departure_date IS NOT NULL
+    ) x
+    JOIN sub_event s ON s.id = x.sub_event_id
+    GROUP BY s.main_event_id, x.sub_event_id, x.day;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_dashboard_daily_member_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_member();
+
+CREATE TRIGGER trg_dashboard_daily_member_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_member();
+
+CREATE TRIGGER trg_dashboard_daily_member_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_member();
+
+CREATE TRIGGER trg_dashboard_daily_delegation_update
+AFTER UPDATE ON delegation REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_daily_delegation_moved();
+
+CREATE TRIGGER trg_dashboard_daily_delegation_delete
+BEFORE DELETE ON delegation
+FOR EACH ROW EXECUTE FUNCTION dashboard_daily_delegation_deleted();
+
+CREATE TRIGGER trg_dashboard_daily_sub_event
+AFTER UPDATE OR DELETE ON sub_event
+FOR EACH ROW EXECUTE FUNCTION dashboard_daily_sub_event();
+
+-- ================================================================
+-- 🖨️ إصدارات بيانات التقارير (Report Versions)
+-- ================================================================
+-- 
+-- رقم إصدار لكل حدث فرعي ('sub_event:<id>') وللجداول المرجعية ('lookups')
+-- يزداد عبر المشغلات مع كل تغيير في الوفود أو الأعضاء أو جلسات المغادرة
+-- التقارير المطبوعة (/api/reports/) تُخزَّن على القرص بمفتاح يتضمن هذا الإصدار
+-- إصدار 'lookups' هو أيضاً ETag الخاص بـ /api/lookups/ (يزداد مع الإضافة كذلك)
+--
+CREATE TABLE report_version (
+    scope_key VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- رفع إصدار بيانات التقارير لمجموعة من النطاقات (sub_event:<id> أو lookups)
+CREATE OR REPLACE FUNCTION report_version_bump(p_keys TEXT[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO report_version AS v (scope_key, version)
+    SELECT DISTINCT k, 1 FROM unnest(p_keys) AS k
+    WHERE k IS NOT NULL
+    ON CONFLICT (scope_key) DO UPDATE SET version = v.version + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+-- الأحداث الفرعية المتأثرة بتغيير الوفود، مرة واحدة لكل استعلام
+CREATE OR REPLACE FUNCTION report_version_delegation()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM report_version_bump(ARRAY(SELECT 'sub_event:' || sub_event_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM report_version_bump(ARRAY(SELECT 'sub_event:' || sub_event_id FROM old_rows));
+    ELSE
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || sub_event_id FROM new_rows
+            UNION SELECT 'sub_event:' || sub_event_id FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- الأحداث الفرعية المتأثرة بتغيير الأعضاء أو جلسات المغادرة (عبر الوفد)
+CREATE OR REPLACE FUNCTION report_version_delegation_child()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || d.sub_event_id FROM new_rows r JOIN delegation d ON d.id = r.delegation_id
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || d.sub_event_id FROM old_rows r JOIN delegation d ON d.id = r.delegation_id
+        ));
+    ELSE
+        PERFORM report_version_bump(ARRAY(
+            SELECT 'sub_event:' || d.sub_event_id FROM new_rows r JOIN delegation d ON d.id = r.delegation_id
+            UNION SELECT 'sub_event:' || d.sub_event_id FROM old_rows r JOIN delegation d ON d.id = r.delegation_id
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- إضافة أو تعديل أو حذف الجداول المرجعية (الجنسيات، المدن...) يغير كل التقارير و/api/lookups/
+CREATE OR REPLACE FUNCTION report_version_lookups()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM report_version_bump(ARRAY['lookups']);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A trigger with transition tables can only handle one event, hence three per table
+CREATE TRIGGER trg_report_version_delegation_insert
+AFTER INSERT ON delegation REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation();
+
+CREATE TRIGGER trg_report_version_delegation_update
+AFTER UPDATE ON delegation REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation();
+
+CREATE TRIGGER trg_report_version_delegation_delete
+AFTER DELETE ON delegation REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation();
+
+CREATE TRIGGER trg_report_version_member_insert
+AFTER INSERT ON member REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_member_update
+AFTER UPDATE ON member REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_member_delete
+AFTER DELETE ON member REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_check_out_insert
+AFTER INSERT ON check_out REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_check_out_update
+AFTER UPDATE ON check_out REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_check_out_delete
+AFTER DELETE ON check_out REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_delegation_child();
+
+CREATE TRIGGER trg_report_version_nationality
+AFTER INSERT OR UPDATE OR DELETE ON nationality
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_cities
+AFTER INSERT OR UPDATE OR DELETE ON cities
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_air_line
+AFTER INSERT OR UPDATE OR DELETE ON air_line
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_air_port
+AFTER INSERT OR UPDATE OR DELETE ON air_port
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+CREATE TRIGGER trg_report_version_equivalent_job
+AFTER INSERT OR UPDATE OR DELETE ON equivalent_job
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_lookups();
+
+-- التقرير يطبع اسم الحدث الفرعي: تغيير الاسم يرفع إصدار ذلك الحدث
+CREATE OR REPLACE FUNCTION report_version_sub_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM report_version_bump(ARRAY(
+        SELECT 'sub_event:' || n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n.event_name IS DISTINCT FROM o.event_name
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_report_version_sub_event_update
+AFTER UPDATE ON sub_event REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION report_version_sub_event();
 
 -- ================================================================
 -- 📊 بيانات تجريبية (اختياري)